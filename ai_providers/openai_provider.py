@@ -1,4 +1,3 @@
-import requests
 import json
 from typing import Dict, Any, Optional
 from .base_provider import BaseAIProvider
@@ -68,6 +67,8 @@ class OpenAIProvider(BaseAIProvider):
             **kwargs
         }
         
+        # requests 导入较慢，只在真正发请求时导入
+        import requests
         try:
             response = requests.post(
                 f'{self.base_url}/chat/completions',
@@ -0,0 +1,132 @@
+"""
+数据层基准测试工具
+
+用法：
+    python -m benchmarks                                 # small 规模，与 benchmarks/baselines/small.json 比较
+    python -m benchmarks --scale huge --repeat 10 --out results.json
+    python -m benchmarks --scale medium --save-baseline  # 把本次结果保存为该规模的基线
+    python -m benchmarks --only trend --no-views         # 只运行名称包含 trend 的基准
+    python -m benchmarks --data-dir ~/.bench-data        # 复用已生成的数据库，大规模数据只生成一次
+    python -m benchmarks --memory                        # 载入内存数据库后计时，排除磁盘 I/O
+
+数据写入临时数据库，不会读写应用的数据库。有退化时以退出码 1 结束。
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.datagen import SCALES, DEFAULT_SEED, generate
+from benchmarks.suite import (
+    RESULTS_FORMAT, DEFAULT_REPEAT, DEFAULT_THRESHOLD, run_suite, environment, compare, regressions,
+    format_comparison
+)
+from database.db_manager import DatabaseManager
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+def prepare_database(path: str, scale: str, seed: int, data_dir: str = None) -> dict:
+    """在 path 生成数据（data_dir 中有相同规模、种子和日期的数据库时直接复制），返回生成的行数"""
+    cached = None
+    if data_dir:
+        os.makedirs(data_dir, exist_ok=True)
+        cached = os.path.join(data_dir, f"{scale}-{seed}-{date.today().isoformat()}.db")
+        if os.path.exists(cached) and os.path.exists(cached + '.json'):
+            shutil.copyfile(cached, path)
+            with open(cached + '.json', encoding='utf-8') as f:
+                return json.load(f)
+
+    db = DatabaseManager(path)
+    try:
+        counts = generate(db, scale, seed)
+    finally:
+        db.close()
+
+    if cached:
+        shutil.copyfile(path, cached)
+        with open(cached + '.json', 'w', encoding='utf-8') as f:
+            json.dump(counts, f)
+    return counts
+
+
+def run(scale: str, seed: int, repeat: int, only: str = None, include_views: bool = True,
+        data_dir: str = None, memory: bool = False) -> dict:
+    """生成数据并运行基准，返回完整结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        started = time.time()
+        print(f"生成 {scale} 规模数据...", flush=True)
+        counts = prepare_database(path, scale, seed, data_dir)
+        print(f"  {counts}，用时 {time.time() - started:.1f} 秒", flush=True)
+
+        db = DatabaseManager(':memory:', seed=path) if memory else DatabaseManager(path)
+        try:
+            suite = run_suite(db, repeat, only, include_views,
+                              progress=lambda name: print(f"  {name}", flush=True))
+        finally:
+            db.close()
+
+    return {
+        'format': RESULTS_FORMAT,
+        'scale': scale,
+        'seed': seed,
+        'repeat': repeat,
+        'memory': memory,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': environment(),
+        'rows': counts,
+        **suite,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据层基准测试")
+    parser.add_argument("--scale", choices=list(SCALES), default="small", help="数据规模（默认 small）")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每项基准的计时次数")
+    parser.add_argument("--only", default=None, help="只运行名称包含该字符串的基准")
+    parser.add_argument("--no-views", action="store_true", help="不计时 create_*_view")
+    parser.add_argument("--out", default=None, help="结果 JSON 文件")
+    parser.add_argument("--baseline", default=None, help="基线 JSON 文件（默认 benchmarks/baselines/<规模>.json）")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="记为退化的变慢比例（默认 0.25）")
+    parser.add_argument("--data-dir", default=None, help="缓存生成的数据库的目录")
+    parser.add_argument("--memory", action="store_true", help="在内存数据库上计时")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.seed, args.repeat, args.only, not args.no_views, args.data_dir, args.memory)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.out}")
+    for name, reason in results['skipped'].items():
+        print(f"跳过 {name}: {reason}")
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.scale}.json")
+    failed = False
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.threshold)
+        print(f"\n与基线 {baseline_path}（{baseline.get('created_at')}）比较：")
+        print(format_comparison(comparison))
+        failed = bool(regressions(comparison))
+        if failed:
+            print(f"\n{len(regressions(comparison))} 项退化超过 {args.threshold:.0%}")
+    else:
+        print(format_comparison(compare(results, {})))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {baseline_path}")
+
+    sys.exit(1 if failed else 0)
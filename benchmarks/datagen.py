@@ -0,0 +1,168 @@
+"""
+基准测试数据生成 - 按规模向数据库写入确定的合成数据
+
+同一规模、随机种子和截止日期生成的数据完全相同；截止日期默认为今天，
+"今日"相关的查询总能读到数据，不同日期运行时数据只是整体平移，查询成本不变。
+
+写入尽量走应用自己的路径：收支流水用 import_finance_records 批量导入，境界树用
+save_jingjie_data，其余明细在一个事务内 executemany，触发器照常维护每日汇总、账本、
+全文索引和变更日志。
+"""
+import csv
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+from database.db_manager import DatabaseManager
+
+
+DEFAULT_SEED = 20240101
+
+
+@dataclass(frozen=True)
+class Scale:
+    """一种数据规模"""
+    days: int                     # 修炼记录覆盖的天数（截止日期往前）
+    finance_records: int
+    friends: int
+    interactions_per_friend: int
+    family_members: int
+    skills: int
+    nodes_per_skill: int
+    quotes: int
+
+
+SCALES: Dict[str, Scale] = {
+    'tiny': Scale(days=30, finance_records=300, friends=10, interactions_per_friend=3,
+                  family_members=3, skills=5, nodes_per_skill=10, quotes=20),
+    'small': Scale(days=365, finance_records=5_000, friends=100, interactions_per_friend=5,
+                   family_members=8, skills=25, nodes_per_skill=20, quotes=100),
+    'medium': Scale(days=3 * 365, finance_records=50_000, friends=300, interactions_per_friend=10,
+                    family_members=15, skills=100, nodes_per_skill=25, quotes=500),
+    'huge': Scale(days=10 * 365, finance_records=200_000, friends=1_000, interactions_per_friend=20,
+                  family_members=30, skills=250, nodes_per_skill=20, quotes=2_000),
+}
+
+# 每个任务每天被完成的概率
+TASK_COMPLETION_RATE = 0.6
+
+INCOME_CATEGORIES = ('工资', '奖金', '理财', '副业')
+EXPENSE_CATEGORIES = ('餐饮', '交通', '购物', '住房', '娱乐', '医疗', '学习')
+FRIEND_CATEGORIES = ('同学', '同事', '道友', '邻居', '网友')
+SURNAMES = '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许'
+GIVEN_NAMES = '一二三四五六七八九十明华强伟芳静丽军洋勇'
+WORDS = ('修炼', '灵石', '心境', '寿元', '功法', '秘术', '境界', '道心', '天地', '日月', '山河', '风雨')
+
+
+def _timestamp(day: date, rng: random.Random) -> str:
+    return datetime(day.year, day.month, day.day, rng.randrange(7, 23), rng.randrange(60),
+                    rng.randrange(60)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _phrase(rng: random.Random, words: int) -> str:
+    return ''.join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate(db: DatabaseManager, scale: str = 'small', seed: int = DEFAULT_SEED, end: date = None) -> Dict[str, int]:
+    """向（新建的）数据库写入 scale 规模的数据，返回各表生成的行数"""
+    spec = SCALES[scale]
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=spec.days - 1)
+    days = [start + timedelta(days=offset) for offset in range(spec.days)]
+    counts = {}
+
+    # 收支流水：生成 CSV 后走批量导入
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'finance.csv')
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(('type', 'amount', 'category', 'description', 'created_at'))
+            for _ in range(spec.finance_records):
+                if rng.random() < 0.2:
+                    row = ('income', rng.randrange(100, 20000), rng.choice(INCOME_CATEGORIES))
+                else:
+                    row = ('expense', rng.randrange(5, 2000), rng.choice(EXPENSE_CATEGORIES))
+                description = _phrase(rng, 2) if rng.random() < 0.3 else ''
+                writer.writerow(row + (description, _timestamp(rng.choice(days), rng)))
+        counts['finance_records'] = db.import_finance_records(csv_path, skip_duplicates=False)['inserted']
+
+    # 境界树：功法分属各境界，另有秘术与副本
+    realm_data = db.load_jingjie_data()
+    realms = realm_data['gongfa']['realms']
+    skill_groups = [realm.setdefault('skills', {}) for realm in realms]
+    skill_groups += [realm_data.setdefault('secret_arts', {}), realm_data.setdefault('fuben', {})]
+    for index in range(spec.skills):
+        nodes = [f"第{ordinal + 1}层·{_phrase(rng, 1)}" for ordinal in range(spec.nodes_per_skill)]
+        done = rng.randrange(spec.nodes_per_skill + 1)
+        skill_groups[index % len(skill_groups)][f"{_phrase(rng, 2)}{index}"] = {
+            'nodes': nodes, 'completed': nodes[:done],
+        }
+    db.save_jingjie_data(realm_data)
+    counts['skill_nodes'] = spec.skills * spec.nodes_per_skill
+
+    with db.transaction() as conn:
+        # 修炼记录：每个任务每天按概率完成一次
+        tasks = conn.execute('SELECT id, spirit_effect, blood_effect FROM tasks ORDER BY id').fetchall()
+        task_rows = [
+            (task_id, _timestamp(day, rng), spirit, blood)
+            for day in days
+            for task_id, spirit, blood in tasks
+            if rng.random() < TASK_COMPLETION_RATE
+        ]
+        conn.executemany('''
+            INSERT INTO task_records (task_id, completed_at, spirit_change, blood_change) VALUES (?, ?, ?, ?)
+        ''', task_rows)
+        counts['task_records'] = len(task_rows)
+
+        # 道友、关系、互动记录与交互任务
+        first_friend = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM friends").fetchone()[0]
+        friend_rows = [
+            (rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES) + rng.choice(GIVEN_NAMES),
+             rng.choice(FRIEND_CATEGORIES), _phrase(rng, 2), _phrase(rng, 2),
+             (end - timedelta(days=rng.randrange(spec.days))).isoformat(), int(rng.random() < 0.1))
+            for _ in range(spec.friends)
+        ]
+        conn.executemany('''
+            INSERT INTO friends (name, category, personality, hobbies, last_contact, is_close_friend)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', friend_rows)
+        friend_ids = list(range(first_friend, first_friend + spec.friends))
+        conn.executemany('''
+            INSERT INTO interaction_records (friend_id, content, interaction_date) VALUES (?, ?, ?)
+        ''', [
+            (friend_id, _phrase(rng, 4), rng.choice(days).isoformat())
+            for friend_id in friend_ids for _ in range(spec.interactions_per_friend)
+        ])
+        if len(friend_ids) > 1:
+            conn.executemany('''
+                INSERT INTO friend_relations (friend_id, related_friend_id, relation_type) VALUES (?, ?, ?)
+            ''', [(friend_id, rng.choice(friend_ids), 'acquaintance') for friend_id in friend_ids])
+        conn.executemany('''
+            INSERT INTO friend_tasks (friend_id, task_name, reward_type, reward_amount) VALUES (?, ?, ?, ?)
+        ''', [(friend_id, _phrase(rng, 2), rng.choice(('spirit', 'blood', 'money')), rng.randrange(1, 10))
+              for friend_id in friend_ids[::5]])
+        counts['friends'] = spec.friends
+        counts['interaction_records'] = spec.friends * spec.interactions_per_friend
+
+        # 家族成员与事件
+        for _ in range(spec.family_members):
+            birthday = date(rng.randrange(1940, 2020), rng.randrange(1, 13), rng.randrange(1, 29))
+            member_id = conn.execute('INSERT INTO family_members (name, birthday) VALUES (?, ?)', (
+                rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES), birthday.isoformat()
+            )).lastrowid
+            conn.executemany('''
+                INSERT INTO family_events (member_id, event_name, event_date) VALUES (?, ?, ?)
+            ''', [(member_id, _phrase(rng, 2), rng.choice(days).isoformat()) for _ in range(3)])
+        counts['family_members'] = spec.family_members
+
+        # 励志语录
+        conn.executemany('INSERT INTO lizhi_quotes (content, author) VALUES (?, ?)', [
+            (_phrase(rng, rng.randrange(4, 12)), rng.choice(SURNAMES) + '子') for _ in range(spec.quotes)
+        ])
+        counts['lizhi_quotes'] = spec.quotes
+
+    return counts
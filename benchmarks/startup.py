@@ -0,0 +1,136 @@
+"""
+启动耗时基准 - 在全新的解释器中重复执行无界面的启动路径，阶段中位数超出预算时失败
+
+用法：
+    python -m benchmarks.startup                      # 5 次，与 config.STARTUP_BUDGETS_MS 比较
+    python -m benchmarks.startup --runs 10 --out startup.json
+    python -m benchmarks.startup --imports 20         # 显示中位数那次启动最慢的 20 个导入
+
+每次都是冷启动（新进程、空的模块缓存），对同一个已建好表的临时数据库计时：
+import_config、import_main_window、import_database（界面导入成功时已缓存）、
+db_init（含 schema_check、optimize_database）、panel_system。
+first_update 需要真实窗口，只在应用启动日志中记录。依赖缺失（如 flet）的阶段记入跳过列表。
+超出预算时以退出码 1 结束。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from utils.startup import startup, phase_totals, check_budgets, format_run
+
+
+DEFAULT_RUNS = 5
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_startup(db_path: str) -> dict:
+    """在当前（全新的）进程中执行一次无界面启动路径，返回启动记录，skipped 为 {阶段: 原因}"""
+    startup.begin(import_timing=True)
+    skipped = {}
+    with startup.phase('import_config'):
+        import config  # noqa: F401
+    try:
+        with startup.phase('import_main_window'):
+            import ui.main_window  # noqa: F401
+    except ImportError as e:
+        skipped['import_main_window'] = f"{type(e).__name__}: {e}"
+
+    with startup.phase('import_database'):
+        from database.db_manager import DatabaseManager
+    with startup.phase('db_init'):
+        db = DatabaseManager(db_path)
+    try:
+        with startup.phase('panel_system'):
+            from systems.panel import PanelSystem
+            PanelSystem(db).create_panel_view()
+    except ImportError as e:
+        skipped['panel_system'] = f"{type(e).__name__}: {e}"
+    finally:
+        db.close()
+
+    run = startup.finish(write=False, budgets={})
+    run['skipped'] = skipped
+    return run
+
+
+def _run_child(db_path: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'run.json')
+        subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child', db_path, out],
+                       cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL)
+        with open(out, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def run(runs: int = DEFAULT_RUNS) -> dict:
+    """建好临时数据库后冷启动 runs 次，返回各次记录、各阶段中位数和中位数那次启动"""
+    from database.db_manager import DatabaseManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'startup.db')
+        # 先建表并写入初始数据，计时的是已有数据库的启动
+        DatabaseManager(db_path).close()
+        records = [_run_child(db_path) for _ in range(runs)]
+
+    samples: Dict[str, List[float]] = {}
+    for record in records:
+        for name, ms in phase_totals(record).items():
+            samples.setdefault(name, []).append(ms)
+    medians = {name: round(sorted(values)[len(values) // 2], 3) for name, values in samples.items()}
+    by_total = sorted(records, key=lambda record: record['total_ms'])
+    return {
+        'runs': records,
+        'median_ms': medians,
+        'median_run': by_total[len(by_total) // 2],
+        'skipped': records[0]['skipped'] if records else {},
+    }
+
+
+def format_medians(medians: Dict[str, float], budgets: Dict[str, float]) -> str:
+    """各阶段中位数与预算的文本表格"""
+    lines = [f"{'阶段':<24} {'中位数ms':>10} {'预算ms':>10}  状态"]
+    for name, ms in medians.items():
+        budget = budgets.get(name)
+        status = '超出' if budget is not None and ms > budget else ''
+        lines.append(f"{name:<24} {ms:>10.1f} {budget if budget is not None else '-':>10}  {status}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动耗时基准")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="冷启动次数")
+    parser.add_argument("--imports", type=int, default=10, help="显示最慢的导入数")
+    parser.add_argument("--out", default=None, help="结果 JSON 文件")
+    parser.add_argument("--child", nargs=2, metavar=("DB", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        db_path, out = args.child
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(measure_startup(db_path), f, ensure_ascii=False)
+        sys.exit(0)
+
+    from config import STARTUP_BUDGETS_MS
+
+    results = run(args.runs)
+    over = results['over_budget'] = check_budgets(results['median_ms'], STARTUP_BUDGETS_MS)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.out}")
+    for name, reason in results['skipped'].items():
+        print(f"跳过 {name}: {reason}")
+
+    print(f"{args.runs} 次冷启动：")
+    print(format_medians(results['median_ms'], STARTUP_BUDGETS_MS))
+    print("\n中位数那次启动：")
+    print(format_run(results['median_run'], args.imports))
+
+    if over:
+        print(f"\n{len(over)} 个阶段超出预算")
+    sys.exit(1 if over else 0)
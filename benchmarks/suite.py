@@ -0,0 +1,259 @@
+"""
+数据层基准测试 - 对合成数据库计时热点 DatabaseManager 方法和各系统的 create_*_view
+
+每项基准先预热一次，再重复执行若干次，取中位数、p95、最小值和平均值（毫秒）。
+读取类基准每次执行前清空查询缓存，测的是实际查询成本；写入类基准成对执行
+（完成/取消、记账/删除），数据库状态不随次数累积。写入类基准另在暂停状态时间序列
+触发器后各计时一次（名称带 [no series]），两者之差即每次写入附带的三层快照与清理的成本。
+
+结果可与保存的基线比较：中位数比基线慢 threshold 以上且差值超过噪声下限时记为退化。
+"""
+import platform
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from database.db_manager import DatabaseManager
+from database.profiling import percentile
+from database.migrations import STATE_SERIES_TRIGGERS
+
+
+RESULTS_FORMAT = 1
+DEFAULT_REPEAT = 20
+# 比较基线时：中位数变慢超过该比例记为退化，变快超过该比例记为改进
+DEFAULT_THRESHOLD = 0.25
+# 差值低于该毫秒数的变化视为噪声
+NOISE_FLOOR_MS = 0.05
+
+
+class Fixture:
+    """基准使用的固定对象：数据量最大的道友、专用任务、一个技能节点、分页游标等"""
+
+    def __init__(self, db: DatabaseManager):
+        with db.transaction() as conn:
+            self.friend_id = conn.execute('''
+                SELECT friend_id FROM interaction_records GROUP BY friend_id ORDER BY COUNT(*) DESC, friend_id LIMIT 1
+            ''').fetchone()[0]
+            self.skill_id, self.ordinal = conn.execute(
+                'SELECT skill_id, ordinal FROM skill_nodes ORDER BY skill_id, ordinal LIMIT 1'
+            ).fetchone()
+        # 今天没有完成记录的专用任务，完成/取消基准不受生成数据影响
+        self.task_id = db.add_task('基准测试任务', 'positive', 1, 1)
+        self.finance_cursor = db.get_finance_records_page(20).next_cursor
+        self.version = db.get_change_version()
+
+
+def _read_benchmarks(fixture: Fixture) -> Dict[str, Callable[[DatabaseManager], object]]:
+    today = date.today()
+    year_ago = (today - timedelta(days=364)).isoformat()
+    return {
+        'get_user_data': lambda db: db.get_user_data(),
+        'get_user_stats': lambda db: db.get_user_stats(),
+        'get_tasks': lambda db: db.get_tasks(),
+        'get_today_tasks': lambda db: db.get_today_tasks(),
+        'get_finance_balance': lambda db: db.get_finance_balance(),
+        'get_finance_summary': lambda db: db.get_finance_summary(),
+        'get_daily_finance_stats': lambda db: db.get_daily_finance_stats(),
+        'get_finance_records': lambda db: db.get_finance_records(20),
+        'get_finance_records_page.next': lambda db: db.get_finance_records_page(20, fixture.finance_cursor),
+        'get_fixed_items': lambda db: db.get_fixed_items(),
+        'get_daily_rollups.year': lambda db: db.get_daily_rollups(year_ago, today.isoformat()),
+        'get_period_trend.day30': lambda db: db.get_period_trend('day', 30),
+        'get_period_trend.week26': lambda db: db.get_period_trend('week', 26),
+        'get_period_trend.month24': lambda db: db.get_period_trend('month', 24),
+        'get_spirit_trend_data.30': lambda db: db.get_spirit_trend_data(30),
+        'get_finance_trend_data.30': lambda db: db.get_finance_trend_data(30),
+        'get_state_series.365': lambda db: db.get_state_series(365),
+        'load_jingjie_data': lambda db: db.load_jingjie_data(),
+        'get_friends': lambda db: db.get_friends(),
+        'get_interaction_records_page': lambda db: db.get_interaction_records_page(fixture.friend_id, 10),
+        'get_family_members': lambda db: db.get_family_members(),
+        'get_family_events': lambda db: db.get_family_events(),
+        'get_quotes_page': lambda db: db.get_quotes_page(20),
+        'get_random_quote': lambda db: db.get_random_quote(),
+        'search': lambda db: db.search('修炼'),
+        'get_changes_since.coalesce': lambda db: db.get_changes_since(max(0, fixture.version - 1000), coalesce=True),
+    }
+
+
+def _write_benchmarks(fixture: Fixture) -> Dict[str, Callable[[DatabaseManager], object]]:
+    def complete_and_undo(db):
+        db.complete_task(fixture.task_id, 1, 1)
+        db.uncomplete_task(fixture.task_id, 1, 1)
+
+    def record_and_delete(db):
+        db.add_finance_record('expense', 12.5, '餐饮', '基准测试')
+        db.delete_finance_record(db.get_finance_records(1)[0].id)
+
+    def spirit_round_trip(db):
+        db.update_spirit_blood(1, 0)
+        db.update_spirit_blood(-1, 0)
+
+    def toggle_node(db):
+        db.set_skill_node_completed(fixture.skill_id, fixture.ordinal, True)
+        db.set_skill_node_completed(fixture.skill_id, fixture.ordinal, False)
+
+    return {
+        'write.complete_task+uncomplete': complete_and_undo,
+        'write.add_finance_record+delete': record_and_delete,
+        'write.update_spirit_blood x2': spirit_round_trip,
+        'write.set_skill_node_completed x2': toggle_node,
+    }
+
+
+def _view_benchmarks() -> Dict[str, Callable[[DatabaseManager], Callable]]:
+    """各系统的 create_*_view：名称 -> build(db)，build 导入并构造系统后返回计时的调用"""
+    def view(module: str, class_name: str, method: str, *args):
+        def build(db):
+            system = getattr(__import__(module, fromlist=[class_name]), class_name)(db)
+            return lambda db: getattr(system, method)(*args)
+        return build
+
+    def noop(*args):
+        return None
+
+    return {
+        'view.panel': view('systems.panel', 'PanelSystem', 'create_panel_view'),
+        'view.xinjing': view('systems.xinjing', 'XinjingSystem', 'create_xinjing_view', noop, noop),
+        'view.lingshi': view('systems.lingshi', 'LingshiSystem', 'create_lingshi_view'),
+        'view.jingjie': view('systems.jingjie', 'JingjieSystem', 'create_jingjie_view'),
+        'view.tongyu': view('systems.tongyu', 'TongyuSystem', 'create_tongyu_view'),
+        'view.lizhi': view('systems.lizhi', 'LizhiSystem', 'create_lizhi_view'),
+        'view.settings': view('systems.settings', 'SettingsSystem', 'create_settings_view'),
+    }
+
+
+@contextmanager
+def suspended_triggers(db: DatabaseManager, trigger_sqls):
+    """临时删除一组触发器（只用于基准数据库），结束时按原定义恢复"""
+    names = [re.search(r'TRIGGER IF NOT EXISTS (\w+)', sql).group(1) for sql in trigger_sqls]
+    with db.transaction() as conn:
+        for name in names:
+            conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    try:
+        yield
+    finally:
+        with db.transaction() as conn:
+            for sql in trigger_sqls:
+                conn.execute(sql)
+
+
+def time_call(fn: Callable[[], object], repeat: int, before: Callable[[], None] = None) -> dict:
+    """预热一次后执行 repeat 次，返回耗时统计（毫秒）；before 在每次计时前执行，不计入耗时"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(samples[0], 4),
+        'median_ms': round(percentile(samples, 0.5), 4),
+        'p95_ms': round(percentile(samples, 0.95), 4),
+        'mean_ms': round(sum(samples) / len(samples), 4),
+    }
+
+
+def run_suite(db: DatabaseManager, repeat: int = DEFAULT_REPEAT, only: str = None,
+              include_views: bool = True, progress: Callable[[str], None] = None) -> dict:
+    """对已生成数据的数据库运行全部基准，返回 {'benchmarks': {名称: 统计}, 'skipped': {名称: 原因}}"""
+    fixture = Fixture(db)
+    benchmarks, skipped = {}, {}
+
+    def measure(name, fn, cold_cache):
+        if only and only not in name:
+            return
+        if progress:
+            progress(name)
+        benchmarks[name] = time_call(lambda: fn(db), repeat, db.invalidate_cache if cold_cache else None)
+
+    for name, fn in _read_benchmarks(fixture).items():
+        measure(name, fn, cold_cache=True)
+    for name, fn in _write_benchmarks(fixture).items():
+        measure(name, fn, cold_cache=False)
+    # 同样的写入不维护状态时间序列，与上面的结果对比得到这些触发器的写放大
+    with suspended_triggers(db, STATE_SERIES_TRIGGERS):
+        for name, fn in _write_benchmarks(fixture).items():
+            measure(f'{name} [no series]', fn, cold_cache=False)
+
+    if include_views:
+        # 依赖（flet、AI 服务等）缺失时记入跳过列表
+        for name, build in _view_benchmarks().items():
+            if only and only not in name:
+                continue
+            try:
+                fn = build(db)
+            except Exception as e:
+                skipped[name] = f"{type(e).__name__}: {e}"
+                continue
+            measure(name, fn, cold_cache=True)
+
+    return {'benchmarks': benchmarks, 'skipped': skipped}
+
+
+def environment() -> dict:
+    """结果中记录的运行环境"""
+    return {
+        'python': sys.version.split()[0],
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            noise_floor_ms: float = NOISE_FLOOR_MS) -> List[dict]:
+    """按中位数逐项比较，status 为 regression / improvement / ok / new / missing"""
+    current, previous = results['benchmarks'], baseline.get('benchmarks', {})
+    rows = []
+    for name in sorted(set(current) | set(previous)):
+        now, before = current.get(name), previous.get(name)
+        row = {
+            'name': name,
+            'baseline_ms': before['median_ms'] if before else None,
+            'current_ms': now['median_ms'] if now else None,
+            'ratio': None,
+        }
+        if before is None:
+            row['status'] = 'new'
+        elif now is None:
+            row['status'] = 'missing'
+        else:
+            delta = now['median_ms'] - before['median_ms']
+            row['ratio'] = round(now['median_ms'] / before['median_ms'], 3) if before['median_ms'] else None
+            if abs(delta) < noise_floor_ms:
+                row['status'] = 'ok'
+            elif now['median_ms'] > before['median_ms'] * (1 + threshold):
+                row['status'] = 'regression'
+            elif now['median_ms'] < before['median_ms'] * (1 - threshold):
+                row['status'] = 'improvement'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+
+def regressions(comparison: List[dict]) -> List[dict]:
+    return [row for row in comparison if row['status'] == 'regression']
+
+
+def format_comparison(comparison: List[dict], only_changes: bool = False) -> str:
+    """比较结果的文本表格"""
+    labels = {'regression': '退化', 'improvement': '改进', 'ok': '', 'new': '新增', 'missing': '缺失'}
+    lines = [f"{'基准':<48} {'基线ms':>10} {'本次ms':>10} {'倍数':>7}  状态"]
+    for row in comparison:
+        if only_changes and row['status'] == 'ok':
+            continue
+        baseline = f"{row['baseline_ms']:.3f}" if row['baseline_ms'] is not None else '-'
+        current = f"{row['current_ms']:.3f}" if row['current_ms'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+        lines.append(f"{row['name']:<48} {baseline:>10} {current:>10} {ratio:>7}  {labels[row['status']]}")
+    return '\n'.join(lines)
@@ -60,6 +60,40 @@ def init_paths():
         DB_PATH = BASE_DIR / "immortal_cultivation.db"
     return BASE_DIR, DB_PATH
 
+# Server mode (python main.py --server): every browser tab is its own session,
+# sessions of the same profile (?profile=<name>) share one database and clock
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = 8550
+
+# Database mode: "file" reads and writes the database file directly; "memory" keeps the database
+# in RAM, loads it from the file at startup and writes it back with the SQLite backup API every
+# MEMORY_SNAPSHOT_SECONDS (0 = only on exit and explicit snapshots). A fresh in-memory database
+# takes its default tasks from assets/initial_tasks.json
+DB_MODE = os.environ.get("XIUXIAN_DB_MODE", "file")
+MEMORY_SNAPSHOT_SECONDS = 300
+
+# SQL profiling (also switchable at runtime from the settings page): per-method latency
+# percentiles and a rolling log of statements slower than SLOW_QUERY_MS with their query plans
+SQL_PROFILING = os.environ.get("XIUXIAN_SQL_PROFILING") == "1"
+SLOW_QUERY_MS = 50
+
+# Startup profiling: every start appends its phase timings to STARTUP_LOG_NAME in the app data
+# directory (shown on the settings page); XIUXIAN_STARTUP_PROFILING=1 also records per-module
+# import cost. A phase slower than its budget is logged, and `python -m benchmarks.startup`
+# fails when a phase's median is over budget. "total" is begin to the first panel frame
+STARTUP_LOG_NAME = "startup_log.json"
+STARTUP_BUDGETS_MS = {
+    "import_flet": 400,
+    "import_config": 30,
+    "import_main_window": 300,
+    "db_init": 200,
+    "schema_check": 80,
+    "optimize_database": 50,
+    "panel_system": 150,
+    "first_update": 300,
+    "total": 2000,
+}
+
 # Theme Configuration
 class ThemeConfig:
     # Primary colors - Purple and Gold theme
@@ -117,6 +151,7 @@ class GameConfig:
     MAX_AGE = 80  # Maximum age
     MINUTES_PER_DAY = 24 * 60  # Blood consumed per day
     BLOOD_DECREASE_PER_MINUTE = 1  # Blood decreased per minute
+    BLOOD_DISPLAY_REFRESH_SECONDS = 300  # How often the panel re-reads the time-derived blood value
 
     # Spirit settings
     MIN_SPIRIT = -80
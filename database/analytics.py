@@ -0,0 +1,331 @@
+"""
+统计查询 - 面板、增强版主界面与趋势图使用的汇总数据
+
+DatabaseManager 通过 AnalyticsMixin 提供这些方法。每个方法只读取账本、每日汇总表和
+状态时间序列，用一条分组查询（配合窗口函数计算累计值、环比、连续天数）得到结果，
+不在 Python 中逐行累加；结果按表版本号缓存，面板加载只需要少量查询。
+
+返回约定：单值汇总为 dict，序列为按时间升序的 dict 列表，时间键统一为 date。
+"""
+from datetime import date, timedelta
+from typing import List
+
+from database.models import Task
+from database.timeseries import SERIES_TIERS, choose_tier, trend_group, range_start
+
+
+# 统计周期 -> 每日汇总表中某天所属周期的第一天（周从周一开始）
+PERIOD_START_SQL = {
+    'day': "day",
+    'week': "date(day, '-6 days', 'weekday 1')",
+    'month': "strftime('%Y-%m-01', day)",
+}
+
+# 趋势序列中任务完成数滑动平均的窗口（期数）
+MOVING_AVERAGE_PERIODS = 7
+
+
+def period_range_start(period: str, count: int, today: date = None) -> str:
+    """最近 count 个周期（含本期）的第一天"""
+    today = today or date.today()
+    if period == 'day':
+        start = today - timedelta(days=count - 1)
+    elif period == 'week':
+        start = today - timedelta(days=today.weekday() + 7 * (count - 1))
+    elif period == 'month':
+        months = today.year * 12 + today.month - 1 - (count - 1)
+        start = date(months // 12, months % 12 + 1, 1)
+    else:
+        raise ValueError(f"不支持的统计周期: {period}")
+    return start.isoformat()
+
+
+class AnalyticsMixin:
+    """统计查询方法，依赖 DatabaseManager 的 _pool 与 _cached"""
+
+    def get_user_stats(self) -> dict:
+        """获取用户当前状态与今日修炼统计
+
+        blood_value（推算后的寿元，分钟）/ days_left / spirit_value / birth_year /
+        tasks_completed_today / spirit_change_today / blood_change_today /
+        streak_days（截至今日或昨日连续有完成任务的天数）
+        """
+        today = date.today()
+
+        def load():
+            with self._pool.reader() as conn:
+                # 连续天数：有完成任务的日期减去其序号，同一段连续日期得到相同的分组值
+                row = conn.execute('''
+                    WITH active_days AS (
+                        SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS run
+                        FROM daily_task_rollup
+                        WHERE tasks_completed > 0
+                    ),
+                    last_run AS (
+                        SELECT MAX(day) AS last_day, COUNT(*) AS length
+                        FROM active_days
+                        GROUP BY run
+                        ORDER BY last_day DESC
+                        LIMIT 1
+                    )
+                    SELECT COALESCE(t.tasks_completed, 0), COALESCE(t.spirit_change, 0), COALESCE(t.blood_change, 0),
+                           CASE WHEN r.last_day >= ? THEN r.length ELSE 0 END
+                    FROM (SELECT 1) LEFT JOIN daily_task_rollup t ON t.day = ?
+                    LEFT JOIN last_run r
+                ''', ((today - timedelta(days=1)).isoformat(), today.isoformat())).fetchone()
+
+            return {
+                'tasks_completed_today': row[0],
+                'spirit_change_today': row[1],
+                'blood_change_today': row[2],
+                'streak_days': row[3],
+            }
+
+        try:
+            user = self.get_user_data()
+            if not user:
+                return {}
+            stats = self._cached(('user_stats', today), ('daily_task_rollup',), load)
+            stats.update({
+                'blood_value': user.current_blood,
+                'days_left': user.current_blood // (24 * 60),
+                'spirit_value': user.current_spirit,
+                'birth_year': user.birth_year,
+            })
+            return stats
+
+        except Exception as e:
+            print(f"获取用户统计错误: {e}")
+            return {}
+
+    def get_finance_summary(self) -> dict:
+        """获取灵石汇总：累计收支与余额、今日与本月收支、本月各支出分类及占比
+
+        expense_categories 为 [{'category', 'amount', 'share'}]，按金额降序。
+        """
+        today = date.today()
+        month_start = today.replace(day=1).isoformat()
+
+        def load():
+            with self._pool.reader() as conn:
+                # 每个 (类型, 分类) 一行，窗口函数在同一查询中给出各类型的本月与今日合计
+                rows = conn.execute('''
+                    SELECT type, category,
+                           SUM(amount_total) AS month_total,
+                           SUM(SUM(amount_total)) OVER (PARTITION BY type) AS type_month_total,
+                           SUM(SUM(CASE WHEN day = ? THEN amount_total ELSE 0 END)) OVER (PARTITION BY type)
+                    FROM daily_finance_rollup
+                    WHERE day >= ?
+                    GROUP BY type, category
+                    ORDER BY type, month_total DESC
+                ''', (today.isoformat(), month_start)).fetchall()
+
+            summary = {
+                'today_income': 0.0, 'today_expense': 0.0,
+                'month_income': 0.0, 'month_expense': 0.0,
+                'expense_categories': [],
+            }
+            for record_type, category, amount, type_total, type_today in rows:
+                if record_type not in ('income', 'expense'):
+                    continue
+                summary[f'month_{record_type}'] = float(type_total)
+                summary[f'today_{record_type}'] = float(type_today)
+                if record_type == 'expense':
+                    summary['expense_categories'].append({
+                        'category': category or '其他',
+                        'amount': float(amount),
+                        'share': float(amount) / float(type_total) if type_total else 0.0,
+                    })
+            return summary
+
+        try:
+            summary = self._cached(('finance_summary', month_start, today), ('daily_finance_rollup',), load)
+            balance = self.get_finance_balance()
+            summary.update({
+                'initial': balance['initial'],
+                'total_income': balance['income'],
+                'total_expense': balance['expense'],
+                'balance': balance['balance'],
+                'record_count': balance['record_count'],
+            })
+            return summary
+
+        except Exception as e:
+            print(f"获取灵石汇总错误: {e}")
+            return {
+                'initial': 0, 'total_income': 0, 'total_expense': 0, 'balance': 0, 'record_count': 0,
+                'today_income': 0.0, 'today_expense': 0.0, 'month_income': 0.0, 'month_expense': 0.0,
+                'expense_categories': [],
+            }
+
+    def get_today_tasks(self) -> List[Task]:
+        """获取今日任务（含完成情况），未完成的在前"""
+        return sorted(self.get_tasks(), key=lambda task: task.completed_today)
+
+    def get_period_trend(self, period: str = 'day', count: int = 30) -> List[dict]:
+        """获取最近 count 个日 / 周 / 月的收支与修炼趋势，按时间升序
+
+        每个有活动的周期一行：date（周期第一天）/ income / expense / net_amount /
+        cumulative_net（区间内累计净收入）/ net_change（较上一周期的变化，首行为 None）/
+        tasks_completed / tasks_moving_avg（最近 7 期平均）/ spirit_change / blood_change。
+        """
+        start = period_range_start(period, count)
+        period_sql = PERIOD_START_SQL[period]
+
+        def load():
+            with self._pool.reader() as conn:
+                rows = conn.execute(f'''
+                    WITH finance AS (
+                        SELECT {period_sql} AS period,
+                               SUM(CASE WHEN type = 'income' THEN amount_total ELSE 0 END) AS income,
+                               SUM(CASE WHEN type = 'expense' THEN amount_total ELSE 0 END) AS expense
+                        FROM daily_finance_rollup
+                        WHERE day >= ?
+                        GROUP BY period
+                    ),
+                    tasks AS (
+                        SELECT {period_sql} AS period,
+                               SUM(tasks_completed) AS tasks_completed,
+                               SUM(spirit_change) AS spirit_change,
+                               SUM(blood_change) AS blood_change
+                        FROM daily_task_rollup
+                        WHERE day >= ?
+                        GROUP BY period
+                    ),
+                    periods AS (
+                        SELECT period FROM finance UNION SELECT period FROM tasks
+                    ),
+                    merged AS (
+                        SELECT p.period,
+                               COALESCE(f.income, 0) AS income,
+                               COALESCE(f.expense, 0) AS expense,
+                               COALESCE(t.tasks_completed, 0) AS tasks_completed,
+                               COALESCE(t.spirit_change, 0) AS spirit_change,
+                               COALESCE(t.blood_change, 0) AS blood_change
+                        FROM periods p
+                        LEFT JOIN finance f ON f.period = p.period
+                        LEFT JOIN tasks t ON t.period = p.period
+                    )
+                    SELECT period, income, expense, income - expense,
+                           SUM(income - expense) OVER (ORDER BY period),
+                           (income - expense) - LAG(income - expense) OVER (ORDER BY period),
+                           tasks_completed,
+                           AVG(tasks_completed) OVER (ORDER BY period ROWS BETWEEN {MOVING_AVERAGE_PERIODS - 1} PRECEDING AND CURRENT ROW),
+                           spirit_change, blood_change
+                    FROM merged
+                    ORDER BY period
+                ''', (start, start)).fetchall()
+
+            return [
+                {
+                    'date': row[0], 'income': float(row[1]), 'expense': float(row[2]),
+                    'net_amount': float(row[3]), 'cumulative_net': float(row[4]),
+                    'net_change': float(row[5]) if row[5] is not None else None,
+                    'tasks_completed': row[6], 'tasks_moving_avg': round(row[7], 2),
+                    'spirit_change': row[8], 'blood_change': row[9],
+                }
+                for row in rows
+            ]
+
+        try:
+            return self._cached(('period_trend', period, count, start),
+                                ('daily_finance_rollup', 'daily_task_rollup'), load)
+
+        except Exception as e:
+            print(f"获取周期趋势错误: {e}")
+            return []
+
+    def get_state_series(self, days: int = 7) -> List[dict]:
+        """获取最近 days 天的心境、寿元、余额快照，按时间升序，可直接用于趋势图
+
+        按跨度选择精度层（原始 / 小时 / 天，更长时按周、月合并），每个点：
+        date（时间桶，UTC）/ spirit_value / blood_value / balance。
+        由收支汇总回填的历史点只有余额，spirit_value 与 blood_value 为 None。
+        """
+        tier, group = choose_tier(days)
+        code = SERIES_TIERS[tier][0]
+        start = range_start(tier, days)
+
+        def load():
+            with self._pool.reader() as conn:
+                if group:
+                    # 每组取最后一个时间桶的状态（SQLite 中与 MAX() 同查询的裸列取自最大值所在行）
+                    rows = conn.execute('''
+                        SELECT MAX(bucket), spirit, blood, balance
+                        FROM state_series
+                        WHERE tier = ? AND bucket >= ?
+                        GROUP BY strftime(?, bucket)
+                        ORDER BY 1
+                    ''', (code, start, group)).fetchall()
+                else:
+                    rows = conn.execute('''
+                        SELECT bucket, spirit, blood, balance
+                        FROM state_series
+                        WHERE tier = ? AND bucket >= ?
+                        ORDER BY bucket
+                    ''', (code, start)).fetchall()
+
+            return [
+                {'date': bucket, 'spirit_value': spirit, 'blood_value': blood,
+                 'balance': float(balance) if balance is not None else None}
+                for bucket, spirit, blood, balance in rows
+            ]
+
+        try:
+            return self._cached(('state_series', days, start), ('state_series',), load)
+
+        except Exception as e:
+            print(f"获取状态趋势错误: {e}")
+            return []
+
+    def get_spirit_trend_data(self, days: int = 7) -> List[dict]:
+        """获取心境、寿元趋势（跳过只有余额的回填点）"""
+        return [point for point in self.get_state_series(days) if point['spirit_value'] is not None]
+
+    def get_finance_trend_data(self, days: int = 7) -> List[dict]:
+        """获取最近 days 天的收支趋势，按日期升序，读取每日汇总表
+
+        每个点：date / income / expense / net_amount / balance（该时段结束时的余额）。
+        跨度较长时按周、月合并，date 为该时段内第一个有收支的日期。
+        """
+        start = (date.today() - timedelta(days=days - 1)).isoformat()
+        group = trend_group(days) or '%Y-%m-%d'
+
+        def load():
+            with self._pool.reader() as conn:
+                # 期初余额 = 初始余额 + 区间开始前的累计净收入，再按时段累加区间内的净收入
+                rows = conn.execute('''
+                    WITH periods AS (
+                        SELECT MIN(day) AS day,
+                               SUM(CASE WHEN type = 'income' THEN amount_total ELSE 0 END) AS income,
+                               SUM(CASE WHEN type = 'expense' THEN amount_total ELSE 0 END) AS expense
+                        FROM daily_finance_rollup
+                        WHERE day >= ?
+                        GROUP BY strftime(?, day)
+                    ),
+                    opening AS (
+                        SELECT COALESCE((SELECT current_money FROM user_config WHERE id = 1), 0)
+                               + COALESCE(SUM(CASE type WHEN 'income' THEN amount_total
+                                                        WHEN 'expense' THEN -amount_total ELSE 0 END), 0) AS balance
+                        FROM daily_finance_rollup
+                        WHERE day < ?
+                    )
+                    SELECT day, income, expense, income - expense,
+                           opening.balance + SUM(income - expense) OVER (ORDER BY day)
+                    FROM periods, opening
+                    ORDER BY day
+                ''', (start, group, start)).fetchall()
+
+            return [
+                {'date': day, 'income': float(income), 'expense': float(expense),
+                 'net_amount': float(net), 'balance': float(balance)}
+                for day, income, expense, net, balance in rows
+            ]
+
+        try:
+            return self._cached(('finance_trend', days, start), ('daily_finance_rollup', 'user_config'), load)
+
+        except Exception as e:
+            print(f"获取收支趋势错误: {e}")
+            return []
+
@@ -0,0 +1,54 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database.db_manager import DatabaseManager
+
+
+class AsyncDatabaseManager:
+    """DatabaseManager 的异步外观
+
+    DatabaseManager 的每个公开方法在这里都有同名的协程版本，调用在专用线程池中
+    执行，不占用 Flet 的事件循环线程：
+
+        adb = AsyncDatabaseManager(db)
+        user_data = await adb.get_user_data()
+        results = await adb.gather(user=adb.get_user_data(), tasks=adb.get_tasks())
+
+    读取在线程池线程的读连接上并发执行；写入仍由连接池串行化到唯一的写连接。
+    """
+
+    def __init__(self, db: DatabaseManager, max_workers: int = None):
+        self.db = db
+        # 与连接池的读连接上限一致，超出的读取会退化为共享写连接（内存模式没有读连接，只用一个线程）
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(1, db._pool.max_readers),
+            thread_name_prefix="db-async"
+        )
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return call
+
+    async def run(self, fn, *args, **kwargs):
+        """在数据库线程池中执行任意同步函数（如构建依赖数据库的视图）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def gather(self, **calls) -> dict:
+        """并发等待多个调用，按关键字返回结果"""
+        results = await asyncio.gather(*calls.values())
+        return dict(zip(calls.keys(), results))
+
+    def close(self):
+        """停止线程池（不关闭底层 DatabaseManager）"""
+        self._executor.shutdown(wait=True)
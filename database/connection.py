@@ -0,0 +1,353 @@
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+from database.search import search_tokens
+
+
+# 写语句的目标表：INSERT [OR ...] INTO t / REPLACE INTO t / UPDATE [OR ...] t / DELETE FROM t
+_WRITE_TARGET = re.compile(
+    r'(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
+_DDL = re.compile(r'^\s*(?:CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+# 影响范围无法确定（如结构变更）时通知的表名
+ALL_TABLES = '*'
+
+
+def memory_uri() -> str:
+    """新的共享缓存内存数据库 URI：本进程内用同一 URI 打开的连接访问同一个数据库"""
+    return f"file:xiuxian-{uuid.uuid4().hex}?mode=memory&cache=shared"
+
+
+class ConnectionPool:
+    """SQLite连接池 - 一个长连接写入者 + 线程本地读连接
+
+    PRAGMA 只在连接创建时设置一次，之后所有仓储方法复用连接，
+    不再为每次调用重新 connect / close。
+    """
+
+    # 每个连接创建时执行一次的性能参数
+    CONNECTION_PRAGMAS = (
+        'PRAGMA synchronous=NORMAL',     # 平衡性能和安全
+        'PRAGMA cache_size=-64000',      # 64MB缓存
+        'PRAGMA temp_store=MEMORY',      # 临时表存内存
+        'PRAGMA mmap_size=268435456',    # 256MB内存映射
+    )
+
+    # 触发器依赖的自定义 SQL 函数，每个连接都必须注册，否则写入相关表会失败
+    SQL_FUNCTIONS = (
+        ('search_tokens', 1, search_tokens),  # 全文索引分词
+    )
+
+    def __init__(self, db_path: str, timeout: float = 10.0, max_readers: int = 4, uri: bool = False):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.max_readers = max_readers
+        self.uri = uri  # db_path 是 URI（如 memory_uri() 的内存数据库）
+
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._writer_owner = None
+        self._rollback_only = False  # 内层失败后整个事务只能回滚
+
+        # 写事务涉及的表，提交后通知监听者（如查询缓存）
+        self._dirty_tables = set()
+        self._commit_listeners = []
+        self._trigger_targets = None  # 表 -> 其触发器（传递地）写入的表
+        # 语句监听者（性能分析），为空时读连接不挂语句回调
+        self._statement_listeners = []
+
+        self._readers = {}  # 线程ID -> 读连接
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建并配置一个新连接"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("连接池已关闭")
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,  # 连接由连接池负责串行化
+            isolation_level=None,     # 事务由连接池显式控制
+            uri=self.uri
+        )
+        for pragma in self.CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        for name, num_params, func in self.SQL_FUNCTIONS:
+            conn.create_function(name, num_params, func, deterministic=True)
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        """获取（必要时创建）唯一的写连接，调用方需持有写锁"""
+        if self._writer is None:
+            conn = self._connect()
+            # WAL模式持久化在数据库文件中，只需由写连接设置一次
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.set_trace_callback(self._track_statement)
+            self._writer = conn
+        return self._writer
+
+    def _in_write_transaction(self) -> bool:
+        """当前线程是否处于写事务中"""
+        return self._write_depth > 0 and self._writer_owner == threading.get_ident()
+
+    @contextmanager
+    def writer(self):
+        """获取写连接并开启事务，正常退出提交、异常回滚
+
+        支持同一线程内嵌套使用：内层以 SAVEPOINT 加入外层事务。内层一旦失败，
+        即使异常被调用方捕获，整个事务也会被标记为只能回滚，外层退出时回滚并
+        抛出 sqlite3.OperationalError，避免出现只完成一半的操作。
+        """
+        with self._write_lock:
+            conn = self._get_writer()
+            depth = self._write_depth
+            savepoint = f"sp_{depth}"
+
+            if depth == 0:
+                conn.execute('BEGIN IMMEDIATE')
+                self._writer_owner = threading.get_ident()
+                self._rollback_only = False
+            else:
+                conn.execute(f'SAVEPOINT {savepoint}')
+            self._write_depth += 1
+
+            try:
+                yield conn
+            except BaseException:
+                self._write_depth -= 1
+                if depth == 0:
+                    self._writer_owner = None
+                    self._rollback_only = False
+                    self._dirty_tables.clear()
+                    conn.rollback()
+                else:
+                    self._rollback_only = True
+                    conn.execute(f'ROLLBACK TO {savepoint}')
+                    conn.execute(f'RELEASE {savepoint}')
+                raise
+            else:
+                self._write_depth -= 1
+                if depth > 0:
+                    conn.execute(f'RELEASE {savepoint}')
+                    return
+
+                self._writer_owner = None
+                if self._rollback_only:
+                    self._rollback_only = False
+                    self._dirty_tables.clear()
+                    conn.rollback()
+                    raise sqlite3.OperationalError("事务中的操作失败，已整体回滚")
+
+                tables = self._collect_dirty_tables(conn)
+                conn.commit()
+                self._notify_commit(tables)
+
+    def add_commit_listener(self, listener):
+        """注册提交监听者：listener(tables) 在写事务提交后以涉及的表名集合调用"""
+        self._commit_listeners.append(listener)
+
+    def in_write_transaction(self) -> bool:
+        """当前线程是否处于写事务中（此时读到的可能是未提交的数据）"""
+        return self._in_write_transaction()
+
+    def _track_statement(self, sql: str):
+        """写连接的语句跟踪回调：记录本事务写入的表"""
+        if self._statement_listeners:
+            self._dispatch_statement(sql)
+        if _DDL.match(sql):
+            self._dirty_tables.add(ALL_TABLES)
+            self._trigger_targets = None
+            return
+        match = _WRITE_TARGET.match(sql.lstrip())
+        if match:
+            self._dirty_tables.add(match.group(1).lower())
+
+    def add_statement_listener(self, listener):
+        """注册语句监听者：listener(sql) 在任一连接开始执行语句时于执行线程中调用
+
+        用于性能分析；没有监听者时读连接上不挂回调，不产生任何开销。
+        """
+        self._statement_listeners.append(listener)
+        self._set_reader_traces()
+
+    def remove_statement_listener(self, listener):
+        if listener in self._statement_listeners:
+            self._statement_listeners.remove(listener)
+        self._set_reader_traces()
+
+    def _dispatch_statement(self, sql: str):
+        for listener in list(self._statement_listeners):
+            try:
+                listener(sql)
+            except Exception as e:
+                print(f"语句监听错误: {e}")
+
+    def _set_reader_traces(self):
+        callback = self._dispatch_statement if self._statement_listeners else None
+        with self._readers_lock:
+            for conn in self._readers.values():
+                conn.set_trace_callback(callback)
+
+    def _collect_dirty_tables(self, conn) -> frozenset:
+        """取出本事务写入的表，并加上触发器连带写入的表，调用方需持有写锁"""
+        if not self._dirty_tables:
+            return frozenset()
+        if self._trigger_targets is None:
+            self._trigger_targets = self._load_trigger_targets(conn)
+
+        tables = set(self._dirty_tables)
+        self._dirty_tables.clear()
+        for table in list(tables):
+            tables |= self._trigger_targets.get(table, set())
+        return frozenset(tables)
+
+    @staticmethod
+    def _load_trigger_targets(conn) -> dict:
+        """从 sqlite_master 解析每张表的触发器会写入哪些表（含传递）"""
+        table_names = {row[0].lower() for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        direct = {}
+        for table, sql in conn.execute(
+                "SELECT tbl_name, sql FROM sqlite_master WHERE type = 'trigger'"):
+            body = sql[sql.upper().find('BEGIN'):]
+            targets = {name.lower() for name in _WRITE_TARGET.findall(body)} & table_names
+            direct.setdefault(table.lower(), set()).update(targets)
+
+        closure = {}
+        for table in direct:
+            seen, stack = set(), [table]
+            while stack:
+                for target in direct.get(stack.pop(), ()):
+                    if target not in seen:
+                        seen.add(target)
+                        stack.append(target)
+            closure[table] = seen
+        return closure
+
+    def _notify_commit(self, tables: frozenset):
+        if not tables:
+            return
+        for listener in self._commit_listeners:
+            try:
+                listener(tables)
+            except Exception as e:
+                print(f"提交通知错误: {e}")
+
+    @contextmanager
+    def reader(self):
+        """获取当前线程的读连接
+
+        处于写事务中的线程直接复用写连接，保证读到本事务内未提交的修改；
+        读连接数超过上限时退化为在写锁下共享写连接。
+        """
+        if self._in_write_transaction():
+            yield self._writer
+            return
+
+        conn = self._get_reader()
+        if conn is not None:
+            yield conn
+            return
+
+        with self._write_lock:
+            yield self._get_writer()
+
+    def _get_reader(self):
+        """获取线程本地读连接，超过上限返回None"""
+        ident = threading.get_ident()
+        with self._readers_lock:
+            conn = self._readers.get(ident)
+            if conn is not None:
+                return conn
+
+            # 清理已结束线程遗留的连接
+            alive = {t.ident for t in threading.enumerate()}
+            for dead in [i for i in self._readers if i not in alive]:
+                try:
+                    self._readers.pop(dead).close()
+                except sqlite3.Error:
+                    pass
+
+            if len(self._readers) >= self.max_readers:
+                return None
+
+            conn = self._connect()
+            if self._statement_listeners:
+                conn.set_trace_callback(self._dispatch_statement)
+            self._readers[ident] = conn
+            return conn
+
+    def total_changes(self) -> int:
+        """写连接打开以来修改的行数（含触发器），所有写入都经过写连接，可据此判断数据是否变化"""
+        with self._write_lock:
+            return self._get_writer().total_changes
+
+    def backup_to(self, target: str) -> int:
+        """用 SQLite 在线备份 API 把整个数据库复制到 target 文件，target 已存在时整体覆盖
+
+        在写锁下复制，快照总是某次提交之后的完整状态；不能在写事务内调用。
+        返回复制时的 total_changes()。
+        """
+        if self._in_write_transaction():
+            raise sqlite3.OperationalError("写事务中不能生成快照")
+        with self._write_lock:
+            writer = self._get_writer()
+            destination = sqlite3.connect(target, timeout=self.timeout)
+            try:
+                writer.backup(destination)
+            finally:
+                destination.close()
+            return writer.total_changes
+
+    def restore_from(self, source: str):
+        """用在线备份 API 把 source 文件的内容整体载入本数据库（替换现有全部数据）"""
+        if self._in_write_transaction():
+            raise sqlite3.OperationalError("写事务中不能载入数据库")
+        with self._write_lock:
+            origin = sqlite3.connect(source, timeout=self.timeout)
+            try:
+                origin.backup(self._get_writer())
+            finally:
+                origin.close()
+            self._trigger_targets = None
+            self.reset_readers()
+        self._notify_commit(frozenset({ALL_TABLES}))
+
+    def reset_readers(self):
+        """关闭全部读连接，下次读取时重新创建（结构迁移后丢弃旧的 schema 缓存）"""
+        with self._readers_lock:
+            for conn in self._readers.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._readers.clear()
+
+    def close(self):
+        """关闭所有连接，应用退出时调用"""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+
+            if self._writer is not None:
+                try:
+                    # 退出前让SQLite根据本次会话的查询更新统计信息
+                    self._writer.execute('PRAGMA optimize')
+                    self._writer.close()
+                except sqlite3.Error:
+                    pass
+                self._writer = None
+
+            self.reset_readers()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
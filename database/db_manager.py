@@ -1,48 +1,128 @@
-import sqlite3
-import json
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 from typing import List, Optional
 from pathlib import Path
 import os
+import copy
+from concurrent.futures import Future
+from contextlib import contextmanager
 
-from database.models import Task, UserData, TaskRecord, FamilyMember, FamilyEvent, Friend, FriendRelation, FriendTask, InteractionRecord
-from config import GameConfig
+from database.models import Task, UserData, TaskRecord, FamilyMember, FamilyEvent, Friend, FriendRelation, FriendTask, InteractionRecord, FinanceRecord, FixedItem, Page, SearchResult, Change, ChangeSet
+from database.connection import ConnectionPool, memory_uri
+from database.write_queue import WriteQueue
+from database.query_cache import QueryCache
+from database.migrations import (
+    migrate, skill_node_rows, FINANCE_TOTALS_SQL, FINANCE_INSERT_TRIGGERS, ROLLUP_BACKFILL,
+    BLOOD_ELAPSED_MINUTES_SQL, STATE_SERIES_BACKFILL, FINANCE_SEARCH_BACKFILL
+)
+from database.finance_import import iter_finance_rows
+from database.search import search_tokens, build_match_query, source_range, split_rowid
+from database.timeseries import SERIES_TIERS
+from database.analytics import AnalyticsMixin
+from database.sync import SyncMixin
+from database.profiling import QueryProfiler
+from database.memory import MEMORY_PATH, SnapshotTimer, load_initial_tasks
+from utils.startup import startup
+from config import GameConfig, SQL_PROFILING, DB_MODE, MEMORY_SNAPSHOT_SECONDS
 
-class DatabaseManager:
+
+def day_range(day: str = None) -> tuple:
+    """返回某日的半开区间 [当日, 次日)，默认今日
+
+    DATETIME 列以 'YYYY-MM-DD HH:MM:SS' 文本存储，
+    `col >= start AND col < end` 与 `DATE(col) = day` 等价，但可以使用索引。
+    """
+    start = date.fromisoformat(day) if day else date.today()
+    return start.isoformat(), (start + timedelta(days=1)).isoformat()
+
+
+def derive_blood(baseline: int, updated_at: str = None, now: datetime = None) -> int:
+    """由基准值和基准时间推算当前寿元：每分钟减少 BLOOD_DECREASE_PER_MINUTE，不低于0
+
+    寿元不再由定时器逐分钟写库，读取时按经过的时间计算，应用挂起期间同样计入。
+    """
+    if not updated_at:
+        return max(0, baseline)
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    minutes = int((now - datetime.fromisoformat(updated_at)).total_seconds() // 60)
+    return max(0, baseline - max(0, minutes) * GameConfig.BLOOD_DECREASE_PER_MINUTE)
+
+
+def default_db_path() -> str:
+    """默认数据库文件路径（应用数据目录下），目录不存在时创建"""
+    # 检测Android环境
+    if 'ANDROID_STORAGE' in os.environ or os.sys.platform == 'android' or hasattr(os.sys, 'getandroidapilevel'):
+        # Android平台：使用当前工作目录（Flet会自动设置为应用私有目录）
+        app_data = Path.cwd() / 'data'
+        app_data.mkdir(exist_ok=True)
+        return str(app_data / 'immortal_cultivation.db')
+    elif os.name == 'nt':  # Windows
+        app_data = os.path.expanduser('~\\AppData\\Local\\FanRenXiuXian')
+    else:  # Linux/Mac
+        app_data = os.path.expanduser('~/.fanrenxiuxian')
+    os.makedirs(app_data, exist_ok=True)
+    return os.path.join(app_data, 'immortal_cultivation.db')
+
+
+def _iter_skills(realm_data: dict):
+    """境界数据中的全部技能字典：各境界的功法、秘术、副本"""
+    for realm in realm_data["gongfa"]["realms"]:
+        yield from realm.get("skills", {}).values()
+    yield from realm_data.get("secret_arts", {}).values()
+    yield from realm_data.get("fuben", {}).values()
+
+
+class DatabaseManager(AnalyticsMixin, SyncMixin):
     """数据库管理器 - 性能优化版"""
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, in_memory: bool = None, seed: str = None):
+        """db_path 为 ':memory:'，或 in_memory 为真（默认按 config.DB_MODE）时使用内存数据库：
+        从 seed（默认 db_path 文件）载入，db_path 是文件时定期及关闭时写回
+        """
         # 使用绝对路径，确保有写权限的目录
-        if db_path is None:
-            # 检测Android环境
-            if 'ANDROID_STORAGE' in os.environ or os.sys.platform == 'android' or hasattr(os.sys, 'getandroidapilevel'):
-                # Android平台：使用当前工作目录（Flet会自动设置为应用私有目录）
-                from pathlib import Path
-                app_data = Path.cwd() / 'data'
-                app_data.mkdir(exist_ok=True)
-                self.db_path = str(app_data / 'immortal_cultivation.db')
-            elif os.name == 'nt':  # Windows
-                app_data = os.path.expanduser('~\\AppData\\Local\\FanRenXiuXian')
-                os.makedirs(app_data, exist_ok=True)
-                self.db_path = os.path.join(app_data, 'immortal_cultivation.db')
-            else:  # Linux/Mac
-                app_data = os.path.expanduser('~/.fanrenxiuxian')
-                os.makedirs(app_data, exist_ok=True)
-                self.db_path = os.path.join(app_data, 'immortal_cultivation.db')
-        else:
-            self.db_path = db_path
+        self.db_path = db_path or default_db_path()
+        if in_memory is None:
+            in_memory = DB_MODE == 'memory'
+        self.in_memory = in_memory or self.db_path == MEMORY_PATH
+        # 内存模式自动写回的文件（文件模式与纯内存数据库为 None）
+        self.snapshot_path = self.db_path if self.in_memory and self.db_path != MEMORY_PATH else None
 
-        print(f"数据库路径: {self.db_path}")
+        print(f"数据库路径: {self.db_path}" + ("（内存模式）" if self.in_memory else ""))
 
-        # 数据缓存
-        self._cache = {}
-        self._cache_timeout = {}
+        # 连接池：一个长连接写入者 + 线程本地读连接
+        if self.in_memory:
+            # 共享缓存的内存数据库上读写并发会遇到表锁，读取一律在写锁下复用写连接
+            self._pool = ConnectionPool(memory_uri(), max_readers=0, uri=True)
+        else:
+            self._pool = ConnectionPool(self.db_path)
+        # 后台写入队列：UI 线程的写操作经此交给唯一的写线程批量提交
+        self.writes = WriteQueue(self._pool)
+        # 查询缓存：写事务提交后按涉及的表失效
+        self._query_cache = QueryCache()
+        self._pool.add_commit_listener(self._query_cache.invalidate)
 
         # 检查并设置文件权限
         self._check_permissions()
-        self.init_database()
-        self._optimize_database()
-    
+        loaded = self._load_memory_database(seed) if self.in_memory else False
+        with startup.phase('schema_check'):
+            self.init_database()
+        if self.in_memory and not loaded:
+            self._seed_initial_tasks()
+        with startup.phase('optimize_database'):
+            self._optimize_database()
+
+        # 内存模式：记下载入后的修改计数，之后只在数据有变化时写回；新建的数据库立即写出文件
+        self._snapshot_changes = self._pool.total_changes()
+        if self.snapshot_path and not loaded:
+            self.snapshot()
+        self._snapshot_timer = None
+        if self.snapshot_path and MEMORY_SNAPSHOT_SECONDS > 0:
+            self._snapshot_timer = SnapshotTimer(self.snapshot_if_changed, MEMORY_SNAPSHOT_SECONDS)
+
+        # SQL 性能分析：关闭时不包装方法、不挂语句回调，可在设置页随时开关
+        self.profiler = QueryProfiler(self)
+        if SQL_PROFILING:
+            self.profiler.enable()
+
     def _check_permissions(self):
         """检查并设置数据库文件权限"""
         if os.path.exists(self.db_path):
@@ -51,591 +131,266 @@ class DatabaseManager:
                 os.chmod(self.db_path, 0o666)
             except:
                 pass
-    
-    def _optimize_database(self):
-        """优化数据库性能设置"""
+
+    def _load_memory_database(self, seed: str = None) -> bool:
+        """内存模式启动时从 seed（默认数据库文件）载入数据，没有可载入的文件时返回 False"""
+        source = seed or self.snapshot_path
+        if not source or not os.path.exists(source):
+            return False
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            self._pool.restore_from(source)
+            return True
+        except Exception as e:
+            print(f"载入数据库错误: {e}")
+            return False
 
-            # 启用WAL模式，提高并发性能
-            cursor.execute('PRAGMA journal_mode=WAL')
+    def _seed_initial_tasks(self):
+        """新建的内存数据库以 assets/initial_tasks.json 作为默认任务"""
+        try:
+            tasks = load_initial_tasks()
+            if not tasks:
+                return
+            with self._pool.writer() as conn:
+                conn.execute('DELETE FROM tasks')
+                conn.executemany('''
+                    INSERT INTO tasks (name, category, spirit_effect, blood_effect) VALUES (?, ?, ?, ?)
+                ''', tasks)
+        except Exception as e:
+            print(f"初始化任务错误: {e}")
+
+    def snapshot(self, path: str = None) -> Optional[str]:
+        """用 SQLite 在线备份 API 把数据库写到 path（默认内存模式对应的数据库文件），返回写入的路径
+
+        文件模式下同样可用，得到的是运行中数据库的一致副本。
+        """
+        try:
+            target = path or self.snapshot_path
+            if not target:
+                raise ValueError("没有指定快照文件")
+            changes = self._pool.backup_to(target)
+            if target == self.snapshot_path:
+                self._snapshot_changes = changes
+            return target
+
+        except Exception as e:
+            print(f"生成快照错误: {e}")
+            return None
+
+    def snapshot_if_changed(self) -> bool:
+        """内存模式下数据自上次写回后有变化时写回数据库文件，返回是否写出（定时快照与关闭时调用）"""
+        if not self.snapshot_path or self._pool.total_changes() == self._snapshot_changes:
+            return False
+        return self.snapshot() is not None
 
-            # 优化性能参数
-            cursor.execute('PRAGMA synchronous=NORMAL')  # 平衡性能和安全
-            cursor.execute('PRAGMA cache_size=-64000')   # 64MB缓存
-            cursor.execute('PRAGMA temp_store=MEMORY')   # 临时表存内存
-            cursor.execute('PRAGMA mmap_size=268435456') # 256MB内存映射
+    def _optimize_database(self):
+        """优化数据库性能设置
 
-            conn.commit()
-            conn.close()
+        PRAGMA 由连接池在创建连接时统一设置，这里只负责预先建立写连接，
+        避免首次用户操作时才付出打开连接的开销。
+        """
+        try:
+            with self._pool.writer():
+                pass
             print("数据库性能优化完成")
         except Exception as e:
             print(f"数据库优化警告: {e}")
 
-    def _get_cache(self, key: str, timeout: int = 5):
-        """获取缓存数据"""
-        import time
-        if key in self._cache:
-            # 检查缓存是否过期
-            if key in self._cache_timeout:
-                if time.time() - self._cache_timeout[key] < timeout:
-                    return self._cache[key]
-        return None
-
-    def _set_cache(self, key: str, value):
-        """设置缓存数据"""
-        import time
-        self._cache[key] = value
-        self._cache_timeout[key] = time.time()
-
-    def _clear_cache(self, pattern: str = None):
-        """清除缓存"""
-        if pattern:
-            keys_to_delete = [k for k in self._cache.keys() if pattern in k]
-            for key in keys_to_delete:
-                del self._cache[key]
-                if key in self._cache_timeout:
-                    del self._cache_timeout[key]
-        else:
-            self._cache.clear()
-            self._cache_timeout.clear()
+    def _cached(self, key, tables: tuple, loader):
+        """按表版本号缓存 loader() 的结果，tables 为结果依赖的表
 
-    def _get_connection(self):
-        """获取数据库连接，统一处理连接参数"""
-        conn = sqlite3.connect(
-            self.db_path,
-            timeout=10.0,  # 增加超时时间
-            check_same_thread=False,  # 允许多线程访问
-            isolation_level=None  # 自动提交模式，提升性能
+        写事务内读到的可能是未提交的数据，不写入缓存；loader 抛出的异常不会被缓存。
+        """
+        value = self._query_cache.get_or_load(
+            key, tables, loader, cacheable=not self._pool.in_write_transaction()
         )
-        # 设置WAL模式，提高并发性能
-        conn.execute('PRAGMA journal_mode=WAL')
-        conn.execute('PRAGMA synchronous=NORMAL')
-        return conn
-    
-    def init_database(self):
-        """初始化数据库表结构"""
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 用户配置表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_config (
-                    id INTEGER PRIMARY KEY,
-                    birth_year INTEGER NOT NULL,
-                    initial_blood INTEGER NOT NULL,
-                    current_blood INTEGER NOT NULL,
-                    current_spirit INTEGER DEFAULT 0,
-                    current_money INTEGER DEFAULT 0,
-                    target_money INTEGER DEFAULT 5000000,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 任务表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    spirit_effect INTEGER DEFAULT 0,
-                    blood_effect INTEGER DEFAULT 0,
-                    frequency TEXT DEFAULT 'daily',
-                    status INTEGER DEFAULT 1,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 任务记录表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS task_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_id INTEGER NOT NULL,
-                    completed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    spirit_change INTEGER,
-                    blood_change INTEGER,
-                    FOREIGN KEY (task_id) REFERENCES tasks(id)
-                )
-            ''')
-            
-            # 财务记录表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS finance_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type TEXT NOT NULL,
-                    amount DECIMAL NOT NULL,
-                    category TEXT,
-                    description TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 技能进度表（已废弃，使用新的境界表）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS skill_progress (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    skill_name TEXT NOT NULL,
-                    parent_id INTEGER,
-                    total_nodes INTEGER DEFAULT 0,
-                    completed_nodes INTEGER DEFAULT 0,
-                    realm_level TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 境界表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS realms (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    order_index INTEGER NOT NULL,
-                    completed BOOLEAN DEFAULT FALSE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 功法/秘术/副本表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS skills (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    realm_id INTEGER,
-                    skill_type TEXT NOT NULL CHECK(skill_type IN ('gongfa', 'secret_art', 'fuben')),
-                    nodes_json TEXT NOT NULL,
-                    completed_json TEXT DEFAULT '[]',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (realm_id) REFERENCES realms(id)
-                )
-            ''')
-            
-            # 境界系统配置表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS jingjie_config (
-                    id INTEGER PRIMARY KEY,
-                    current_realm_index INTEGER DEFAULT 0,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 负债表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS debts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    monthly_payment DECIMAL NOT NULL,
-                    remaining_months INTEGER NOT NULL,
-                    total_amount DECIMAL NOT NULL,
-                    description TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    status INTEGER DEFAULT 1
-                )
-            ''')
-            
-            # 资产表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS assets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    monthly_income DECIMAL NOT NULL,
-                    duration_months INTEGER NOT NULL,
-                    total_value DECIMAL NOT NULL,
-                    description TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    status INTEGER DEFAULT 1
-                )
-            ''')
-            
-            # 固定收支项表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS fixed_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    type TEXT NOT NULL CHECK(type IN ('income', 'expense')),
-                    amount DECIMAL NOT NULL,
-                    description TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    status INTEGER DEFAULT 1
-                )
-            ''')
-            
-            # 统御系统 - 家族成员表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS family_members (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    birthday TEXT NOT NULL,
-                    phone TEXT,
-                    notes TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 统御系统 - 家族事件表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS family_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    member_id INTEGER NOT NULL,
-                    event_name TEXT NOT NULL,
-                    event_date TEXT NOT NULL,
-                    completed BOOLEAN DEFAULT FALSE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (member_id) REFERENCES family_members(id)
-                )
-            ''')
-            
-            # 统御系统 - 朋友表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS friends (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    personality TEXT,
-                    hobbies TEXT,
-                    notes TEXT,
-                    last_contact TEXT,
-                    is_close_friend BOOLEAN DEFAULT FALSE,
-                    ai_analysis TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 统御系统 - 朋友关系表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS friend_relations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    friend_id INTEGER NOT NULL,
-                    related_friend_id INTEGER NOT NULL,
-                    relation_type TEXT DEFAULT 'acquaintance',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (friend_id) REFERENCES friends(id),
-                    FOREIGN KEY (related_friend_id) REFERENCES friends(id)
-                )
-            ''')
-            
-            # 统御系统 - 朋友交互任务表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS friend_tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    friend_id INTEGER NOT NULL,
-                    task_name TEXT NOT NULL,
-                    reward_type TEXT NOT NULL CHECK(reward_type IN ('spirit', 'blood', 'money')),
-                    reward_amount INTEGER NOT NULL,
-                    completed BOOLEAN DEFAULT FALSE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (friend_id) REFERENCES friends(id)
-                )
-            ''')
-            
-            # 统御系统 - 互动记录表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS interaction_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    friend_id INTEGER NOT NULL,
-                    content TEXT NOT NULL,
-                    interaction_date TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (friend_id) REFERENCES friends(id)
-                )
-            ''')
+        # 返回拷贝，调用方修改结果不会影响缓存
+        return copy.deepcopy(value)
 
-            # 励志库表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS lizhi_quotes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    content TEXT NOT NULL,
-                    author TEXT,
-                    category TEXT DEFAULT 'poetry',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    status INTEGER DEFAULT 1
-                )
-            ''')
+    def cache_stats(self) -> dict:
+        """查询缓存的命中统计"""
+        return self._query_cache.stats()
 
-            conn.commit()
-            conn.close()
-            
-            # 初始化默认数据
-            self._init_default_data()
-            
-        except Exception as e:
-            print(f"数据库初始化错误: {e}")
-            if conn:
-                conn.close()
-    
-    def _init_default_data(self):
-        """初始化默认数据"""
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 初始化用户数据
-            cursor.execute("SELECT COUNT(*) FROM user_config")
-            if cursor.fetchone()[0] == 0:
-                birth_year = 1998
-                age = datetime.now().year - birth_year
-                initial_blood = (80 - age) * 365 * 24 * 60
-                
-                cursor.execute('''
-                    INSERT INTO user_config 
-                    (birth_year, initial_blood, current_blood, current_spirit, current_money, target_money)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (birth_year, initial_blood, initial_blood, 0, 125840, 5000000))
-            
-            # 初始化默认任务
-            cursor.execute("SELECT COUNT(*) FROM tasks")
-            if cursor.fetchone()[0] == 0:
-                default_tasks = [
-                    ("早起", "positive", 1, 0, "daily"),
-                    ("晨跑30分钟", "positive", 1, 1, "daily"),
-                    ("八部金刚功", "positive", 1, 2, "daily"),
-                    ("冥想15分钟", "positive", 2, 0, "daily"),
-                    ("阅读1小时", "positive", 1, 0, "daily"),
-                    ("控制情绪", "positive", 1, 0, "daily"),
-                    ("打扫房间", "positive", 1, 0, "daily"),
-                    ("熬夜", "negative", -3, -1, "daily"),
-                    ("刷自媒体", "negative", -3, 0, "daily"),
-                    ("打游戏", "negative", -3, 0, "daily"),
-                    ("发脾气", "negative", -3, -3, "daily"),
-                    ("晚起", "negative", -2, 0, "daily"),
-                ]
-                
-                for task in default_tasks:
-                    cursor.execute('''
-                        INSERT INTO tasks (name, category, spirit_effect, blood_effect, frequency)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', task)
-            
-            # 初始化默认固定收支项
-            cursor.execute("SELECT COUNT(*) FROM fixed_items")
-            if cursor.fetchone()[0] == 0:
-                default_fixed_items = [
-                    ("工资", "income", 15000, "固定工作收入"),
-                    ("副业", "income", 2000, "额外收入来源"),
-                    ("房租", "expense", 3000, "每月房租支出"),
-                    ("房贷", "expense", 5000, "每月房贷还款"),
-                    ("生活费", "expense", 2000, "日常生活费用"),
-                ]
-                
-                for item in default_fixed_items:
-                    cursor.execute('''
-                        INSERT INTO fixed_items (name, type, amount, description)
-                        VALUES (?, ?, ?, ?)
-                    ''', item)
-            
-            # 初始化境界系统配置
-            cursor.execute("SELECT COUNT(*) FROM jingjie_config")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('''
-                    INSERT INTO jingjie_config (id, current_realm_index)
-                    VALUES (1, 0)
-                ''')
-            
-            # 初始化默认境界
-            cursor.execute("SELECT COUNT(*) FROM realms")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('''
-                    INSERT INTO realms (name, order_index, completed)
-                    VALUES (?, ?, ?)
-                ''', ("练气期", 0, False))
-            
-            # 初始化默认家族成员
-            cursor.execute("SELECT COUNT(*) FROM family_members")
-            if cursor.fetchone()[0] == 0:
-                # 添加默认家族成员
-                cursor.execute('''
-                    INSERT INTO family_members (name, birthday, phone, notes)
-                    VALUES (?, ?, ?, ?)
-                ''', ("父亲", "1970-03-15", "138****1234", "喜欢钓鱼，注意血压"))
-                
-                father_id = cursor.lastrowid
-                
-                cursor.execute('''
-                    INSERT INTO family_members (name, birthday, phone, notes)
-                    VALUES (?, ?, ?, ?)
-                ''', ("母亲", "1972-08-20", "139****5678", "喜欢跳舞，胃不好"))
-                
-                mother_id = cursor.lastrowid
-                
-                # 添加默认家族事件
-                cursor.execute('''
-                    INSERT INTO family_events (member_id, event_name, event_date, completed)
-                    VALUES (?, ?, ?, ?)
-                ''', (father_id, "生日", "2024-03-15", True))
-                
-                cursor.execute('''
-                    INSERT INTO family_events (member_id, event_name, event_date, completed)
-                    VALUES (?, ?, ?, ?)
-                ''', (father_id, "父亲节", "2024-06-16", False))
-                
-                cursor.execute('''
-                    INSERT INTO family_events (member_id, event_name, event_date, completed)
-                    VALUES (?, ?, ?, ?)
-                ''', (mother_id, "母亲节", "2024-05-12", False))
-                
-                cursor.execute('''
-                    INSERT INTO family_events (member_id, event_name, event_date, completed)
-                    VALUES (?, ?, ?, ?)
-                ''', (mother_id, "生日", "2024-08-20", False))
-            
-            # 初始化默认朋友
-            cursor.execute("SELECT COUNT(*) FROM friends")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('''
-                    INSERT INTO friends (name, category, personality, hobbies, notes, last_contact)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', ("张三", "挚友", "外向开朗", "篮球、游戏", "大学室友，在深圳工作", "2024-12-01"))
+    def invalidate_cache(self):
+        """清空查询缓存（数据库文件被外部替换或修改后调用，如恢复备份）"""
+        self._query_cache.clear()
 
-                cursor.execute('''
-                    INSERT INTO friends (name, category, personality, hobbies, notes, last_contact)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', ("李四", "同事", "稳重内敛", "读书、电影", "技术大牛，可以多交流", "2024-12-15"))
-
-            # 初始化默认励志语录
-            cursor.execute("SELECT COUNT(*) FROM lizhi_quotes")
-            if cursor.fetchone()[0] == 0:
-                default_quotes = [
-                    ("大鹏一日同风起，扶摇直上九万里", "李白", "poetry"),
-                    ("天行健，君子以自强不息", "周易", "poetry"),
-                    ("不经一番寒彻骨，怎得梅花扑鼻香", "黄蘗禅师", "poetry"),
-                    ("长风破浪会有时，直挂云帆济沧海", "李白", "poetry"),
-                    ("千磨万击还坚劲，任尔东西南北风", "郑板桥", "poetry"),
-                    ("路漫漫其修远兮，吾将上下而求索", "屈原", "poetry"),
-                    ("宝剑锋从磨砺出，梅花香自苦寒来", "古诗", "poetry"),
-                    ("莫愁前路无知己，天下谁人不识君", "高适", "poetry"),
-                    ("会当凌绝顶，一览众山小", "杜甫", "poetry"),
-                    ("天生我材必有用，千金散尽还复来", "李白", "poetry"),
-                ]
+    @staticmethod
+    def _fetch_page(cursor, select_sql: str, filters: list, params: list, sort_column: str,
+                    before: tuple, limit: int, key) -> Page:
+        """键集分页：按 (sort_column, id) 倒序取一页
 
-                for content, author, category in default_quotes:
-                    cursor.execute('''
-                        INSERT INTO lizhi_quotes (content, author, category)
-                        VALUES (?, ?, ?)
-                    ''', (content, author, category))
+        before 为上一页的 next_cursor，key(row) 从一行中取出 (sort_column, id)。
+        条件写成行值比较，直接在 (..., sort_column, id) 索引上定位，翻页成本与页码无关；
+        多取一行用于判断是否还有下一页。
+        """
+        conditions = list(filters)
+        params = list(params)
+        if before is not None:
+            conditions.append(f'({sort_column}, id) < (?, ?)')
+            params.extend(before)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        cursor.execute(f'''
+            {select_sql}
+            {where}
+            ORDER BY {sort_column} DESC, id DESC
+            LIMIT ?
+        ''', params + [limit + 1])
+        rows = cursor.fetchall()
+
+        if len(rows) > limit:
+            return Page(rows[:limit], tuple(key(rows[limit - 1])))
+        return Page(rows)
+
+    def _get_connection(self):
+        """获取独立的数据库连接（仅供脚本和调试使用，调用方负责关闭）
+
+        仓储方法应通过 self._pool.reader() / self._pool.writer() 访问数据库。
+        """
+        return self._pool._connect()
+
+    def close(self):
+        """写完后台队列中的写入并关闭数据库连接池，应用退出时调用
+
+        内存模式下关闭前把有变化的数据写回数据库文件。
+        """
+        self.writes.close()
+        if self._snapshot_timer:
+            self._snapshot_timer.stop()
+        if not self._pool.closed:
+            self.snapshot_if_changed()
+        self._pool.close()
+
+    @contextmanager
+    def transaction(self):
+        """工作单元：with 块内调用的所有仓储方法共用同一连接和同一事务
+
+        一次用户操作（如勾选境界节点并记录修炼）应整体包在一个 transaction 中，
+        块内任一步失败都会整体回滚并抛出异常：
+
+            with db.transaction():
+                task_id = db.add_task(...)
+                db.complete_task(task_id, ...)
+        """
+        with self._pool.writer() as conn:
+            yield conn
+
+    def explain_query_plan(self, sql: str, params: tuple = ()) -> List[str]:
+        """返回语句的 EXPLAIN QUERY PLAN 明细，用于检查是否全表扫描"""
+        with self._pool.reader() as conn:
+            rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        return [row[3] for row in rows]
 
-            conn.commit()
-            conn.close()
-            
+    def init_database(self):
+        """初始化/升级数据库结构
+
+        由迁移引擎按 PRAGMA user_version 执行未完成的迁移步骤，结构已是最新时不执行任何 DDL。
+        """
+        try:
+            migrate(self._pool)
         except Exception as e:
-            print(f"初始化默认数据错误: {e}")
-            if conn:
-                conn.close()
-    
+            print(f"数据库初始化错误: {e}")
+
     def get_user_data(self) -> Optional[UserData]:
-        """获取用户数据 - 带缓存优化"""
-        # 检查缓存
-        cached = self._get_cache('user_data', timeout=2)
-        if cached:
-            return cached
+        """获取用户数据 - 带缓存优化
+
+        缓存的是寿元基准值，current_blood 在每次读取时按经过的时间推算。
+        """
+        def load():
+            with self._pool.reader() as conn:
+                row = conn.execute('''
+                    SELECT birth_year, current_spirit, current_blood, target_money, current_money,
+                           blood_updated_at
+                    FROM user_config LIMIT 1
+                ''').fetchone()
+
+            if not row:
+                return None
+            return UserData(
+                birth_year=row[0],
+                current_spirit=row[1] or 0,
+                current_blood=row[2],
+                target_money=row[3],
+                current_money=row[4] or 0,
+                blood_updated_at=row[5]
+            )
 
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            user_data = self._cached('user_data', ('user_config',), load)
+            if user_data:
+                user_data.current_blood = derive_blood(user_data.current_blood, user_data.blood_updated_at)
+            return user_data
 
-            cursor.execute('''
-                SELECT birth_year, current_spirit, current_blood, target_money, current_money
-                FROM user_config LIMIT 1
-            ''')
-            row = cursor.fetchone()
-            conn.close()
-
-            if row:
-                user_data = UserData(
-                    birth_year=row[0],
-                    current_spirit=row[1] or 0,
-                    current_blood=row[2],
-                    target_money=row[3],
-                    current_money=row[4] or 0
-                )
-                # 设置缓存
-                self._set_cache('user_data', user_data)
-                return user_data
-            return None
         except Exception as e:
             print(f"获取用户数据错误: {e}")
             return None
-    
+
+    def _apply_spirit_blood(self, cursor, spirit_change: int, blood_change: int) -> bool:
+        """在调用方的事务内以一条 UPDATE 更新心境血量（心境限制在范围内，血量不为负）
+
+        寿元先结算到当前时间再加上变化量：基准时间只前移已结算的整分钟，不足一分钟的部分保留。
+        """
+        cursor.execute(f'''
+            UPDATE user_config
+            SET current_spirit = MAX(?, MIN(?, current_spirit + ?)),
+                current_blood = MAX(0, current_blood - {BLOOD_ELAPSED_MINUTES_SQL} * ? + ?),
+                blood_updated_at = datetime(COALESCE(blood_updated_at, 'now'),
+                                            '+' || {BLOOD_ELAPSED_MINUTES_SQL} || ' minutes')
+            WHERE id = 1
+        ''', (GameConfig.MIN_SPIRIT, GameConfig.MAX_SPIRIT, spirit_change,
+              GameConfig.BLOOD_DECREASE_PER_MINUTE, blood_change))
+        return cursor.rowcount > 0
+
     def update_spirit_blood(self, spirit_change: int = 0, blood_change: int = 0):
         """更新心境和血量 - 性能优化"""
-        # 清除用户数据缓存
-        self._clear_cache('user_data')
-
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            with self._pool.writer() as conn:
+                return self._apply_spirit_blood(conn.cursor(), spirit_change, blood_change)
 
-            # 先检查当前血量
-            cursor.execute('SELECT current_blood, current_spirit FROM user_config WHERE id = 1')
-            result = cursor.fetchone()
-            
-            if result:
-                current_blood, current_spirit = result
-                # 确保血量不会变为负数
-                new_blood = max(0, current_blood + blood_change)
-                # 确保心境在范围内
-                new_spirit = max(GameConfig.MIN_SPIRIT, 
-                               min(GameConfig.MAX_SPIRIT, current_spirit + spirit_change))
-                
-                cursor.execute('''
-                    UPDATE user_config 
-                    SET current_spirit = ?,
-                        current_blood = ?
-                    WHERE id = 1
-                ''', (new_spirit, new_blood))
-                
-                conn.commit()
-                return True
-            
-            return False
-            
         except Exception as e:
             print(f"更新心境血量错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
-    def decrease_blood_by_time(self, amount: int = 1):
-        """按时间减少血量（用于定时器）"""
-        return self.update_spirit_blood(0, -amount)
-    
+
+    def submit_spirit_blood(self, spirit_change: int = 0, blood_change: int = 0) -> Future:
+        """后台提交心境血量变化，排队中的多次变化合并为一次更新"""
+        return self.writes.submit(
+            self.update_spirit_blood, spirit_change, blood_change,
+            key=('user_config', 'spirit_blood'),
+            merge=lambda old, new: tuple(a + b for a, b in zip(old, new))
+        )
+
     def get_tasks(self, category: Optional[str] = None) -> List[Task]:
-        """获取任务列表"""
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            if category:
-                cursor.execute('''
-                    SELECT id, name, category, spirit_effect, blood_effect, frequency 
-                    FROM tasks WHERE status = 1 AND category = ?
-                    ORDER BY id
-                ''', (category,))
-            else:
+        """获取任务列表（含今日完成情况）"""
+        day_start, day_end = day_range()
+
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                if category:
+                    cursor.execute('''
+                        SELECT id, name, category, spirit_effect, blood_effect, frequency 
+                        FROM tasks WHERE status = 1 AND category = ?
+                        ORDER BY id
+                    ''', (category,))
+                else:
+                    cursor.execute('''
+                        SELECT id, name, category, spirit_effect, blood_effect, frequency 
+                        FROM tasks WHERE status = 1
+                        ORDER BY category DESC, id
+                    ''')
+
+                rows = cursor.fetchall()
+
+                # 检查今日完成情况
                 cursor.execute('''
-                    SELECT id, name, category, spirit_effect, blood_effect, frequency 
-                    FROM tasks WHERE status = 1
-                    ORDER BY category DESC, id
-                ''')
-            
-            rows = cursor.fetchall()
-            
-            # 检查今日完成情况
-            today = date.today().isoformat()
-            cursor.execute('''
-                SELECT task_id FROM task_records 
-                WHERE DATE(completed_at) = ?
-            ''', (today,))
-            completed_ids = {row[0] for row in cursor.fetchall()}
-            
-            conn.close()
-            
-            tasks = []
-            for row in rows:
-                tasks.append(Task(
+                    SELECT task_id FROM task_records 
+                    WHERE completed_at >= ? AND completed_at < ?
+                ''', (day_start, day_end))
+                completed_ids = {row[0] for row in cursor.fetchall()}
+
+            return [
+                Task(
                     id=row[0],
                     name=row[1],
                     category=row[2],
@@ -643,764 +398,1007 @@ class DatabaseManager:
                     blood_effect=row[4],
                     frequency=row[5],
                     completed_today=(row[0] in completed_ids)
-                ))
-            
-            return tasks
-            
+                )
+                for row in rows
+            ]
+
+        try:
+            # 缓存键包含日期，跨天后自动重新读取今日完成情况
+            return self._cached(('tasks', category, day_start), ('tasks', 'task_records'), load)
+
         except Exception as e:
             print(f"获取任务列表错误: {e}")
             return []
-    
+
     def complete_task(self, task_id: int, spirit_effect: int, blood_effect: int):
-        """完成任务"""
-        conn = None
+        """完成任务（今日已完成则忽略），记录与心境血量变化在同一事务内"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 检查今天是否已经完成过
-            today = date.today().isoformat()
-            cursor.execute('''
-                SELECT COUNT(*) FROM task_records 
-                WHERE task_id = ? AND DATE(completed_at) = ?
-            ''', (task_id, today))
-            
-            if cursor.fetchone()[0] == 0:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                # 今天尚未完成过才插入
+                day_start, day_end = day_range()
                 cursor.execute('''
                     INSERT INTO task_records (task_id, spirit_change, blood_change)
-                    VALUES (?, ?, ?)
-                ''', (task_id, spirit_effect, blood_effect))
-                
-                conn.commit()
-                self.update_spirit_blood(spirit_effect, blood_effect)
-            
+                    SELECT ?, ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM task_records
+                        WHERE task_id = ? AND completed_at >= ? AND completed_at < ?
+                    )
+                ''', (task_id, spirit_effect, blood_effect, task_id, day_start, day_end))
+
+                if cursor.rowcount > 0:
+                    self._apply_spirit_blood(cursor, spirit_effect, blood_effect)
+
         except Exception as e:
             print(f"完成任务错误: {e}")
-            if conn:
-                conn.rollback()
-        finally:
-            if conn:
-                conn.close()
-    
+
     def uncomplete_task(self, task_id: int, spirit_effect: int, blood_effect: int):
         """取消完成任务"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            today = date.today().isoformat()
-            cursor.execute('''
-                DELETE FROM task_records 
-                WHERE task_id = ? AND DATE(completed_at) = ?
-            ''', (task_id, today))
-            
-            if cursor.rowcount > 0:
-                conn.commit()
-                self.update_spirit_blood(-spirit_effect, -blood_effect)
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                day_start, day_end = day_range()
+                cursor.execute('''
+                    DELETE FROM task_records 
+                    WHERE task_id = ? AND completed_at >= ? AND completed_at < ?
+                ''', (task_id, day_start, day_end))
+
+                if cursor.rowcount > 0:
+                    self._apply_spirit_blood(cursor, -spirit_effect, -blood_effect)
+
         except Exception as e:
             print(f"取消任务错误: {e}")
-            if conn:
-                conn.rollback()
-        finally:
-            if conn:
-                conn.close()
-    
-    def add_task(self, name: str, category: str, spirit_effect: int, blood_effect: int):
-        """添加新任务"""
-        conn = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO tasks (name, category, spirit_effect, blood_effect)
-                VALUES (?, ?, ?, ?)
-            ''', (name, category, spirit_effect, blood_effect))
-            
-            conn.commit()
-            
+
+    def add_task(self, name: str, category: str, spirit_effect: int, blood_effect: int) -> Optional[int]:
+        """添加新任务，返回新任务ID"""
+        try:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO tasks (name, category, spirit_effect, blood_effect)
+                    VALUES (?, ?, ?, ?)
+                ''', (name, category, spirit_effect, blood_effect))
+
+                return cursor.lastrowid
+
         except Exception as e:
             print(f"添加任务错误: {e}")
-            if conn:
-                conn.rollback()
-        finally:
-            if conn:
-                conn.close()
-    
+
+    def _insert_finance_record(self, cursor, record_type: str, amount: float, category: str = None, description: str = None):
+        """在调用方的事务内插入财务记录"""
+        cursor.execute('''
+            INSERT INTO finance_records (type, amount, category, description)
+            VALUES (?, ?, ?, ?)
+        ''', (record_type, amount, category, description))
+        # 注意：不再直接更新current_money，保持其作为初始余额
+        # 累计收支由 finance_balance 触发器在同一事务内更新
+
     def add_finance_record(self, record_type: str, amount: float, category: str = None, description: str = None):
         """添加财务记录"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO finance_records (type, amount, category, description)
-                VALUES (?, ?, ?, ?)
-            ''', (record_type, amount, category, description))
-            
-            # 注意：不再直接更新current_money，保持其作为初始余额
-            # 实际余额通过计算所有财务记录来获得
-            
-            conn.commit()
-            
+            with self._pool.writer() as conn:
+                self._insert_finance_record(conn.cursor(), record_type, amount, category, description)
+
         except Exception as e:
             print(f"添加财务记录错误: {e}")
-            if conn:
-                conn.rollback()
-        finally:
-            if conn:
-                conn.close()
-    
-    def get_finance_records(self, limit: int = 20) -> list:
+
+    def get_finance_records(self, limit: int = 20) -> List[FinanceRecord]:
         """获取财务记录"""
+        return self.get_finance_records_page(limit).items
+
+    def get_finance_records_page(self, limit: int = 20, before: tuple = None) -> Page:
+        """分页获取财务记录（FinanceRecord），按时间倒序，before 传上一页的 next_cursor"""
+        def load():
+            with self._pool.reader() as conn:
+                page = self._fetch_page(
+                    conn.cursor(),
+                    'SELECT id, type, amount, category, description, created_at FROM finance_records',
+                    [], [], 'created_at', before, limit,
+                    key=lambda row: (row[5], row[0])
+                )
+                page.items = [FinanceRecord._make(row) for row in page.items]
+                return page
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT type, amount, category, description, created_at
-                FROM finance_records
-                ORDER BY created_at DESC
-                LIMIT ?
-            ''', (limit,))
-            
-            records = cursor.fetchall()
-            conn.close()
-            
-            return records
-            
+            return self._cached(('finance_records', limit, before), ('finance_records',), load)
+
         except Exception as e:
             print(f"获取财务记录错误: {e}")
+            return Page([])
+
+    def get_daily_finance_stats(self, day: str = None) -> dict:
+        """获取某日收支汇总（默认今日），读取每日汇总表"""
+        day = day or date.today().isoformat()
+
+        def load():
+            with self._pool.reader() as conn:
+                row = conn.execute('''
+                    SELECT
+                        COALESCE(SUM(CASE WHEN type = 'income' THEN amount_total ELSE 0 END), 0),
+                        COALESCE(SUM(CASE WHEN type = 'expense' THEN amount_total ELSE 0 END), 0)
+                    FROM daily_finance_rollup
+                    WHERE day = ?
+                ''', (day,)).fetchone()
+
+            return {
+                'income': float(row[0]),
+                'expense': float(row[1])
+            }
+
+        try:
+            return self._cached(('daily_finance_stats', day), ('daily_finance_rollup',), load)
+
+        except Exception as e:
+            print(f"获取每日收支数据错误: {e}")
+            return {'income': 0.0, 'expense': 0.0}
+
+    def get_daily_rollups(self, start_day: str, end_day: str) -> List[dict]:
+        """获取 [start_day, end_day) 区间内每日的收支与修炼汇总，按日期升序
+
+        每个有活动的日期一行：income / expense / categories（分类 -> 金额，支出为负）/
+        tasks_completed / spirit_change / blood_change。一年最多 366 行。
+        """
+        try:
+            with self._pool.reader() as conn:
+                finance_rows = conn.execute('''
+                    SELECT day, type, category, amount_total
+                    FROM daily_finance_rollup
+                    WHERE day >= ? AND day < ?
+                ''', (start_day, end_day)).fetchall()
+                task_rows = conn.execute('''
+                    SELECT day, tasks_completed, spirit_change, blood_change
+                    FROM daily_task_rollup
+                    WHERE day >= ? AND day < ?
+                ''', (start_day, end_day)).fetchall()
+
+            days = {}
+
+            def day_entry(day):
+                if day not in days:
+                    days[day] = {
+                        'day': day, 'income': 0, 'expense': 0, 'categories': {},
+                        'tasks_completed': 0, 'spirit_change': 0, 'blood_change': 0
+                    }
+                return days[day]
+
+            for day, record_type, category, amount in finance_rows:
+                entry = day_entry(day)
+                if record_type in ('income', 'expense'):
+                    entry[record_type] += amount
+                signed = amount if record_type == 'income' else -amount
+                entry['categories'][category or '其他'] = entry['categories'].get(category or '其他', 0) + signed
+
+            for day, tasks_completed, spirit_change, blood_change in task_rows:
+                entry = day_entry(day)
+                entry['tasks_completed'] = tasks_completed
+                entry['spirit_change'] = spirit_change
+                entry['blood_change'] = blood_change
+
+            return [days[day] for day in sorted(days)]
+
+        except Exception as e:
+            print(f"获取每日汇总错误: {e}")
             return []
-        
-    def delete_finance_record_by_details(self, record_type: str, amount: float, category: str, description: str, created_at: str) -> bool:
-        """根据详细信息删除财务记录"""
-        conn = None
+
+    @staticmethod
+    def _refresh_balance_history(cursor):
+        """补录历史收支后按每日汇总重算回填的历史余额（已记录的快照不变）"""
+        cursor.execute('DELETE FROM state_series WHERE tier = ? AND samples = 0', (SERIES_TIERS['daily'][0],))
+        cursor.execute(STATE_SERIES_BACKFILL)
+
+    def rebuild_daily_rollups(self) -> bool:
+        """按全部明细重建每日汇总表（旧库回填或修复）"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 先查找记录ID
-            cursor.execute('''
-                SELECT id, type, amount FROM finance_records 
-                WHERE type = ? AND amount = ? AND category = ? AND 
-                      (description = ? OR (description IS NULL AND ? IS NULL)) AND 
-                      created_at = ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            ''', (record_type, amount, category, description, description, created_at))
-            
-            record = cursor.fetchone()
-            if not record:
-                print(f"未找到匹配的财务记录: {category} ¥{amount}")
-                return False
-            
-            record_id, rec_type, rec_amount = record
-            
-            # 删除记录
-            cursor.execute('DELETE FROM finance_records WHERE id = ?', (record_id,))
-            
-            # 注意：不再直接更新current_money，保持其作为初始余额
-            # 删除记录后，实际余额会通过重新计算所有财务记录来获得
-            
-            conn.commit()
+            with self._pool.writer() as conn:
+                for backfill_sql in ROLLUP_BACKFILL:
+                    conn.execute(backfill_sql)
+                self._refresh_balance_history(conn)
             return True
-            
+
+        except Exception as e:
+            print(f"重建每日汇总错误: {e}")
+            return False
+
+    def get_finance_balance(self) -> dict:
+        """获取灵石实际余额：初始余额 + 账本中的累计收入 - 累计支出"""
+        def load():
+            with self._pool.reader() as conn:
+                row = conn.execute('''
+                    SELECT u.current_money, b.total_income, b.total_expense, b.record_count
+                    FROM user_config u, finance_balance b
+                    WHERE b.id = 1
+                    ORDER BY u.id
+                    LIMIT 1
+                ''').fetchone()
+
+            if not row:
+                return {'initial': 0, 'income': 0, 'expense': 0, 'balance': 0, 'record_count': 0}
+
+            initial, income, expense, record_count = row
+            initial = initial or 0
+            return {
+                'initial': initial,
+                'income': income,
+                'expense': expense,
+                'balance': initial + income - expense,
+                'record_count': record_count
+            }
+
+        try:
+            return self._cached('finance_balance', ('user_config', 'finance_balance'), load)
+
+        except Exception as e:
+            print(f"获取灵石余额错误: {e}")
+            return {'initial': 0, 'income': 0, 'expense': 0, 'balance': 0, 'record_count': 0}
+
+    def verify_finance_balance(self, repair: bool = False) -> dict:
+        """按全部历史记录重新汇总并与账本比对，repair=True 时以历史记录为准修正账本"""
+        try:
+            with self._pool.writer() as conn:
+                stored = conn.execute('''
+                    SELECT total_income, total_expense, record_count
+                    FROM finance_balance WHERE id = 1
+                ''').fetchone() or (0, 0, 0)
+                actual = conn.execute(FINANCE_TOTALS_SQL).fetchone()
+
+                income_drift = round(stored[0] - actual[0], 2)
+                expense_drift = round(stored[1] - actual[1], 2)
+                count_drift = stored[2] - actual[2]
+                has_drift = bool(income_drift or expense_drift or count_drift)
+
+                if repair and has_drift:
+                    conn.execute('''
+                        INSERT OR REPLACE INTO finance_balance
+                        (id, total_income, total_expense, record_count, updated_at)
+                        VALUES (1, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ''', actual)
+
+            return {
+                'stored': {'income': stored[0], 'expense': stored[1], 'record_count': stored[2]},
+                'actual': {'income': actual[0], 'expense': actual[1], 'record_count': actual[2]},
+                'drift': {'income': income_drift, 'expense': expense_drift, 'record_count': count_drift},
+                'has_drift': has_drift,
+                'repaired': repair and has_drift
+            }
+
+        except Exception as e:
+            print(f"校验灵石账本错误: {e}")
+            return None
+
+    def import_finance_records(self, path: str, column_map: dict = None, fmt: str = None,
+                               encoding: str = 'utf-8-sig', batch_size: int = 5000,
+                               skip_duplicates: bool = True, progress_callback=None) -> dict:
+        """批量导入历史收支记录（CSV / JSON / JSON Lines）
+
+        源文件流式读取，经列映射与校验后分批 executemany 写入临时表，再在同一事务中
+        一次性插入 finance_records。导入期间暂停逐行维护账本、每日汇总、变更日志与全文索引的
+        触发器，结束时各用一条语句补齐。整个导入是一个事务，失败时不留下任何记录。
+
+        column_map: {目标字段: 源列名}，目标字段为 type / amount / category / description / created_at
+        skip_duplicates: 跳过与已有记录完全相同（时间、类型、金额、分类、备注）的行，
+                         文件内重复的行也只导入一次
+        progress_callback: progress_callback(stage, count)，stage 依次为
+                           'reading'（已读取行数）、'inserting'、'rebuilding'、'done'（已导入条数）
+
+        返回 {'read', 'inserted', 'duplicates', 'invalid', 'errors'}，errors 最多保留前 100 条。
+        """
+        result = {'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+
+        def report(stage, count):
+            if progress_callback:
+                progress_callback(stage, count)
+
+        try:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TEMP TABLE IF NOT EXISTS finance_import (
+                        type TEXT, amount REAL, category TEXT, description TEXT, created_at TEXT
+                    )
+                ''')
+                cursor.execute('DELETE FROM temp.finance_import')
+
+                # 1. 流式读取、校验并分批写入临时表
+                batch = []
+                for line_no, row, error in iter_finance_rows(path, column_map, fmt, encoding):
+                    result['read'] += 1
+                    if error:
+                        result['invalid'] += 1
+                        if len(result['errors']) < 100:
+                            result['errors'].append(f"第{line_no}行: {error}")
+                        continue
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        cursor.executemany('INSERT INTO temp.finance_import VALUES (?, ?, ?, ?, ?)', batch)
+                        batch.clear()
+                        report('reading', result['read'])
+                if batch:
+                    cursor.executemany('INSERT INTO temp.finance_import VALUES (?, ?, ?, ?, ?)', batch)
+                report('reading', result['read'])
+                staged = result['read'] - result['invalid']
+
+                # 2. 暂停逐行触发器，一条语句插入全部新记录（去重走 created_at/type/amount 索引）
+                report('inserting', staged)
+                last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM finance_records').fetchone()[0]
+                for trigger_name in FINANCE_INSERT_TRIGGERS:
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+
+                duplicate_filter = '''
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM finance_records f
+                        WHERE f.created_at = s.created_at AND f.type = s.type AND f.amount = s.amount
+                          AND f.category IS s.category AND f.description IS s.description
+                    )
+                ''' if skip_duplicates else ''
+                distinct = 'DISTINCT' if skip_duplicates else ''
+                cursor.execute(f'''
+                    INSERT INTO finance_records (type, amount, category, description, created_at)
+                    SELECT {distinct} s.type, s.amount, s.category, s.description, s.created_at
+                    FROM temp.finance_import s
+                    {duplicate_filter}
+                    ORDER BY s.created_at
+                ''')
+                result['inserted'] = cursor.rowcount
+                result['duplicates'] = staged - cursor.rowcount
+                cursor.execute('''
+                    INSERT INTO changelog (table_name, row_id, op)
+                    SELECT 'finance_records', id, 'I' FROM finance_records WHERE id > ? ORDER BY id
+                ''', (last_id,))
+                cursor.execute(FINANCE_SEARCH_BACKFILL, (last_id,))
+
+                # 3. 一次性重建受影响日期的每日汇总与账本，再恢复触发器
+                report('rebuilding', result['inserted'])
+                cursor.execute('''
+                    CREATE TEMP TABLE finance_import_days AS
+                    SELECT DISTINCT DATE(created_at) AS day FROM temp.finance_import
+                ''')
+                cursor.execute('''
+                    DELETE FROM daily_finance_rollup
+                    WHERE day IN (SELECT day FROM temp.finance_import_days)
+                ''')
+                # 按日期半开区间连接，逐日走 created_at 索引，而不是对 DATE(created_at) 全表扫描
+                cursor.execute('''
+                    INSERT INTO daily_finance_rollup (day, type, category, amount_total, record_count)
+                    SELECT d.day, f.type, COALESCE(f.category, ''), SUM(f.amount), COUNT(*)
+                    FROM temp.finance_import_days d
+                    JOIN finance_records f
+                      ON f.created_at >= d.day AND f.created_at < DATE(d.day, '+1 day')
+                    GROUP BY d.day, f.type, COALESCE(f.category, '')
+                ''')
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO finance_balance
+                    (id, total_income, total_expense, record_count, updated_at)
+                    SELECT 1, totals.*, CURRENT_TIMESTAMP FROM ({FINANCE_TOTALS_SQL}) AS totals
+                ''')
+                for trigger_sql in FINANCE_INSERT_TRIGGERS.values():
+                    cursor.execute(trigger_sql)
+                self._refresh_balance_history(cursor)
+
+                cursor.execute('DROP TABLE temp.finance_import_days')
+                cursor.execute('DROP TABLE temp.finance_import')
+
+            report('done', result['inserted'])
+            return result
+
+        except Exception as e:
+            print(f"批量导入财务记录错误: {e}")
+            result['inserted'] = 0
+            result['errors'].append(str(e))
+            return result
+
+    def delete_finance_record(self, record_id: int) -> bool:
+        """按 id 删除财务记录，累计收支由 finance_balance 触发器在同一事务内回退"""
+        try:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM finance_records WHERE id = ?', (record_id,))
+
+                if cursor.rowcount == 0:
+                    print(f"未找到财务记录: {record_id}")
+                    return False
+
+                # 注意：不再直接更新current_money，保持其作为初始余额
+                return True
+
         except Exception as e:
             print(f"删除财务记录错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
 
     def delete_task(self, task_id: int):
         """删除任务"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 先删除相关的任务记录
-            cursor.execute('DELETE FROM task_records WHERE task_id = ?', (task_id,))
-            
-            # 再删除任务本身
-            cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                # 先删除相关的任务记录
+                cursor.execute('DELETE FROM task_records WHERE task_id = ?', (task_id,))
+
+                # 再删除任务本身
+                cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+
+                return True
+
         except Exception as e:
             print(f"删除任务错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
 
     def update_task(self, task_id: int, name: str, spirit_effect: int, blood_effect: int):
         """更新任务"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE tasks 
-                SET name = ?, spirit_effect = ?, blood_effect = ?
-                WHERE id = ?
-            ''', (name, spirit_effect, blood_effect, task_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE tasks 
+                    SET name = ?, spirit_effect = ?, blood_effect = ?
+                    WHERE id = ?
+                ''', (name, spirit_effect, blood_effect, task_id))
+
+                return True
+
         except Exception as e:
             print(f"更新任务错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def set_money(self, amount: float):
         """设置当前灵石余额"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE user_config 
-                SET current_money = ?
-                WHERE id = 1
-            ''', (amount,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE user_config 
+                    SET current_money = ?
+                    WHERE id = 1
+                ''', (amount,))
+
+                return True
+
         except Exception as e:
             print(f"设置余额错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def set_target_money(self, amount: float):
         """设置目标金额"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE user_config 
-                SET target_money = ?
-                WHERE id = 1
-            ''', (amount,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE user_config 
+                    SET target_money = ?
+                    WHERE id = 1
+                ''', (amount,))
+
+                return True
+
         except Exception as e:
             print(f"设置目标金额错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     # 负债管理方法
     def add_debt(self, name: str, monthly_payment: float, remaining_months: int, description: str = None):
         """添加负债"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            total_amount = monthly_payment * remaining_months
-            
-            cursor.execute('''
-                INSERT INTO debts (name, monthly_payment, remaining_months, total_amount, description)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, monthly_payment, remaining_months, total_amount, description))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                total_amount = monthly_payment * remaining_months
+
+                cursor.execute('''
+                    INSERT INTO debts (name, monthly_payment, remaining_months, total_amount, description)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, monthly_payment, remaining_months, total_amount, description))
+
+                return True
+
         except Exception as e:
             print(f"添加负债错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_debts(self) -> list:
         """获取负债列表"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, name, monthly_payment, remaining_months, total_amount, description, created_at
-                FROM debts
-                WHERE status = 1
-                ORDER BY created_at DESC
-            ''')
-            
-            debts = cursor.fetchall()
-            conn.close()
-            
-            return debts
-            
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT id, name, monthly_payment, remaining_months, total_amount, description, created_at
+                    FROM debts
+                    WHERE status = 1
+                    ORDER BY created_at DESC
+                ''')
+
+                debts = cursor.fetchall()
+
+                return debts
+
         except Exception as e:
             print(f"获取负债列表错误: {e}")
             return []
-    
+
     def update_debt(self, debt_id: int, name: str, monthly_payment: float, remaining_months: int, description: str = None):
         """更新负债"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            total_amount = monthly_payment * remaining_months
-            
-            cursor.execute('''
-                UPDATE debts 
-                SET name = ?, monthly_payment = ?, remaining_months = ?, total_amount = ?, description = ?
-                WHERE id = ?
-            ''', (name, monthly_payment, remaining_months, total_amount, description, debt_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                total_amount = monthly_payment * remaining_months
+
+                cursor.execute('''
+                    UPDATE debts 
+                    SET name = ?, monthly_payment = ?, remaining_months = ?, total_amount = ?, description = ?
+                    WHERE id = ?
+                ''', (name, monthly_payment, remaining_months, total_amount, description, debt_id))
+
+                return True
+
         except Exception as e:
             print(f"更新负债错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def delete_debt(self, debt_id: int):
         """删除负债"""
-        conn = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('UPDATE debts SET status = 0 WHERE id = ?', (debt_id,))
-            
-            conn.commit()
-            return True
-            
+        try:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('UPDATE debts SET status = 0 WHERE id = ?', (debt_id,))
+
+                return True
+
         except Exception as e:
             print(f"删除负债错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_debt_summary(self) -> dict:
         """获取负债汇总"""
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT 
+                        SUM(total_amount) as total_debt,
+                        SUM(monthly_payment) as monthly_payment,
+                        COUNT(*) as debt_count
+                    FROM debts
+                    WHERE status = 1
+                ''')
+
+                row = cursor.fetchone()
+
+                return {
+                    'total_debt': row[0] or 0,
+                    'monthly_payment': row[1] or 0,
+                    'debt_count': row[2] or 0
+                }
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    SUM(total_amount) as total_debt,
-                    SUM(monthly_payment) as monthly_payment,
-                    COUNT(*) as debt_count
-                FROM debts
-                WHERE status = 1
-            ''')
-            
-            row = cursor.fetchone()
-            conn.close()
-            
-            return {
-                'total_debt': row[0] or 0,
-                'monthly_payment': row[1] or 0,
-                'debt_count': row[2] or 0
-            }
-            
+            return self._cached('debt_summary', ('debts',), load)
+
         except Exception as e:
             print(f"获取负债汇总错误: {e}")
             return {'total_debt': 0, 'monthly_payment': 0, 'debt_count': 0}
-    
+
     # 资产管理方法
     def add_asset(self, name: str, monthly_income: float, duration_months: int, description: str = None):
         """添加资产"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            total_value = monthly_income * duration_months
-            
-            cursor.execute('''
-                INSERT INTO assets (name, monthly_income, duration_months, total_value, description)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, monthly_income, duration_months, total_value, description))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                total_value = monthly_income * duration_months
+
+                cursor.execute('''
+                    INSERT INTO assets (name, monthly_income, duration_months, total_value, description)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, monthly_income, duration_months, total_value, description))
+
+                return True
+
         except Exception as e:
             print(f"添加资产错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_assets(self) -> list:
         """获取资产列表"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, name, monthly_income, duration_months, total_value, description, created_at
-                FROM assets
-                WHERE status = 1
-                ORDER BY created_at DESC
-            ''')
-            
-            assets = cursor.fetchall()
-            conn.close()
-            
-            return assets
-            
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT id, name, monthly_income, duration_months, total_value, description, created_at
+                    FROM assets
+                    WHERE status = 1
+                    ORDER BY created_at DESC
+                ''')
+
+                assets = cursor.fetchall()
+
+                return assets
+
         except Exception as e:
             print(f"获取资产列表错误: {e}")
             return []
-    
+
     def update_asset(self, asset_id: int, name: str, monthly_income: float, duration_months: int, description: str = None):
         """更新资产"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            total_value = monthly_income * duration_months
-            
-            cursor.execute('''
-                UPDATE assets 
-                SET name = ?, monthly_income = ?, duration_months = ?, total_value = ?, description = ?
-                WHERE id = ?
-            ''', (name, monthly_income, duration_months, total_value, description, asset_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                total_value = monthly_income * duration_months
+
+                cursor.execute('''
+                    UPDATE assets 
+                    SET name = ?, monthly_income = ?, duration_months = ?, total_value = ?, description = ?
+                    WHERE id = ?
+                ''', (name, monthly_income, duration_months, total_value, description, asset_id))
+
+                return True
+
         except Exception as e:
             print(f"更新资产错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def delete_asset(self, asset_id: int):
         """删除资产"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('UPDATE assets SET status = 0 WHERE id = ?', (asset_id,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('UPDATE assets SET status = 0 WHERE id = ?', (asset_id,))
+
+                return True
+
         except Exception as e:
             print(f"删除资产错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_asset_summary(self) -> dict:
         """获取资产汇总"""
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT 
+                        SUM(total_value) as total_value,
+                        SUM(monthly_income) as monthly_income,
+                        COUNT(*) as asset_count
+                    FROM assets
+                    WHERE status = 1
+                ''')
+
+                row = cursor.fetchone()
+
+                return {
+                    'total_value': row[0] or 0,
+                    'monthly_income': row[1] or 0,
+                    'asset_count': row[2] or 0
+                }
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    SUM(total_value) as total_value,
-                    SUM(monthly_income) as monthly_income,
-                    COUNT(*) as asset_count
-                FROM assets
-                WHERE status = 1
-            ''')
-            
-            row = cursor.fetchone()
-            conn.close()
-            
-            return {
-                'total_value': row[0] or 0,
-                'monthly_income': row[1] or 0,
-                'asset_count': row[2] or 0
-            }
-            
+            return self._cached('asset_summary', ('assets',), load)
+
         except Exception as e:
             print(f"获取资产汇总错误: {e}")
             return {'total_value': 0, 'monthly_income': 0, 'asset_count': 0}
-    
+
     # 固定收支项管理方法
     def add_fixed_item(self, name: str, item_type: str, amount: float, description: str = None):
         """添加固定收支项"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO fixed_items (name, type, amount, description)
-                VALUES (?, ?, ?, ?)
-            ''', (name, item_type, amount, description))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO fixed_items (name, type, amount, description)
+                    VALUES (?, ?, ?, ?)
+                ''', (name, item_type, amount, description))
+
+                return True
+
         except Exception as e:
             print(f"添加固定收支项错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_fixed_items(self, item_type: str = None) -> dict:
-        """获取固定收支项列表，返回按类型分组的字典"""
+        """获取固定收支项列表，返回按类型分组的字典（项目 id -> 金额）"""
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                if item_type:
+                    cursor.execute('''
+                        SELECT id, name, type, amount, description, created_at
+                        FROM fixed_items
+                        WHERE status = 1 AND type = ?
+                        ORDER BY created_at
+                    ''', (item_type,))
+                else:
+                    cursor.execute('''
+                        SELECT id, name, type, amount, description, created_at
+                        FROM fixed_items
+                        WHERE status = 1
+                        ORDER BY type, created_at
+                    ''')
+
+                items = [FixedItem._make(row) for row in cursor.fetchall()]
+
+                # 按类型分组，以 id 为键：同名项目各自计入合计
+                income_items = {}
+                expense_items = {}
+
+                for item in items:
+                    if item.type == 'income':
+                        income_items[item.id] = item.amount
+                    elif item.type == 'expense':
+                        expense_items[item.id] = item.amount
+
+                return {
+                    'income': income_items,
+                    'expense': expense_items,
+                    'raw_items': items  # FixedItem 列表，编辑、删除按其 id 进行
+                }
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            if item_type:
-                cursor.execute('''
-                    SELECT id, name, type, amount, description, created_at
-                    FROM fixed_items
-                    WHERE status = 1 AND type = ?
-                    ORDER BY created_at
-                ''', (item_type,))
-            else:
-                cursor.execute('''
-                    SELECT id, name, type, amount, description, created_at
-                    FROM fixed_items
-                    WHERE status = 1
-                    ORDER BY type, created_at
-                ''')
-            
-            items = cursor.fetchall()
-            conn.close()
-            
-            # 按类型分组
-            income_items = {}
-            expense_items = {}
-            
-            for item in items:
-                item_id, name, type_val, amount, description, created_at = item
-                if type_val == 'income':
-                    income_items[name] = amount
-                elif type_val == 'expense':
-                    expense_items[name] = amount
-            
-            return {
-                'income': income_items,
-                'expense': expense_items,
-                'raw_items': items  # 包含完整信息的原始数据
-            }
-            
+            return self._cached(('fixed_items', item_type), ('fixed_items',), load)
+
         except Exception as e:
             print(f"获取固定收支项错误: {e}")
             return {'income': {}, 'expense': {}, 'raw_items': []}
-    
+
     def update_fixed_item(self, item_id: int, name: str, amount: float, description: str = None):
         """更新固定收支项"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE fixed_items 
-                SET name = ?, amount = ?, description = ?
-                WHERE id = ?
-            ''', (name, amount, description, item_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE fixed_items 
+                    SET name = ?, amount = ?, description = ?
+                    WHERE id = ?
+                ''', (name, amount, description, item_id))
+
+                return True
+
         except Exception as e:
             print(f"更新固定收支项错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def delete_fixed_item(self, item_id: int):
         """删除固定收支项"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('UPDATE fixed_items SET status = 0 WHERE id = ?', (item_id,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('UPDATE fixed_items SET status = 0 WHERE id = ?', (item_id,))
+
+                return True
+
         except Exception as e:
             print(f"删除固定收支项错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def delete_fixed_item_by_name(self, name: str, item_type: str):
         """根据名称和类型删除固定收支项"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE fixed_items SET status = 0 
-                WHERE name = ? AND type = ? AND status = 1
-            ''', (name, item_type))
-            
-            conn.commit()
-            return cursor.rowcount > 0
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE fixed_items SET status = 0 
+                    WHERE name = ? AND type = ? AND status = 1
+                ''', (name, item_type))
+
+                return cursor.rowcount > 0
+
         except Exception as e:
             print(f"删除固定收支项错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     # =================== 境界系统数据持久化方法 ===================
-    
+
     def save_jingjie_data(self, realm_data: dict):
-        """保存境界系统数据到数据库 - 性能优化"""
-        # 清除境界数据缓存
-        self._clear_cache('jingjie_data')
+        """保存整棵境界数据到数据库（增删境界/功法等结构修改时使用）
 
-        conn = None
+        勾选单个节点请使用 set_skill_node_completed。已入库的技能（带 "id"）保留原 ID 和
+        创建时间，仍为完成状态的节点保留原完成时间，completed 的先后顺序不因结构修改而改变；
+        新技能的 ID 会回写到 realm_data 中各技能的 "id" 字段。
+        """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 保存当前境界索引
-            current_index = realm_data["gongfa"]["current_realm_index"]
-            cursor.execute('''
-                UPDATE jingjie_config SET current_realm_index = ?, updated_at = CURRENT_TIMESTAMP 
-                WHERE id = 1
-            ''', (current_index,))
-            
-            # 清除现有数据
-            cursor.execute('DELETE FROM skills')
-            cursor.execute('DELETE FROM realms')
-            
-            # 保存境界数据
-            realms = realm_data["gongfa"]["realms"]
-            for i, realm in enumerate(realms):
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                # 保存当前境界索引
+                current_index = realm_data["gongfa"]["current_realm_index"]
                 cursor.execute('''
-                    INSERT INTO realms (name, order_index, completed)
-                    VALUES (?, ?, ?)
-                ''', (realm["name"], i, realm.get("completed", False)))
-                
-                realm_id = cursor.lastrowid
-                
-                # 保存该境界的功法
-                for skill_name, skill_data in realm.get("skills", {}).items():
-                    nodes_json = json.dumps(skill_data.get("nodes", []))
-                    completed_json = json.dumps(skill_data.get("completed", []))
-                    
+                    UPDATE jingjie_config SET current_realm_index = ?, updated_at = CURRENT_TIMESTAMP 
+                    WHERE id = 1
+                ''', (current_index,))
+
+                # 重写前记下原有技能的创建时间和节点的完成时间
+                created = dict(cursor.execute('SELECT id, created_at FROM skills'))
+                finished = {
+                    (skill_id, ordinal): (name, completed_at)
+                    for skill_id, ordinal, name, completed_at in cursor.execute(
+                        'SELECT skill_id, ordinal, name, completed_at FROM skill_nodes WHERE completed_at IS NOT NULL'
+                    )
+                }
+                next_id = max([0, *created, *(skill.get("id") or 0 for skill in _iter_skills(realm_data))]) + 1
+                used_ids = set()
+
+                # 清除现有数据（skill_nodes 由触发器随 skills 一并删除）
+                cursor.execute('DELETE FROM skills')
+                cursor.execute('DELETE FROM realms')
+
+                node_rows = []
+
+                def insert_skill(name, realm_id, skill_type, skill_data):
+                    nonlocal next_id
+                    skill_id = skill_data.get("id")
+                    if skill_id is None or skill_id in used_ids:
+                        skill_id, next_id = next_id, next_id + 1
+                    used_ids.add(skill_id)
+                    # 节点明细存于 skill_nodes，JSON 列不再维护
+                    cursor.execute('''
+                        INSERT INTO skills (id, name, realm_id, skill_type, nodes_json, created_at)
+                        VALUES (?, ?, ?, ?, '[]', COALESCE(?, CURRENT_TIMESTAMP))
+                    ''', (skill_id, name, realm_id, skill_type, created.get(skill_id)))
+                    skill_data["id"] = skill_id
+
+                    nodes = skill_data.get("nodes", [])
+                    ordinals = skill_data.get("completed_ordinals")
+                    if ordinals is None:
+                        rows = skill_node_rows(skill_id, nodes, skill_data.get("completed", []))
+                    else:
+                        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        rows = [(skill_id, i, node, now if i in ordinals else None) for i, node in enumerate(nodes)]
+                    for i, (_, ordinal, node, completed_at) in enumerate(rows):
+                        previous = finished.get((skill_id, ordinal))
+                        if completed_at is not None and previous and previous[0] == node:
+                            rows[i] = (skill_id, ordinal, node, previous[1])
+                    skill_data["completed_ordinals"] = [ordinal for _, ordinal, _, done in rows if done is not None]
+                    node_rows.extend(rows)
+
+                # 保存境界数据
+                realms = realm_data["gongfa"]["realms"]
+                for i, realm in enumerate(realms):
                     cursor.execute('''
-                        INSERT INTO skills (name, realm_id, skill_type, nodes_json, completed_json)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (skill_name, realm_id, 'gongfa', nodes_json, completed_json))
-            
-            # 保存秘术数据
-            secret_arts = realm_data.get("secret_arts", {})
-            for art_name, art_data in secret_arts.items():
-                nodes_json = json.dumps(art_data.get("nodes", []))
-                completed_json = json.dumps(art_data.get("completed", []))
+                        INSERT INTO realms (name, order_index, completed)
+                        VALUES (?, ?, ?)
+                    ''', (realm["name"], i, realm.get("completed", False)))
+
+                    realm_id = cursor.lastrowid
+
+                    # 保存该境界的功法
+                    for skill_name, skill_data in realm.get("skills", {}).items():
+                        insert_skill(skill_name, realm_id, 'gongfa', skill_data)
+
+                # 保存秘术数据
+                for art_name, art_data in realm_data.get("secret_arts", {}).items():
+                    insert_skill(art_name, None, 'secret_art', art_data)
+
+                # 保存副本数据
+                for fuben_name, fuben_info in realm_data.get("fuben", {}).items():
+                    insert_skill(fuben_name, None, 'fuben', fuben_info)
+
+                cursor.executemany('''
+                    INSERT INTO skill_nodes (skill_id, ordinal, name, completed_at)
+                    VALUES (?, ?, ?, ?)
+                ''', node_rows)
+
+                return True
+
+        except Exception as e:
+            print(f"保存境界数据错误: {e}")
+            return False
+
+    def set_skill_node_completed(self, skill_id: int, ordinal: int, completed: bool) -> bool:
+        """勾选/取消单个技能节点，只更新 skill_nodes 中的一行"""
+        try:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
 
                 cursor.execute('''
-                    INSERT INTO skills (name, realm_id, skill_type, nodes_json, completed_json)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (art_name, None, 'secret_art', nodes_json, completed_json))
+                    UPDATE skill_nodes
+                    SET completed_at = CASE WHEN ? THEN COALESCE(completed_at, CURRENT_TIMESTAMP) END
+                    WHERE skill_id = ? AND ordinal = ?
+                ''', (bool(completed), skill_id, ordinal))
+
+                return cursor.rowcount > 0
+
+        except Exception as e:
+            print(f"更新技能节点错误: {e}")
+            return False
 
-            # 保存副本数据
-            fuben_data = realm_data.get("fuben", {})
-            for fuben_name, fuben_info in fuben_data.items():
-                nodes_json = json.dumps(fuben_info.get("nodes", []))
-                completed_json = json.dumps(fuben_info.get("completed", []))
+    def save_realm_progress(self, realm_data: dict) -> bool:
+        """保存境界突破进度：当前境界索引与各境界的圆满标记"""
+        try:
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
 
                 cursor.execute('''
-                    INSERT INTO skills (name, realm_id, skill_type, nodes_json, completed_json)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (fuben_name, None, 'fuben', nodes_json, completed_json))
+                    UPDATE jingjie_config SET current_realm_index = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = 1
+                ''', (realm_data["gongfa"]["current_realm_index"],))
+
+                cursor.executemany(
+                    'UPDATE realms SET completed = ? WHERE order_index = ?',
+                    [(bool(realm.get("completed", False)), i)
+                     for i, realm in enumerate(realm_data["gongfa"]["realms"])]
+                )
+
+                return True
 
-            conn.commit()
-            return True
-            
         except Exception as e:
-            print(f"保存境界数据错误: {e}")
-            if conn:
-                conn.rollback()
+            print(f"保存境界进度错误: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def load_jingjie_data(self) -> dict:
-        """从数据库加载境界系统数据 - 带缓存优化"""
-        # 检查缓存（3秒有效期）
-        cached = self._get_cache('jingjie_data', timeout=3)
-        if cached:
-            return cached
+        """从数据库加载境界系统数据 - 带缓存优化
+
+        由 skill_nodes 明细还原 JingjieSystem 使用的字典结构，各技能额外带有 "id" 字段
+        供单节点更新使用，以及 "completed_ordinals"（已完成节点的序号），区分同名节点。
+        返回的是缓存的深拷贝，调用方可以直接修改。
+        """
+        try:
+            return self._cached(
+                'jingjie_data', ('jingjie_config', 'realms', 'skills', 'skill_nodes'), self._load_jingjie_data
+            )
+
+        except Exception as e:
+            print(f"加载境界数据错误: {e}")
+            # 返回默认数据
+            return {
+                "gongfa": {
+                    "realms": [{
+                        "name": "练气期",
+                        "skills": {},
+                        "completed": False
+                    }],
+                    "current_realm_index": 0
+                },
+                "secret_arts": {},
+                "fuben": {}
+            }
+
+    def get_current_realm_name(self) -> str:
+        """当前境界名称 - 面板只需要这一项，不必加载整棵境界树"""
+        def load():
+            with self._pool.reader() as conn:
+                config_row = conn.execute('SELECT current_realm_index FROM jingjie_config WHERE id = 1').fetchone()
+                index = config_row[0] if config_row else 0
+                if index < 0:
+                    return "无境界"
+                # 与 load_jingjie_data 相同的顺序取第 index 个境界
+                row = conn.execute(
+                    'SELECT name FROM realms ORDER BY order_index LIMIT 1 OFFSET ?', (index,)
+                ).fetchone()
+            return row[0] if row else "无境界"
 
         try:
-            conn = self._get_connection()
+            return self._cached('current_realm_name', ('jingjie_config', 'realms'), load)
+
+        except Exception as e:
+            print(f"获取当前境界错误: {e}")
+            return "无境界"
+
+    def _load_jingjie_data(self) -> dict:
+        """读取境界数据（不经缓存）"""
+        with self._pool.reader() as conn:
             cursor = conn.cursor()
 
             # 加载当前境界索引
             cursor.execute('SELECT current_realm_index FROM jingjie_config WHERE id = 1')
             config_row = cursor.fetchone()
             current_realm_index = config_row[0] if config_row else 0
-            
+
             # 加载境界数据
             cursor.execute('''
                 SELECT id, name, order_index, completed 
@@ -1408,10 +1406,10 @@ class DatabaseManager:
                 ORDER BY order_index
             ''')
             realm_rows = cursor.fetchall()
-            
+
             realms = []
             realm_id_map = {}
-            
+
             for realm_row in realm_rows:
                 realm_id, name, order_index, completed = realm_row
                 realm = {
@@ -1421,57 +1419,44 @@ class DatabaseManager:
                 }
                 realms.append(realm)
                 realm_id_map[realm_id] = len(realms) - 1
-            
-            # 加载功法数据
-            cursor.execute('''
-                SELECT name, realm_id, skill_type, nodes_json, completed_json
-                FROM skills
-                WHERE skill_type = 'gongfa'
-            ''')
-            skill_rows = cursor.fetchall()
-            
-            for skill_row in skill_rows:
-                name, realm_id, skill_type, nodes_json, completed_json = skill_row
-                if realm_id in realm_id_map:
-                    realm_index = realm_id_map[realm_id]
-                    realms[realm_index]["skills"][name] = {
-                        "nodes": json.loads(nodes_json),
-                        "completed": json.loads(completed_json)
-                    }
-            
-            # 加载秘术数据
-            cursor.execute('''
-                SELECT name, nodes_json, completed_json
-                FROM skills
-                WHERE skill_type = 'secret_art'
-            ''')
-            secret_art_rows = cursor.fetchall()
-            
-            secret_arts = {}
-            for art_row in secret_art_rows:
-                name, nodes_json, completed_json = art_row
-                secret_arts[name] = {
-                    "nodes": json.loads(nodes_json),
-                    "completed": json.loads(completed_json)
-                }
 
-            # 加载副本数据
+            # 一次查询加载全部技能及其节点
             cursor.execute('''
-                SELECT name, nodes_json, completed_json
-                FROM skills
-                WHERE skill_type = 'fuben'
+                SELECT s.id, s.name, s.realm_id, s.skill_type, n.name, n.completed_at
+                FROM skills s
+                LEFT JOIN skill_nodes n ON n.skill_id = s.id
+                ORDER BY s.id, n.ordinal
             ''')
-            fuben_rows = cursor.fetchall()
 
+            secret_arts = {}
             fuben_data = {}
-            for fuben_row in fuben_rows:
-                name, nodes_json, completed_json = fuben_row
-                fuben_data[name] = {
-                    "nodes": json.loads(nodes_json),
-                    "completed": json.loads(completed_json)
-                }
+            skills = {}         # 技能ID -> 技能字典
+            completion = {}     # 技能ID -> [(完成时间, 序号, 节点)]
+
+            for skill_id, name, realm_id, skill_type, node, completed_at in cursor.fetchall():
+                skill = skills.get(skill_id)
+                if skill is None:
+                    skill = {"id": skill_id, "nodes": [], "completed": [], "completed_ordinals": []}
+                    skills[skill_id] = skill
+                    completion[skill_id] = []
+                    if skill_type == 'gongfa':
+                        if realm_id in realm_id_map:
+                            realms[realm_id_map[realm_id]]["skills"][name] = skill
+                    elif skill_type == 'secret_art':
+                        secret_arts[name] = skill
+                    elif skill_type == 'fuben':
+                        fuben_data[name] = skill
 
-            conn.close()
+                if node is None:
+                    continue
+                if completed_at is not None:
+                    completion[skill_id].append((completed_at, len(skill["nodes"]), node))
+                    skill["completed_ordinals"].append(len(skill["nodes"]))
+                skill["nodes"].append(node)
+
+            # completed 按完成先后排列
+            for skill_id, done in completion.items():
+                skills[skill_id]["completed"] = [node for _, _, node in sorted(done)]
 
             # 如果没有境界数据，创建默认境界
             if not realms:
@@ -1490,661 +1475,571 @@ class DatabaseManager:
                 "fuben": fuben_data
             }
 
-            # 设置缓存
-            self._set_cache('jingjie_data', result)
-            return result
-            
-        except Exception as e:
-            print(f"加载境界数据错误: {e}")
-            # 返回默认数据
-            return {
-                "gongfa": {
-                    "realms": [{
-                        "name": "练气期",
-                        "skills": {},
-                        "completed": False
-                    }],
-                    "current_realm_index": 0
-                },
-                "secret_arts": {},
-                "fuben": {}
-            }
-    
+        return result
+
     # =================== 统御系统数据操作方法 ===================
-    
+
     def get_family_members(self) -> List[FamilyMember]:
         """获取家族成员列表"""
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT id, name, birthday, phone, notes, created_at
+                    FROM family_members
+                    ORDER BY created_at
+                ''')
+
+                rows = cursor.fetchall()
+
+                members = []
+                for row in rows:
+                    members.append(FamilyMember(
+                        id=row[0],
+                        name=row[1],
+                        birthday=row[2],
+                        phone=row[3] or "",
+                        notes=row[4] or "",
+                        created_at=row[5]
+                    ))
+
+                return members
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, name, birthday, phone, notes, created_at
-                FROM family_members
-                ORDER BY created_at
-            ''')
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            members = []
-            for row in rows:
-                members.append(FamilyMember(
-                    id=row[0],
-                    name=row[1],
-                    birthday=row[2],
-                    phone=row[3] or "",
-                    notes=row[4] or "",
-                    created_at=row[5]
-                ))
-            
-            return members
-            
+            return self._cached('family_members', ('family_members',), load)
+
         except Exception as e:
             print(f"获取家族成员错误: {e}")
             return []
-    
+
     def add_family_member(self, name: str, birthday: str, phone: str = "", notes: str = "") -> bool:
         """添加家族成员"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO family_members (name, birthday, phone, notes)
-                VALUES (?, ?, ?, ?)
-            ''', (name, birthday, phone, notes))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO family_members (name, birthday, phone, notes)
+                    VALUES (?, ?, ?, ?)
+                ''', (name, birthday, phone, notes))
+
+                return True
+
         except Exception as e:
             print(f"添加家族成员错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def update_family_member(self, member_id: int, name: str, birthday: str, phone: str = "", notes: str = "") -> bool:
         """更新家族成员"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE family_members 
-                SET name = ?, birthday = ?, phone = ?, notes = ?
-                WHERE id = ?
-            ''', (name, birthday, phone, notes, member_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE family_members 
+                    SET name = ?, birthday = ?, phone = ?, notes = ?
+                    WHERE id = ?
+                ''', (name, birthday, phone, notes, member_id))
+
+                return True
+
         except Exception as e:
             print(f"更新家族成员错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def delete_family_member(self, member_id: int) -> bool:
         """删除家族成员"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 先删除相关事件
-            cursor.execute('DELETE FROM family_events WHERE member_id = ?', (member_id,))
-            
-            # 再删除成员
-            cursor.execute('DELETE FROM family_members WHERE id = ?', (member_id,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                # 先删除相关事件
+                cursor.execute('DELETE FROM family_events WHERE member_id = ?', (member_id,))
+
+                # 再删除成员
+                cursor.execute('DELETE FROM family_members WHERE id = ?', (member_id,))
+
+                return True
+
         except Exception as e:
             print(f"删除家族成员错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_family_events(self, member_id: int = None) -> List[FamilyEvent]:
         """获取家族事件列表"""
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                if member_id:
+                    cursor.execute('''
+                        SELECT id, member_id, event_name, event_date, completed, created_at
+                        FROM family_events
+                        WHERE member_id = ?
+                        ORDER BY event_date
+                    ''', (member_id,))
+                else:
+                    cursor.execute('''
+                        SELECT id, member_id, event_name, event_date, completed, created_at
+                        FROM family_events
+                        ORDER BY event_date
+                    ''')
+
+                rows = cursor.fetchall()
+
+                events = []
+                for row in rows:
+                    events.append(FamilyEvent(
+                        id=row[0],
+                        member_id=row[1],
+                        event_name=row[2],
+                        event_date=row[3],
+                        completed=bool(row[4]),
+                        created_at=row[5]
+                    ))
+
+                return events
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            if member_id:
-                cursor.execute('''
-                    SELECT id, member_id, event_name, event_date, completed, created_at
-                    FROM family_events
-                    WHERE member_id = ?
-                    ORDER BY event_date
-                ''', (member_id,))
-            else:
-                cursor.execute('''
-                    SELECT id, member_id, event_name, event_date, completed, created_at
-                    FROM family_events
-                    ORDER BY event_date
-                ''')
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            events = []
-            for row in rows:
-                events.append(FamilyEvent(
-                    id=row[0],
-                    member_id=row[1],
-                    event_name=row[2],
-                    event_date=row[3],
-                    completed=bool(row[4]),
-                    created_at=row[5]
-                ))
-            
-            return events
-            
+            return self._cached(('family_events', member_id), ('family_events',), load)
+
         except Exception as e:
             print(f"获取家族事件错误: {e}")
             return []
-    
+
     def add_family_event(self, member_id: int, event_name: str, event_date: str) -> bool:
         """添加家族事件"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO family_events (member_id, event_name, event_date)
-                VALUES (?, ?, ?)
-            ''', (member_id, event_name, event_date))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO family_events (member_id, event_name, event_date)
+                    VALUES (?, ?, ?)
+                ''', (member_id, event_name, event_date))
+
+                return True
+
         except Exception as e:
             print(f"添加家族事件错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def toggle_family_event(self, event_id: int, completed: bool) -> bool:
         """切换家族事件完成状态"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE family_events 
-                SET completed = ?
-                WHERE id = ?
-            ''', (completed, event_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE family_events 
+                    SET completed = ?
+                    WHERE id = ?
+                ''', (completed, event_id))
+
+                return True
+
         except Exception as e:
             print(f"切换家族事件状态错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_friends(self) -> List[Friend]:
         """获取朋友列表"""
+        def load():
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT id, name, category, personality, hobbies, notes, 
+                           last_contact, is_close_friend, ai_analysis, created_at
+                    FROM friends
+                    ORDER BY is_close_friend DESC, created_at
+                ''')
+
+                rows = cursor.fetchall()
+
+                friends = []
+                for row in rows:
+                    friends.append(Friend(
+                        id=row[0],
+                        name=row[1],
+                        category=row[2],
+                        personality=row[3] or "",
+                        hobbies=row[4] or "",
+                        notes=row[5] or "",
+                        last_contact=row[6],
+                        is_close_friend=bool(row[7]),
+                        ai_analysis=row[8],
+                        created_at=row[9]
+                    ))
+
+                return friends
+
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, name, category, personality, hobbies, notes, 
-                       last_contact, is_close_friend, ai_analysis, created_at
-                FROM friends
-                ORDER BY is_close_friend DESC, created_at
-            ''')
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            friends = []
-            for row in rows:
-                friends.append(Friend(
-                    id=row[0],
-                    name=row[1],
-                    category=row[2],
-                    personality=row[3] or "",
-                    hobbies=row[4] or "",
-                    notes=row[5] or "",
-                    last_contact=row[6],
-                    is_close_friend=bool(row[7]),
-                    ai_analysis=row[8],
-                    created_at=row[9]
-                ))
-            
-            return friends
-            
+            return self._cached('friends', ('friends',), load)
+
         except Exception as e:
             print(f"获取朋友列表错误: {e}")
             return []
-    
+
     def add_friend(self, name: str, category: str, personality: str = "", hobbies: str = "", notes: str = "") -> Optional[int]:
         """添加朋友"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO friends (name, category, personality, hobbies, notes)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, category, personality, hobbies, notes))
-            
-            friend_id = cursor.lastrowid
-            conn.commit()
-            return friend_id
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO friends (name, category, personality, hobbies, notes)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, category, personality, hobbies, notes))
+
+                friend_id = cursor.lastrowid
+                return friend_id
+
         except Exception as e:
             print(f"添加朋友错误: {e}")
-            if conn:
-                conn.rollback()
             return None
-        finally:
-            if conn:
-                conn.close()
-    
+
     def update_friend(self, friend_id: int, name: str, category: str, personality: str = "", hobbies: str = "", notes: str = "", ai_analysis: str = None) -> bool:
         """更新朋友信息"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE friends 
-                SET name = ?, category = ?, personality = ?, hobbies = ?, notes = ?, ai_analysis = ?
-                WHERE id = ?
-            ''', (name, category, personality, hobbies, notes, ai_analysis, friend_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE friends 
+                    SET name = ?, category = ?, personality = ?, hobbies = ?, notes = ?, ai_analysis = ?
+                    WHERE id = ?
+                ''', (name, category, personality, hobbies, notes, ai_analysis, friend_id))
+
+                return True
+
         except Exception as e:
             print(f"更新朋友信息错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def delete_friend(self, friend_id: int) -> bool:
         """删除朋友"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 删除相关的关系、任务和互动记录
-            cursor.execute('DELETE FROM friend_relations WHERE friend_id = ? OR related_friend_id = ?', (friend_id, friend_id))
-            cursor.execute('DELETE FROM friend_tasks WHERE friend_id = ?', (friend_id,))
-            cursor.execute('DELETE FROM interaction_records WHERE friend_id = ?', (friend_id,))
-            
-            # 删除朋友
-            cursor.execute('DELETE FROM friends WHERE id = ?', (friend_id,))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                # 删除相关的关系、任务和互动记录
+                cursor.execute('DELETE FROM friend_relations WHERE friend_id = ? OR related_friend_id = ?', (friend_id, friend_id))
+                cursor.execute('DELETE FROM friend_tasks WHERE friend_id = ?', (friend_id,))
+                cursor.execute('DELETE FROM interaction_records WHERE friend_id = ?', (friend_id,))
+
+                # 删除朋友
+                cursor.execute('DELETE FROM friends WHERE id = ?', (friend_id,))
+
+                return True
+
         except Exception as e:
             print(f"删除朋友错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def update_friend_last_contact(self, friend_id: int, contact_date: str) -> bool:
         """更新朋友最后联系时间"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE friends 
-                SET last_contact = ?
-                WHERE id = ?
-            ''', (contact_date, friend_id))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE friends 
+                    SET last_contact = ?
+                    WHERE id = ?
+                ''', (contact_date, friend_id))
+
+                return True
+
         except Exception as e:
             print(f"更新朋友联系时间错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def auto_update_close_friend_status(self) -> bool:
-        """自动更新密友状态（任务数量>10的朋友）"""
-        conn = None
+        """自动更新密友状态（任务数量>10的朋友）
+
+        只改写状态实际变化的朋友，其余行不写入，也不产生变更日志。
+        """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 先重置所有朋友的密友状态
-            cursor.execute('UPDATE friends SET is_close_friend = FALSE')
-            
-            # 查找任务数量>10的朋友并设置为密友
-            cursor.execute('''
-                UPDATE friends 
-                SET is_close_friend = TRUE
-                WHERE id IN (
-                    SELECT friend_id 
-                    FROM friend_tasks 
-                    GROUP BY friend_id 
-                    HAVING COUNT(*) > 10
-                )
-            ''')
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE friends
+                    SET is_close_friend = id IN (
+                        SELECT friend_id FROM friend_tasks
+                        GROUP BY friend_id HAVING COUNT(*) > 10
+                    )
+                    WHERE is_close_friend IS NOT (id IN (
+                        SELECT friend_id FROM friend_tasks
+                        GROUP BY friend_id HAVING COUNT(*) > 10
+                    ))
+                ''')
+
+                return True
+
         except Exception as e:
             print(f"自动更新密友状态错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def add_friend_relation(self, friend_id: int, related_friend_id: int, relation_type: str = "acquaintance") -> bool:
         """添加朋友关系"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO friend_relations (friend_id, related_friend_id, relation_type)
-                VALUES (?, ?, ?)
-            ''', (friend_id, related_friend_id, relation_type))
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO friend_relations (friend_id, related_friend_id, relation_type)
+                    VALUES (?, ?, ?)
+                ''', (friend_id, related_friend_id, relation_type))
+
+                return True
+
         except Exception as e:
             print(f"添加朋友关系错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_friend_relations(self, friend_id: int) -> List[FriendRelation]:
         """获取朋友关系列表"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, friend_id, related_friend_id, relation_type, created_at
-                FROM friend_relations
-                WHERE friend_id = ? OR related_friend_id = ?
-                ORDER BY created_at
-            ''', (friend_id, friend_id))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            relations = []
-            for row in rows:
-                relations.append(FriendRelation(
-                    id=row[0],
-                    friend_id=row[1],
-                    related_friend_id=row[2],
-                    relation_type=row[3],
-                    created_at=row[4]
-                ))
-            
-            return relations
-            
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT id, friend_id, related_friend_id, relation_type, created_at
+                    FROM friend_relations
+                    WHERE friend_id = ? OR related_friend_id = ?
+                    ORDER BY created_at
+                ''', (friend_id, friend_id))
+
+                rows = cursor.fetchall()
+
+                relations = []
+                for row in rows:
+                    relations.append(FriendRelation(
+                        id=row[0],
+                        friend_id=row[1],
+                        related_friend_id=row[2],
+                        relation_type=row[3],
+                        created_at=row[4]
+                    ))
+
+                return relations
+
         except Exception as e:
             print(f"获取朋友关系错误: {e}")
             return []
-    
+
     def add_friend_task(self, friend_id: int, task_name: str, reward_type: str, reward_amount: int) -> bool:
         """添加朋友交互任务"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO friend_tasks (friend_id, task_name, reward_type, reward_amount)
-                VALUES (?, ?, ?, ?)
-            ''', (friend_id, task_name, reward_type, reward_amount))
-            
-            conn.commit()
-            # 自动更新密友状态
-            self.auto_update_close_friend_status()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO friend_tasks (friend_id, task_name, reward_type, reward_amount)
+                    VALUES (?, ?, ?, ?)
+                ''', (friend_id, task_name, reward_type, reward_amount))
+
+                # 自动更新密友状态
+                self.auto_update_close_friend_status()
+                return True
+
         except Exception as e:
             print(f"添加朋友任务错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_friend_tasks(self, friend_id: int) -> List[FriendTask]:
         """获取朋友任务列表"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, friend_id, task_name, reward_type, reward_amount, completed, created_at
-                FROM friend_tasks
-                WHERE friend_id = ?
-                ORDER BY completed, created_at DESC
-            ''', (friend_id,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            tasks = []
-            for row in rows:
-                tasks.append(FriendTask(
-                    id=row[0],
-                    friend_id=row[1],
-                    task_name=row[2],
-                    reward_type=row[3],
-                    reward_amount=row[4],
-                    completed=bool(row[5]),
-                    created_at=row[6]
-                ))
-            
-            return tasks
-            
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT id, friend_id, task_name, reward_type, reward_amount, completed, created_at
+                    FROM friend_tasks
+                    WHERE friend_id = ?
+                    ORDER BY completed, created_at DESC
+                ''', (friend_id,))
+
+                rows = cursor.fetchall()
+
+                tasks = []
+                for row in rows:
+                    tasks.append(FriendTask(
+                        id=row[0],
+                        friend_id=row[1],
+                        task_name=row[2],
+                        reward_type=row[3],
+                        reward_amount=row[4],
+                        completed=bool(row[5]),
+                        created_at=row[6]
+                    ))
+
+                return tasks
+
         except Exception as e:
             print(f"获取朋友任务错误: {e}")
             return []
-    
+
     def complete_friend_task(self, task_id: int) -> bool:
         """完成朋友任务"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 获取任务信息
-            cursor.execute('''
-                SELECT reward_type, reward_amount 
-                FROM friend_tasks 
-                WHERE id = ? AND completed = FALSE
-            ''', (task_id,))
-            
-            task_info = cursor.fetchone()
-            if not task_info:
-                return False
-            
-            reward_type, reward_amount = task_info
-            
-            # 标记任务完成
-            cursor.execute('''
-                UPDATE friend_tasks 
-                SET completed = TRUE
-                WHERE id = ?
-            ''', (task_id,))
-            
-            # 应用奖励
-            if reward_type == "spirit":
-                self.update_spirit_blood(reward_amount, 0)
-            elif reward_type == "blood":
-                self.update_spirit_blood(0, reward_amount)
-            elif reward_type == "money":
-                self.add_finance_record("income", reward_amount, "朋友任务", f"完成朋友任务奖励")
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                # 获取任务信息
+                cursor.execute('''
+                    SELECT reward_type, reward_amount 
+                    FROM friend_tasks 
+                    WHERE id = ? AND completed = FALSE
+                ''', (task_id,))
+
+                task_info = cursor.fetchone()
+                if not task_info:
+                    return False
+
+                reward_type, reward_amount = task_info
+
+                # 标记任务完成
+                cursor.execute('''
+                    UPDATE friend_tasks 
+                    SET completed = TRUE
+                    WHERE id = ?
+                ''', (task_id,))
+
+                # 应用奖励（与完成标记同一事务）
+                if reward_type == "spirit":
+                    self._apply_spirit_blood(cursor, reward_amount, 0)
+                elif reward_type == "blood":
+                    self._apply_spirit_blood(cursor, 0, reward_amount)
+                elif reward_type == "money":
+                    self._insert_finance_record(cursor, "income", reward_amount, "朋友任务", "完成朋友任务奖励")
+
+                return True
+
         except Exception as e:
             print(f"完成朋友任务错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def add_interaction_record(self, friend_id: int, content: str, interaction_date: str) -> bool:
         """添加互动记录"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO interaction_records (friend_id, content, interaction_date)
-                VALUES (?, ?, ?)
-            ''', (friend_id, content, interaction_date))
-            
-            # 更新朋友的最后联系时间
-            self.update_friend_last_contact(friend_id, interaction_date)
-            
-            conn.commit()
-            return True
-            
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO interaction_records (friend_id, content, interaction_date)
+                    VALUES (?, ?, ?)
+                ''', (friend_id, content, interaction_date))
+
+                # 更新朋友的最后联系时间
+                self.update_friend_last_contact(friend_id, interaction_date)
+
+                return True
+
         except Exception as e:
             print(f"添加互动记录错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
-    
+
     def get_interaction_records(self, friend_id: int, limit: int = 10) -> List[InteractionRecord]:
         """获取互动记录"""
+        return self.get_interaction_records_page(friend_id, limit).items
+
+    def get_interaction_records_page(self, friend_id: int, limit: int = 10, before: tuple = None) -> Page:
+        """分页获取互动记录，按互动日期倒序，before 传上一页的 next_cursor"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, friend_id, content, interaction_date, created_at
-                FROM interaction_records
-                WHERE friend_id = ?
-                ORDER BY interaction_date DESC
-                LIMIT ?
-            ''', (friend_id, limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            records = []
-            for row in rows:
-                records.append(InteractionRecord(
-                    id=row[0],
-                    friend_id=row[1],
-                    content=row[2],
-                    interaction_date=row[3],
-                    created_at=row[4]
-                ))
-            
-            return records
-            
+            with self._pool.reader() as conn:
+                page = self._fetch_page(
+                    conn.cursor(),
+                    'SELECT id, friend_id, content, interaction_date, created_at FROM interaction_records',
+                    ['friend_id = ?'], [friend_id], 'interaction_date', before, limit,
+                    key=lambda row: (row[3], row[0])
+                )
+
+                page.items = [
+                    InteractionRecord(
+                        id=row[0],
+                        friend_id=row[1],
+                        content=row[2],
+                        interaction_date=row[3],
+                        created_at=row[4]
+                    )
+                    for row in page.items
+                ]
+
+                return page
+
         except Exception as e:
             print(f"获取互动记录错误: {e}")
-            return []
+            return Page([])
 
     # =================== 励志库管理方法 ===================
 
     def get_all_quotes(self) -> list:
         """获取所有励志语录"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT id, content, author, category, created_at
-                FROM lizhi_quotes
-                WHERE status = 1
-                ORDER BY created_at DESC
-            ''')
+                cursor.execute('''
+                    SELECT id, content, author, category, created_at
+                    FROM lizhi_quotes
+                    WHERE status = 1
+                    ORDER BY created_at DESC, id DESC
+                ''')
 
-            quotes = cursor.fetchall()
-            conn.close()
+                quotes = cursor.fetchall()
 
-            return quotes
+                return quotes
 
         except Exception as e:
             print(f"获取励志语录错误: {e}")
             return []
 
+    def get_quotes_page(self, limit: int = 20, before: tuple = None) -> Page:
+        """分页获取励志语录，顺序与 get_all_quotes 一致，before 传上一页的 next_cursor"""
+        try:
+            with self._pool.reader() as conn:
+                return self._fetch_page(
+                    conn.cursor(),
+                    'SELECT id, content, author, category, created_at FROM lizhi_quotes',
+                    ['status = 1'], [], 'created_at', before, limit,
+                    key=lambda row: (row[4], row[0])
+                )
+
+        except Exception as e:
+            print(f"获取励志语录错误: {e}")
+            return Page([])
+
+    def count_quotes(self) -> int:
+        """励志语录总数"""
+        try:
+            with self._pool.reader() as conn:
+                return conn.execute('SELECT COUNT(*) FROM lizhi_quotes WHERE status = 1').fetchone()[0]
+
+        except Exception as e:
+            print(f"统计励志语录错误: {e}")
+            return 0
+
     def get_random_quote(self) -> tuple:
         """随机获取一条励志语录"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            with self._pool.reader() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT id, content, author, category
-                FROM lizhi_quotes
-                WHERE status = 1
-                ORDER BY RANDOM()
-                LIMIT 1
-            ''')
+                cursor.execute('''
+                    SELECT id, content, author, category
+                    FROM lizhi_quotes
+                    WHERE status = 1
+                    ORDER BY RANDOM()
+                    LIMIT 1
+                ''')
 
-            quote = cursor.fetchone()
-            conn.close()
+                quote = cursor.fetchone()
 
-            return quote
+                return quote
 
         except Exception as e:
             print(f"获取随机励志语录错误: {e}")
@@ -2152,45 +2047,182 @@ class DatabaseManager:
 
     def add_quote(self, content: str, author: str = "", category: str = "poetry") -> bool:
         """添加励志语录"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                INSERT INTO lizhi_quotes (content, author, category)
-                VALUES (?, ?, ?)
-            ''', (content, author, category))
+                cursor.execute('''
+                    INSERT INTO lizhi_quotes (content, author, category)
+                    VALUES (?, ?, ?)
+                ''', (content, author, category))
 
-            conn.commit()
-            return True
+                return True
 
         except Exception as e:
             print(f"添加励志语录错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
 
     def delete_quote(self, quote_id: int) -> bool:
         """删除励志语录"""
-        conn = None
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            with self._pool.writer() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('UPDATE lizhi_quotes SET status = 0 WHERE id = ?', (quote_id,))
+                cursor.execute('UPDATE lizhi_quotes SET status = 0 WHERE id = ?', (quote_id,))
 
-            conn.commit()
-            return True
+                return True
 
         except Exception as e:
             print(f"删除励志语录错误: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
\ No newline at end of file
+    # =================== 全文搜索 ===================
+
+    def search(self, query: str, sources: tuple = None, limit: int = 30) -> List[SearchResult]:
+        """全文搜索语录、诗句、道友、互动记录和收支备注，按相关度（bm25）排序
+
+        sources 限定来源，取值见 database.search.SEARCH_SOURCES，默认全部来源。
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        sql = 'SELECT rowid, body, rank FROM search_index WHERE search_index MATCH ?'
+        params = [match]
+        if sources:
+            # 每个来源占一段连续的 rowid
+            ranges = [source_range(source) for source in sources]
+            sql += ' AND (' + ' OR '.join('rowid BETWEEN ? AND ?' for _ in ranges) + ')'
+            params.extend(bound for rowid_range in ranges for bound in rowid_range)
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+
+        try:
+            with self._pool.reader() as conn:
+                rows = conn.execute(sql, params).fetchall()
+
+            return [SearchResult(*split_rowid(rowid), body, rank) for rowid, body, rank in rows]
+
+        except Exception as e:
+            print(f"搜索错误: {e}")
+            return []
+
+    def sync_poetry_index(self, poetry_library: list) -> bool:
+        """把诗句库同步到全文索引（诗句库保存在 JSON 文件中，没有触发器可用）
+
+        ref_id 为诗句在列表中的序号；内容未变化时不写入。
+        """
+        start, end = source_range('poetry')
+        rows = [
+            (start + index, poetry.get('text', ''), search_tokens(' '.join(
+                str(poetry.get(field) or '') for field in ('text', 'author', 'category')
+            )))
+            for index, poetry in enumerate(poetry_library)
+        ]
+
+        try:
+            with self._pool.reader() as conn:
+                indexed = conn.execute('''
+                    SELECT rowid, body, tokens FROM search_index
+                    WHERE rowid BETWEEN ? AND ?
+                    ORDER BY rowid
+                ''', (start, end)).fetchall()
+            if indexed == rows:
+                return True
+
+            with self._pool.writer() as conn:
+                conn.execute('DELETE FROM search_index WHERE rowid BETWEEN ? AND ?', (start, end))
+                conn.executemany('INSERT INTO search_index (rowid, body, tokens) VALUES (?, ?, ?)', rows)
+
+                return True
+
+        except Exception as e:
+            print(f"同步诗句索引错误: {e}")
+            return False
+
+    # =================== 变更日志 ===================
+
+    def get_change_version(self) -> int:
+        """变更日志的当前版本（最后一次变化的 version，没有变化时为0）"""
+        try:
+            with self._pool.reader() as conn:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changelog'").fetchone()
+            return row[0] if row else 0
+
+        except Exception as e:
+            print(f"获取变更版本错误: {e}")
+            return 0
+
+    def get_changes_since(self, version: int = 0, tables: tuple = None, limit: int = 1000,
+                          coalesce: bool = False) -> ChangeSet:
+        """读取 version 之后的变化，按 version 升序，每次最多 limit 条
+
+        coalesce=True 时同一行的多次变化合并为一条净变化：先插入后删除的行不返回，
+        先插入后更新记为 I，以删除结束记为 D，其余记为 U；每行保留最后一次变化的 version。
+        tables 只筛选结果，返回的 version 仍推进到本批最后一条日志，消费者不会重复读取。
+        """
+        try:
+            with self._pool.reader() as conn:
+                oldest, latest = conn.execute('''
+                    SELECT MIN(version),
+                           (SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'changelog')
+                    FROM changelog
+                ''').fetchone()
+                # 日志按 version 连续追加，清理只删除开头的部分
+                pruned_through = (oldest if oldest is not None else latest + 1) - 1
+                if version < pruned_through:
+                    return ChangeSet([], latest, resync=True)
+
+                # 本批的版本上界：第 limit 条变化的 version
+                upper = conn.execute('''
+                    SELECT version FROM changelog WHERE version > ?
+                    ORDER BY version LIMIT 1 OFFSET ?
+                ''', (version, limit - 1)).fetchone()
+                upper = upper[0] if upper else latest
+
+                table_filter, params = '', [version, upper]
+                if tables:
+                    table_filter = f"AND table_name IN ({', '.join('?' for _ in tables)})"
+                    params.extend(tables)
+
+                if coalesce:
+                    rows = conn.execute(f'''
+                        SELECT version, table_name, row_id,
+                               CASE WHEN first_op = 'I' AND op = 'D' THEN NULL
+                                    WHEN first_op = 'I' THEN 'I'
+                                    WHEN op = 'D' THEN 'D'
+                                    ELSE 'U' END,
+                               changed_at
+                        FROM (
+                            SELECT *,
+                                   FIRST_VALUE(op) OVER (PARTITION BY table_name, row_id ORDER BY version) AS first_op,
+                                   ROW_NUMBER() OVER (PARTITION BY table_name, row_id ORDER BY version DESC) AS recency
+                            FROM changelog
+                            WHERE version > ? AND version <= ? {table_filter}
+                        )
+                        WHERE recency = 1
+                        ORDER BY version
+                    ''', params).fetchall()
+                    rows = [row for row in rows if row[3] is not None]
+                else:
+                    rows = conn.execute(f'''
+                        SELECT version, table_name, row_id, op, changed_at
+                        FROM changelog
+                        WHERE version > ? AND version <= ? {table_filter}
+                        ORDER BY version
+                    ''', params).fetchall()
+
+            return ChangeSet([Change(*row) for row in rows], upper, has_more=upper < latest)
+
+        except Exception as e:
+            print(f"读取变更日志错误: {e}")
+            return ChangeSet([], version)
+
+    def prune_changelog(self, through_version: int) -> int:
+        """删除 through_version 及之前的变更日志（所有消费者都已读过的部分），返回删除条数"""
+        try:
+            with self._pool.writer() as conn:
+                return conn.execute('DELETE FROM changelog WHERE version <= ?', (through_version,)).rowcount
+
+        except Exception as e:
+            print(f"清理变更日志错误: {e}")
+            return 0
@@ -0,0 +1,181 @@
+"""
+灵石流水批量导入 - 流式读取 CSV / JSON / JSON Lines，按列映射规范化并校验
+
+只负责把源文件逐行转换为 finance_records 的字段，写库由
+DatabaseManager.import_finance_records 分批完成。
+"""
+import csv
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+
+# 目标字段 -> 可自动识别的表头（不区分大小写）
+DEFAULT_COLUMN_ALIASES = {
+    'type': ('type', '类型', '收支类型', '收/支', '收支'),
+    'amount': ('amount', '金额', '金额(元)', '交易金额'),
+    'category': ('category', '分类', '类别', '交易分类'),
+    'description': ('description', '备注', '说明', '描述', '摘要'),
+    'created_at': ('created_at', 'date', 'time', 'datetime', '时间', '日期', '交易时间', '记账时间'),
+}
+
+TYPE_ALIASES = {
+    'income': 'income', '收入': 'income', '收': 'income',
+    'expense': 'expense', '支出': 'expense', '支': 'expense',
+}
+
+# ISO 格式由 datetime.fromisoformat 处理，这里是其余常见格式
+DATETIME_FORMATS = (
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d %H:%M',
+    '%Y/%m/%d',
+    '%Y年%m月%d日',
+)
+
+# 一行规范化后的字段：(type, amount, category, description, created_at)
+FinanceRow = Tuple[str, float, Optional[str], Optional[str], str]
+
+
+class FinanceRowError(ValueError):
+    """源文件中某一行无法导入"""
+
+
+def iter_source_rows(path: str, fmt: str = None, encoding: str = 'utf-8-sig') -> Iterator[Tuple[int, dict]]:
+    """流式读取源文件，逐行产出 (行号, 原始字段字典)
+
+    fmt 为 csv / json / jsonl，默认按扩展名判断。CSV 与 JSON Lines 逐行读取，
+    JSON 需为对象数组（或 {"records": [...]}），会整体载入。
+    """
+    fmt = (fmt or Path(path).suffix.lstrip('.')).lower()
+
+    if fmt == 'csv':
+        with open(path, newline='', encoding=encoding) as f:
+            # 表头占第 1 行
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+    elif fmt in ('jsonl', 'ndjson'):
+        with open(path, encoding=encoding) as f:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+    elif fmt == 'json':
+        with open(path, encoding=encoding) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('records', [])
+        for index, row in enumerate(data, start=1):
+            yield index, row
+    else:
+        raise ValueError(f"不支持的导入格式: {fmt}")
+
+
+def resolve_column_map(headers, column_map: dict = None) -> dict:
+    """确定目标字段对应的源列：column_map 显式指定的优先，其余按常见表头识别"""
+    lookup = {str(h).strip().lower(): h for h in headers if h is not None}
+    resolved = {}
+    for target, aliases in DEFAULT_COLUMN_ALIASES.items():
+        if column_map and target in column_map:
+            resolved[target] = column_map[target]
+            continue
+        for alias in aliases:
+            if alias.lower() in lookup:
+                resolved[target] = lookup[alias.lower()]
+                break
+
+    missing = [field for field in ('amount', 'created_at') if field not in resolved]
+    if missing:
+        raise ValueError(f"源文件缺少必需的列: {', '.join(missing)}，请通过 column_map 指定")
+    return resolved
+
+
+def parse_amount(value) -> float:
+    """解析金额，允许货币符号、千分位和括号表示的负数"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or '').strip()
+    negative = text.startswith('(') and text.endswith(')')
+    for symbol in ('(', ')', ',', '¥', '￥', '$', '元', ' '):
+        text = text.replace(symbol, '')
+    if not text:
+        raise FinanceRowError("金额为空")
+    try:
+        amount = float(text)
+    except ValueError:
+        raise FinanceRowError(f"金额无法解析: {value}")
+    return -amount if negative else amount
+
+
+def parse_datetime(value) -> str:
+    """解析时间并统一为 'YYYY-MM-DD HH:MM:SS'（与 CURRENT_TIMESTAMP 一致）"""
+    text = str(value or '').strip()
+    if not text:
+        raise FinanceRowError("时间为空")
+
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        parsed = None
+        for fmt in DATETIME_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        raise FinanceRowError(f"时间无法解析: {value}")
+
+    if len(text) == 19 and text[10] == ' ':
+        return text  # 已是标准格式
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def normalize_row(raw: dict, columns: dict) -> FinanceRow:
+    """按列映射把一行原始数据转换为 finance_records 字段并校验"""
+    def field(name):
+        source = columns.get(name)
+        value = raw.get(source) if source is not None else None
+        if isinstance(value, str):
+            value = value.strip()
+        return value if value not in ('', None) else None
+
+    amount = parse_amount(field('amount'))
+    raw_type = field('type')
+    if raw_type is None:
+        # 未提供收支类型时按金额正负判断
+        record_type = 'expense' if amount < 0 else 'income'
+    else:
+        record_type = TYPE_ALIASES.get(str(raw_type).lower())
+        if record_type is None:
+            raise FinanceRowError(f"收支类型无法识别: {raw_type}")
+
+    # 银行流水中支出常以负数表示，统一存为正数
+    amount = round(abs(amount), 2)
+    if amount == 0:
+        raise FinanceRowError("金额为0")
+
+    category = field('category')
+    description = field('description')
+    return (
+        record_type,
+        amount,
+        str(category) if category is not None else None,
+        str(description) if description is not None else None,
+        parse_datetime(field('created_at')),
+    )
+
+
+def iter_finance_rows(path: str, column_map: dict = None, fmt: str = None,
+                      encoding: str = 'utf-8-sig') -> Iterator[Tuple[int, Optional[FinanceRow], Optional[str]]]:
+    """逐行产出 (行号, 规范化后的字段, 错误信息)，两者只有一个不为 None"""
+    columns = None
+    for line_no, raw in iter_source_rows(path, fmt, encoding):
+        if not isinstance(raw, dict):
+            yield line_no, None, "不是键值对象"
+            continue
+        if columns is None:
+            columns = resolve_column_map(raw.keys(), column_map)
+        try:
+            yield line_no, normalize_row(raw, columns), None
+        except FinanceRowError as e:
+            yield line_no, None, str(e)
@@ -0,0 +1,58 @@
+"""
+内存数据库模式 - 数据库放在内存中，启动时载入、运行中定期写回磁盘
+
+数据库文件只在载入和快照时读写，其余时间所有读写都在内存中完成，适合演示、测试、
+基准测试以及闪存很慢的手机。快照使用 SQLite 在线备份 API，写出的是某次提交之后的完整数据库。
+
+    db = DatabaseManager(':memory:')                  # 纯内存，默认任务来自 assets/initial_tasks.json
+    db = DatabaseManager(path, in_memory=True)        # 从 path 载入，定期及关闭时写回 path
+    db.snapshot('copy.db')                            # 随时另存一份快照
+"""
+import json
+import os
+import threading
+from typing import Callable, List, Tuple
+
+
+# 不对应任何文件的纯内存数据库，不自动写回
+MEMORY_PATH = ':memory:'
+
+INITIAL_TASKS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'assets', 'initial_tasks.json')
+
+
+def load_initial_tasks(path: str = INITIAL_TASKS_PATH) -> List[Tuple[str, str, int, int]]:
+    """读取初始任务清单，返回 (name, category, spirit_effect, blood_effect)；文件不存在时返回空列表"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [
+        (task['name'], category, task.get('spirit_effect', 0), task.get('blood_effect', 0))
+        for category in ('positive', 'negative')
+        for task in data.get(f'{category}_tasks', [])
+    ]
+
+
+class SnapshotTimer:
+    """后台线程按固定间隔调用 snapshot()，由 snapshot 自行判断数据是否有变化"""
+
+    def __init__(self, snapshot: Callable[[], object], interval: float):
+        self.interval = interval
+        self._snapshot = snapshot
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止计时，等待进行中的快照完成"""
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self._snapshot()
+            except Exception as e:
+                print(f"定时快照错误: {e}")
@@ -0,0 +1,1158 @@
+"""
+数据库结构迁移引擎
+
+以 PRAGMA user_version 记录结构版本，按版本号顺序执行迁移步骤，每步与版本号更新
+处于同一事务中。版本已是最新时只需读取一次 user_version，不再执行任何 DDL。
+
+新增迁移：在 MIGRATIONS 末尾追加版本号递增的 Migration，不要修改已发布的步骤。
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from database.connection import ConnectionPool
+from database.search import SEARCH_SOURCES, SOURCE_SHIFT
+from database.timeseries import SERIES_TIERS
+from config import GameConfig
+
+
+# 二级索引定义（均可重复执行）
+INDEX_DEFINITIONS = (
+    # 某任务今日是否已完成：task_id 等值 + completed_at 范围
+    'CREATE INDEX IF NOT EXISTS idx_task_records_task_completed ON task_records(task_id, completed_at)',
+    # 今日已完成任务列表：completed_at 范围，覆盖 task_id
+    'CREATE INDEX IF NOT EXISTS idx_task_records_completed ON task_records(completed_at, task_id)',
+    # 按日期汇总收支、按时间倒序列出记录：覆盖 type/amount
+    'CREATE INDEX IF NOT EXISTS idx_finance_records_created_type ON finance_records(created_at, type, amount)',
+    # 统御系统外键列
+    'CREATE INDEX IF NOT EXISTS idx_family_events_member ON family_events(member_id, event_date)',
+    'CREATE INDEX IF NOT EXISTS idx_friend_relations_friend ON friend_relations(friend_id)',
+    'CREATE INDEX IF NOT EXISTS idx_friend_relations_related ON friend_relations(related_friend_id)',
+    'CREATE INDEX IF NOT EXISTS idx_friend_tasks_friend ON friend_tasks(friend_id, completed)',
+    'CREATE INDEX IF NOT EXISTS idx_interaction_records_friend ON interaction_records(friend_id, interaction_date)',
+)
+
+
+# 灵石余额账本：finance_balance 单行表由触发器随 finance_records 的增删改同步维护，
+# 与业务写入处于同一事务中，读取当前余额为 O(1)
+LEDGER_DEFINITIONS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_finance_balance_insert
+    AFTER INSERT ON finance_records
+    BEGIN
+        UPDATE finance_balance SET
+            total_income = total_income + CASE WHEN NEW.type = 'income' THEN NEW.amount ELSE 0 END,
+            total_expense = total_expense + CASE WHEN NEW.type = 'expense' THEN NEW.amount ELSE 0 END,
+            record_count = record_count + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_finance_balance_delete
+    AFTER DELETE ON finance_records
+    BEGIN
+        UPDATE finance_balance SET
+            total_income = total_income - CASE WHEN OLD.type = 'income' THEN OLD.amount ELSE 0 END,
+            total_expense = total_expense - CASE WHEN OLD.type = 'expense' THEN OLD.amount ELSE 0 END,
+            record_count = record_count - 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_finance_balance_update
+    AFTER UPDATE OF type, amount ON finance_records
+    BEGIN
+        UPDATE finance_balance SET
+            total_income = total_income
+                - CASE WHEN OLD.type = 'income' THEN OLD.amount ELSE 0 END
+                + CASE WHEN NEW.type = 'income' THEN NEW.amount ELSE 0 END,
+            total_expense = total_expense
+                - CASE WHEN OLD.type = 'expense' THEN OLD.amount ELSE 0 END
+                + CASE WHEN NEW.type = 'expense' THEN NEW.amount ELSE 0 END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END
+    ''',
+)
+
+# 每日汇总表：触发器随明细写入同步维护，面板、导出和趋势图只读汇总行
+# category 以空字符串代替 NULL，保证主键唯一
+ROLLUP_TABLES = (
+    '''
+    CREATE TABLE IF NOT EXISTS daily_finance_rollup (
+        day TEXT NOT NULL,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL DEFAULT '',
+        amount_total DECIMAL NOT NULL DEFAULT 0,
+        record_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, type, category)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_task_rollup (
+        day TEXT PRIMARY KEY,
+        tasks_completed INTEGER NOT NULL DEFAULT 0,
+        spirit_change INTEGER NOT NULL DEFAULT 0,
+        blood_change INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+)
+
+ROLLUP_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_finance_rollup_insert
+    AFTER INSERT ON finance_records
+    BEGIN
+        INSERT INTO daily_finance_rollup (day, type, category, amount_total, record_count)
+        VALUES (DATE(NEW.created_at), NEW.type, COALESCE(NEW.category, ''), NEW.amount, 1)
+        ON CONFLICT (day, type, category) DO UPDATE SET
+            amount_total = amount_total + excluded.amount_total,
+            record_count = record_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_finance_rollup_delete
+    AFTER DELETE ON finance_records
+    BEGIN
+        UPDATE daily_finance_rollup SET
+            amount_total = amount_total - OLD.amount,
+            record_count = record_count - 1
+        WHERE day = DATE(OLD.created_at) AND type = OLD.type AND category = COALESCE(OLD.category, '');
+        DELETE FROM daily_finance_rollup
+        WHERE day = DATE(OLD.created_at) AND type = OLD.type AND category = COALESCE(OLD.category, '')
+          AND record_count <= 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_finance_rollup_update
+    AFTER UPDATE OF type, amount, category, created_at ON finance_records
+    BEGIN
+        UPDATE daily_finance_rollup SET
+            amount_total = amount_total - OLD.amount,
+            record_count = record_count - 1
+        WHERE day = DATE(OLD.created_at) AND type = OLD.type AND category = COALESCE(OLD.category, '');
+        DELETE FROM daily_finance_rollup
+        WHERE day = DATE(OLD.created_at) AND type = OLD.type AND category = COALESCE(OLD.category, '')
+          AND record_count <= 0;
+        INSERT INTO daily_finance_rollup (day, type, category, amount_total, record_count)
+        VALUES (DATE(NEW.created_at), NEW.type, COALESCE(NEW.category, ''), NEW.amount, 1)
+        ON CONFLICT (day, type, category) DO UPDATE SET
+            amount_total = amount_total + excluded.amount_total,
+            record_count = record_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_task_rollup_insert
+    AFTER INSERT ON task_records
+    BEGIN
+        INSERT INTO daily_task_rollup (day, tasks_completed, spirit_change, blood_change)
+        VALUES (DATE(NEW.completed_at), 1, COALESCE(NEW.spirit_change, 0), COALESCE(NEW.blood_change, 0))
+        ON CONFLICT (day) DO UPDATE SET
+            tasks_completed = tasks_completed + 1,
+            spirit_change = spirit_change + excluded.spirit_change,
+            blood_change = blood_change + excluded.blood_change;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_task_rollup_delete
+    AFTER DELETE ON task_records
+    BEGIN
+        UPDATE daily_task_rollup SET
+            tasks_completed = tasks_completed - 1,
+            spirit_change = spirit_change - COALESCE(OLD.spirit_change, 0),
+            blood_change = blood_change - COALESCE(OLD.blood_change, 0)
+        WHERE day = DATE(OLD.completed_at);
+        DELETE FROM daily_task_rollup
+        WHERE day = DATE(OLD.completed_at) AND tasks_completed <= 0;
+    END
+    ''',
+)
+
+# 批量导入时暂停的逐行插入触发器，导入结束后一次性重建账本与汇总再恢复
+FINANCE_INSERT_TRIGGERS = {
+    'trg_finance_balance_insert': LEDGER_DEFINITIONS[0],
+    'trg_finance_rollup_insert': ROLLUP_TRIGGERS[0],
+}
+
+# 按明细全量重建每日汇总（回填与校验共用）
+ROLLUP_BACKFILL = (
+    'DELETE FROM daily_finance_rollup',
+    '''
+    INSERT INTO daily_finance_rollup (day, type, category, amount_total, record_count)
+    SELECT DATE(created_at), type, COALESCE(category, ''), SUM(amount), COUNT(*)
+    FROM finance_records
+    GROUP BY DATE(created_at), type, COALESCE(category, '')
+    ''',
+    'DELETE FROM daily_task_rollup',
+    '''
+    INSERT INTO daily_task_rollup (day, tasks_completed, spirit_change, blood_change)
+    SELECT DATE(completed_at), COUNT(*), COALESCE(SUM(spirit_change), 0), COALESCE(SUM(blood_change), 0)
+    FROM task_records
+    GROUP BY DATE(completed_at)
+    ''',
+)
+
+# 从历史记录重新汇总收支（账本初始化与校验共用）
+FINANCE_TOTALS_SQL = '''
+    SELECT
+        COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+        COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0),
+        COUNT(*)
+    FROM finance_records
+'''
+
+
+def _create_base_schema(cursor):
+    """创建基础表结构"""
+    # 用户配置表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_config (
+            id INTEGER PRIMARY KEY,
+            birth_year INTEGER NOT NULL,
+            initial_blood INTEGER NOT NULL,
+            current_blood INTEGER NOT NULL,
+            current_spirit INTEGER DEFAULT 0,
+            current_money INTEGER DEFAULT 0,
+            target_money INTEGER DEFAULT 5000000,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 任务表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            spirit_effect INTEGER DEFAULT 0,
+            blood_effect INTEGER DEFAULT 0,
+            frequency TEXT DEFAULT 'daily',
+            status INTEGER DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 任务记录表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            completed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            spirit_change INTEGER,
+            blood_change INTEGER,
+            FOREIGN KEY (task_id) REFERENCES tasks(id)
+        )
+    ''')
+
+    # 财务记录表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS finance_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            amount DECIMAL NOT NULL,
+            category TEXT,
+            description TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 技能进度表（已废弃，使用新的境界表）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS skill_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            skill_name TEXT NOT NULL,
+            parent_id INTEGER,
+            total_nodes INTEGER DEFAULT 0,
+            completed_nodes INTEGER DEFAULT 0,
+            realm_level TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 境界表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS realms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            order_index INTEGER NOT NULL,
+            completed BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 功法/秘术/副本表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS skills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            realm_id INTEGER,
+            skill_type TEXT NOT NULL CHECK(skill_type IN ('gongfa', 'secret_art', 'fuben')),
+            nodes_json TEXT NOT NULL,
+            completed_json TEXT DEFAULT '[]',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (realm_id) REFERENCES realms(id)
+        )
+    ''')
+
+    # 境界系统配置表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jingjie_config (
+            id INTEGER PRIMARY KEY,
+            current_realm_index INTEGER DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 负债表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS debts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            monthly_payment DECIMAL NOT NULL,
+            remaining_months INTEGER NOT NULL,
+            total_amount DECIMAL NOT NULL,
+            description TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status INTEGER DEFAULT 1
+        )
+    ''')
+
+    # 资产表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            monthly_income DECIMAL NOT NULL,
+            duration_months INTEGER NOT NULL,
+            total_value DECIMAL NOT NULL,
+            description TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status INTEGER DEFAULT 1
+        )
+    ''')
+
+    # 固定收支项表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fixed_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL CHECK(type IN ('income', 'expense')),
+            amount DECIMAL NOT NULL,
+            description TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status INTEGER DEFAULT 1
+        )
+    ''')
+
+    # 统御系统 - 家族成员表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS family_members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            birthday TEXT NOT NULL,
+            phone TEXT,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 统御系统 - 家族事件表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS family_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER NOT NULL,
+            event_name TEXT NOT NULL,
+            event_date TEXT NOT NULL,
+            completed BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (member_id) REFERENCES family_members(id)
+        )
+    ''')
+
+    # 统御系统 - 朋友表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS friends (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            personality TEXT,
+            hobbies TEXT,
+            notes TEXT,
+            last_contact TEXT,
+            is_close_friend BOOLEAN DEFAULT FALSE,
+            ai_analysis TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 统御系统 - 朋友关系表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS friend_relations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            friend_id INTEGER NOT NULL,
+            related_friend_id INTEGER NOT NULL,
+            relation_type TEXT DEFAULT 'acquaintance',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (friend_id) REFERENCES friends(id),
+            FOREIGN KEY (related_friend_id) REFERENCES friends(id)
+        )
+    ''')
+
+    # 统御系统 - 朋友交互任务表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS friend_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            friend_id INTEGER NOT NULL,
+            task_name TEXT NOT NULL,
+            reward_type TEXT NOT NULL CHECK(reward_type IN ('spirit', 'blood', 'money')),
+            reward_amount INTEGER NOT NULL,
+            completed BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (friend_id) REFERENCES friends(id)
+        )
+    ''')
+
+    # 统御系统 - 互动记录表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS interaction_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            friend_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            interaction_date TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (friend_id) REFERENCES friends(id)
+        )
+    ''')
+
+    # 励志库表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lizhi_quotes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            author TEXT,
+            category TEXT DEFAULT 'poetry',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            status INTEGER DEFAULT 1
+        )
+    ''')
+
+
+def _seed_default_data(cursor):
+    """初始化默认数据（仅在对应表为空时写入）"""
+    # 初始化用户数据
+    cursor.execute("SELECT COUNT(*) FROM user_config")
+    if cursor.fetchone()[0] == 0:
+        birth_year = 1998
+        age = datetime.now().year - birth_year
+        initial_blood = (80 - age) * 365 * 24 * 60
+
+        cursor.execute('''
+            INSERT INTO user_config 
+            (birth_year, initial_blood, current_blood, current_spirit, current_money, target_money)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (birth_year, initial_blood, initial_blood, 0, 125840, 5000000))
+
+    # 初始化默认任务
+    cursor.execute("SELECT COUNT(*) FROM tasks")
+    if cursor.fetchone()[0] == 0:
+        default_tasks = [
+            ("早起", "positive", 1, 0, "daily"),
+            ("晨跑30分钟", "positive", 1, 1, "daily"),
+            ("八部金刚功", "positive", 1, 2, "daily"),
+            ("冥想15分钟", "positive", 2, 0, "daily"),
+            ("阅读1小时", "positive", 1, 0, "daily"),
+            ("控制情绪", "positive", 1, 0, "daily"),
+            ("打扫房间", "positive", 1, 0, "daily"),
+            ("熬夜", "negative", -3, -1, "daily"),
+            ("刷自媒体", "negative", -3, 0, "daily"),
+            ("打游戏", "negative", -3, 0, "daily"),
+            ("发脾气", "negative", -3, -3, "daily"),
+            ("晚起", "negative", -2, 0, "daily"),
+        ]
+
+        for task in default_tasks:
+            cursor.execute('''
+                INSERT INTO tasks (name, category, spirit_effect, blood_effect, frequency)
+                VALUES (?, ?, ?, ?, ?)
+            ''', task)
+
+    # 初始化默认固定收支项
+    cursor.execute("SELECT COUNT(*) FROM fixed_items")
+    if cursor.fetchone()[0] == 0:
+        default_fixed_items = [
+            ("工资", "income", 15000, "固定工作收入"),
+            ("副业", "income", 2000, "额外收入来源"),
+            ("房租", "expense", 3000, "每月房租支出"),
+            ("房贷", "expense", 5000, "每月房贷还款"),
+            ("生活费", "expense", 2000, "日常生活费用"),
+        ]
+
+        for item in default_fixed_items:
+            cursor.execute('''
+                INSERT INTO fixed_items (name, type, amount, description)
+                VALUES (?, ?, ?, ?)
+            ''', item)
+
+    # 初始化境界系统配置
+    cursor.execute("SELECT COUNT(*) FROM jingjie_config")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO jingjie_config (id, current_realm_index)
+            VALUES (1, 0)
+        ''')
+
+    # 初始化默认境界
+    cursor.execute("SELECT COUNT(*) FROM realms")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO realms (name, order_index, completed)
+            VALUES (?, ?, ?)
+        ''', ("练气期", 0, False))
+
+    # 初始化默认家族成员
+    cursor.execute("SELECT COUNT(*) FROM family_members")
+    if cursor.fetchone()[0] == 0:
+        # 添加默认家族成员
+        cursor.execute('''
+            INSERT INTO family_members (name, birthday, phone, notes)
+            VALUES (?, ?, ?, ?)
+        ''', ("父亲", "1970-03-15", "138****1234", "喜欢钓鱼，注意血压"))
+
+        father_id = cursor.lastrowid
+
+        cursor.execute('''
+            INSERT INTO family_members (name, birthday, phone, notes)
+            VALUES (?, ?, ?, ?)
+        ''', ("母亲", "1972-08-20", "139****5678", "喜欢跳舞，胃不好"))
+
+        mother_id = cursor.lastrowid
+
+        # 添加默认家族事件
+        cursor.execute('''
+            INSERT INTO family_events (member_id, event_name, event_date, completed)
+            VALUES (?, ?, ?, ?)
+        ''', (father_id, "生日", "2024-03-15", True))
+
+        cursor.execute('''
+            INSERT INTO family_events (member_id, event_name, event_date, completed)
+            VALUES (?, ?, ?, ?)
+        ''', (father_id, "父亲节", "2024-06-16", False))
+
+        cursor.execute('''
+            INSERT INTO family_events (member_id, event_name, event_date, completed)
+            VALUES (?, ?, ?, ?)
+        ''', (mother_id, "母亲节", "2024-05-12", False))
+
+        cursor.execute('''
+            INSERT INTO family_events (member_id, event_name, event_date, completed)
+            VALUES (?, ?, ?, ?)
+        ''', (mother_id, "生日", "2024-08-20", False))
+
+    # 初始化默认朋友
+    cursor.execute("SELECT COUNT(*) FROM friends")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO friends (name, category, personality, hobbies, notes, last_contact)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ("张三", "挚友", "外向开朗", "篮球、游戏", "大学室友，在深圳工作", "2024-12-01"))
+
+        cursor.execute('''
+            INSERT INTO friends (name, category, personality, hobbies, notes, last_contact)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ("李四", "同事", "稳重内敛", "读书、电影", "技术大牛，可以多交流", "2024-12-15"))
+
+    # 初始化默认励志语录
+    cursor.execute("SELECT COUNT(*) FROM lizhi_quotes")
+    if cursor.fetchone()[0] == 0:
+        default_quotes = [
+            ("大鹏一日同风起，扶摇直上九万里", "李白", "poetry"),
+            ("天行健，君子以自强不息", "周易", "poetry"),
+            ("不经一番寒彻骨，怎得梅花扑鼻香", "黄蘗禅师", "poetry"),
+            ("长风破浪会有时，直挂云帆济沧海", "李白", "poetry"),
+            ("千磨万击还坚劲，任尔东西南北风", "郑板桥", "poetry"),
+            ("路漫漫其修远兮，吾将上下而求索", "屈原", "poetry"),
+            ("宝剑锋从磨砺出，梅花香自苦寒来", "古诗", "poetry"),
+            ("莫愁前路无知己，天下谁人不识君", "高适", "poetry"),
+            ("会当凌绝顶，一览众山小", "杜甫", "poetry"),
+            ("天生我材必有用，千金散尽还复来", "李白", "poetry"),
+        ]
+
+        for content, author, category in default_quotes:
+            cursor.execute('''
+                INSERT INTO lizhi_quotes (content, author, category)
+                VALUES (?, ?, ?)
+            ''', (content, author, category))
+
+
+def _v1_base_schema(conn):
+    cursor = conn.cursor()
+    _create_base_schema(cursor)
+    _seed_default_data(cursor)
+
+
+SKILLS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        realm_id INTEGER,
+        skill_type TEXT NOT NULL CHECK(skill_type IN ('gongfa', 'secret_art', 'fuben')),
+        nodes_json TEXT NOT NULL,
+        completed_json TEXT DEFAULT '[]',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (realm_id) REFERENCES realms(id)
+    )
+'''
+SKILLS_COLUMNS = 'id, name, realm_id, skill_type, nodes_json, completed_json, created_at'
+
+
+def _skills_needs_fuben(conn) -> bool:
+    """旧版 skills 表的 CHECK 约束不含 'fuben'，需要重建"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'skills'").fetchone()
+    return bool(row) and "'fuben'" not in row[0]
+
+
+def _v2_prepare_skills_fuben(pool):
+    with pool.reader() as conn:
+        needs_rebuild = _skills_needs_fuben(conn)
+    if needs_rebuild:
+        copy_table_in_batches(pool, 'skills', SKILLS_TABLE_SQL, SKILLS_COLUMNS)
+
+
+def _v2_skills_fuben(conn):
+    if _skills_needs_fuben(conn):
+        swap_rebuilt_table(conn, 'skills', SKILLS_TABLE_SQL, SKILLS_COLUMNS)
+
+
+def _v3_indexes(conn):
+    for index_sql in INDEX_DEFINITIONS:
+        conn.execute(index_sql)
+
+
+def _v4_finance_ledger(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS finance_balance (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_income DECIMAL NOT NULL DEFAULT 0,
+            total_expense DECIMAL NOT NULL DEFAULT 0,
+            record_count INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # 按历史记录建立账本，之后由触发器维护
+    conn.execute(f'''
+        INSERT OR IGNORE INTO finance_balance (id, total_income, total_expense, record_count)
+        SELECT 1, totals.* FROM ({FINANCE_TOTALS_SQL}) AS totals
+    ''')
+    for ledger_sql in LEDGER_DEFINITIONS:
+        conn.execute(ledger_sql)
+
+
+def _v5_daily_rollups(conn):
+    for rollup_sql in ROLLUP_TABLES + ROLLUP_TRIGGERS:
+        conn.execute(rollup_sql)
+    # 从明细回填
+    for backfill_sql in ROLLUP_BACKFILL:
+        conn.execute(backfill_sql)
+
+
+# 境界节点明细：每个功法/秘术/副本节点一行，勾选节点只更新一行，
+# 取代 skills.nodes_json / completed_json（旧列保留，仅供迁移读取）
+SKILL_NODES_DEFINITIONS = (
+    '''
+    CREATE TABLE IF NOT EXISTS skill_nodes (
+        skill_id INTEGER NOT NULL,
+        ordinal INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        completed_at DATETIME,
+        PRIMARY KEY (skill_id, ordinal),
+        FOREIGN KEY (skill_id) REFERENCES skills(id)
+    ) WITHOUT ROWID
+    ''',
+    # 删除技能时一并删除其节点
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_skills_delete_nodes
+    AFTER DELETE ON skills
+    BEGIN
+        DELETE FROM skill_nodes WHERE skill_id = OLD.id;
+    END
+    ''',
+)
+
+
+def skill_node_rows(skill_id: int, nodes: list, completed: list, completed_at: str = None) -> list:
+    """把一个技能的节点列表展开为 skill_nodes 行，completed 中的节点记为已完成
+
+    同名节点按出现顺序依次匹配；completed_at 为空时使用当前时间。
+    """
+    completed_at = completed_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    pending = list(completed)
+    rows = []
+    for ordinal, node in enumerate(nodes):
+        done = None
+        if node in pending:
+            pending.remove(node)
+            done = completed_at
+        rows.append((skill_id, ordinal, node, done))
+    return rows
+
+
+def _v6_skill_nodes(conn):
+    for definition_sql in SKILL_NODES_DEFINITIONS:
+        conn.execute(definition_sql)
+    # 从 JSON 列展开，原完成时间未记录，以技能创建时间代替
+    rows = []
+    for skill_id, nodes_json, completed_json, created_at in conn.execute(
+            'SELECT id, nodes_json, completed_json, created_at FROM skills'):
+        try:
+            nodes = json.loads(nodes_json or '[]')
+            completed = json.loads(completed_json or '[]')
+        except (TypeError, ValueError):
+            print(f"技能 {skill_id} 的节点数据无法解析，已跳过")
+            continue
+        rows.extend(skill_node_rows(skill_id, nodes, completed, created_at))
+    conn.executemany(
+        'INSERT OR IGNORE INTO skill_nodes (skill_id, ordinal, name, completed_at) VALUES (?, ?, ?, ?)',
+        rows
+    )
+
+
+# 列表分页索引：按 (排序键, id) 倒序做键集分页，翻到任意一页都只扫描一页的行
+PAGINATION_INDEX_DEFINITIONS = (
+    'CREATE INDEX IF NOT EXISTS idx_finance_records_created_id ON finance_records(created_at, id)',
+    'CREATE INDEX IF NOT EXISTS idx_lizhi_quotes_status_created ON lizhi_quotes(status, created_at, id)',
+    # 互动记录按 interaction_date 排序，沿用 idx_interaction_records_friend（隐含 rowid 即 id）
+)
+
+
+def _v7_pagination_indexes(conn):
+    for index_sql in PAGINATION_INDEX_DEFINITIONS:
+        conn.execute(index_sql)
+
+
+# 全文索引：body 为结果中显示的文本，tokens 为 search_tokens 生成的词元（见 database/search.py），
+# prefix='1' 为单字前缀查询建立前缀索引
+SEARCH_INDEX_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        body UNINDEXED,
+        tokens,
+        tokenize = 'unicode61',
+        prefix = '1'
+    )
+'''
+
+# 以表为来源的索引内容：来源 -> (表, 显示文本, 分词文本, 入索引条件)，{r} 为 NEW/OLD 或表名
+SEARCH_TABLE_SOURCES = {
+    'quote': ('lizhi_quotes', "{r}.content",
+              "{r}.content || ' ' || COALESCE({r}.author, '')", "{r}.status = 1"),
+    'friend': ('friends', "{r}.name",
+               "{r}.name || ' ' || COALESCE({r}.personality, '') || ' ' || "
+               "COALESCE({r}.hobbies, '') || ' ' || COALESCE({r}.notes, '')", "1"),
+    'interaction': ('interaction_records', "{r}.content", "{r}.content", "1"),
+    'finance': ('finance_records', "{r}.description", "{r}.description", "{r}.description <> ''"),
+}
+
+# 索引内容（显示文本、分词文本、入索引条件）用到的列：只有这些列变化时才重新分词，
+# 其他列的更新（如 is_close_friend、last_contact、金额）不触发 search_tokens
+SEARCH_INDEXED_COLUMNS = {
+    'quote': ('content', 'author', 'status'),
+    'friend': ('name', 'personality', 'hobbies', 'notes'),
+    'interaction': ('content',),
+    'finance': ('description',),
+}
+
+
+def _search_insert_sql(source: str, row: str, from_table: bool = False) -> str:
+    """把一行（NEW 或整张表）写入全文索引的语句"""
+    table, body, tokens, condition = SEARCH_TABLE_SOURCES[source]
+    base = SEARCH_SOURCES[source] << SOURCE_SHIFT
+    return (
+        f"INSERT INTO search_index (rowid, body, tokens) "
+        f"SELECT {base} + {row}.id, {body.format(r=row)}, search_tokens({tokens.format(r=row)}) "
+        f"{'FROM ' + table + ' ' if from_table else ''}WHERE {condition.format(r=row)}"
+    )
+
+
+def _search_sync_triggers(source: str) -> tuple:
+    """业务表增删改时同步全文索引的触发器"""
+    table = SEARCH_TABLE_SOURCES[source][0]
+    delete_sql = f"DELETE FROM search_index WHERE rowid = {SEARCH_SOURCES[source] << SOURCE_SHIFT} + OLD.id"
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table} "
+        f"BEGIN {_search_insert_sql(source, 'NEW')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update "
+        f"AFTER UPDATE OF {', '.join(SEARCH_INDEXED_COLUMNS[source])} ON {table} "
+        f"BEGIN {delete_sql}; {_search_insert_sql(source, 'NEW')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table} "
+        f"BEGIN {delete_sql}; END",
+    )
+
+
+SEARCH_TRIGGERS = tuple(sql for source in SEARCH_TABLE_SOURCES for sql in _search_sync_triggers(source))
+
+# 批量导入财务记录时同样暂停全文索引的插入触发器（逐行调用 search_tokens），
+# 导入后用 FINANCE_SEARCH_BACKFILL 一条语句为 id 大于参数的新记录建索引
+FINANCE_INSERT_TRIGGERS['trg_finance_records_search_insert'] = _search_sync_triggers('finance')[0]
+FINANCE_SEARCH_BACKFILL = _search_insert_sql('finance', 'finance_records', from_table=True) + " AND finance_records.id > ?"
+
+
+def _v8_search_index(conn):
+    conn.execute(SEARCH_INDEX_SQL)
+    # 从现有数据建立索引（诗句库不在数据库中，由 PoetrySystem 加载时同步）
+    for source in SEARCH_TABLE_SOURCES:
+        table = SEARCH_TABLE_SOURCES[source][0]
+        conn.execute(_search_insert_sql(source, table, from_table=True))
+    for trigger_sql in SEARCH_TRIGGERS:
+        conn.execute(trigger_sql)
+
+
+# 寿元基准时间至今经过的整分钟数（UTC，时钟回拨时按0计），与 derive_blood 的算法一致
+BLOOD_ELAPSED_MINUTES_SQL = (
+    "MAX(0, CAST((julianday('now') - julianday(COALESCE(blood_updated_at, 'now'))) * 1440 AS INTEGER))"
+)
+
+
+def _v9_blood_baseline(conn):
+    # current_blood 改为基准值，当前寿元 = 基准值 - 自 blood_updated_at 起经过的分钟数
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(user_config)')}
+    if 'blood_updated_at' not in columns:
+        conn.execute('ALTER TABLE user_config ADD COLUMN blood_updated_at DATETIME')
+    conn.execute("UPDATE user_config SET blood_updated_at = datetime('now') WHERE blood_updated_at IS NULL")
+
+
+# 状态时间序列：每个精度层的每个时间桶一行（见 database/timeseries.py），
+# spirit / blood 为空的天层行是由收支汇总回填的历史余额
+STATE_SERIES_SQL = '''
+    CREATE TABLE IF NOT EXISTS state_series (
+        tier INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        spirit INTEGER,
+        blood INTEGER,
+        balance DECIMAL,
+        samples INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (tier, bucket)
+    ) WITHOUT ROWID
+'''
+
+
+def _snapshot_sql(tier: str) -> str:
+    """把当前心境、寿元（推算值）、余额写入某一精度层当前时间桶的语句，同一时间桶内覆盖为最新状态"""
+    code, bucket_format, _ = SERIES_TIERS[tier]
+    return (
+        f"INSERT INTO state_series (tier, bucket, spirit, blood, balance, samples) "
+        f"SELECT {code}, strftime('{bucket_format}', 'now'), current_spirit, "
+        f"MAX(0, current_blood - {BLOOD_ELAPSED_MINUTES_SQL} * {GameConfig.BLOOD_DECREASE_PER_MINUTE}), "
+        f"COALESCE(current_money, 0) + COALESCE(total_income, 0) - COALESCE(total_expense, 0), 1 "
+        f"FROM user_config LEFT JOIN finance_balance ON finance_balance.id = 1 "
+        f"WHERE user_config.id = 1 "
+        f"ON CONFLICT (tier, bucket) DO UPDATE SET "
+        f"spirit = excluded.spirit, blood = excluded.blood, balance = excluded.balance, samples = samples + 1"
+    )
+
+
+def _series_prune_sql(tier: str) -> str:
+    """删除某一精度层超出保留时长的时间桶"""
+    code, bucket_format, retention = SERIES_TIERS[tier]
+    return f"DELETE FROM state_series WHERE tier = {code} AND bucket < strftime('{bucket_format}', 'now', '{retention}')"
+
+
+STATE_SNAPSHOT_STATEMENTS = tuple(
+    [_snapshot_sql(tier) for tier in SERIES_TIERS]
+    + [_series_prune_sql(tier) for tier, (_, _, retention) in SERIES_TIERS.items() if retention]
+)
+STATE_SNAPSHOT_SQL = '; '.join(STATE_SNAPSHOT_STATEMENTS)
+
+# 心境、寿元、初始余额变化或账本变化时记录快照；账本整行重建（INSERT OR REPLACE）走插入触发器
+STATE_SERIES_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS trg_user_config_series "
+    f"AFTER UPDATE OF current_spirit, current_blood, current_money ON user_config "
+    f"BEGIN {STATE_SNAPSHOT_SQL}; END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_finance_balance_series_update AFTER UPDATE ON finance_balance "
+    f"BEGIN {STATE_SNAPSHOT_SQL}; END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_finance_balance_series_insert AFTER INSERT ON finance_balance "
+    f"BEGIN {STATE_SNAPSHOT_SQL}; END",
+)
+
+# 由每日收支汇总回填今日之前每天收盘时的余额（心境、寿元没有历史记录，留空）
+STATE_SERIES_BACKFILL = f'''
+    INSERT OR IGNORE INTO state_series (tier, bucket, balance, samples)
+    SELECT {SERIES_TIERS['daily'][0]}, day,
+           (SELECT COALESCE(current_money, 0) FROM user_config WHERE id = 1) + SUM(net) OVER (ORDER BY day),
+           0
+    FROM (
+        SELECT day, SUM(CASE WHEN type = 'income' THEN amount_total ELSE -amount_total END) AS net
+        FROM daily_finance_rollup
+        GROUP BY day
+    )
+    WHERE day < date('now')
+'''
+
+
+def _v10_state_series(conn):
+    conn.execute(STATE_SERIES_SQL)
+    conn.execute(STATE_SERIES_BACKFILL)
+    for trigger_sql in STATE_SERIES_TRIGGERS:
+        conn.execute(trigger_sql)
+    # 以当前状态作为第一个快照
+    for snapshot_sql in STATE_SNAPSHOT_STATEMENTS:
+        conn.execute(snapshot_sql)
+
+
+# 变更日志（CDC）：业务表的每次增删改由触发器追加一行，version 单调递增且不复用，
+# 增量消费者（备份、导出、同步）记住读到的 version，下次只读取之后的变化。
+# 派生表（汇总、账本、全文索引、时间序列）可由业务表重建，不记录
+CHANGELOG_SQL = '''
+    CREATE TABLE IF NOT EXISTS changelog (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# 记录变化的业务表 -> 行号列；skill_nodes 没有 rowid，以 skill_id 为行号，
+# 任何节点变化都记为 U（消费者重新读取该技能的全部节点）
+CHANGELOG_TABLES = {
+    'user_config': 'id',
+    'tasks': 'id',
+    'task_records': 'id',
+    'finance_records': 'id',
+    'fixed_items': 'id',
+    'debts': 'id',
+    'assets': 'id',
+    'realms': 'id',
+    'skills': 'id',
+    'skill_progress': 'id',
+    'skill_nodes': 'skill_id',
+    'jingjie_config': 'id',
+    'lizhi_quotes': 'id',
+    'family_members': 'id',
+    'family_events': 'id',
+    'friends': 'id',
+    'friend_relations': 'id',
+    'friend_tasks': 'id',
+    'interaction_records': 'id',
+}
+
+
+def _changelog_triggers(table: str) -> tuple:
+    """业务表增删改时追加变更日志的触发器"""
+    key = CHANGELOG_TABLES[table]
+    ops = {'insert': 'I', 'update': 'U', 'delete': 'D'}
+    if key != 'id':
+        ops = dict.fromkeys(ops, 'U')
+    return tuple(
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_changelog_{event} AFTER {event.upper()} ON {table} "
+        f"BEGIN INSERT INTO changelog (table_name, row_id, op) "
+        f"VALUES ('{table}', {'OLD' if event == 'delete' else 'NEW'}.{key}, '{op}'); END"
+        for event, op in ops.items()
+    )
+
+
+CHANGELOG_TRIGGERS = {
+    f"trg_{table}_changelog_{event}": sql
+    for table in CHANGELOG_TABLES
+    for event, sql in zip(('insert', 'update', 'delete'), _changelog_triggers(table))
+}
+
+
+# 批量导入财务记录时同样暂停变更日志的插入触发器，导入后按新 id 一次性追加
+FINANCE_INSERT_TRIGGERS['trg_finance_records_changelog_insert'] = \
+    CHANGELOG_TRIGGERS['trg_finance_records_changelog_insert']
+
+
+def _v11_changelog(conn):
+    conn.execute(CHANGELOG_SQL)
+    # 现有数据记为插入，从 version 0 读取变更日志即可得到全部数据
+    for table, key in CHANGELOG_TABLES.items():
+        op = 'I' if key == 'id' else 'U'
+        conn.execute(f'''
+            INSERT INTO changelog (table_name, row_id, op)
+            SELECT DISTINCT '{table}', {key}, '{op}' FROM {table} ORDER BY {key}
+        ''')
+    for trigger_sql in CHANGELOG_TRIGGERS.values():
+        conn.execute(trigger_sql)
+
+
+# 离线同步（见 database/sync.py）：本机标识与心境寿元的累计基准、每个对端的同步进度、
+# 对端行的全局键 (来源设备, 来源 id) 到本地 id 的映射、导入对端同步包时写入的日志区间
+SYNC_STATE_SQL = (
+    '''
+    CREATE TABLE IF NOT EXISTS sync_device (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        device_id TEXT NOT NULL,
+        base_spirit INTEGER NOT NULL DEFAULT 0,
+        base_blood INTEGER NOT NULL DEFAULT 0,
+        imported_spirit INTEGER NOT NULL DEFAULT 0,
+        imported_blood INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_peers (
+        peer_id TEXT PRIMARY KEY,
+        acked_version INTEGER NOT NULL DEFAULT 0,
+        imported_version INTEGER NOT NULL DEFAULT 0,
+        peer_spirit INTEGER NOT NULL DEFAULT 0,
+        peer_blood INTEGER NOT NULL DEFAULT 0,
+        synced_at DATETIME
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_rows (
+        table_name TEXT NOT NULL,
+        origin TEXT NOT NULL,
+        origin_id INTEGER NOT NULL,
+        local_id INTEGER NOT NULL,
+        PRIMARY KEY (table_name, origin, origin_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_sync_rows_local ON sync_rows(table_name, local_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_echoes (
+        peer_id TEXT NOT NULL,
+        first_version INTEGER NOT NULL,
+        last_version INTEGER NOT NULL,
+        PRIMARY KEY (peer_id, first_version)
+    ) WITHOUT ROWID
+    ''',
+)
+
+# 寿元的累计量：基准值加上基准时间的整分钟数。结算经过的时间时两者此增彼减，
+# 只有完成任务等真实变化会改变它，可以像心境一样按差值在设备间相加
+BLOOD_TOTAL_SQL = (
+    f"(current_blood + {GameConfig.BLOOD_DECREASE_PER_MINUTE} * "
+    f"(CAST(strftime('%s', COALESCE(blood_updated_at, 'now')) AS INTEGER) / 60))"
+)
+
+
+def _v12_sync_state(conn):
+    for sql in SYNC_STATE_SQL:
+        conn.execute(sql)
+    conn.execute(f'''
+        INSERT OR IGNORE INTO sync_device (id, device_id, base_spirit, base_blood)
+        SELECT 1, lower(hex(randomblob(8))),
+               COALESCE((SELECT current_spirit FROM user_config WHERE id = 1), 0),
+               COALESCE((SELECT {BLOOD_TOTAL_SQL} FROM user_config WHERE id = 1), 0)
+    ''')
+
+
+def _v13_search_update_columns(conn):
+    # v8 建立的更新触发器对任意列的更新都重新分词，按索引列重建
+    for source in SEARCH_TABLE_SOURCES:
+        conn.execute(f'DROP TRIGGER IF EXISTS trg_{SEARCH_TABLE_SOURCES[source][0]}_search_update')
+        conn.execute(_search_sync_triggers(source)[1])
+
+
+# =================== 迁移引擎 ===================
+
+@dataclass
+class Migration:
+    """一个结构迁移步骤"""
+    version: int
+    description: str
+    apply: Callable                    # apply(conn)，与 user_version 更新在同一事务内执行
+    prepare: Optional[Callable] = None  # prepare(pool)，事务外可重入的准备工作（如分批复制大表）
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "基础表结构与默认数据", _v1_base_schema),
+    Migration(2, "skills 表支持副本类型", _v2_skills_fuben, prepare=_v2_prepare_skills_fuben),
+    Migration(3, "历史记录与外键二级索引", _v3_indexes),
+    Migration(4, "灵石余额账本", _v4_finance_ledger),
+    Migration(5, "每日收支与修炼汇总", _v5_daily_rollups),
+    Migration(6, "境界节点明细表", _v6_skill_nodes),
+    Migration(7, "列表分页索引", _v7_pagination_indexes),
+    Migration(8, "全文搜索索引", _v8_search_index),
+    Migration(9, "寿元改为按时间推算", _v9_blood_baseline),
+    Migration(10, "心境寿元余额时间序列", _v10_state_series),
+    Migration(11, "变更日志", _v11_changelog),
+    Migration(12, "离线同步状态", _v12_sync_state),
+    Migration(13, "全文索引只在文本列更新时同步", _v13_search_update_columns),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# 分批复制大表时每个事务复制的行数
+REBUILD_BATCH_SIZE = 2000
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def copy_table_in_batches(pool: ConnectionPool, table: str, create_sql: str, columns: str,
+                          batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """把 table 的数据按主键顺序分批复制到 {table}_rebuild
+
+    每批一个短事务，期间其他写入不会被长时间阻塞；中断后重新执行会从已复制的最大 id 继续。
+    create_sql 中以 {table} 占位新表名。返回本次复制的行数。
+    """
+    new_table = f'{table}_rebuild'
+    with pool.writer() as conn:
+        conn.execute(create_sql.format(table=new_table))
+
+    copied = 0
+    while True:
+        with pool.writer() as conn:
+            cursor = conn.execute(f'''
+                INSERT INTO {new_table} ({columns})
+                SELECT {columns} FROM {table}
+                WHERE id > (SELECT COALESCE(MAX(id), 0) FROM {new_table})
+                ORDER BY id
+                LIMIT ?
+            ''', (batch_size,))
+            copied += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return copied
+
+
+def swap_rebuilt_table(conn, table: str, create_sql: str, columns: str):
+    """在迁移事务内用分批复制好的 {table}_rebuild 替换原表
+
+    先补齐准备阶段之后新增的行；没有准备阶段时在此一次性复制。
+    """
+    new_table = f'{table}_rebuild'
+    conn.execute(create_sql.format(table=new_table))
+    conn.execute(f'''
+        INSERT INTO {new_table} ({columns})
+        SELECT {columns} FROM {table}
+        WHERE id > (SELECT COALESCE(MAX(id), 0) FROM {new_table})
+    ''')
+    conn.execute(f'DROP TABLE {table}')
+    conn.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+
+
+def migrate(pool: ConnectionPool, target_version: int = SCHEMA_VERSION) -> List[int]:
+    """把数据库升级到 target_version，返回本次执行的迁移版本号
+
+    结构已是最新时只读取一次 user_version 即返回（冷启动快速路径）。
+    """
+    with pool.reader() as conn:
+        current = get_schema_version(conn)
+    if current >= target_version:
+        return []
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current or migration.version > target_version:
+            continue
+
+        if migration.prepare:
+            migration.prepare(pool)
+
+        with pool.writer() as conn:
+            # 另一个进程可能已完成该迁移
+            if get_schema_version(conn) >= migration.version:
+                continue
+            migration.apply(conn)
+            conn.execute(f'PRAGMA user_version = {migration.version}')
+
+        applied.append(migration.version)
+        print(f"数据库迁移完成: v{migration.version} {migration.description}")
+
+    if applied:
+        pool.reset_readers()
+    return applied
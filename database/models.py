@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Any, Tuple, NamedTuple
 
 @dataclass
 class Task():
@@ -19,10 +19,11 @@ class UserData:
     """用户数据模型"""
     birth_year: int
     current_spirit: int
-    current_blood: int
+    current_blood: int  # 读取时按经过的时间推算
     target_money: int
     current_money: int
     created_at: Optional[datetime] = None
+    blood_updated_at: Optional[str] = None  # 寿元基准时间（UTC）
 
 @dataclass
 class TaskRecord:
@@ -94,4 +95,58 @@ class InteractionRecord:
     friend_id: int
     content: str
     interaction_date: str
-    created_at: Optional[datetime] = None
\ No newline at end of file
+    created_at: Optional[datetime] = None
+
+class FinanceRecord(NamedTuple):
+    """财务记录（不可变元组，列表中大量出现时比 dataclass 更省内存，可在重绘间复用）"""
+    id: int
+    type: str  # income/expense
+    amount: float
+    category: Optional[str]
+    description: Optional[str]
+    created_at: str
+
+class FixedItem(NamedTuple):
+    """固定收支项"""
+    id: int
+    name: str
+    type: str  # income/expense
+    amount: float
+    description: Optional[str]
+    created_at: str
+
+class SearchResult(NamedTuple):
+    """全文搜索结果，rank 越小越相关（bm25）"""
+    source: str  # quote/poetry/friend/interaction/finance
+    ref_id: int  # 来源表中的 id（诗句为其在诗句库中的序号）
+    text: str
+    rank: float
+
+class Change(NamedTuple):
+    """变更日志中的一条变化，op 为 I（插入）/ U（更新）/ D（删除）"""
+    version: int
+    table: str
+    row_id: int
+    op: str
+    changed_at: str
+
+@dataclass
+class ChangeSet:
+    """一次增量读取的结果，version 为已读到的最后一个版本，下次读取时传入
+
+    resync 为 True 表示起始版本之前的日志已被清理，消费者需要全量重读后从 version 继续。
+    """
+    changes: List[Change]
+    version: int
+    has_more: bool = False
+    resync: bool = False
+
+@dataclass
+class Page:
+    """分页查询结果，next_cursor 为最后一条的 (排序键, id)，传给下一次查询的 before"""
+    items: List[Any]
+    next_cursor: Optional[Tuple] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
@@ -0,0 +1,180 @@
+"""
+用户档案 - 每个档案一个 SQLite 文件，服务器模式下多个浏览器会话共享档案的数据库与时钟
+
+一个家庭成员对应一个档案。默认档案使用原来的数据库文件，其余档案位于同目录的
+profiles/<档案名>.db。同一档案的所有会话共用一个 DatabaseManager（连接池、写入队列、
+查询缓存）、一个 AsyncDatabaseManager 线程池和一个时钟线程；会话只持有自己的界面状态。
+最后一个会话释放档案时关闭其数据库。
+
+    profile = profiles.acquire("mom")
+    profile.clock.subscribe(on_tick)
+    ...
+    profile.clock.unsubscribe(on_tick)
+    profiles.release(profile)
+"""
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from database.db_manager import DatabaseManager, default_db_path
+from database.async_db import AsyncDatabaseManager
+from utils.startup import startup
+from config import GameConfig
+
+
+DEFAULT_PROFILE = "default"
+PROFILE_DIR_NAME = "profiles"
+
+# 档案名同时是文件名：字母、数字、汉字、下划线和连字符
+_PROFILE_NAME = re.compile(r'[\w-]{1,32}')
+
+
+def validate_profile_name(name: str) -> str:
+    """校验档案名，返回去除首尾空白后的名称"""
+    name = (name or '').strip()
+    if not _PROFILE_NAME.fullmatch(name):
+        raise ValueError(f"无效的档案名: {name!r}")
+    return name
+
+
+class ProfileClock:
+    """档案级时钟：一个后台线程按固定间隔通知所有订阅的会话
+
+    寿元由时间推算，时钟只负责提醒界面刷新，不写数据库；
+    同一档案无论打开多少个会话都只有一个线程。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, listener: Callable[[], None]):
+        """注册回调，首次注册时启动线程；回调在时钟线程中执行"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-clock", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, listener: Callable[[], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                listeners = list(self._listeners)
+            for listener in listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    print(f"时钟回调错误: {e}")
+
+
+class Profile:
+    """一个档案的共享资源"""
+
+    def __init__(self, name: str, db_path: str):
+        self.name = name
+        with startup.phase('db_init'):
+            self.db = DatabaseManager(db_path)
+        self.adb = AsyncDatabaseManager(self.db)
+        self.clock = ProfileClock(GameConfig.BLOOD_DISPLAY_REFRESH_SECONDS)
+        self.sessions = 0
+
+    def close(self):
+        self.clock.stop()
+        self.adb.close()
+        self.db.close()
+
+
+class ProfileRegistry:
+    """档案注册表：按档案名共享 Profile，按会话计数，最后一个会话释放时关闭"""
+
+    def __init__(self, base_path: str = None):
+        # 默认档案的数据库文件，其余档案放在同目录的 profiles/ 下
+        self._base_path = base_path
+        self._profiles: Dict[str, Profile] = {}
+        self._lock = threading.Lock()
+        # 每个档案一把打开锁：同名档案只创建一次，创建期间不占用注册表锁
+        self._opening: Dict[str, threading.Lock] = {}
+
+    def db_path(self, name: str) -> str:
+        """档案对应的数据库文件路径"""
+        name = validate_profile_name(name)
+        base_path = self._base_path or default_db_path()
+        if name == DEFAULT_PROFILE:
+            return base_path
+        profile_dir = os.path.join(os.path.dirname(base_path), PROFILE_DIR_NAME)
+        os.makedirs(profile_dir, exist_ok=True)
+        return os.path.join(profile_dir, f"{name}.db")
+
+    def acquire(self, name: str = None) -> Profile:
+        """为一个会话获取档案（不存在时创建数据库），与 release 成对调用
+
+        打开数据库（连接池、迁移）在注册表锁之外进行，只持有该档案的打开锁，
+        其他档案的获取与释放不必等待；创建完成后再在注册表锁内发布。
+        """
+        name = validate_profile_name(name or DEFAULT_PROFILE)
+        with self._lock:
+            profile = self._join(name)
+            if profile is not None:
+                return profile
+            opening = self._opening.setdefault(name, threading.Lock())
+
+        with opening:
+            # 等待期间可能已由另一个会话创建
+            with self._lock:
+                profile = self._join(name)
+                if profile is not None:
+                    return profile
+            profile = Profile(name, self.db_path(name))
+            with self._lock:
+                profile.sessions += 1
+                self._profiles[name] = profile
+            return profile
+
+    def _join(self, name: str) -> Optional[Profile]:
+        """已打开的档案会话数加一并返回，未打开时返回 None，调用方需持有注册表锁"""
+        profile = self._profiles.get(name)
+        if profile is not None:
+            profile.sessions += 1
+        return profile
+
+    def release(self, profile: Profile):
+        """会话结束时释放档案，没有会话使用时关闭其数据库"""
+        with self._lock:
+            profile.sessions -= 1
+            if profile.sessions > 0 or self._profiles.get(profile.name) is not profile:
+                return
+            del self._profiles[profile.name]
+        profile.close()
+
+    def active_profiles(self) -> Dict[str, int]:
+        """当前打开的档案 -> 会话数"""
+        with self._lock:
+            return {name: profile.sessions for name, profile in self._profiles.items()}
+
+    def list_profiles(self) -> List[str]:
+        """磁盘上已有的档案名（含默认档案）"""
+        base_path = self._base_path or default_db_path()
+        profile_dir = os.path.join(os.path.dirname(base_path), PROFILE_DIR_NAME)
+        names = [DEFAULT_PROFILE]
+        if os.path.isdir(profile_dir):
+            names.extend(sorted(
+                filename[:-3] for filename in os.listdir(profile_dir)
+                if filename.endswith('.db') and _PROFILE_NAME.fullmatch(filename[:-3])
+            ))
+        return names
+
+
+# 进程内共享的注册表（桌面模式只有一个会话，服务器模式每个浏览器标签页一个会话）
+profiles = ProfileRegistry()
@@ -0,0 +1,258 @@
+"""
+SQL 性能分析 - 按仓储方法统计耗时分位数，按语句记录慢查询及其查询计划
+
+默认关闭，关闭时没有额外开销：方法不做包装，连接上也不挂语句回调。打开后：
+
+- DatabaseManager 的每个公开方法在实例上替换为计时包装，记录耗时与返回的行数
+  （列表、元组和分页结果的长度）；嵌套调用分别计入各自的方法；
+- 所有连接挂上 sqlite3 语句回调。一条语句的耗时记为从它开始执行到同一线程下一条语句开始、
+  或所在方法返回之间的时间，包含取回结果行的时间；触发器内的语句和 SQLite 内部语句（如全文索引读写）计入触发它的语句。
+  不在被分析方法内执行的语句（如迁移）不计时；
+- 超过阈值的语句进入滚动的慢查询日志，生成报告时在读连接上补上 EXPLAIN QUERY PLAN。
+
+    db.profiler.enable()
+    ...
+    db.profiler.dump('sql_profile.json')   # 每个方法的 p50/p95/p99、最耗时的语句、慢查询日志
+"""
+import functools
+import json
+import math
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database.models import Page
+from config import SLOW_QUERY_MS
+
+
+# 每个方法/语句保留的最近耗时样本数（分位数按这些样本计算）
+PROFILE_SAMPLES = 1000
+# 慢查询日志保留的条数
+SLOW_LOG_SIZE = 200
+# 统计的不同语句上限，超出后新语句合并到 OTHER_STATEMENTS
+MAX_STATEMENTS = 500
+OTHER_STATEMENTS = '(其他语句)'
+# 报告中列出的最耗时语句条数
+REPORT_STATEMENTS = 50
+
+# 不做包装的公开方法：上下文管理器、分析自身使用的方法和关闭连接
+UNPROFILED_METHODS = frozenset({'transaction', 'explain_query_plan', 'close', 'cache_stats', 'invalidate_cache'})
+
+# 语句归类时把字面量替换为 ?（回调收到的是已绑定参数的语句）
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r'\s+')
+# SQLite 执行语句时内部发出的语句（全文索引读写影子表、检查 data_version），形如 'main'.'search_index_data'
+_INTERNAL = re.compile(r"'main'\.")
+# 不需要查询计划的语句
+_NO_PLAN = re.compile(r'^\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """去掉字面量和多余空白，同一条语句的不同参数归为一类"""
+    return _SPACES.sub(' ', _LITERALS.sub('?', sql)).strip()
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """最近秩法分位数，样本需已排序"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples), max(1, math.ceil(fraction * len(sorted_samples)))) - 1
+    return sorted_samples[index]
+
+
+class _Timings:
+    """一个方法或一类语句的耗时统计"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'rows', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=PROFILE_SAMPLES)
+
+    def add(self, ms: float, rows: int = 0):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+        self.samples.append(ms)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'p99_ms': round(percentile(samples, 0.99), 3),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+        }
+
+
+def _row_count(result) -> int:
+    if isinstance(result, Page):
+        return len(result.items)
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 0
+
+
+class QueryProfiler:
+    """DatabaseManager 的 SQL 性能分析器（db.profiler）"""
+
+    def __init__(self, db, slow_ms: float = SLOW_QUERY_MS):
+        self.db = db
+        self.slow_ms = slow_ms
+        self.enabled = False
+        self.started_at: Optional[str] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # 当前线程正在执行的方法和语句
+        self._methods: Dict[str, _Timings] = {}
+        self._statements: Dict[str, _Timings] = {}
+        self._slow_log = deque(maxlen=SLOW_LOG_SIZE)
+
+    def profiled_methods(self) -> List[str]:
+        """会被计时的方法名"""
+        return sorted(
+            name for name in dir(type(self.db))
+            if not name.startswith('_') and name not in UNPROFILED_METHODS
+            and callable(getattr(type(self.db), name))
+        )
+
+    def enable(self):
+        """开始分析（已有的统计保留，需要从零开始时先调用 reset）"""
+        with self._lock:
+            if self.enabled:
+                return
+            for name in self.profiled_methods():
+                setattr(self.db, name, self._wrap(name, getattr(self.db, name)))
+            self.db._pool.add_statement_listener(self._on_statement)
+            self.enabled = True
+            self.started_at = self.started_at or datetime.now().isoformat(timespec='seconds')
+
+    def disable(self):
+        """停止分析，恢复原方法并摘除语句回调（统计保留，可继续导出）"""
+        with self._lock:
+            if not self.enabled:
+                return
+            for name in self.profiled_methods():
+                self.db.__dict__.pop(name, None)
+            self.db._pool.remove_statement_listener(self._on_statement)
+            self.enabled = False
+
+    def reset(self):
+        """清空统计和慢查询日志"""
+        with self._lock:
+            self._methods.clear()
+            self._statements.clear()
+            self._slow_log.clear()
+            self.started_at = datetime.now().isoformat(timespec='seconds') if self.enabled else None
+
+    # =================== 采集 ===================
+
+    def _wrap(self, name: str, func):
+        local = self._local
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            outer = getattr(local, 'method', None)
+            local.method = name
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                end = time.perf_counter()
+                self._finish_statement(end)
+                local.method = outer
+                self._record(self._methods, name, (end - start) * 1000, _row_count(result))
+
+        return timed
+
+    def _on_statement(self, sql: str):
+        """语句回调（在执行语句的线程中调用）：结束上一条语句的计时，开始这一条"""
+        if _INTERNAL.search(sql):
+            return  # 内部语句计入正在执行的语句
+        local = self._local
+        current = getattr(local, 'statement', None)
+        if current is not None and current[0] == sql:
+            return  # 触发器内的语句，回调收到的是触发它的语句
+        now = time.perf_counter()
+        self._finish_statement(now)
+        method = getattr(local, 'method', None)
+        if method is not None:
+            local.statement = (sql, now, method)
+
+    def _finish_statement(self, now: float):
+        local = self._local
+        current = getattr(local, 'statement', None)
+        if current is None:
+            return
+        local.statement = None
+        sql, start, method = current
+        ms = (now - start) * 1000
+
+        key = normalize_sql(sql)
+        with self._lock:
+            if key not in self._statements and len(self._statements) >= MAX_STATEMENTS:
+                key = OTHER_STATEMENTS
+            self._statements.setdefault(key, _Timings()).add(ms)
+            if ms >= self.slow_ms:
+                self._slow_log.append({
+                    'at': datetime.now().isoformat(timespec='seconds'),
+                    'method': method,
+                    'ms': round(ms, 3),
+                    'sql': sql,
+                })
+
+    def _record(self, table: Dict[str, _Timings], key: str, ms: float, rows: int = 0):
+        with self._lock:
+            table.setdefault(key, _Timings()).add(ms, rows)
+
+    # =================== 报告 ===================
+
+    def report(self, with_plans: bool = True) -> dict:
+        """分析报告：方法按总耗时降序，语句取总耗时最多的若干条，慢查询按时间升序并附查询计划"""
+        with self._lock:
+            methods = {name: timings.summary() for name, timings in self._methods.items()}
+            statements = [dict(sql=sql, **timings.summary()) for sql, timings in self._statements.items()]
+            slow_queries = [dict(entry) for entry in self._slow_log]
+
+        if with_plans:
+            plans = {}
+            for entry in slow_queries:
+                if _NO_PLAN.match(entry['sql']):
+                    continue
+                key = normalize_sql(entry['sql'])
+                if key not in plans:
+                    try:
+                        plans[key] = self.db.explain_query_plan(entry['sql'])
+                    except Exception as e:
+                        plans[key] = [f"无法获取查询计划: {e}"]
+                entry['plan'] = plans[key]
+
+        statements.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {
+            'enabled': self.enabled,
+            'started_at': self.started_at,
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_ms': self.slow_ms,
+            'methods': dict(sorted(methods.items(), key=lambda item: item[1]['total_ms'], reverse=True)),
+            'statements': statements[:REPORT_STATEMENTS],
+            'slow_queries': slow_queries,
+        }
+
+    def dump(self, path: str) -> dict:
+        """把报告写成 JSON 文件，返回报告"""
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
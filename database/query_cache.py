@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """按表版本号失效的查询缓存（LRU，线程安全）
+
+    每张表有一个只增不减的版本号，写事务提交后由连接池通知递增涉及的表。
+    缓存项记录读取前所依赖表的版本号，命中时版本号必须一致，因此缓存项
+    不需要过期时间，也不会返回写入之前的旧数据。
+    """
+
+    ALL_TABLES = '*'  # 结构变更等无法确定影响范围时，使全部缓存失效
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (版本号元组, 值)
+        self._generations = {}         # 表名 -> 版本号
+        self._epoch = 0                # 全部失效的次数
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def generations(self, tables: tuple) -> tuple:
+        """返回一组表当前的版本号"""
+        with self._lock:
+            return (self._epoch,) + tuple(self._generations.get(t, 0) for t in tables)
+
+    def get_or_load(self, key, tables: tuple, loader, cacheable: bool = True):
+        """命中则返回缓存值，否则调用 loader() 读取并缓存（None 不缓存）
+
+        版本号在读取之前获取：读取期间若有写入提交，本次结果以旧版本号入缓存，
+        下次读取时自然失效。
+        """
+        generations = self.generations(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generations:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        if value is not None and cacheable:
+            with self._lock:
+                self._entries[key] = (generations, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, tables):
+        """递增表的版本号，依赖这些表的缓存项随之失效"""
+        with self._lock:
+            for table in tables:
+                if table == self.ALL_TABLES:
+                    self._epoch += 1
+                else:
+                    self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
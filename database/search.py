@@ -0,0 +1,74 @@
+"""
+全文搜索 - 基于 SQLite FTS5 的语录、诗句、道友、互动记录与收支备注搜索
+
+FTS5 自带的分词器不切分中文，这里在写入索引前把文本转换为以空格分隔的词元：
+连续的汉字按相邻两字切分（二元组），并补上末字；其余字母数字按词小写。
+"修仙之路" -> "修仙 仙之 之路 路"，任意连续的两个及以上汉字都能以短语命中，
+单个汉字以前缀查询命中（每个字要么是某个二元组的首字，要么是末字）。
+
+词元由 SQL 函数 search_tokens 生成，业务表上的触发器调用它同步维护索引，
+连接池为每个连接注册该函数。
+"""
+import re
+from typing import Dict, Tuple
+
+
+# 汉字（含扩展A区、兼容区）连续片段，或不含汉字的字母数字词
+_SEGMENT = re.compile(
+    r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)'
+    r'|[^\W_\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+'
+)
+
+# 索引来源 -> 编号；索引行的 rowid = 编号 << SOURCE_SHIFT | 来源表中的 id，
+# 每个来源占一段连续的 rowid，按来源删除或筛选都是 rowid 范围操作
+SEARCH_SOURCES: Dict[str, int] = {
+    'quote': 1,        # lizhi_quotes
+    'poetry': 2,       # 诗句库（JSON 文件，由 PoetrySystem 同步）
+    'friend': 3,       # friends
+    'interaction': 4,  # interaction_records
+    'finance': 5,      # finance_records.description
+}
+SOURCE_SHIFT = 40
+SOURCE_NAMES = {code: name for name, code in SEARCH_SOURCES.items()}
+
+
+def search_tokens(text) -> str:
+    """把文本转换为索引词元（空格分隔），供 SQL 函数 search_tokens 使用"""
+    if not text:
+        return ''
+    tokens = []
+    for match in _SEGMENT.finditer(str(text)):
+        run = match.group(1)
+        if run:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(match.group(0).lower())
+    return ' '.join(tokens)
+
+
+def build_match_query(query: str) -> str:
+    """把用户输入转换为 FTS5 MATCH 表达式，各片段之间为 AND
+
+    两个及以上汉字转换为二元组短语，单个汉字和字母数字词使用前缀查询；
+    词元都用双引号包裹，用户输入中的 FTS5 语法字符不会生效。无可搜索内容时返回空串。
+    """
+    terms = []
+    for match in _SEGMENT.finditer(query or ''):
+        run = match.group(1)
+        if run and len(run) > 1:
+            terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        else:
+            terms.append(f'"{match.group(0).lower()}"*')
+    return ' '.join(terms)
+
+
+def source_range(source: str) -> Tuple[int, int]:
+    """某个来源在索引中的 rowid 范围 [起, 止]"""
+    base = SEARCH_SOURCES[source] << SOURCE_SHIFT
+    return base, base + (1 << SOURCE_SHIFT) - 1
+
+
+def split_rowid(rowid: int) -> Tuple[str, int]:
+    """索引 rowid -> (来源, 来源表中的 id)"""
+    return SOURCE_NAMES.get(rowid >> SOURCE_SHIFT, ''), rowid & ((1 << SOURCE_SHIFT) - 1)
@@ -0,0 +1,594 @@
+"""
+离线同步 - 手机版与电脑版的数据库通过同步包文件交换变化
+
+两端各自使用自己的 immortal_cultivation.db。导出时从变更日志中取出对端尚未确认的净变化，
+连同变化后的整行写成一个 gzip 压缩的 JSON 同步包；把文件拷到另一端导入即可，不需要网络。
+
+行的身份：每行有全局键 (来源设备, 来源 id)。本机新建的行来源为本机，从对端导入的行在
+sync_rows 中记录全局键到本地 id 的映射，外键列在同步包中同样写成全局键。对端新增的行
+若与本地某个尚未对应的行在 SYNC_TABLES 的比较列上相同（如同名境界、同一时刻的同一笔收支），
+视为同一行，两端初始化时写入的默认数据和各自保存的境界树不会重复。
+
+冲突处理：同一行两端都有对方未见过的修改时，以变化时间较晚的一方为准，时间相同时以设备
+标识较大的一方为准，两端得出同样的结果；删除与修改冲突时同样比较时间。心境和寿元不参与
+整行比较：同步包带上导出设备自开始同步以来自身产生的累计变化量，导入端只加上比上次多出的
+部分。收支流水只会追加，余额账本和每日汇总由触发器随导入的流水更新。
+
+进度：每个对端记录本机已导入到对端日志的哪个版本（导出时作为确认号带给对端），以及对端
+确认过本机日志的哪个版本（下次从这里导出）。同步包可以重复导入，丢失后重新导出即可；
+导入时写入的日志区间不会再导出给来源设备，两端不会来回传同一批变化。
+
+    db.export_sync_bundle('to_phone.sync.json.gz')
+    db.import_sync_bundle('from_phone.sync.json.gz')
+"""
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from database.migrations import BLOOD_TOTAL_SQL
+
+
+SYNC_FORMAT = 1
+SYNC_BUNDLE_SUFFIX = '.sync.json.gz'
+
+# 同步的业务表，被引用的表在前 -> (外键列 -> 引用表, 对端新增行与本地行视为同一行时比较的列)
+SYNC_TABLES: Dict[str, Tuple[Dict[str, str], Tuple[str, ...]]] = {
+    'tasks': ({}, ('name', 'category')),
+    'realms': ({}, ('name',)),
+    'skills': ({'realm_id': 'realms'}, ('name', 'skill_type', 'realm_id')),
+    'family_members': ({}, ('name', 'birthday')),
+    'friends': ({}, ('name', 'category')),
+    'task_records': ({'task_id': 'tasks'}, ('task_id', 'completed_at')),
+    'finance_records': ({}, ('type', 'amount', 'category', 'description', 'created_at')),
+    'fixed_items': ({}, ('name', 'type')),
+    'debts': ({}, ('name',)),
+    'assets': ({}, ('name',)),
+    'lizhi_quotes': ({}, ('content',)),
+    'family_events': ({'member_id': 'family_members'}, ('member_id', 'event_name', 'event_date')),
+    'friend_relations': ({'friend_id': 'friends', 'related_friend_id': 'friends'},
+                         ('friend_id', 'related_friend_id')),
+    'friend_tasks': ({'friend_id': 'friends'}, ('friend_id', 'task_name', 'created_at')),
+    'interaction_records': ({'friend_id': 'friends'}, ('friend_id', 'content', 'interaction_date')),
+}
+
+# 单行配置表（两端都是 id = 1）-> 按整行以后写为准的列
+SINGLETON_COLUMNS = {
+    'user_config': ('birth_year', 'initial_blood', 'current_money', 'target_money'),
+    'jingjie_config': ('current_realm_index', 'updated_at'),
+}
+
+# 心境寿元：只在与对端第一次同步时随 user_config 整行比较，之后按累计变化量相加
+COUNTER_COLUMNS = ('current_spirit', 'current_blood', 'blood_updated_at')
+
+SYNCED_TABLES = tuple(SYNC_TABLES) + tuple(SINGLETON_COLUMNS) + ('skill_nodes',)
+
+# 按 id 批量读取行时每条语句的 id 个数
+ROW_BATCH_SIZE = 500
+
+
+def _net_changes(conn, since: int, peer_id: Optional[str]) -> list:
+    """since 之后本机同步表的净变化，每行一条 (version, table, row_id, op, changed_at)，按 version 升序
+
+    不含导入 peer_id 的同步包时写入的日志；合并规则与 get_changes_since(coalesce=True) 相同。
+    """
+    tables = ', '.join('?' for _ in SYNCED_TABLES)
+    rows = conn.execute(f'''
+        SELECT version, table_name, row_id,
+               CASE WHEN first_op = 'I' AND op = 'D' THEN NULL
+                    WHEN first_op = 'I' THEN 'I'
+                    WHEN op = 'D' THEN 'D'
+                    ELSE 'U' END,
+               changed_at
+        FROM (
+            SELECT *,
+                   FIRST_VALUE(op) OVER (PARTITION BY table_name, row_id ORDER BY version) AS first_op,
+                   ROW_NUMBER() OVER (PARTITION BY table_name, row_id ORDER BY version DESC) AS recency
+            FROM changelog c
+            WHERE version > ? AND table_name IN ({tables})
+              AND NOT EXISTS (
+                  SELECT 1 FROM sync_echoes e
+                  WHERE e.peer_id = ? AND c.version BETWEEN e.first_version AND e.last_version
+              )
+        )
+        WHERE recency = 1
+        ORDER BY version
+    ''', (since, *SYNCED_TABLES, peer_id)).fetchall()
+    return [row for row in rows if row[3] is not None]
+
+
+def _snapshot_changes(conn) -> list:
+    """变更日志已被清理到对端进度之后时，以全部现有行作为变化（无法再传递其间的删除）"""
+    rows = []
+    for table in SYNCED_TABLES:
+        key = 'skill_id' if table == 'skill_nodes' else 'id'
+        rows.extend(conn.execute(f'''
+            SELECT 0, '{table}', t.{key}, 'U', MAX(c.changed_at)
+            FROM (SELECT DISTINCT {key} FROM {table}) t
+            LEFT JOIN changelog c ON c.table_name = '{table}' AND c.row_id = t.{key}
+            GROUP BY t.{key}
+        ''').fetchall())
+    return rows
+
+
+def _remote_wins(local_at: Optional[str], remote_at: Optional[str], local_device: str, peer_id: str) -> bool:
+    """本地没有对端未见过的修改，或对端的修改更晚（时间相同时比较设备标识）"""
+    if local_at is None:
+        return True
+    return (remote_at or '', peer_id) > (local_at, local_device)
+
+
+def _chunks(items: list, size: int = ROW_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_sync_bundle(path: str) -> dict:
+    """读取同步包文件，格式不符时抛出 ValueError"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        bundle = json.load(f)
+    if not isinstance(bundle, dict) or bundle.get('format') != SYNC_FORMAT:
+        raise ValueError(f"不支持的同步包格式: {path}")
+    return bundle
+
+
+class SyncMixin:
+    """离线同步方法，依赖 DatabaseManager 的 _pool、db_path 与 _apply_spirit_blood"""
+
+    # =================== 状态 ===================
+
+    @staticmethod
+    def _sync_device(conn) -> str:
+        return conn.execute('SELECT device_id FROM sync_device WHERE id = 1').fetchone()[0]
+
+    @staticmethod
+    def _sync_peer(conn, peer_id: Optional[str]) -> Optional[dict]:
+        row = conn.execute('''
+            SELECT peer_id, acked_version, imported_version, peer_spirit, peer_blood, synced_at
+            FROM sync_peers WHERE peer_id = ?
+        ''', (peer_id,)).fetchone()
+        if not row:
+            return None
+        keys = ('peer_id', 'acked_version', 'imported_version', 'peer_spirit', 'peer_blood', 'synced_at')
+        return dict(zip(keys, row))
+
+    @staticmethod
+    def _counter_totals(conn) -> Tuple[int, int]:
+        """当前心境与寿元累计量"""
+        row = conn.execute(f'SELECT current_spirit, {BLOOD_TOTAL_SQL} FROM user_config WHERE id = 1').fetchone()
+        return (row[0] or 0, row[1] or 0) if row else (0, 0)
+
+    def get_sync_status(self) -> dict:
+        """本机设备标识、已知对端的同步进度，以及每个对端尚未导出的变化行数"""
+        try:
+            with self._pool.reader() as conn:
+                device_id = self._sync_device(conn)
+                peers = []
+                for (peer_id,) in conn.execute('SELECT peer_id FROM sync_peers ORDER BY peer_id').fetchall():
+                    peer = self._sync_peer(conn, peer_id)
+                    peer['pending'] = len(_net_changes(conn, peer['acked_version'], peer_id))
+                    peers.append(peer)
+            return {'device_id': device_id, 'peers': peers}
+
+        except Exception as e:
+            print(f"获取同步状态错误: {e}")
+            return {'device_id': None, 'peers': []}
+
+    def reset_sync_device(self) -> Optional[str]:
+        """为本机生成新的设备标识并清空同步进度，返回新标识
+
+        数据库文件是从另一台设备直接复制来的时候，两端标识相同，需要在其中一端执行；
+        之后第一次同步按内容对应两端已有的相同记录。
+        """
+        try:
+            with self._pool.writer() as conn:
+                spirit, blood = self._counter_totals(conn)
+                conn.execute('''
+                    UPDATE sync_device
+                    SET device_id = lower(hex(randomblob(8))), base_spirit = ?, base_blood = ?,
+                        imported_spirit = 0, imported_blood = 0
+                    WHERE id = 1
+                ''', (spirit, blood))
+                for table in ('sync_peers', 'sync_rows', 'sync_echoes'):
+                    conn.execute(f'DELETE FROM {table}')
+                return self._sync_device(conn)
+
+        except Exception as e:
+            print(f"重置同步设备错误: {e}")
+            return None
+
+    def sync_bundle_dir(self) -> str:
+        """界面导入导出同步包使用的目录（数据库所在目录下的 sync/）"""
+        directory = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), 'sync')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    # =================== 导出 ===================
+
+    def export_sync_bundle(self, path: str = None, peer_id: str = None) -> Optional[dict]:
+        """把对端尚未确认的变化写成同步包，返回 {'path', 'peer', 'changes', 'version'}
+
+        path 为空时写到 sync_bundle_dir() 下以设备标识和时间命名的文件。peer_id 为空时，
+        只有一个已知对端则发给它，否则从头导出（首次同步，包含全部数据）。
+        """
+        try:
+            with self._pool.writer() as conn:
+                bundle = self._build_sync_bundle(conn, peer_id)
+
+            if path is None:
+                stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                path = os.path.join(self.sync_bundle_dir(), f"{bundle['device']}_{stamp}{SYNC_BUNDLE_SUFFIX}")
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                json.dump(bundle, f, ensure_ascii=False, separators=(',', ':'))
+
+            return {'path': path, 'peer': bundle['peer'], 'changes': len(bundle['changes']),
+                    'version': bundle['version']}
+
+        except Exception as e:
+            print(f"导出同步包错误: {e}")
+            return None
+
+    def _build_sync_bundle(self, conn, peer_id: Optional[str]) -> dict:
+        device_id = self._sync_device(conn)
+        if peer_id is None:
+            peers = [row[0] for row in conn.execute('SELECT peer_id FROM sync_peers')]
+            peer_id = peers[0] if len(peers) == 1 else None
+        peer = self._sync_peer(conn, peer_id) or {'acked_version': 0, 'imported_version': 0}
+
+        oldest, latest = conn.execute('''
+            SELECT MIN(version),
+                   (SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'changelog')
+            FROM changelog
+        ''').fetchone()
+        since = peer['acked_version']
+        pruned_through = (oldest if oldest is not None else latest + 1) - 1
+        changes = _snapshot_changes(conn) if since < pruned_through else _net_changes(conn, since, peer_id)
+
+        keys = _KeyMapper(conn, device_id)
+        rows = self._read_changed_rows(conn, changes)
+        entries = []
+        for _version, table, row_id, op, changed_at in changes:
+            entry = {'t': table, 'k': keys.global_key(table if table != 'skill_nodes' else 'skills', row_id),
+                     'op': op, 'at': changed_at}
+            if op != 'D':
+                row = rows.get((table, row_id))
+                if row is None:
+                    continue
+                entry['row'] = self._export_row(table, row, keys)
+            entries.append(entry)
+
+        spirit, blood = conn.execute(f'''
+            SELECT u.current_spirit - d.base_spirit - d.imported_spirit,
+                   {BLOOD_TOTAL_SQL} - d.base_blood - d.imported_blood
+            FROM user_config u, sync_device d
+            WHERE u.id = 1
+        ''').fetchone() or (0, 0)
+
+        return {
+            'format': SYNC_FORMAT,
+            'device': device_id,
+            'peer': peer_id,
+            'since': since,
+            'version': latest,
+            'ack': peer['imported_version'],
+            'spirit': spirit or 0,
+            'blood': blood or 0,
+            'changes': entries,
+        }
+
+    @staticmethod
+    def _read_changed_rows(conn, changes: list) -> dict:
+        """按表批量读取变化行的当前内容 -> {(表, 行号): {列: 值}}；skill_nodes 为该技能的节点列表"""
+        ids: Dict[str, List[int]] = {}
+        for _version, table, row_id, op, _changed_at in changes:
+            if op != 'D':
+                ids.setdefault(table, []).append(row_id)
+
+        rows = {}
+        for table, row_ids in ids.items():
+            key = 'skill_id' if table == 'skill_nodes' else 'id'
+            for chunk in _chunks(row_ids):
+                cursor = conn.execute(
+                    f"SELECT * FROM {table} WHERE {key} IN ({', '.join('?' for _ in chunk)})"
+                    + (' ORDER BY skill_id, ordinal' if table == 'skill_nodes' else ''),
+                    chunk
+                )
+                columns = [column[0] for column in cursor.description]
+                for values in cursor.fetchall():
+                    row = dict(zip(columns, values))
+                    if table == 'skill_nodes':
+                        rows.setdefault((table, row['skill_id']), []).append(
+                            [row['ordinal'], row['name'], row['completed_at']]
+                        )
+                    else:
+                        rows[(table, row['id'])] = row
+        return rows
+
+    @staticmethod
+    def _export_row(table: str, row, keys: '_KeyMapper'):
+        if table == 'skill_nodes':
+            return row
+        if table in SINGLETON_COLUMNS:
+            columns = SINGLETON_COLUMNS[table] + (COUNTER_COLUMNS if table == 'user_config' else ())
+            return {column: row.get(column) for column in columns}
+
+        foreign_keys = SYNC_TABLES[table][0]
+        data = {}
+        for column, value in row.items():
+            if column == 'id':
+                continue
+            if column in foreign_keys and value is not None:
+                value = keys.global_key(foreign_keys[column], value)
+            data[column] = value
+        return data
+
+    # =================== 导入 ===================
+
+    def import_sync_bundle(self, path: str) -> Optional[dict]:
+        """导入对端的同步包（整包一个事务），返回统计
+
+        {'peer', 'applied'（写入的行）, 'deleted', 'kept'（本地修改更晚而保留的行）,
+         'skipped'（引用的行不存在或违反约束）, 'stale'（已导入过更新的同步包）}
+        """
+        try:
+            bundle = read_sync_bundle(path)
+            with self._pool.writer() as conn:
+                return self._apply_sync_bundle(conn, bundle)
+
+        except Exception as e:
+            print(f"导入同步包错误: {e}")
+            return None
+
+    def import_sync_bundles(self, directory: str = None) -> List[dict]:
+        """按文件名顺序导入目录中其他设备的同步包（默认 sync_bundle_dir()），重复的包不会重复生效"""
+        directory = directory or self.sync_bundle_dir()
+        try:
+            with self._pool.reader() as conn:
+                device_id = self._sync_device(conn)
+        except Exception as e:
+            print(f"导入同步包错误: {e}")
+            return []
+
+        results = []
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(SYNC_BUNDLE_SUFFIX) and not filename.startswith(device_id):
+                result = self.import_sync_bundle(os.path.join(directory, filename))
+                if result is not None:
+                    results.append(result)
+        return results
+
+    def _apply_sync_bundle(self, conn, bundle: dict) -> dict:
+        device_id = self._sync_device(conn)
+        peer_id = bundle['device']
+        if peer_id == device_id:
+            raise ValueError("同步包来自本机（数据库文件若是复制的，请先在其中一端重置同步设备）")
+        if bundle.get('peer') not in (None, device_id):
+            raise ValueError(f"同步包是发给设备 {bundle['peer']} 的")
+
+        peer = self._sync_peer(conn, peer_id)
+        first_contact = peer is None
+        peer = peer or {'acked_version': 0, 'imported_version': 0, 'peer_spirit': 0, 'peer_blood': 0}
+        result = {'peer': peer_id, 'applied': 0, 'deleted': 0, 'kept': 0, 'skipped': 0,
+                  'stale': bundle['version'] <= peer['imported_version'] and not first_contact}
+
+        acked = max(peer['acked_version'], bundle.get('ack', 0))
+        first_version = self._changelog_seq(conn) + 1
+
+        if not result['stale']:
+            pending = {(table, row_id): changed_at
+                       for _v, table, row_id, _op, changed_at in _net_changes(conn, acked, peer_id)}
+            applier = _BundleApplier(conn, device_id, peer_id, pending, result)
+            changes = bundle['changes']
+            order = {table: index for index, table in enumerate(SYNCED_TABLES)}
+
+            # 先删除（引用方在前），再按被引用的表在前写入
+            deletes = sorted((c for c in changes if c['op'] == 'D' and c['t'] in order),
+                             key=lambda c: -order[c['t']])
+            upserts = sorted((c for c in changes if c['op'] != 'D' and c['t'] in order),
+                             key=lambda c: order[c['t']])
+            for change in deletes:
+                applier.delete(change)
+            totals_before = self._counter_totals(conn)
+            for change in upserts:
+                applier.upsert(change, first_contact)
+
+            # 心境寿元：加上对端累计变化量中本机尚未计入的部分
+            spirit_change = bundle['spirit'] - peer['peer_spirit']
+            blood_change = bundle['blood'] - peer['peer_blood']
+            if not first_contact and (spirit_change or blood_change):
+                self._apply_spirit_blood(conn.cursor(), spirit_change, blood_change)
+            totals_after = self._counter_totals(conn)
+            conn.execute('''
+                UPDATE sync_device
+                SET imported_spirit = imported_spirit + ?, imported_blood = imported_blood + ?
+                WHERE id = 1
+            ''', (totals_after[0] - totals_before[0], totals_after[1] - totals_before[1]))
+
+        last_version = self._changelog_seq(conn)
+        if last_version >= first_version:
+            conn.execute('INSERT INTO sync_echoes (peer_id, first_version, last_version) VALUES (?, ?, ?)',
+                         (peer_id, first_version, last_version))
+        # 对端已确认的部分不会再导出，对应的回声区间可以删除
+        conn.execute('DELETE FROM sync_echoes WHERE peer_id = ? AND last_version <= ?', (peer_id, acked))
+
+        conn.execute('''
+            INSERT INTO sync_peers (peer_id, acked_version, imported_version, peer_spirit, peer_blood, synced_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(peer_id) DO UPDATE SET
+                acked_version = excluded.acked_version,
+                imported_version = MAX(imported_version, excluded.imported_version),
+                peer_spirit = CASE WHEN excluded.imported_version > imported_version
+                                   THEN excluded.peer_spirit ELSE peer_spirit END,
+                peer_blood = CASE WHEN excluded.imported_version > imported_version
+                                  THEN excluded.peer_blood ELSE peer_blood END,
+                synced_at = excluded.synced_at
+        ''', (peer_id, acked, bundle['version'], bundle['spirit'], bundle['blood']))
+        return result
+
+    @staticmethod
+    def _changelog_seq(conn) -> int:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changelog'").fetchone()
+        return row[0] if row else 0
+
+
+class _KeyMapper:
+    """本地 id 与全局键 [来源设备, 来源 id] 的互相转换"""
+
+    def __init__(self, conn, device_id: str):
+        self.conn = conn
+        self.device_id = device_id
+        self._origins: Dict[str, Dict[int, list]] = {}
+
+    def global_key(self, table: str, local_id: int) -> list:
+        if table not in self._origins:
+            self._origins[table] = {
+                local_id: [origin, origin_id]
+                for origin, origin_id, local_id in self.conn.execute(
+                    'SELECT origin, origin_id, local_id FROM sync_rows WHERE table_name = ?', (table,)
+                )
+            }
+        return self._origins[table].get(local_id, [self.device_id, local_id])
+
+    def local_id(self, table: str, key) -> Optional[int]:
+        origin, origin_id = key
+        if origin == self.device_id:
+            return origin_id
+        row = self.conn.execute('''
+            SELECT local_id FROM sync_rows WHERE table_name = ? AND origin = ? AND origin_id = ?
+        ''', (table, origin, origin_id)).fetchone()
+        return row[0] if row else None
+
+    def bind(self, table: str, key, local_id: int):
+        origin, origin_id = key
+        if origin != self.device_id:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO sync_rows (table_name, origin, origin_id, local_id) VALUES (?, ?, ?, ?)
+            ''', (table, origin, origin_id, local_id))
+
+
+class _BundleApplier:
+    """在导入事务内逐条应用同步包中的变化"""
+
+    def __init__(self, conn, device_id: str, peer_id: str, pending: dict, result: dict):
+        self.conn = conn
+        self.device_id = device_id
+        self.peer_id = peer_id
+        self.pending = pending
+        self.result = result
+        self.keys = _KeyMapper(conn, device_id)
+        self._columns: Dict[str, set] = {}
+
+    def _local_columns(self, table: str) -> set:
+        if table not in self._columns:
+            self._columns[table] = {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+        return self._columns[table]
+
+    def _remote_wins(self, table: str, local_id: int, remote_at: str) -> bool:
+        if _remote_wins(self.pending.get((table, local_id)), remote_at, self.device_id, self.peer_id):
+            return True
+        self.result['kept'] += 1
+        return False
+
+    def delete(self, change: dict):
+        table = change['t']
+        if table in SINGLETON_COLUMNS or table == 'skill_nodes':
+            return
+        local_id = self.keys.local_id(table, change['k'])
+        if local_id is None or not self._remote_wins(table, local_id, change['at']):
+            return
+        cursor = self.conn.execute(f'DELETE FROM {table} WHERE id = ?', (local_id,))
+        self.result['deleted'] += cursor.rowcount
+
+    def upsert(self, change: dict, first_contact: bool):
+        table, row = change['t'], change['row']
+        try:
+            if table in SINGLETON_COLUMNS:
+                self._update_singleton(table, row, change['at'], first_contact)
+            elif table == 'skill_nodes':
+                self._replace_nodes(change['k'], row, change['at'])
+            else:
+                self._upsert_row(table, change['k'], row, change['at'])
+        except sqlite3.IntegrityError as e:
+            print(f"同步跳过 {table} 行 {change['k']}: {e}")
+            self.result['skipped'] += 1
+
+    def _update_singleton(self, table: str, row: dict, remote_at: str, first_contact: bool):
+        if not self._remote_wins(table, 1, remote_at):
+            return
+        columns = SINGLETON_COLUMNS[table]
+        if table == 'user_config' and first_contact:
+            columns += COUNTER_COLUMNS
+        columns = [column for column in columns if column in row and column in self._local_columns(table)]
+        self.conn.execute(
+            f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = 1",
+            [row[column] for column in columns]
+        )
+        self.result['applied'] += 1
+
+    def _replace_nodes(self, skill_key, nodes: list, remote_at: str):
+        skill_id = self.keys.local_id('skills', skill_key)
+        if skill_id is None:
+            self.result['skipped'] += 1
+            return
+        if not self._remote_wins('skill_nodes', skill_id, remote_at):
+            return
+        self.conn.execute('DELETE FROM skill_nodes WHERE skill_id = ?', (skill_id,))
+        self.conn.executemany('''
+            INSERT INTO skill_nodes (skill_id, ordinal, name, completed_at) VALUES (?, ?, ?, ?)
+        ''', [(skill_id, *node) for node in nodes])
+        self.result['applied'] += 1
+
+    def _upsert_row(self, table: str, key, row: dict, remote_at: str):
+        foreign_keys, match_columns = SYNC_TABLES[table]
+        values = {}
+        for column, value in row.items():
+            if column not in self._local_columns(table) or column == 'id':
+                continue
+            if column in foreign_keys and value is not None:
+                value = self.keys.local_id(foreign_keys[column], value)
+                if value is None:
+                    # 引用的行在本机不存在（已删除或尚未同步）
+                    self.result['skipped'] += 1
+                    return
+            values[column] = value
+
+        local_id = self.keys.local_id(table, key)
+        if local_id is None:
+            local_id = self._match_existing(table, match_columns, values)
+            if local_id is not None:
+                self.keys.bind(table, key, local_id)
+        if local_id is not None and not self._remote_wins(table, local_id, remote_at):
+            return
+
+        columns = list(values)
+        exists = local_id is not None and self.conn.execute(
+            f'SELECT 1 FROM {table} WHERE id = ?', (local_id,)
+        ).fetchone()
+        if exists:
+            self.conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                [values[column] for column in columns] + [local_id]
+            )
+        else:
+            # 本机删除过的行沿用原来的 id 恢复，新行由数据库分配 id
+            cursor = self.conn.execute(
+                f"INSERT INTO {table} (id, {', '.join(columns)}) VALUES (?, {', '.join('?' for _ in columns)})",
+                [local_id] + [values[column] for column in columns]
+            )
+            self.keys.bind(table, key, cursor.lastrowid)
+        self.result['applied'] += 1
+
+    def _match_existing(self, table: str, match_columns: tuple, values: dict) -> Optional[int]:
+        """本地尚未与其他设备的行对应、比较列全部相同的行"""
+        if not all(column in values for column in match_columns):
+            return None
+        row = self.conn.execute(f'''
+            SELECT id FROM {table}
+            WHERE {' AND '.join(f'{column} IS ?' for column in match_columns)}
+              AND id NOT IN (SELECT local_id FROM sync_rows WHERE table_name = ?)
+            ORDER BY id
+            LIMIT 1
+        ''', [values[column] for column in match_columns] + [table]).fetchone()
+        return row[0] if row else None
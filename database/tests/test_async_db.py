@@ -0,0 +1,89 @@
+"""
+异步外观测试：公开方法包装为协程、在线程池中执行、并发等待与异常传播
+"""
+import asyncio
+import threading
+
+import pytest
+
+from database.async_db import AsyncDatabaseManager
+from database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / 'async.db'))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def adb(db):
+    facade = AsyncDatabaseManager(db, max_workers=2)
+    yield facade
+    facade.close()
+
+
+def test_public_methods_become_coroutines(db, adb):
+    """同名协程与同步调用结果一致，写入同样生效"""
+    assert adb.get_user_data.__name__ == 'get_user_data'
+
+    async def scenario():
+        user = await adb.get_user_data()
+        await adb.add_finance_record("income", 8, "红包")
+        return user
+
+    user = asyncio.run(scenario())
+    assert user.current_spirit == db.get_user_data().current_spirit
+    assert db.get_finance_balance()['income'] == 8
+
+
+def test_run_uses_db_threads(adb):
+    """run 在数据库线程池中执行任意函数，参数原样传入"""
+    def work(a, b=0):
+        return threading.current_thread().name, a + b
+
+    thread, total = asyncio.run(adb.run(work, 1, b=2))
+    assert thread.startswith('db-async') and total == 3
+
+
+def test_gather_returns_results_by_keyword(db, adb):
+    """gather 并发等待，按关键字返回结果"""
+    async def scenario():
+        return await adb.gather(user=adb.get_user_data(), tasks=adb.get_tasks(), answer=adb.run(lambda: 42))
+
+    results = asyncio.run(scenario())
+    assert set(results) == {'user', 'tasks', 'answer'} and results['answer'] == 42
+    assert [task.id for task in results['tasks']] == [task.id for task in db.get_tasks()]
+
+
+def test_exceptions_propagate(adb):
+    """线程池中抛出的异常传播给等待者，包括 gather 中的任一调用"""
+    def fail():
+        raise ValueError("数据库线程中的错误")
+
+    with pytest.raises(ValueError):
+        asyncio.run(adb.run(fail))
+
+    async def scenario():
+        return await adb.gather(ok=adb.run(lambda: 1), bad=adb.run(fail))
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+
+def test_attribute_access(db, adb):
+    """私有成员不暴露，非可调用属性原样返回"""
+    with pytest.raises(AttributeError):
+        adb._pool
+    assert adb.writes is db.writes
+    assert adb.db_path == db.db_path
+
+
+def test_close_keeps_database_open(db):
+    """关闭后不再接受调用，底层 DatabaseManager 仍可使用"""
+    facade = AsyncDatabaseManager(db)
+    facade.close()
+    with pytest.raises(RuntimeError):
+        asyncio.run(facade.run(lambda: 1))
+    assert db.get_user_data() is not None
@@ -0,0 +1,114 @@
+"""
+连接池测试：嵌套写事务与整体回滚、事务内复用写连接、读连接超出上限时退化
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from database.connection import ConnectionPool
+
+
+def make_pool(tmp_path, **kwargs) -> ConnectionPool:
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), **kwargs)
+    with pool.writer() as conn:
+        conn.execute('CREATE TABLE items (name TEXT NOT NULL)')
+    return pool
+
+
+def names(pool: ConnectionPool) -> list:
+    with pool.reader() as conn:
+        return [row[0] for row in conn.execute('SELECT name FROM items ORDER BY rowid')]
+
+
+def test_nested_writer_joins_outer_transaction(tmp_path):
+    """内层写事务复用同一连接，随外层一起提交"""
+    pool = make_pool(tmp_path)
+    with pool.writer() as outer:
+        outer.execute("INSERT INTO items VALUES ('外层')")
+        with pool.writer() as inner:
+            assert inner is outer
+            inner.execute("INSERT INTO items VALUES ('内层')")
+    assert names(pool) == ['外层', '内层']
+    pool.close()
+
+
+def test_inner_failure_makes_transaction_rollback_only(tmp_path):
+    """内层失败即使被捕获，整个事务也只能回滚，外层退出时抛出 OperationalError"""
+    pool = make_pool(tmp_path)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.writer() as outer:
+            outer.execute("INSERT INTO items VALUES ('外层')")
+            try:
+                with pool.writer() as inner:
+                    inner.execute("INSERT INTO items VALUES ('内层')")
+                    inner.execute("INSERT INTO items VALUES (NULL)")
+            except sqlite3.IntegrityError:
+                pass
+            outer.execute("INSERT INTO items VALUES ('之后的写入')")
+    assert names(pool) == []
+    assert not pool._in_write_transaction()
+
+    # 下一个事务不受影响
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO items VALUES ('恢复')")
+    assert names(pool) == ['恢复']
+    pool.close()
+
+
+def test_outer_failure_rolls_back(tmp_path):
+    """外层异常回滚整个事务，之后的事务不受影响"""
+    pool = make_pool(tmp_path)
+    try:
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO items VALUES ('应回滚')")
+            raise ValueError("中途失败")
+    except ValueError:
+        pass
+    assert names(pool) == []
+
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO items VALUES ('恢复')")
+    assert names(pool) == ['恢复']
+    pool.close()
+
+
+def test_reader_reuses_writer_inside_transaction(tmp_path):
+    """写事务中读取复用写连接，能读到未提交的修改；其他线程读不到"""
+    pool = make_pool(tmp_path)
+    seen = {}
+    with pool.writer() as writer:
+        writer.execute("INSERT INTO items VALUES ('事务内写入')")
+        with pool.reader() as conn:
+            assert conn is writer
+        assert names(pool) == ['事务内写入']
+        thread = threading.Thread(target=lambda: seen.update(other=names(pool)))
+        thread.start()
+        thread.join()
+    assert seen['other'] == []
+    assert names(pool) == ['事务内写入']
+    pool.close()
+
+
+def test_reader_falls_back_beyond_max_readers(tmp_path):
+    """读连接已达上限时，其他线程在写锁下共享写连接"""
+    pool = make_pool(tmp_path, max_readers=1)
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO items VALUES ('已提交')")
+
+    with pool.reader() as own:
+        assert own is not pool._writer
+
+    seen = {}
+
+    def read_in_thread():
+        with pool.reader() as conn:
+            seen['conn'] = conn
+            seen['names'] = [row[0] for row in conn.execute('SELECT name FROM items')]
+
+    thread = threading.Thread(target=read_in_thread)
+    thread.start()
+    thread.join()
+    assert seen['conn'] is pool._writer and seen['names'] == ['已提交']
+    assert len(pool._readers) == 1
+    pool.close()
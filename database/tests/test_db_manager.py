@@ -0,0 +1,273 @@
+"""
+DatabaseManager 测试：灵石账本、每日汇总、批量导入、境界节点、密友状态
+"""
+import pytest
+
+from database.db_manager import DatabaseManager, ROLLUP_BACKFILL
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / 'test.db'))
+    yield manager
+    manager.close()
+
+
+def corrupt_ledger(db: DatabaseManager, sql: str):
+    """绕过触发器直接改写账本"""
+    with db._pool.writer() as conn:
+        conn.execute(sql)
+
+
+def test_ledger_follows_records(db):
+    """增删记录时账本由触发器在同一事务内维护"""
+    db.add_finance_record("income", 200, "工资", "月薪")
+    db.add_finance_record("expense", 80, "餐饮", "聚餐")
+    balance = db.get_finance_balance()
+    assert (balance['income'], balance['expense'], balance['record_count']) == (200, 80, 2)
+
+    with db._pool.reader() as conn:
+        record_id = conn.execute("SELECT id FROM finance_records WHERE type = 'expense'").fetchone()[0]
+    assert db.delete_finance_record(record_id)
+    balance = db.get_finance_balance()
+    assert (balance['income'], balance['expense'], balance['record_count']) == (200, 0, 1)
+    assert not db.verify_finance_balance()['has_drift']
+
+
+def test_verify_reports_and_repairs_drift(db):
+    """账本被改坏后，校验报告偏差且不修改账本，修正后与历史记录一致"""
+    db.add_finance_record("income", 200, "工资")
+    db.add_finance_record("expense", 80, "餐饮")
+    corrupt_ledger(db, '''
+        UPDATE finance_balance
+        SET total_income = total_income + 50, record_count = record_count - 1
+        WHERE id = 1
+    ''')
+
+    report = db.verify_finance_balance()
+    assert report['has_drift'] and not report['repaired']
+    assert report['drift'] == {'income': 50, 'expense': 0, 'record_count': -1}
+    assert report['actual'] == {'income': 200, 'expense': 80, 'record_count': 2}
+    assert db.verify_finance_balance()['has_drift']
+    assert db.get_finance_balance()['income'] == 250
+
+    assert db.verify_finance_balance(repair=True)['repaired']
+    assert not db.verify_finance_balance()['has_drift']
+    balance = db.get_finance_balance()
+    assert (balance['income'], balance['expense'], balance['record_count']) == (200, 80, 2)
+
+    # 修正后的写入继续由触发器维护
+    db.add_finance_record("expense", 20, "交通")
+    assert not db.verify_finance_balance()['has_drift']
+
+
+def test_verify_tool(tmp_path):
+    """命令行工具：发现偏差返回失败，--repair 修正后返回成功"""
+    from verify_finance_balance import verify_finance_balance
+
+    db_path = str(tmp_path / 'tool.db')
+    db = DatabaseManager(db_path)
+    db.add_finance_record("expense", 100, "房租")
+    corrupt_ledger(db, 'UPDATE finance_balance SET total_expense = 0 WHERE id = 1')
+    db.close()
+
+    assert not verify_finance_balance(db_path)
+    assert verify_finance_balance(db_path, repair=True)
+    assert verify_finance_balance(db_path)
+
+
+def assert_rollups_match(db: DatabaseManager):
+    """触发器维护的汇总表与 ROLLUP_BACKFILL 按明细重新汇总的结果一致"""
+    with db._pool.reader() as conn:
+        for sql in ROLLUP_BACKFILL:
+            if 'SELECT' not in sql:
+                continue
+            table = sql.split()[2]
+            stored = sorted(conn.execute(f'SELECT * FROM {table}').fetchall())
+            expected = sorted(conn.execute(sql[sql.index('SELECT'):]).fetchall())
+            assert stored == expected, table
+
+
+def test_rollups_follow_updates_and_deletes(db):
+    """修改金额、日期、分类、类型以及删除记录后，每日汇总与全量重建一致"""
+    with db._pool.writer() as conn:
+        conn.executemany(
+            "INSERT INTO finance_records (type, amount, category, created_at) VALUES (?, ?, ?, ?)",
+            [('income', 100, '工资', '2024-01-01 09:00:00'),
+             ('expense', 30.5, '餐饮', '2024-01-01 12:00:00'),
+             ('expense', 20, '餐饮', '2024-01-01 18:00:00'),
+             ('expense', 15, '交通', '2024-01-02 08:00:00'),
+             ('expense', 8, None, '2024-01-03 08:00:00')]
+        )
+        ids = [row[0] for row in conn.execute('SELECT id FROM finance_records ORDER BY id')]
+    assert_rollups_match(db)
+
+    with db._pool.writer() as conn:
+        conn.execute('UPDATE finance_records SET amount = 45.25 WHERE id = ?', (ids[1],))
+        # 移入已有的分组
+        conn.execute("UPDATE finance_records SET created_at = '2024-01-02 18:00:00', category = '交通' WHERE id = ?",
+                     (ids[2],))
+        conn.execute('UPDATE finance_records SET category = NULL WHERE id = ?', (ids[3],))
+        conn.execute("UPDATE finance_records SET type = 'expense' WHERE id = ?", (ids[0],))
+    assert_rollups_match(db)
+    day = db.get_daily_rollups('2024-01-02', '2024-01-03')[0]
+    assert day['expense'] == 35 and day['categories'] == {'交通': -20, '其他': -15}
+
+    # 分组清空时汇总行一并删除
+    with db._pool.writer() as conn:
+        conn.executemany('DELETE FROM finance_records WHERE id = ?', [(ids[1],), (ids[4],)])
+    assert_rollups_match(db)
+    assert [day['day'] for day in db.get_daily_rollups('2024-01-01', '2024-01-04')] == ['2024-01-01', '2024-01-02']
+
+    assert db.rebuild_daily_rollups()
+    assert_rollups_match(db)
+
+
+def test_task_rollups_follow_deletes(db):
+    """删除修炼记录、当天完成后取消，每日汇总与全量重建一致"""
+    with db._pool.writer() as conn:
+        task_ids = [row[0] for row in conn.execute('SELECT id FROM tasks ORDER BY id LIMIT 2')]
+        conn.executemany(
+            "INSERT INTO task_records (task_id, completed_at, spirit_change, blood_change) VALUES (?, ?, ?, ?)",
+            [(task_ids[0], '2024-01-01 07:00:00', 1, 0),
+             (task_ids[1], '2024-01-01 07:30:00', 1, 1),
+             (task_ids[1], '2024-01-02 07:30:00', 1, 1)]
+        )
+    assert_rollups_match(db)
+
+    db.delete_task(task_ids[1])
+    assert_rollups_match(db)
+    days = db.get_daily_rollups('2024-01-01', '2024-01-03')
+    assert [(day['day'], day['tasks_completed']) for day in days] == [('2024-01-01', 1)]
+
+    db.complete_task(task_ids[0], 2, 1)
+    assert_rollups_match(db)
+    db.uncomplete_task(task_ids[0], 2, 1)
+    assert_rollups_match(db)
+
+
+def add_secret_art(db: DatabaseManager, name: str, nodes: list, completed: list) -> int:
+    realm_data = db.load_jingjie_data()
+    realm_data["secret_arts"][name] = {"nodes": nodes, "completed": completed}
+    db.save_jingjie_data(realm_data)
+    return realm_data["secret_arts"][name]["id"]
+
+
+def node_completed_at(db: DatabaseManager, skill_id: int, ordinal: int):
+    with db._pool.reader() as conn:
+        return conn.execute('SELECT completed_at FROM skill_nodes WHERE skill_id = ? AND ordinal = ?',
+                            (skill_id, ordinal)).fetchone()[0]
+
+
+def test_skill_node_completion_order(db):
+    """单节点勾选只更新一行，completed 按完成先后排列；重复勾选保留完成时间，取消勾选清空"""
+    skill_id = add_secret_art(db, "顺序秘术", ["甲", "乙", "丙"], ["丙"])
+    with db._pool.writer() as conn:
+        conn.execute("UPDATE skill_nodes SET completed_at = '2020-01-01 00:00:00' "
+                     "WHERE skill_id = ? AND completed_at IS NOT NULL", (skill_id,))
+
+    assert db.set_skill_node_completed(skill_id, 0, True)
+    assert db.load_jingjie_data()["secret_arts"]["顺序秘术"]["completed"] == ["丙", "甲"]
+
+    assert db.set_skill_node_completed(skill_id, 2, True)
+    assert node_completed_at(db, skill_id, 2) == '2020-01-01 00:00:00'
+    assert db.set_skill_node_completed(skill_id, 2, False)
+    assert node_completed_at(db, skill_id, 2) is None
+    assert db.load_jingjie_data()["secret_arts"]["顺序秘术"]["completed"] == ["甲"]
+
+    assert not db.set_skill_node_completed(skill_id, 9, True)
+
+
+def test_duplicate_node_names_toggle_by_ordinal(db):
+    """同名节点按序号勾选，completed_ordinals 区分勾选的是哪一个"""
+    skill_id = add_secret_art(db, "重名秘术", ["一", "二", "一"], [])
+
+    assert db.set_skill_node_completed(skill_id, 2, True)
+    skill = db.load_jingjie_data()["secret_arts"]["重名秘术"]
+    assert skill["completed"] == ["一"] and skill["completed_ordinals"] == [2]
+    assert node_completed_at(db, skill_id, 0) is None
+
+    assert db.set_skill_node_completed(skill_id, 0, True)
+    assert db.set_skill_node_completed(skill_id, 2, False)
+    assert db.load_jingjie_data()["secret_arts"]["重名秘术"]["completed_ordinals"] == [0]
+
+
+def test_structural_save_keeps_ids_and_completion_times(db):
+    """整体保存（增删节点、技能）不改变已有技能的 id 与已完成节点的完成时间"""
+    skill_id = add_secret_art(db, "保留秘术", ["一", "二", "一"], [])
+    other_id = add_secret_art(db, "另一秘术", ["甲"], [])
+    assert db.set_skill_node_completed(skill_id, 2, True)
+    with db._pool.writer() as conn:
+        conn.execute("UPDATE skill_nodes SET completed_at = '2020-01-01 00:00:00' "
+                     "WHERE skill_id = ? AND completed_at IS NOT NULL", (skill_id,))
+
+    realm_data = db.load_jingjie_data()
+    realm_data["secret_arts"]["保留秘术"]["nodes"].append("三")
+    realm_data["secret_arts"]["新秘术"] = {"nodes": ["乙"], "completed": []}
+    assert db.save_jingjie_data(realm_data)
+
+    arts = db.load_jingjie_data()["secret_arts"]
+    assert arts["保留秘术"]["id"] == skill_id and arts["另一秘术"]["id"] == other_id
+    assert arts["新秘术"]["id"] not in (skill_id, other_id)
+    assert arts["保留秘术"]["nodes"] == ["一", "二", "一", "三"]
+    assert arts["保留秘术"]["completed_ordinals"] == [2]
+    assert node_completed_at(db, skill_id, 2) == '2020-01-01 00:00:00'
+
+
+def test_close_friend_status_writes_only_changed_rows(db):
+    """反复添加朋友任务只改写密友状态变化的朋友，其他朋友不进入变更日志"""
+    friend_ids = [db.add_friend(name, "道友") for name in ("韩立", "南宫婉", "厉飞雨")]
+    version = db.get_changes_since(0).version
+
+    for i in range(12):
+        assert db.add_friend_task(friend_ids[0], f"论道{i}", "spirit", 1)
+    changes = db.get_changes_since(version, tables=('friends',)).changes
+    # 第 11 个任务时成为密友，只此一次更新
+    assert [(change.row_id, change.op) for change in changes] == [(friend_ids[0], 'U')]
+    close = {friend.id for friend in db.get_friends() if friend.is_close_friend}
+    assert close == {friend_ids[0]}
+
+    # 任务减少到阈值以下时取消密友
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM friend_tasks WHERE friend_id = ? AND task_name IN (?, ?)',
+                     (friend_ids[0], "论道0", "论道1"))
+    assert db.auto_update_close_friend_status()
+    assert not [f for f in db.get_friends() if f.is_close_friend]
+
+
+def test_fixed_items_with_same_name_are_totalled_separately(db):
+    """同名的固定收支项分别计入合计，编辑其中一项不影响另一项"""
+    assert db.add_fixed_item("洞府租金", "expense", 1500)
+    assert db.add_fixed_item("洞府租金", "expense", 800)
+    assert db.add_fixed_item("工资", "income", 5000)
+    fixed_items = db.get_fixed_items()
+    rent = [item for item in fixed_items['raw_items'] if item.name == "洞府租金"]
+    assert len(rent) == 2
+    assert sum(fixed_items['expense'].values()) == sum(
+        item.amount for item in fixed_items['raw_items'] if item.type == 'expense')
+    assert {fixed_items['expense'][item.id] for item in rent} == {1500, 800}
+
+    assert db.update_fixed_item(rent[1].id, "洞府租金", 900)
+    assert {amount for item_id, amount in db.get_fixed_items()['expense'].items()
+            if item_id in {item.id for item in rent}} == {1500, 900}
+
+
+def test_import_skips_rows_repeated_within_file(db, tmp_path):
+    """文件内重复的行只导入一次，每日汇总与账本按导入后的明细重建"""
+    csv_path = tmp_path / 'bank.csv'
+    csv_path.write_text("交易时间,金额,分类,备注\n"
+                        "2024/03/01 12:00,-30.50,餐饮,午饭\n"
+                        "2024/03/01 12:00,-30.50,餐饮,午饭\n"
+                        "2024/03/02 09:00,100,工资,\n"
+                        "2024/03/02 09:00,100,工资,\n"
+                        "2024/03/02 18:00,-20,餐饮,晚饭\n", encoding='utf-8')
+
+    result = db.import_finance_records(str(csv_path))
+    assert (result['inserted'], result['duplicates']) == (3, 2)
+    assert db.import_finance_records(str(csv_path))['inserted'] == 0
+    assert_rollups_match(db)
+    assert not db.verify_finance_balance()['has_drift']
+
+    kept = db.import_finance_records(str(csv_path), skip_duplicates=False)
+    assert kept['inserted'] == 5
+    assert_rollups_match(db)
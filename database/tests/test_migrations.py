@@ -0,0 +1,123 @@
+"""
+迁移引擎测试：基线数据库逐步升级到最新版本，已是最新时的快速路径
+"""
+import json
+import sqlite3
+
+from database.connection import ConnectionPool
+from database.db_manager import DatabaseManager
+from database.migrations import (
+    MIGRATIONS, SCHEMA_VERSION, _create_base_schema, _seed_default_data, get_schema_version, migrate
+)
+
+
+def make_baseline_db(db_path: str):
+    """迁移引擎之前的数据库：user_version 为 0，skills 不支持副本类型，已有收支、修炼记录和技能"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE skills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            realm_id INTEGER,
+            skill_type TEXT NOT NULL CHECK(skill_type IN ('gongfa', 'secret_art')),
+            nodes_json TEXT NOT NULL,
+            completed_json TEXT DEFAULT '[]',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor = conn.cursor()
+    _create_base_schema(cursor)
+    _seed_default_data(cursor)
+    conn.executemany(
+        "INSERT INTO finance_records (type, amount, category, description, created_at) VALUES (?, ?, ?, ?, ?)",
+        [('income', 100, '工资', '旧库工资', '2023-05-01 09:00:00'),
+         ('expense', 30, '餐饮', '旧库午饭', '2023-05-01 12:00:00')]
+    )
+    conn.execute("INSERT INTO task_records (task_id, completed_at, spirit_change, blood_change) "
+                 "VALUES (1, '2023-05-01 07:00:00', 1, 0)")
+    conn.execute("INSERT INTO skills (name, skill_type, nodes_json, completed_json, created_at) "
+                 "VALUES (?, 'secret_art', ?, ?, '2020-01-01 00:00:00')",
+                 ("旧秘术", json.dumps(["一", "二"]), json.dumps(["二"])))
+    conn.commit()
+    assert get_schema_version(conn) == 0
+    conn.close()
+
+
+def test_baseline_upgrades_through_every_step(tmp_path):
+    """打开基线数据库时依次执行全部迁移，数据保留并补齐账本、汇总与节点明细"""
+    db_path = str(tmp_path / 'baseline.db')
+    make_baseline_db(db_path)
+
+    db = DatabaseManager(db_path)
+    with db._pool.reader() as conn:
+        assert get_schema_version(conn) == SCHEMA_VERSION == MIGRATIONS[-1].version
+        skills_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'skills'").fetchone()[0]
+        skills = conn.execute('SELECT name, created_at FROM skills').fetchall()
+        # 默认任务没有重复写入
+        assert conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] == 12
+    assert "'fuben'" in skills_sql
+    assert skills == [("旧秘术", '2020-01-01 00:00:00')]
+    with db._pool.reader() as conn:
+        nodes = conn.execute('SELECT ordinal, name, completed_at FROM skill_nodes ORDER BY ordinal').fetchall()
+    assert nodes == [(0, "一", None), (1, "二", '2020-01-01 00:00:00')]
+
+    balance = db.get_finance_balance()
+    assert (balance['income'], balance['expense'], balance['record_count']) == (100, 30, 2)
+    assert not db.verify_finance_balance()['has_drift']
+    day = db.get_daily_rollups('2023-05-01', '2023-05-02')
+    assert len(day) == 1 and (day[0]['income'], day[0]['expense'], day[0]['tasks_completed']) == (100, 30, 1)
+
+    # 升级后可以写入副本类型
+    with db._pool.writer() as conn:
+        conn.execute("INSERT INTO skills (name, skill_type, nodes_json) VALUES ('新副本', 'fuben', '[]')")
+    db.close()
+
+
+def test_migrate_stops_at_target_version(tmp_path):
+    """target_version 之后的迁移不执行，之后可以继续升级"""
+    pool = ConnectionPool(str(tmp_path / 'partial.db'))
+    assert migrate(pool, 2) == [1, 2]
+    assert migrate(pool) == [m.version for m in MIGRATIONS if m.version > 2]
+    pool.close()
+
+
+def test_current_schema_fast_path(tmp_path):
+    """已是最新版本时只读取 user_version，不开启写事务"""
+    db_path = str(tmp_path / 'current.db')
+    DatabaseManager(db_path).close()
+
+    pool = ConnectionPool(db_path)
+    assert migrate(pool) == []
+    assert pool._writer is None
+    pool.close()
+
+
+def test_skill_nodes_from_json_with_duplicate_names(tmp_path):
+    """nodes_json 展开为 skill_nodes：同名节点按出现顺序匹配 completed_json，完成时间取技能创建时间"""
+    db_path = str(tmp_path / 'nodes.db')
+    pool = ConnectionPool(db_path)
+    migrate(pool, 5)
+    with pool.writer() as conn:
+        conn.executemany(
+            "INSERT INTO skills (name, skill_type, nodes_json, completed_json, created_at) "
+            "VALUES (?, 'secret_art', ?, ?, '2020-01-01 00:00:00')",
+            [("重名秘术", json.dumps(["一", "二", "一", "一"]), json.dumps(["一", "一"])),
+             ("损坏秘术", "[", "[]")]
+        )
+    pool.close()
+
+    db = DatabaseManager(db_path)
+    with db._pool.reader() as conn:
+        rows = conn.execute('''
+            SELECT s.name, n.ordinal, n.name, n.completed_at FROM skill_nodes n
+            JOIN skills s ON s.id = n.skill_id ORDER BY s.id, n.ordinal
+        ''').fetchall()
+    assert rows == [("重名秘术", 0, "一", '2020-01-01 00:00:00'),
+                    ("重名秘术", 1, "二", None),
+                    ("重名秘术", 2, "一", '2020-01-01 00:00:00'),
+                    ("重名秘术", 3, "一", None)]
+
+    skill = db.load_jingjie_data()["secret_arts"]["重名秘术"]
+    assert skill["nodes"] == ["一", "二", "一", "一"] and skill["completed"] == ["一", "一"]
+    assert skill["completed_ordinals"] == [0, 2]
+    db.close()
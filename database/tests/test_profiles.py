@@ -0,0 +1,60 @@
+"""
+ProfileRegistry 测试：档案创建不阻塞注册表
+"""
+import threading
+
+import pytest
+
+import database.profiles
+from database.profiles import Profile, ProfileRegistry
+
+
+@pytest.fixture
+def slow_profiles(monkeypatch):
+    """创建名为 slow 的档案时停在数据库打开之前，直到 release_slow 被设置"""
+    entered_slow = threading.Event()
+    release_slow = threading.Event()
+
+    class SlowProfile(Profile):
+        def __init__(self, name, db_path):
+            if name == 'slow':
+                entered_slow.set()
+                assert release_slow.wait(10)
+            super().__init__(name, db_path)
+
+    monkeypatch.setattr(database.profiles, 'Profile', SlowProfile)
+    return entered_slow, release_slow
+
+
+def test_opening_profile_does_not_block_other_profiles(tmp_path, slow_profiles):
+    """一个档案打开数据库期间，其他档案照常获取与释放，同名档案等待并共享同一实例"""
+    entered_slow, release_slow = slow_profiles
+    registry = ProfileRegistry(str(tmp_path / 'main.db'))
+    acquired = []
+
+    def acquire_slow():
+        acquired.append(registry.acquire('slow'))
+
+    threads = [threading.Thread(target=acquire_slow) for _ in range(2)]
+    try:
+        threads[0].start()
+        assert entered_slow.wait(10)
+        threads[1].start()
+
+        # slow 档案仍在创建，其他档案不等待注册表锁
+        other = threading.Thread(target=lambda: registry.release(registry.acquire('other')))
+        other.start()
+        other.join(5)
+        assert not other.is_alive()
+        assert registry.active_profiles() == {}
+    finally:
+        release_slow.set()
+        for thread in threads:
+            if thread.ident is not None:
+                thread.join(10)
+
+    assert len(acquired) == 2 and acquired[0] is acquired[1]
+    assert registry.active_profiles() == {'slow': 2}
+    registry.release(acquired[0])
+    registry.release(acquired[1])
+    assert registry.active_profiles() == {}
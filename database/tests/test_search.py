@@ -0,0 +1,53 @@
+"""
+全文索引同步测试：只有索引用到的文本列更新时才重新分词
+"""
+import pytest
+
+from database.connection import ConnectionPool
+from database.db_manager import DatabaseManager
+from database.search import search_tokens
+
+
+@pytest.fixture
+def tokenized(monkeypatch):
+    """记录触发器调用 search_tokens 的次数（连接创建时注册的 SQL 函数换成计数版本）"""
+    calls = []
+
+    def counting_search_tokens(text):
+        calls.append(text)
+        return search_tokens(text)
+
+    monkeypatch.setattr(ConnectionPool, 'SQL_FUNCTIONS', (('search_tokens', 1, counting_search_tokens),))
+    return calls
+
+
+@pytest.fixture
+def db(tmp_path, tokenized):
+    manager = DatabaseManager(str(tmp_path / 'search.db'))
+    yield manager
+    manager.close()
+
+
+def test_non_text_update_skips_search_index(db, tokenized):
+    """联系时间、密友标记、金额等非文本列的更新不重新分词"""
+    friend_id = db.add_friend("韩立", "道友", notes="掌天瓶")
+    db.add_finance_record("expense", 12, "餐饮", "灵米饭")
+    tokenized.clear()
+
+    assert db.update_friend_last_contact(friend_id, "2024-01-01")
+    assert db.auto_update_close_friend_status()
+    with db.transaction() as conn:
+        conn.execute('UPDATE finance_records SET amount = 15')
+    assert tokenized == []
+    assert [r.text for r in db.search("掌天瓶", sources=('friend',))] == ["韩立"]
+
+
+def test_text_update_reindexes_row(db, tokenized):
+    """索引列更新时该行重新分词，旧内容不再命中"""
+    friend_id = db.add_friend("韩立", "道友", notes="掌天瓶")
+    tokenized.clear()
+
+    assert db.update_friend(friend_id, "韩立", "道友", notes="青竹蜂云剑")
+    assert len(tokenized) == 1
+    assert [r.text for r in db.search("青竹", sources=('friend',))] == ["韩立"]
+    assert db.search("掌天瓶", sources=('friend',)) == []
@@ -0,0 +1,51 @@
+"""
+状态时间序列 - 心境、寿元、灵石余额的快照与降采样
+
+状态变化时由触发器在同一事务内记录快照，同时写入三个精度层：原始（每次变化一行）、
+小时、天。小时层和天层每个时间桶只有一行，保存桶内最后一次变化后的状态和变化次数；
+原始层和小时层只保留最近一段时间，天层永久保留。
+
+趋势图按查询跨度选择精度层，跨度超过天层点数上限时再按周、月合并，
+7 天、90 天和多年的图表都只读取几百个点。时间桶为 UTC，与 CURRENT_TIMESTAMP 一致。
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+
+# 精度层 -> (编号, 时间桶格式（SQLite strftime 与 Python 通用）, 保留时长（SQLite 时间修饰符，None 为永久）)
+SERIES_TIERS: Dict[str, Tuple[int, str, Optional[str]]] = {
+    'raw': (0, '%Y-%m-%d %H:%M:%S', '-2 days'),
+    'hourly': (1, '%Y-%m-%d %H:00:00', '-31 days'),
+    'daily': (2, '%Y-%m-%d', None),
+}
+
+# 一张趋势图最多读取的点数
+MAX_TREND_POINTS = 400
+
+# 天层再合并时的分组格式：周、月
+WEEK_GROUP = '%Y-%W'
+MONTH_GROUP = '%Y-%m'
+
+
+def choose_tier(days: int) -> Tuple[str, Optional[str]]:
+    """按查询跨度选择精度层，返回 (精度层, 再分组格式)，不需要再分组时格式为 None"""
+    if days <= 1:
+        return 'raw', None
+    if days * 24 <= MAX_TREND_POINTS:
+        return 'hourly', None
+    return 'daily', trend_group(days)
+
+
+def trend_group(days: int) -> Optional[str]:
+    """按天汇总的数据在跨度较长时的合并格式"""
+    if days <= MAX_TREND_POINTS:
+        return None
+    if days / 7 <= MAX_TREND_POINTS:
+        return WEEK_GROUP
+    return MONTH_GROUP
+
+
+def range_start(tier: str, days: int, now: datetime = None) -> str:
+    """查询起点所在的时间桶（含）"""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    return (now - timedelta(days=days)).strftime(SERIES_TIERS[tier][1])
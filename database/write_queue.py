@@ -0,0 +1,163 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from database.connection import ConnectionPool
+
+
+class _WriteJob:
+    """队列中的一次写入，合并后的多个调用方共享同一结果"""
+
+    __slots__ = ('fn', 'args', 'kwargs', 'futures')
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.futures = [Future()]
+
+    def run(self):
+        return self.fn(*self.args, **self.kwargs)
+
+    def resolve(self, result):
+        for future in self.futures:
+            future.set_result(result)
+
+    def fail(self, error: BaseException):
+        for future in self.futures:
+            future.set_exception(error)
+
+
+class WriteQueue:
+    """单写线程的后台写入队列
+
+    UI 线程通过 submit 提交写操作后立即返回 Future，由唯一的写线程按批次在
+    一个事务中执行，避免在 Flet 事件线程上等待 SQLite 提交。
+
+    - 带 key 的写入在执行前会与队列中同 key 的写入合并：默认后者覆盖前者，
+      提供 merge 时由 merge(旧参数, 新参数) 计算合并后的参数（如累加增量）
+    - 队列长度有上限，写满时 submit 阻塞等待，形成背压
+    - 批量事务失败时逐条重试，出错的写入只影响它自己的 Future
+    - flush 等待已提交的写入全部落盘，close 在关闭前先 flush
+    """
+
+    def __init__(self, pool: ConnectionPool, maxsize: int = 256, batch_size: int = 64,
+                 linger: float = 0.02):
+        self._pool = pool
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.linger = linger  # 取批前短暂等待，让连续的写入有机会合并
+
+        self._pending = OrderedDict()  # key -> _WriteJob，按提交顺序执行
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._thread = None
+        self._closed = False
+
+    def submit(self, fn, *args, key=None, merge=None, **kwargs) -> Future:
+        """提交一次写操作，fn(*args, **kwargs) 将在写线程的事务中执行"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("写入队列已关闭")
+
+            job = self._pending.get(key) if key is not None else None
+            if job is not None:
+                if merge is not None:
+                    job.args = merge(job.args, args)
+                else:
+                    job.fn, job.args, job.kwargs = fn, args, kwargs
+                future = Future()
+                job.futures.append(future)
+                return future
+
+            while len(self._pending) >= self.maxsize and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                raise RuntimeError("写入队列已关闭")
+
+            job = _WriteJob(fn, args, kwargs)
+            self._pending[key if key is not None else ('_seq', next(self._seq))] = job
+            self._ensure_thread()
+            self._cond.notify_all()
+            return job.futures[0]
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待已提交的写入全部执行完毕，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                if self._thread is None or not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float = None):
+        """写完队列中剩余的写入后停止写线程，应用退出时调用"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def _ensure_thread(self):
+        """首次提交时启动写线程，调用方需持有 _cond"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # 已关闭且队列为空
+
+            if self.linger and not self._closed:
+                time.sleep(self.linger)
+
+            with self._cond:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popitem(last=False)[1])
+                self._in_flight = len(batch)
+                self._cond.notify_all()  # 唤醒因队列已满而等待的提交者
+
+            self._execute(batch)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _execute(self, batch: list):
+        """在一个事务中执行整批写入，失败时逐条重试以隔离出错的写入"""
+        try:
+            with self._pool.writer():
+                results = [job.run() for job in batch]
+        except Exception:
+            for job in batch:
+                try:
+                    with self._pool.writer():
+                        result = job.run()
+                except Exception as e:
+                    print(f"后台写入错误: {e}")
+                    job.fail(e)
+                else:
+                    job.resolve(result)
+            return
+
+        for job, result in zip(batch, results):
+            job.resolve(result)
@@ -0,0 +1,63 @@
+"""
+灵石流水批量导入工具 - 从银行/记账软件导出的 CSV、JSON 导入历史收支记录
+
+用法：
+    python import_finance_records.py 账单.csv
+    python import_finance_records.py 账单.csv --map amount=交易金额 --map created_at=交易时间
+    python import_finance_records.py 账单.jsonl --encoding gbk --db PATH
+"""
+import argparse
+import sys
+import time
+
+from database.db_manager import DatabaseManager
+
+
+def import_finance_records(path: str, column_map: dict = None, db_path: str = None,
+                           encoding: str = 'utf-8-sig', allow_duplicates: bool = False) -> bool:
+    """导入收支记录并打印结果，有记录导入或全部为重复时返回True"""
+    db = DatabaseManager(db_path)
+    started = time.time()
+
+    def progress(stage, count):
+        labels = {'reading': '已读取', 'inserting': '写入中', 'rebuilding': '重建汇总', 'done': '已导入'}
+        print(f"\r{labels.get(stage, stage)}: {count:,} 行", end='', flush=True)
+
+    try:
+        result = db.import_finance_records(
+            path, column_map=column_map, encoding=encoding,
+            skip_duplicates=not allow_duplicates, progress_callback=progress
+        )
+    finally:
+        db.close()
+
+    print(f"\n\n读取 {result['read']:,} 行，导入 {result['inserted']:,} 条，"
+          f"重复 {result['duplicates']:,} 条，无效 {result['invalid']:,} 行，用时 {time.time() - started:.1f} 秒")
+    for error in result['errors'][:20]:
+        print(f"  - {error}")
+    if len(result['errors']) > 20:
+        print(f"  ... 共 {len(result['errors'])} 条错误")
+
+    return result['inserted'] > 0 or (result['read'] > 0 and result['duplicates'] + result['invalid'] == result['read'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入历史收支记录")
+    parser.add_argument("path", help="CSV / JSON / JSON Lines 文件")
+    parser.add_argument("--map", action="append", default=[], metavar="字段=列名",
+                        help="指定列映射，字段为 type/amount/category/description/created_at")
+    parser.add_argument("--encoding", default="utf-8-sig", help="源文件编码（默认 utf-8）")
+    parser.add_argument("--allow-duplicates", action="store_true", help="不跳过与已有记录相同的行")
+    parser.add_argument("--db", default=None, help="数据库文件路径（默认使用应用数据目录）")
+    args = parser.parse_args()
+
+    column_map = dict(item.split('=', 1) for item in args.map)
+
+    print("=" * 50)
+    print("灵石流水批量导入工具")
+    print("=" * 50)
+
+    ok = import_finance_records(args.path, column_map, args.db, args.encoding, args.allow_duplicates)
+
+    print("=" * 50)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,61 @@
+"""
+离线同步工具 - 在手机版与电脑版的数据库之间用同步包文件交换变化
+
+用法：
+    python sync_bundle.py export 到手机.sync.json.gz          # 导出对端尚未收到的变化
+    python sync_bundle.py import 来自手机.sync.json.gz        # 导入对端的同步包
+    python sync_bundle.py status                             # 查看本机标识与同步进度
+    python sync_bundle.py reset-device                       # 数据库是从另一台设备复制来的时候执行
+
+第一次同步时两端各导出一次、各导入一次，之后每次只传递新的变化。
+"""
+import argparse
+import sys
+
+from database.db_manager import DatabaseManager
+
+
+def print_result(result: dict):
+    print(f"来自设备 {result['peer']}：写入 {result['applied']} 行，删除 {result['deleted']} 行，"
+          f"保留本地较新的修改 {result['kept']} 行，跳过 {result['skipped']} 行")
+    if result['stale']:
+        print("  该同步包已导入过更新的版本，只更新了同步进度")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="手机与电脑之间的离线同步")
+    parser.add_argument("command", choices=["export", "import", "status", "reset-device"])
+    parser.add_argument("path", nargs="?", help="同步包文件（export 时省略则写到数据库目录下的 sync/）")
+    parser.add_argument("--peer", default=None, help="导出给哪台设备（只同步过一台设备时可省略）")
+    parser.add_argument("--db", default=None, help="数据库文件路径（默认使用应用数据目录）")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    ok = True
+    try:
+        if args.command == "export":
+            exported = db.export_sync_bundle(args.path, args.peer)
+            ok = exported is not None
+            if ok:
+                target = exported['peer'] or "新设备（全部数据）"
+                print(f"已导出 {exported['changes']} 项变化给 {target}: {exported['path']}")
+        elif args.command == "import":
+            if not args.path:
+                parser.error("import 需要指定同步包文件")
+            result = db.import_sync_bundle(args.path)
+            ok = result is not None
+            if ok:
+                print_result(result)
+        elif args.command == "status":
+            status = db.get_sync_status()
+            print(f"本机设备: {status['device_id']}")
+            for peer in status['peers']:
+                print(f"  {peer['peer_id']}: 上次同步 {peer['synced_at']}，待导出 {peer['pending']} 项")
+            if not status['peers']:
+                print("  尚未与其他设备同步")
+        else:
+            print(f"本机新的设备标识: {db.reset_sync_device()}")
+    finally:
+        db.close()
+
+    sys.exit(0 if ok else 1)
@@ -1,4 +1,5 @@
 # systems/jingjie.py - 境界系统
+import copy
 import flet as ft
 from database.db_manager import DatabaseManager
 from config import GameConfig, ThemeConfig
@@ -7,34 +8,112 @@ from typing import List, Dict
 class JingjieSystem:
     """境界系统 - 分为功法和秘术两大栏目"""
     
-    # 类级别状态数据，所有实例共享
-    _current_tab_index = 0  # 保存当前Tab索引：0=功法，1=秘术，2=副本
-
-    # 数据结构
-    _realm_data = {
-        # 功法系统：用户自定义境界，按顺序解锁
-        "gongfa": {
-            "realms": [],  # 有序的境界列表 [{"name": "练气期", "skills": {}, "completed": False}, ...]
-            "current_realm_index": 0  # 当前境界索引
-        },
-        # 秘术系统：独立的特长技能
-        "secret_arts": {},
-        # 副本系统：类似秘术的独立技能系统
-        "fuben": {}
-    }
-        
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
-        
-        # 从数据库加载境界数据
-        loaded_data = self.db.load_jingjie_data()
-        JingjieSystem._realm_data = loaded_data
-        self.realm_data = JingjieSystem._realm_data
+
+        # 状态属于实例（即一个会话），服务器模式下多个会话、多个档案互不影响
+        self._current_tab_index = 0  # 保存当前Tab索引：0=功法，1=秘术，2=副本
+
+        # 从数据库加载境界数据，结构：
+        # {
+        #     "gongfa": {  # 功法系统：用户自定义境界，按顺序解锁
+        #         "realms": [],  # 有序的境界列表 [{"name": "练气期", "skills": {}, "completed": False}, ...]
+        #         "current_realm_index": 0  # 当前境界索引
+        #     },
+        #     "secret_arts": {},  # 秘术系统：独立的特长技能
+        #     "fuben": {}  # 副本系统：类似秘术的独立技能系统
+        # }
+        self.realm_data = self.db.load_jingjie_data()
 
     def _save_data(self):
         """保存境界数据到数据库"""
         if hasattr(self, 'db'):
             self.db.save_jingjie_data(self.realm_data)
+
+    def _node_saver(self, skill_data: dict, ordinal: int):
+        """在 UI 线程中取出第 ordinal 个节点的状态，返回在写线程中只保存该节点的函数
+
+        写线程执行时界面可能已再次修改 skill_data，因此不能在写线程中读取它。
+        """
+        skill_id = skill_data.get("id")
+        if skill_id is None:
+            # 尚未入库的技能，退回整体保存此刻的境界数据副本
+            snapshot = copy.deepcopy(self.realm_data)
+            return lambda: self.db.save_jingjie_data(snapshot)
+        completed = self._is_node_completed(skill_data, ordinal)
+        return lambda: self.db.set_skill_node_completed(skill_id, ordinal, completed)
+
+    def _watch_node_write(self, page, future, refresh: bool = False):
+        """节点写入完成时（写线程中回调）回到 UI 事件循环处理结果
+
+        失败时提示错误，并从数据库重新加载，使界面与数据库一致；refresh 为真时写入成功后刷新页面，
+        页面按数据库重新构建，必须等写入提交后再刷新，否则会显示切换前的状态。
+        """
+        if future is None:
+            return
+
+        def on_done(f):
+            error = f.exception()
+            if error is None and not refresh:
+                return
+
+            async def update_ui():
+                if error is not None:
+                    print(f"保存境界节点失败: {error}")
+                    self.realm_data = self.db.load_jingjie_data()
+                if self.refresh_callback:
+                    self.refresh_callback()
+                if error is not None:
+                    self._show_error_dialog(page, f"保存失败，已重新加载: {error}")
+
+            try:
+                page.run_task(update_ui)
+            except Exception:
+                pass  # 页面可能已关闭
+
+        future.add_done_callback(on_done)
+
+    def _show_error_dialog(self, page, message: str):
+        """显示错误对话框"""
+        def close_dialog(e):
+            error_dialog.open = False
+            page.update()
+
+        error_dialog = ft.AlertDialog(
+            title=ft.Text("错误", color=ThemeConfig.DANGER_COLOR),
+            content=ft.Text(message),
+            actions=[
+                ft.TextButton("确定", on_click=close_dialog),
+            ],
+        )
+
+        page.dialog = error_dialog
+        error_dialog.open = True
+        page.update()
+
+    @staticmethod
+    def _is_node_completed(skill_data: dict, ordinal: int) -> bool:
+        """第 ordinal 个节点是否已完成：有 completed_ordinals 时按序号，否则按名称（同名节点依次匹配）"""
+        ordinals = skill_data.get("completed_ordinals")
+        if ordinals is not None:
+            return ordinal in ordinals
+        nodes = skill_data.get("nodes", [])
+        node = nodes[ordinal]
+        return nodes[:ordinal + 1].count(node) <= skill_data.get("completed", []).count(node)
+
+    @staticmethod
+    def _set_node_completed(skill_data: dict, ordinal: int, completed: bool):
+        """在内存中勾选/取消第 ordinal 个节点，同时维护 completed 名称列表与 completed_ordinals"""
+        node = skill_data["nodes"][ordinal]
+        ordinals = skill_data.get("completed_ordinals")
+        if completed:
+            skill_data["completed"].append(node)
+            if ordinals is not None:
+                ordinals.append(ordinal)
+        else:
+            skill_data["completed"].remove(node)
+            if ordinals is not None:
+                ordinals.remove(ordinal)
     
     def get_current_realm(self) -> str:
         """获取当前境界名称"""
@@ -132,12 +211,11 @@ class JingjieSystem:
     def _create_and_complete_task(self, name: str, category: str, spirit_effect: int, blood_effect: int):
         """创建境界任务并立即完成，用于在主页显示"""
         try:
-            self.db.add_task(name, category, spirit_effect, blood_effect)
-            tasks = self.db.get_tasks()
-            if tasks:
-                latest_task = max(tasks, key=lambda t: t.id)
-                self.db.complete_task(latest_task.id, spirit_effect, blood_effect)
-                print(f"境界修炼记录已添加到今日修炼: {name}")
+            with self.db.transaction():
+                task_id = self.db.add_task(name, category, spirit_effect, blood_effect)
+                if task_id is not None:
+                    self.db.complete_task(task_id, spirit_effect, blood_effect)
+            print(f"境界修炼记录已添加到今日修炼: {name}")
         except Exception as e:
             print(f"创建境界任务记录时出错: {e}")
     
@@ -158,11 +236,11 @@ class JingjieSystem:
         return "#999999"
     
     def _on_tab_change(self, e):
-        """Tab切换时保存当前索引到类级别变量"""
-        JingjieSystem._current_tab_index = e.control.selected_index
+        """Tab切换时保存当前索引"""
+        self._current_tab_index = e.control.selected_index
     
-    def _toggle_node(self, realm_index: int, skill_name: str, node: str):
-        """切换功法节点完成状态"""
+    def _toggle_node(self, realm_index: int, skill_name: str, ordinal: int):
+        """切换功法节点完成状态，返回后台写入的 Future"""
         realms = self.realm_data["gongfa"]["realms"]
         if realm_index >= len(realms):
             print(f"未找到境界索引: {realm_index}")
@@ -175,24 +253,40 @@ class JingjieSystem:
             print(f"未找到技能数据: {realm['name']}/{skill_name}")
             return
         
-        # 记录是否是完成操作
-        is_completing = node not in skill_data["completed"]
-        
-        # 切换节点状态
-        if node in skill_data["completed"]:
-            skill_data["completed"].remove(node)
-        else:
-            skill_data["completed"].append(node)
-        
-        # 应用完成效果（仅当是完成操作时）
-        if is_completing:
-            self._apply_skill_completion_effects(realm["name"], skill_name, node, True)
+        # 记录是否是完成操作，切换节点状态
+        node = skill_data["nodes"][ordinal]
+        is_completing = not self._is_node_completed(skill_data, ordinal)
+        self._set_node_completed(skill_data, ordinal, is_completing)
         
         # 检查境界升级
+        gongfa = self.realm_data["gongfa"]
+        progress_before = (gongfa["current_realm_index"], [r.get("completed", False) for r in realms])
         self._try_realm_upgrade()
+        progress_after = (gongfa["current_realm_index"], [r.get("completed", False) for r in realms])
         
-        # 保存数据到数据库
-        self._save_data()
+        # 写入的内容在此取好副本：写线程执行时界面可能已再次切换
+        realm_name = realm["name"]
+        save_node = self._node_saver(skill_data, ordinal)
+        progress = None
+        if progress_after != progress_before:
+            progress = {"gongfa": {
+                "current_realm_index": progress_after[0],
+                "realms": [{"completed": done} for done in progress_after[1]],
+            }}
+
+        # 节点、修炼记录与境界进度在同一事务内由后台写线程保存，不阻塞界面
+        def persist():
+            with self.db.transaction():
+                # 应用完成效果（仅当是完成操作时）
+                if is_completing:
+                    self._apply_skill_completion_effects(realm_name, skill_name, node, True)
+
+                # 只写入该节点，境界有变化时再更新境界进度
+                save_node()
+                if progress:
+                    self.db.save_realm_progress(progress)
+
+        return self.db.writes.submit(persist)
 
     def create_jingjie_view(self, refresh_callback=None) -> ft.Column:
         """创建境界视图 - 功法和秘术两大栏目"""
@@ -249,7 +343,7 @@ class JingjieSystem:
                 # 功法、秘术、副本三大栏目
                 ft.Container(
                     content=ft.Tabs(
-                        selected_index=JingjieSystem._current_tab_index,
+                        selected_index=self._current_tab_index,
                         animation_duration=300,
                         on_change=self._on_tab_change,
                         tabs=[
@@ -486,19 +580,18 @@ class JingjieSystem:
     def _create_skill_card_simple(self, realm_name: str, skill_name: str, skill_data: dict, progress: float, is_current: bool, realm_index: int) -> ft.Container:
         """创建简单的技能卡片"""
         nodes = skill_data.get("nodes", [])
-        completed = skill_data.get("completed", [])
         
         # 创建节点复选框列表
         node_widgets = []
-        for node in nodes:
-            is_completed = node in completed
+        for ordinal, node in enumerate(nodes):
+            is_completed = self._is_node_completed(skill_data, ordinal)
             node_widgets.append(
                 ft.Row(
                     controls=[
                         ft.Checkbox(
                             value=is_completed,
                             fill_color=ThemeConfig.SUCCESS_COLOR if is_completed else None,
-                            on_change=lambda e, n=node: self._handle_node_toggle(e, realm_index, skill_name, n),
+                            on_change=lambda e, o=ordinal: self._handle_node_toggle(e, realm_index, skill_name, o),
                             disabled=not is_current,
                         ),
                         ft.Text(
@@ -573,9 +666,9 @@ class JingjieSystem:
             ),
         )
     
-    def _handle_node_toggle(self, e, realm_index: int, skill_name: str, node: str):
+    def _handle_node_toggle(self, e, realm_index: int, skill_name: str, ordinal: int):
         """处理节点切换事件"""
-        self._toggle_node(realm_index, skill_name, node)
+        self._watch_node_write(e.page, self._toggle_node(realm_index, skill_name, ordinal))
         # 只更新当前控件，保持下拉框展开状态
         e.control.update()
     
@@ -885,19 +978,18 @@ class JingjieSystem:
     def _create_secret_art_card_simple(self, art_name: str, art_data: dict, progress: float) -> ft.Container:
         """创建简单的秘术卡片"""
         nodes = art_data.get("nodes", [])
-        completed = art_data.get("completed", [])
         
         # 创建节点复选框列表
         node_widgets = []
-        for node in nodes:
-            is_completed = node in completed
+        for ordinal, node in enumerate(nodes):
+            is_completed = self._is_node_completed(art_data, ordinal)
             node_widgets.append(
                 ft.Row(
                     controls=[
                         ft.Checkbox(
                             value=is_completed,
                             fill_color=ThemeConfig.SUCCESS_COLOR if is_completed else None,
-                            on_change=lambda e, n=node: self._handle_secret_art_toggle(e, art_name, n),
+                            on_change=lambda e, o=ordinal: self._handle_secret_art_toggle(e, art_name, o),
                         ),
                         ft.Text(
                             node,
@@ -949,13 +1041,13 @@ class JingjieSystem:
             ),
         )
     
-    def _handle_secret_art_toggle(self, e, art_name: str, node: str):
+    def _handle_secret_art_toggle(self, e, art_name: str, ordinal: int):
         """处理秘术节点切换事件"""
-        self._toggle_secret_art_node(art_name, node)
+        self._watch_node_write(e.page, self._toggle_secret_art_node(art_name, ordinal))
         e.control.update()
     
-    def _toggle_secret_art_node(self, art_name: str, node: str):
-        """切换秘术节点完成状态"""
+    def _toggle_secret_art_node(self, art_name: str, ordinal: int):
+        """切换秘术节点完成状态，返回后台写入的 Future"""
         secret_arts = self.realm_data.get("secret_arts", {})
         art_data = secret_arts.get(art_name, {})
         
@@ -963,21 +1055,23 @@ class JingjieSystem:
             print(f"未找到秘术数据: {art_name}")
             return
         
-        # 记录是否是完成操作
-        is_completing = node not in art_data["completed"]
-        
-        # 切换节点状态
-        if node in art_data["completed"]:
-            art_data["completed"].remove(node)
-        else:
-            art_data["completed"].append(node)
-        
-        # 应用完成效果（仅当是完成操作时）
-        if is_completing:
-            self._apply_secret_art_effects(art_name, node, True)
+        # 记录是否是完成操作，切换节点状态
+        node = art_data["nodes"][ordinal]
+        is_completing = not self._is_node_completed(art_data, ordinal)
+        self._set_node_completed(art_data, ordinal, is_completing)
         
-        # 保存数据到数据库
-        self._save_data()
+        # 修炼记录与节点状态在同一事务内由后台写线程保存，不阻塞界面
+        save_node = self._node_saver(art_data, ordinal)
+
+        def persist():
+            with self.db.transaction():
+                # 应用完成效果（仅当是完成操作时）
+                if is_completing:
+                    self._apply_secret_art_effects(art_name, node, True)
+
+                save_node()
+
+        return self.db.writes.submit(persist)
     
     def _apply_secret_art_effects(self, art_name: str, node: str, completed: bool):
         """应用秘术完成的即时效果"""
@@ -1313,19 +1407,18 @@ class JingjieSystem:
     def _create_fuben_card(self, fuben_name: str, fuben_info: dict, progress: float) -> ft.Container:
         """创建副本卡片"""
         nodes = fuben_info.get("nodes", [])
-        completed = fuben_info.get("completed", [])
 
         # 创建节点复选框列表
         node_widgets = []
-        for node in nodes:
-            is_completed = node in completed
+        for ordinal, node in enumerate(nodes):
+            is_completed = self._is_node_completed(fuben_info, ordinal)
             node_widgets.append(
                 ft.Row(
                     controls=[
                         ft.Checkbox(
                             value=is_completed,
                             fill_color="#FF5722" if is_completed else None,
-                            on_change=lambda e, n=node: self._handle_fuben_toggle(e, fuben_name, n),
+                            on_change=lambda e, o=ordinal: self._handle_fuben_toggle(e, fuben_name, o),
                         ),
                         ft.Text(
                             node,
@@ -1393,14 +1486,12 @@ class JingjieSystem:
             border=ft.border.all(1.5, "#FFE5E0"),
         )
 
-    def _handle_fuben_toggle(self, e, fuben_name: str, node: str):
-        """处理副本节点切换事件"""
-        self._toggle_fuben_node(fuben_name, node)
-        if self.refresh_callback:
-            self.refresh_callback()
+    def _handle_fuben_toggle(self, e, fuben_name: str, ordinal: int):
+        """处理副本节点切换事件，写入提交后刷新页面"""
+        self._watch_node_write(e.page, self._toggle_fuben_node(fuben_name, ordinal), refresh=True)
 
-    def _toggle_fuben_node(self, fuben_name: str, node: str):
-        """切换副本节点完成状态"""
+    def _toggle_fuben_node(self, fuben_name: str, ordinal: int):
+        """切换副本节点完成状态，返回后台写入的 Future"""
         fuben_data = self.realm_data.get("fuben", {})
         fuben_info = fuben_data.get(fuben_name, {})
 
@@ -1408,21 +1499,23 @@ class JingjieSystem:
             print(f"未找到副本数据: {fuben_name}")
             return
 
-        # 记录是否是完成操作
-        is_completing = node not in fuben_info["completed"]
+        # 记录是否是完成操作，切换节点状态
+        node = fuben_info["nodes"][ordinal]
+        is_completing = not self._is_node_completed(fuben_info, ordinal)
+        self._set_node_completed(fuben_info, ordinal, is_completing)
 
-        # 切换节点状态
-        if node in fuben_info["completed"]:
-            fuben_info["completed"].remove(node)
-        else:
-            fuben_info["completed"].append(node)
+        # 修炼记录与节点状态在同一事务内由后台写线程保存，不阻塞界面
+        save_node = self._node_saver(fuben_info, ordinal)
+
+        def persist():
+            with self.db.transaction():
+                # 应用完成效果（仅当是完成操作时）
+                if is_completing:
+                    self._apply_fuben_effects(fuben_name, node, True)
 
-        # 应用完成效果（仅当是完成操作时）
-        if is_completing:
-            self._apply_fuben_effects(fuben_name, node, True)
+                save_node()
 
-        # 保存数据到数据库
-        self._save_data()
+        return self.db.writes.submit(persist)
 
     def _apply_fuben_effects(self, fuben_name: str, node: str, completed: bool):
         """应用副本完成的即时效果"""
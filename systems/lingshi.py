@@ -8,14 +8,14 @@ from typing import List, Tuple
 
 class LingshiSystem:
     """灵石系统 - 财务管理"""
+
+    RECORD_PAGE_SIZE = 10  # 交易记录每次加载的条数
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         
         # 从数据库获取固定收支项
         fixed_items = self.db.get_fixed_items()
-        self.fixed_income = fixed_items['income']
-        self.fixed_expense = fixed_items['expense']
         self.fixed_items_raw = fixed_items['raw_items']  # 保存完整数据用于编辑
     
     # 修正：接受可选的刷新回调参数
@@ -37,8 +37,8 @@ class LingshiSystem:
         debt_summary = self.db.get_debt_summary()
         asset_summary = self.db.get_asset_summary()
         
-        # 获取最近交易记录
-        recent_records = self.db.get_finance_records(limit=10)
+        # 获取最近交易记录（第一页）
+        recent_records = self.db.get_finance_records_page(limit=self.RECORD_PAGE_SIZE)
         
         return ft.Column(
             controls=[
@@ -256,7 +256,7 @@ class LingshiSystem:
                                 alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                             ),
                             ft.Divider(height=1, color="#E0E0E0"),
-                            *self._create_record_list(recent_records),
+                            self._create_paged_record_list(recent_records),
                         ],
                         spacing=10,
                     ),
@@ -268,28 +268,14 @@ class LingshiSystem:
         )
     
     def _calculate_actual_balance(self) -> float:
-        """计算基于初始余额和所有财务记录的实际当前余额"""
-        user_data = self.db.get_user_data()
-        initial_balance = user_data.current_money if user_data else 0
-        
-        # 获取所有财务记录
-        all_records = self.db.get_finance_records(limit=999999)  # 获取所有记录
-        
-        total_change = 0
-        for record in all_records:
-            record_type, amount, category, description, created_at = record
-            if record_type == "income":
-                total_change += amount
-            elif record_type == "expense":
-                total_change -= amount
-        
-        return initial_balance + total_change
+        """计算基于初始余额和所有财务记录的实际当前余额（读取账本，O(1)）"""
+        return self.db.get_finance_balance()['balance']
     
     def _get_monthly_stats(self) -> dict:
         """获取本月统计数据"""
-        # 获取固定收支
-        fixed_income_total = sum(self.fixed_income.values())
-        fixed_expense_total = sum(self.fixed_expense.values())
+        # 获取固定收支：按每一行累加，同名项目不会合并
+        fixed_income_total = sum(item.amount for item in self.fixed_items_raw if item.type == 'income')
+        fixed_expense_total = sum(item.amount for item in self.fixed_items_raw if item.type == 'expense')
         
         # 获取负债和资产数据
         debt_summary = self.db.get_debt_summary()
@@ -434,23 +420,19 @@ class LingshiSystem:
         
         # 固定收入项
         items.append(ft.Text("固定收入", size=14, weight=ft.FontWeight.BOLD, color=ThemeConfig.SUCCESS_COLOR))
-        for name, amount in self.fixed_income.items():
-            # 找到对应的数据库记录ID
-            item_id = None
-            for raw_item in self.fixed_items_raw:
-                if raw_item[1] == name and raw_item[2] == 'income':  # name和type匹配
-                    item_id = raw_item[0]  # id字段
-                    break
+        for item in self.fixed_items_raw:
+            if item.type != 'income':
+                continue
             
             items.append(
                 ft.Row(
                     controls=[
-                        ft.Text(name, size=14),
-                        ft.Text(f"+¥{amount:,.0f}", size=14, color=ThemeConfig.SUCCESS_COLOR),
+                        ft.Text(item.name, size=14),
+                        ft.Text(f"+¥{item.amount:,.0f}", size=14, color=ThemeConfig.SUCCESS_COLOR),
                         ft.IconButton(
                             icon=ft.icons.EDIT,
                             icon_size=16,
-                            on_click=lambda e, n=name, a=amount, i=item_id: self._edit_fixed_item(e, "income", n, a, i),
+                            on_click=lambda e, i=item: self._edit_fixed_item(e, "income", i.name, i.amount, i.id),
                         ),
                     ],
                     alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
@@ -461,23 +443,19 @@ class LingshiSystem:
         
         # 固定支出项
         items.append(ft.Text("固定支出", size=14, weight=ft.FontWeight.BOLD, color=ThemeConfig.DANGER_COLOR))
-        for name, amount in self.fixed_expense.items():
-            # 找到对应的数据库记录ID
-            item_id = None
-            for raw_item in self.fixed_items_raw:
-                if raw_item[1] == name and raw_item[2] == 'expense':  # name和type匹配
-                    item_id = raw_item[0]  # id字段
-                    break
+        for item in self.fixed_items_raw:
+            if item.type != 'expense':
+                continue
                     
             items.append(
                 ft.Row(
                     controls=[
-                        ft.Text(name, size=14),
-                        ft.Text(f"-¥{amount:,.0f}", size=14, color=ThemeConfig.DANGER_COLOR),
+                        ft.Text(item.name, size=14),
+                        ft.Text(f"-¥{item.amount:,.0f}", size=14, color=ThemeConfig.DANGER_COLOR),
                         ft.IconButton(
                             icon=ft.icons.EDIT,
                             icon_size=16,
-                            on_click=lambda e, n=name, a=amount, i=item_id: self._edit_fixed_item(e, "expense", n, a, i),
+                            on_click=lambda e, i=item: self._edit_fixed_item(e, "expense", i.name, i.amount, i.id),
                         ),
                     ],
                     alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
@@ -505,6 +483,35 @@ class LingshiSystem:
         
         return ft.Column(controls=items, spacing=8)
     
+    def _create_paged_record_list(self, first_page) -> ft.Column:
+        """创建可逐页加载的交易记录列表，点击"加载更多"按游标读取下一页"""
+        records_column = ft.Column(controls=self._create_record_list(first_page.items), spacing=10)
+        next_cursor = first_page.next_cursor
+
+        def load_more(e):
+            nonlocal next_cursor
+            page = self.db.get_finance_records_page(limit=self.RECORD_PAGE_SIZE, before=next_cursor)
+            if page.items:
+                records_column.controls.extend(self._create_record_list(page.items))
+            next_cursor = page.next_cursor
+            load_more_button.visible = page.has_more
+            e.page.update()
+
+        load_more_button = ft.TextButton(
+            "加载更多",
+            icon=ft.icons.EXPAND_MORE,
+            on_click=load_more,
+            visible=first_page.has_more,
+        )
+
+        return ft.Column(
+            controls=[
+                records_column,
+                ft.Row(controls=[load_more_button], alignment=ft.MainAxisAlignment.CENTER),
+            ],
+            spacing=10,
+        )
+
     def _create_record_list(self, records: list) -> List[ft.Container]:
         """创建交易记录列表"""
         if not records:
@@ -512,17 +519,15 @@ class LingshiSystem:
         
         record_items = []
         for record in records:
-            record_type, amount, category, description, created_at = record
-            
             # 解析时间
-            if isinstance(created_at, str):
-                record_time = datetime.fromisoformat(created_at)
+            if isinstance(record.created_at, str):
+                record_time = datetime.fromisoformat(record.created_at)
                 time_str = record_time.strftime("%m-%d %H:%M")
             else:
                 time_str = "未知时间"
             
             # 确定颜色和符号
-            if record_type == "income":
+            if record.type == "income":
                 color = ThemeConfig.SUCCESS_COLOR
                 sign = "+"
             else:
@@ -530,15 +535,15 @@ class LingshiSystem:
                 sign = "-"
             
             # 构建显示文本：优先显示分类，备注作为副标题
-            display_title = category or "未分类"
+            display_title = record.category or "未分类"
             display_controls = [
                 ft.Text(display_title, size=14, weight=ft.FontWeight.W_500),
             ]
 
             # 如果有备注，添加到下方
-            if description:
+            if record.description:
                 display_controls.append(
-                    ft.Text(description, size=12, color=ThemeConfig.TEXT_SECONDARY)
+                    ft.Text(record.description, size=12, color=ThemeConfig.TEXT_SECONDARY)
                 )
 
             # 添加时间
@@ -556,7 +561,7 @@ class LingshiSystem:
                                 expand=True,
                             ),
                             ft.Text(
-                                f"{sign}¥{amount:,.0f}",
+                                f"{sign}¥{record.amount:,.0f}",
                                 size=16,
                                 weight=ft.FontWeight.BOLD,
                                 color=color,
@@ -578,6 +583,39 @@ class LingshiSystem:
         
         return record_items
     
+    def _on_record_written(self, page, future):
+        """记账写入完成回调（在写线程中执行），交给 UI 事件循环处理"""
+        async def update_ui():
+            error = future.exception()
+            if error is not None:
+                print(f"记账失败: {error}")
+                self._show_error_dialog(page, f"记账失败: {error}")
+            elif self.refresh_callback:
+                self.refresh_callback()
+
+        try:
+            page.run_task(update_ui)
+        except Exception:
+            pass  # 页面可能已关闭
+
+    def _show_error_dialog(self, page, message: str):
+        """显示错误对话框"""
+        def close_dialog(e):
+            error_dialog.open = False
+            page.update()
+
+        error_dialog = ft.AlertDialog(
+            title=ft.Text("错误", color=ThemeConfig.DANGER_COLOR),
+            content=ft.Text(message),
+            actions=[
+                ft.TextButton("确定", on_click=close_dialog),
+            ],
+        )
+
+        page.dialog = error_dialog
+        error_dialog.open = True
+        page.update()
+
     def _show_add_record_dialog(self, e):
         """显示添加记录对话框"""
         page = e.page
@@ -718,7 +756,9 @@ class LingshiSystem:
                         else:
                             final_description = currency_note
 
-                    self.db.add_finance_record(
+                    # 交给后台写入队列，写入完成后再刷新页面
+                    future = self.db.writes.submit(
+                        self.db.add_finance_record,
                         record_type=type_dropdown.value,
                         amount=amount,
                         category=final_category,
@@ -733,9 +773,8 @@ class LingshiSystem:
                         print(f"记账成功：{sign}¥{amount:,.0f} ({final_category})")
 
                     close_dialog(e)
-                    # 刷新页面
-                    if self.refresh_callback:
-                        self.refresh_callback()
+                    # 写入完成后回到 UI 事件循环：失败时提示，成功时刷新页面
+                    future.add_done_callback(lambda f: self._on_record_written(page, f))
                 except ValueError:
                     pass
 
@@ -796,12 +835,6 @@ class LingshiSystem:
                     )
                     
                     if success:
-                        # 更新本地数据
-                        if item_type == "income":
-                            self.fixed_income[name_field.value] = amount
-                        else:
-                            self.fixed_expense[name_field.value] = amount
-                        
                         print(f"添加固定{'收入' if item_type == 'income' else '支出'}成功: {name_field.value} ¥{amount:,.0f}")
                     else:
                         print("保存到数据库失败")
@@ -863,16 +896,6 @@ class LingshiSystem:
                         )
                         
                         if success:
-                            # 更新本地数据
-                            if item_type == "income":
-                                if name != name_field.value and name in self.fixed_income:
-                                    del self.fixed_income[name]
-                                self.fixed_income[name_field.value] = new_amount
-                            else:
-                                if name != name_field.value and name in self.fixed_expense:
-                                    del self.fixed_expense[name]
-                                self.fixed_expense[name_field.value] = new_amount
-                            
                             print(f"更新固定{'收入' if item_type == 'income' else '支出'}成功: {name_field.value}")
                         else:
                             print("更新数据库失败")
@@ -890,12 +913,6 @@ class LingshiSystem:
                 success = self.db.delete_fixed_item(item_id)
                 
                 if success:
-                    # 从本地数据中删除
-                    if item_type == "income" and name in self.fixed_income:
-                        del self.fixed_income[name]
-                    elif item_type == "expense" and name in self.fixed_expense:
-                        del self.fixed_expense[name]
-                    
                     print(f"删除固定{'收入' if item_type == 'income' else '支出'}成功: {name}")
                 else:
                     print("删除数据库记录失败")
@@ -928,24 +945,16 @@ class LingshiSystem:
     def _delete_record(self, e, record):
         """删除交易记录"""
         page = e.page
-        record_type, amount, category, description, created_at = record
+        label = f"{record.description or record.category} ¥{record.amount:,.0f}"
         
         def confirm_delete(e):
             try:
-                # 调用数据库删除方法
-                # 根据交易的创建时间和金额来删除记录（因为没有直接的ID）
-                success = self.db.delete_finance_record_by_details(
-                    record_type=record_type,
-                    amount=amount, 
-                    category=category,
-                    description=description,
-                    created_at=created_at
-                )
+                success = self.db.delete_finance_record(record.id)
                 
                 if success:
-                    print(f"成功删除交易记录: {description or category} ¥{amount:,.0f}")
+                    print(f"成功删除交易记录: {label}")
                 else:
-                    print(f"删除失败：未找到匹配的交易记录")
+                    print(f"删除失败：交易记录已不存在")
                 
                 # 关闭对话框
                 dialog.open = False
@@ -967,7 +976,7 @@ class LingshiSystem:
         
         dialog = ft.AlertDialog(
             title=ft.Text("确认删除", color=ThemeConfig.DANGER_COLOR),
-            content=ft.Text(f"确定要删除这条交易记录吗？\n{description or category} ¥{amount:,.0f}"),
+            content=ft.Text(f"确定要删除这条交易记录吗？\n{label}"),
             actions=[
                 ft.TextButton("取消", on_click=cancel_delete),
                 ft.TextButton(
@@ -7,6 +7,8 @@ from typing import List
 class LizhiSystem:
     """励志库系统 - 管理励志诗句"""
 
+    QUOTE_PAGE_SIZE = 20  # 语录列表每次加载的条数
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
 
@@ -70,10 +72,10 @@ class LizhiSystem:
         )
 
     def _create_quotes_list(self) -> ft.Column:
-        """创建励志语录列表"""
-        quotes = self.db.get_all_quotes()
+        """创建励志语录列表，按页加载"""
+        first_page = self.db.get_quotes_page(limit=self.QUOTE_PAGE_SIZE)
 
-        if not quotes:
+        if not first_page.items:
             return ft.Column(
                 controls=[
                     ft.Container(
@@ -96,13 +98,36 @@ class LizhiSystem:
                 ],
             )
 
-        quote_cards = []
-        for quote in quotes:
-            quote_id, content, author, category, created_at = quote
-            quote_cards.append(self._create_quote_card(quote_id, content, author))
+        def create_cards(quotes):
+            cards = []
+            for quote in quotes:
+                quote_id, content, author, category, created_at = quote
+                cards.append(self._create_quote_card(quote_id, content, author))
+            return cards
+
+        quotes_column = ft.Column(controls=create_cards(first_page.items), spacing=10)
+        next_cursor = first_page.next_cursor
+
+        def load_more(e):
+            nonlocal next_cursor
+            page = self.db.get_quotes_page(limit=self.QUOTE_PAGE_SIZE, before=next_cursor)
+            quotes_column.controls.extend(create_cards(page.items))
+            next_cursor = page.next_cursor
+            load_more_button.visible = page.has_more
+            e.page.update()
+
+        load_more_button = ft.TextButton(
+            "加载更多",
+            icon=ft.icons.EXPAND_MORE,
+            on_click=load_more,
+            visible=first_page.has_more,
+        )
 
         return ft.Column(
-            controls=quote_cards,
+            controls=[
+                quotes_column,
+                ft.Row(controls=[load_more_button], alignment=ft.MainAxisAlignment.CENTER),
+            ],
             spacing=10,
         )
 
@@ -10,6 +10,7 @@ class PanelSystem:
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        self.blood_text = None  # 寿元数字，时钟刷新时原地更新
     
     def create_panel_view(self) -> ft.Column:
         """创建面板视图"""
@@ -25,10 +26,8 @@ class PanelSystem:
         # 获取心境等级
         spirit_level, spirit_color = Styles.get_spirit_level_info(user_data.current_spirit)
         
-        # 获取真实的境界信息
-        from systems.jingjie import JingjieSystem
-        jingjie_system = JingjieSystem(self.db)
-        current_realm = jingjie_system.get_highest_realm()
+        # 获取真实的境界信息（只读当前境界名称，不加载整棵境界树）
+        current_realm = self.db.get_current_realm_name()
         
         # 计算目标达成时间预测
         target_stats = self._calculate_target_achievement(user_data)
@@ -151,6 +150,12 @@ class PanelSystem:
     
     def _create_life_card(self, blood: int) -> ft.Container:
         """创建生命卡片（显示血量）- 优化版"""
+        self.blood_text = ft.Text(
+            f"{blood:,}",
+            size=40,
+            weight=ft.FontWeight.BOLD,
+            color="white"
+        )
         return ft.Container(
             content=ft.Column(
                 controls=[
@@ -159,12 +164,7 @@ class PanelSystem:
                         margin=ft.margin.only(bottom=10),
                     ),
                     ft.Text("剩余血量", size=14, color="white", weight=ft.FontWeight.W_500),
-                    ft.Text(
-                        f"{blood:,}",
-                        size=40,
-                        weight=ft.FontWeight.BOLD,
-                        color="white"
-                    ),
+                    self.blood_text,
                     ft.Text("点", size=14, color="white", opacity=0.9),
                 ],
                 alignment=ft.MainAxisAlignment.CENTER,
@@ -186,6 +186,13 @@ class PanelSystem:
             ),
         )
     
+    def update_blood(self, blood: int):
+        """原地更新寿元数字，不重建面板；面板未显示时不做任何事"""
+        if self.blood_text is None or self.blood_text.page is None:
+            return
+        self.blood_text.value = f"{blood:,}"
+        self.blood_text.update()
+
     def _create_status_card(self, title: str, value: str, color: str) -> ft.Container:
         """创建状态卡片 - 响应式版本"""
         return ft.Container(
@@ -346,40 +353,4 @@ class PanelSystem:
 
     def _get_daily_stats(self) -> dict:
         """获取今日真实收支数据"""
-        try:
-            from datetime import date
-            today = date.today().isoformat()
-            
-            # 获取今日所有财务记录
-            conn = self.db._get_connection()
-            cursor = conn.cursor()
-            
-            # 获取今日收入总额
-            cursor.execute('''
-                SELECT COALESCE(SUM(amount), 0) 
-                FROM finance_records 
-                WHERE type = 'income' AND DATE(created_at) = ?
-            ''', (today,))
-            daily_income = cursor.fetchone()[0]
-            
-            # 获取今日支出总额
-            cursor.execute('''
-                SELECT COALESCE(SUM(amount), 0) 
-                FROM finance_records 
-                WHERE type = 'expense' AND DATE(created_at) = ?
-            ''', (today,))
-            daily_expense = cursor.fetchone()[0]
-            
-            conn.close()
-            
-            return {
-                'income': float(daily_income),
-                'expense': float(daily_expense)
-            }
-            
-        except Exception as e:
-            print(f"获取今日收支数据错误: {e}")
-            return {
-                'income': 0.0,
-                'expense': 0.0
-            }
\ No newline at end of file
+        return self.db.get_daily_finance_stats()
@@ -3,7 +3,6 @@ import random
 from datetime import datetime, date
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from ai_providers.ai_manager import ai_manager
 
 
 class PoetrySystem:
@@ -40,6 +39,7 @@ class PoetrySystem:
         
         # 加载诗句库
         self.poetry_library = self.load_poetry_library()
+        self.db.sync_poetry_index(self.poetry_library)
         
         # 加载每日记录
         self.daily_log = self.load_daily_log()
@@ -76,6 +76,9 @@ class PoetrySystem:
                 
         except Exception as e:
             print(f"保存诗句库失败: {e}")
+        
+        # 诗句库不在数据库中，变更后同步全文索引
+        self.db.sync_poetry_index(self.poetry_library)
     
     def load_daily_log(self) -> Dict[str, Any]:
         """加载每日记录"""
@@ -207,6 +210,8 @@ class PoetrySystem:
     
     def generate_ai_poetry(self) -> Optional[Dict[str, Any]]:
         """使用AI生成诗句"""
+        # AI 接口只在需要生成时导入，加载诗句库不依赖 requests
+        from ai_providers.ai_manager import ai_manager
         if not ai_manager.is_configured():
             return None
         
@@ -270,20 +275,16 @@ class PoetrySystem:
         }
     
     def search_poetry(self, keyword: str) -> List[Dict[str, Any]]:
-        """搜索诗句"""
+        """搜索诗句（全文索引，匹配诗句、作者和分类，按相关度排序）"""
         if not keyword.strip():
             return self.poetry_library
         
-        keyword = keyword.lower()
-        results = []
-        
-        for poetry in self.poetry_library:
-            if (keyword in poetry['text'].lower() or 
-                keyword in poetry.get('author', '').lower() or
-                keyword in poetry.get('category', '').lower()):
-                results.append(poetry)
-        
-        return results
+        hits = self.db.search(keyword, sources=('poetry',), limit=len(self.poetry_library))
+        # ref_id 为诗句在库中的序号，核对文本以防索引尚未同步
+        return [
+            self.poetry_library[hit.ref_id] for hit in hits
+            if hit.ref_id < len(self.poetry_library) and self.poetry_library[hit.ref_id]['text'] == hit.text
+        ]
     
     def export_poetry_library(self) -> str:
         """导出诗句库"""
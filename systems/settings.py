@@ -1,6 +1,7 @@
 import flet as ft
 from database.db_manager import DatabaseManager
 from ai_providers.ai_manager import ai_manager
+from utils.startup import load_startup_log, format_run
 from config import VERSION, ThemeConfig
 import json
 import os
@@ -9,6 +10,8 @@ from datetime import datetime
 class SettingsSystem:
     """设置系统"""
 
+    QUOTE_PAGE_SIZE = 20  # 查看全部语录时每次加载的条数
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.settings = self._load_settings()
@@ -256,9 +259,28 @@ class SettingsSystem:
             on_change=self._on_font_size_change,
         )
         
+        profiling_switch = ft.Switch(
+            label="SQL 性能分析",
+            value=self.db.profiler.enabled,
+            on_change=self._on_profiling_change,
+        )
+        
+        profile_report_button = ft.TextButton(
+            "导出分析报告",
+            icon=ft.icons.QUERY_STATS,
+            on_click=self._export_profile_report,
+        )
+
+        startup_button = ft.TextButton(
+            "启动耗时",
+            icon=ft.icons.TIMER_OUTLINED,
+            on_click=self._show_startup_profile,
+        )
+        
         return ft.Column(
             controls=[
                 auto_backup_switch,
+                ft.Row([profiling_switch, profile_report_button, startup_button]),
                 ft.Row([birth_year_field, target_money_field]),
                 ft.Row([theme_dropdown, font_size_dropdown]),
             ],
@@ -291,6 +313,27 @@ class SettingsSystem:
             on_click=self._restore_backup,
         )
         
+        # 与手机/电脑另一端交换同步包：文件放在数据库目录下的 sync/ 中，拷贝到对端的同一目录后导入
+        sync_export_button = ft.ElevatedButton(
+            "导出同步包",
+            icon=ft.icons.SYNC,
+            on_click=self._export_sync_bundle,
+        )
+        
+        sync_import_button = ft.ElevatedButton(
+            "导入同步包",
+            icon=ft.icons.SYNC_ALT,
+            on_click=self._import_sync_bundles,
+        )
+        
+        # 内存模式：数据定期写回数据库文件，退出前或换设备前可以手动立即写回
+        snapshot_button = ft.ElevatedButton(
+            "立即保存到磁盘",
+            icon=ft.icons.SAVE,
+            on_click=self._save_snapshot,
+            visible=bool(self.db.snapshot_path),
+        )
+        
         clear_button = ft.ElevatedButton(
             "清除数据",
             icon=ft.icons.DELETE_FOREVER,
@@ -303,6 +346,8 @@ class SettingsSystem:
             controls=[
                 ft.Row([export_button, import_button]),
                 ft.Row([backup_button, restore_button]),
+                ft.Row([sync_export_button, sync_import_button]),
+                snapshot_button,
                 ft.Container(height=10),
                 clear_button,
             ],
@@ -390,6 +435,38 @@ class SettingsSystem:
         self.settings["auto_backup"] = e.control.value
         self._save_settings()
     
+    def _on_profiling_change(self, e):
+        """SQL 性能分析开关改变"""
+        if e.control.value:
+            self.db.profiler.enable()
+        else:
+            self.db.profiler.disable()
+    
+    def _export_profile_report(self, e):
+        """把 SQL 性能分析报告写到数据库目录，并显示最慢的几个方法"""
+        try:
+            path = os.path.join(os.path.dirname(os.path.abspath(self.db.db_path)),
+                                f"sql_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            report = self.db.profiler.dump(path)
+        except Exception as ex:
+            self._show_message(e.page, "导出失败", str(ex))
+            return
+        
+        slowest = sorted(report['methods'].items(), key=lambda item: item[1]['p95_ms'], reverse=True)[:5]
+        lines = [f"{name}: p95 {stats['p95_ms']:.1f}ms（{stats['count']} 次）" for name, stats in slowest]
+        lines.append(f"慢查询 {len(report['slow_queries'])} 条")
+        self._show_message(e.page, "分析报告已导出", "\n".join(lines + [path]))
+    
+    def _show_startup_profile(self, e):
+        """显示最近一次启动的各阶段耗时、超出预算的阶段和最慢的导入"""
+        runs = load_startup_log()
+        if not runs:
+            self._show_message(e.page, "启动耗时", "还没有启动记录")
+            return
+        totals = sorted(run['total_ms'] for run in runs)
+        summary = f"最近 {len(runs)} 次启动中位数 {totals[len(totals) // 2]:.0f}ms"
+        self._show_message(e.page, "启动耗时", format_run(runs[-1]) + "\n" + summary)
+
     def _on_birth_year_change(self, e):
         """出生年份改变"""
         try:
@@ -558,6 +635,37 @@ class SettingsSystem:
         # TODO: 实现恢复功能
         self._show_message(e.page, "功能开发中", "备份恢复功能即将推出")
     
+    def _export_sync_bundle(self, e):
+        """导出同步包到 sync/ 目录"""
+        exported = self.db.export_sync_bundle()
+        if exported is None:
+            self._show_message(e.page, "导出失败", "同步包导出失败，请查看日志")
+            return
+        self._show_message(
+            e.page, "导出成功",
+            f"共 {exported['changes']} 项变化\n{exported['path']}\n请把文件拷贝到另一台设备的 sync 目录后导入"
+        )
+    
+    def _import_sync_bundles(self, e):
+        """导入 sync/ 目录中其他设备的同步包"""
+        results = self.db.import_sync_bundles()
+        if not results:
+            self._show_message(e.page, "没有可导入的同步包", f"请把另一台设备导出的文件放到\n{self.db.sync_bundle_dir()}")
+            return
+        applied = sum(result['applied'] + result['deleted'] for result in results)
+        kept = sum(result['kept'] for result in results)
+        self._show_message(e.page, "同步完成", f"导入 {len(results)} 个同步包，更新 {applied} 行，保留本地较新的修改 {kept} 行")
+        if self.refresh_callback:
+            self.refresh_callback()
+    
+    def _save_snapshot(self, e):
+        """把内存中的数据库立即写回数据库文件"""
+        path = self.db.snapshot()
+        if path is None:
+            self._show_message(e.page, "保存失败", "写回数据库文件失败，请查看日志")
+            return
+        self._show_message(e.page, "保存成功", f"数据已写入\n{path}")
+    
     def _clear_data_dialog(self, e):
         """显示清除数据确认对话框"""
         def confirm_clear(e):
@@ -641,11 +749,12 @@ class SettingsSystem:
 
     def _create_lizhi_settings(self):
         """创建励志库管理界面"""
-        quotes = self.db.get_all_quotes()
+        # 只读取显示的前5条语录
+        quotes = self.db.get_quotes_page(limit=5).items
+        quote_count = self.db.count_quotes()
 
-        # 显示前5条语录
         quote_list = []
-        for i, quote in enumerate(quotes[:5]):
+        for quote in quotes:
             quote_id, content, author, category, created_at = quote
 
             # 显示内容（不显示作者）
@@ -708,7 +817,7 @@ class SettingsSystem:
                             on_click=self._add_quote_dialog,
                         ),
                         ft.OutlinedButton(
-                            f"查看全部 ({len(quotes)})",
+                            f"查看全部 ({quote_count})",
                             icon=ft.icons.LIST,
                             on_click=self._show_all_quotes,
                         ),
@@ -828,42 +937,41 @@ class SettingsSystem:
     def _show_all_quotes(self, e):
         """显示所有励志语录"""
         page = e.page
-        quotes = self.db.get_all_quotes()
+        first_page = self.db.get_quotes_page(limit=self.QUOTE_PAGE_SIZE)
+        quote_count = self.db.count_quotes()
 
-        quote_widgets = []
-        for quote in quotes:
+        def create_quote_widget(quote):
             quote_id, content, author, category, created_at = quote
 
-            quote_widgets.append(
-                ft.Container(
-                    content=ft.Row(
-                        controls=[
-                            ft.Column(
-                                controls=[
-                                    ft.Text(
-                                        content,
-                                        size=12,
-                                        color=ThemeConfig.TEXT_PRIMARY,
-                                    ),
-                                ],
-                                expand=True,
-                            ),
-                            ft.IconButton(
-                                icon=ft.icons.DELETE_OUTLINE,
-                                icon_size=16,
-                                icon_color=ThemeConfig.DANGER_COLOR,
-                                tooltip="删除",
-                                on_click=lambda e, qid=quote_id, qcontent=content: self._delete_quote_from_all(e, qid, qcontent, dialog),
-                            ),
-                        ],
-                        spacing=10,
-                    ),
-                    bgcolor=ThemeConfig.CARD_COLOR,
-                    padding=10,
-                    border_radius=8,
-                )
+            return ft.Container(
+                content=ft.Row(
+                    controls=[
+                        ft.Column(
+                            controls=[
+                                ft.Text(
+                                    content,
+                                    size=12,
+                                    color=ThemeConfig.TEXT_PRIMARY,
+                                ),
+                            ],
+                            expand=True,
+                        ),
+                        ft.IconButton(
+                            icon=ft.icons.DELETE_OUTLINE,
+                            icon_size=16,
+                            icon_color=ThemeConfig.DANGER_COLOR,
+                            tooltip="删除",
+                            on_click=lambda e, qid=quote_id, qcontent=content: self._delete_quote_from_all(e, qid, qcontent, dialog),
+                        ),
+                    ],
+                    spacing=10,
+                ),
+                bgcolor=ThemeConfig.CARD_COLOR,
+                padding=10,
+                border_radius=8,
             )
 
+        quote_widgets = [create_quote_widget(quote) for quote in first_page.items]
         if not quote_widgets:
             quote_widgets.append(
                 ft.Text(
@@ -874,15 +982,36 @@ class SettingsSystem:
                 )
             )
 
+        quotes_column = ft.Column(controls=quote_widgets, spacing=8)
+        next_cursor = first_page.next_cursor
+
+        def load_more(e):
+            nonlocal next_cursor
+            more = self.db.get_quotes_page(limit=self.QUOTE_PAGE_SIZE, before=next_cursor)
+            quotes_column.controls.extend(create_quote_widget(quote) for quote in more.items)
+            next_cursor = more.next_cursor
+            load_more_button.visible = more.has_more
+            page.update()
+
+        load_more_button = ft.TextButton(
+            "加载更多",
+            icon=ft.icons.EXPAND_MORE,
+            on_click=load_more,
+            visible=first_page.has_more,
+        )
+
         def close_dialog(e):
             dialog.open = False
             page.update()
 
         dialog = ft.AlertDialog(
-            title=ft.Text(f"所有励志语录 ({len(quotes)})"),
+            title=ft.Text(f"所有励志语录 ({quote_count})"),
             content=ft.Container(
                 content=ft.Column(
-                    controls=quote_widgets,
+                    controls=[
+                        quotes_column,
+                        ft.Row(controls=[load_more_button], alignment=ft.MainAxisAlignment.CENTER),
+                    ],
                     spacing=8,
                     scroll=ft.ScrollMode.AUTO,
                 ),
@@ -7,6 +7,8 @@ from typing import List, Dict, Optional
 
 class TongyuSystem:
     """统御系统 - 人际关系管理（完整功能版）"""
+
+    INTERACTION_PAGE_SIZE = 10  # 互动记录每次加载的条数
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
@@ -346,6 +348,11 @@ class TongyuSystem:
                                             icon=ft.icons.CHAT,
                                             on_click=lambda e, f=friend: self._record_interaction(e, f),
                                         ),
+                                        ft.TextButton(
+                                            "互动记录",
+                                            icon=ft.icons.HISTORY,
+                                            on_click=lambda e, f=friend: self._show_interaction_history(e, f),
+                                        ),
                                         ft.TextButton(
                                             "管理任务",
                                             icon=ft.icons.TASK_ALT,
@@ -939,6 +946,79 @@ class TongyuSystem:
         dialog.open = True
         page.update()
     
+    def _show_interaction_history(self, e, friend: Friend):
+        """查看互动记录，按页加载"""
+        page = e.page
+        first_page = self.db.get_interaction_records_page(friend.id, limit=self.INTERACTION_PAGE_SIZE)
+
+        def create_record_rows(records: List[InteractionRecord]):
+            return [
+                ft.Container(
+                    content=ft.Column(
+                        controls=[
+                            ft.Text(record.interaction_date, size=11, color=ThemeConfig.TEXT_SECONDARY),
+                            ft.Text(record.content, size=13),
+                        ],
+                        spacing=2,
+                    ),
+                    bgcolor=ThemeConfig.CARD_COLOR,
+                    padding=8,
+                    border_radius=8,
+                )
+                for record in records
+            ]
+
+        records_column = ft.Column(
+            controls=create_record_rows(first_page.items) or [
+                ft.Text("暂无互动记录", size=13, color=ThemeConfig.TEXT_SECONDARY)
+            ],
+            spacing=8,
+        )
+        next_cursor = first_page.next_cursor
+
+        def load_more(e):
+            nonlocal next_cursor
+            more = self.db.get_interaction_records_page(
+                friend.id, limit=self.INTERACTION_PAGE_SIZE, before=next_cursor
+            )
+            records_column.controls.extend(create_record_rows(more.items))
+            next_cursor = more.next_cursor
+            load_more_button.visible = more.has_more
+            page.update()
+
+        load_more_button = ft.TextButton(
+            "加载更多",
+            icon=ft.icons.EXPAND_MORE,
+            on_click=load_more,
+            visible=first_page.has_more,
+        )
+
+        def close_dialog(e):
+            dialog.open = False
+            page.update()
+
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"与{friend.name}的互动记录"),
+            content=ft.Container(
+                content=ft.Column(
+                    controls=[
+                        records_column,
+                        ft.Row(controls=[load_more_button], alignment=ft.MainAxisAlignment.CENTER),
+                    ],
+                    scroll=ft.ScrollMode.AUTO,
+                ),
+                width=350,
+                height=300,
+            ),
+            actions=[
+                ft.TextButton("关闭", on_click=close_dialog),
+            ],
+        )
+
+        page.dialog = dialog
+        dialog.open = True
+        page.update()
+    
     def _manage_friend_tasks(self, e, friend: Friend):
         """管理朋友任务"""
         page = e.page
@@ -3,9 +3,16 @@
 测试副本系统和励志库功能
 """
 import sys
+import os
+import json
+import tempfile
+from datetime import date, timedelta
 sys.path.insert(0, '.')
 
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, day_range
+from database.sync import SYNC_BUNDLE_SUFFIX
+from database.search import source_range
+from database.timeseries import SERIES_TIERS
 
 def test_lizhi_system():
     """测试励志库系统"""
@@ -115,6 +122,763 @@ def test_database_tables():
 
     print("\n[PASS] 数据库表测试完成")
 
+def test_query_plans():
+    """测试热点查询走索引（不出现全表扫描）"""
+    print("\n========== 测试查询计划 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'plan.db'))
+        day_start, day_end = day_range()
+
+        hot_queries = {
+            "今日已完成任务": ('SELECT task_id FROM task_records WHERE completed_at >= ? AND completed_at < ?',
+                        (day_start, day_end)),
+            "任务今日是否完成": ('SELECT COUNT(*) FROM task_records WHERE task_id = ? AND completed_at >= ? AND completed_at < ?',
+                         (1, day_start, day_end)),
+            "今日收支汇总": ("SELECT SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) FROM finance_records "
+                       "WHERE created_at >= ? AND created_at < ?", (day_start, day_end)),
+            "最近财务记录": ('SELECT type, amount FROM finance_records ORDER BY created_at DESC LIMIT 10', ()),
+            "朋友任务": ('SELECT id FROM friend_tasks WHERE friend_id = ?', (1,)),
+            "互动记录": ('SELECT id FROM interaction_records WHERE friend_id = ? ORDER BY interaction_date DESC LIMIT 10', (1,)),
+            "家族事件": ('SELECT id FROM family_events WHERE member_id = ? ORDER BY event_date', (1,)),
+        }
+
+        for name, (sql, params) in hot_queries.items():
+            plan = db.explain_query_plan(sql, params)
+            print(f"   {name}: {' | '.join(plan)}")
+            # 允许按索引顺序扫描（ORDER BY ... LIMIT），不允许裸表扫描和临时排序
+            assert not any(step.startswith('SCAN') and 'INDEX' not in step for step in plan), f"{name} 出现全表扫描: {plan}"
+            assert not any('TEMP B-TREE' in step for step in plan), f"{name} 需要临时排序: {plan}"
+
+        db.close()
+
+    print("\n[PASS] 查询计划测试完成")
+
+def pin_blood_clock(db):
+    """把寿元基准时间设到未来，测试期间推算出的寿元不随时间变化"""
+    with db.transaction() as conn:
+        conn.execute("UPDATE user_config SET blood_updated_at = datetime('now', '+1 day')")
+
+def test_transaction_atomicity():
+    """测试一次用户操作在同一事务内完成，任一步失败整体回滚"""
+    print("\n========== 测试事务原子性 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'uow.db'))
+        pin_blood_clock(db)
+        before = db.get_user_data()
+
+        # 1. 完成任务：记录与心境血量同时生效
+        task_id = db.add_task("原子性测试", "positive", 5, 3)
+        db.complete_task(task_id, 5, 3)
+        after = db.get_user_data()
+        print(f"   心境 {before.current_spirit} -> {after.current_spirit}，血量 {before.current_blood} -> {after.current_blood}")
+        assert after.current_blood == before.current_blood + 3
+
+        # 2. 心境被限制在上限内
+        db.update_spirit_blood(10 ** 6, 0)
+        from config import GameConfig
+        assert db.get_user_data().current_spirit == GameConfig.MAX_SPIRIT
+
+        # 3. 工作单元内某一步失败（方法内部已捕获异常）时整体回滚
+        failed = False
+        try:
+            with db.transaction():
+                failing_id = db.add_task("应回滚的任务", "positive", 1, 1)
+                db.add_finance_record("income", None)  # 违反 NOT NULL 约束
+        except Exception as e:
+            failed = True
+            print(f"   工作单元已回滚: {e}")
+        assert failed
+        assert all(task.id != failing_id for task in db.get_tasks())
+
+        db.close()
+
+    print("\n[PASS] 事务原子性测试完成")
+
+def test_write_queue():
+    """测试后台写入队列的合并、批量提交与关闭时落盘"""
+    print("\n========== 测试后台写入队列 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'queue.db')
+        db = DatabaseManager(db_path)
+        pin_blood_clock(db)
+        blood_before = db.get_user_data().current_blood
+
+        # 1. 连续的血量变化合并为一次更新，每个调用方都拿到结果
+        futures = [db.submit_spirit_blood(0, -1) for _ in range(50)]
+        assert db.writes.flush(timeout=5)
+        assert all(future.result() for future in futures)
+        assert db.get_user_data().current_blood == blood_before - 50
+        print("   50 次血量变化已合并写入")
+
+        # 2. 出错的写入只影响自己的 Future
+        bad = db.writes.submit(db.add_finance_record, "income", None)
+        good = db.writes.submit(db.add_finance_record, "income", 8)
+        assert db.writes.flush(timeout=5)
+        assert bad.exception() is not None and good.exception() is None
+        assert db.get_finance_balance()['income'] == 8
+
+        # 3. 同一任务的多次切换只保留最后一次，关闭时写完队列
+        task_id = db.add_task("队列测试", "positive", 1, 0)
+        for i in range(5):
+            write = db.complete_task if i % 2 == 0 else db.uncomplete_task
+            db.writes.submit(write, task_id, 1, 0, key=('task_records', task_id))
+        db.close()
+
+        db = DatabaseManager(db_path)
+        assert db.get_daily_rollups(*day_range())[0]['tasks_completed'] == 1
+        db.close()
+
+    print("\n[PASS] 后台写入队列测试完成")
+
+def test_derived_blood():
+    """测试寿元按经过的时间推算，任务变化先结算再累加"""
+    print("\n========== 测试寿元推算 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'blood.db'))
+        with db.transaction() as conn:
+            baseline = conn.execute("SELECT current_blood FROM user_config").fetchone()[0]
+            conn.execute("UPDATE user_config SET blood_updated_at = datetime('now', '-90 minutes')")
+
+        # 基准时间之后经过 90 分钟，无需任何定时写入
+        assert db.get_user_data().current_blood == baseline - 90
+
+        # 任务增减寿元时先结算已经过的整分钟
+        db.update_spirit_blood(0, 5)
+        with db.transaction() as conn:
+            stored = conn.execute("SELECT current_blood FROM user_config").fetchone()[0]
+        assert stored == baseline - 85
+        assert db.get_user_data().current_blood == baseline - 85
+        print(f"   基准 {baseline} -> 当前 {db.get_user_data().current_blood}")
+
+        db.close()
+
+    print("\n[PASS] 寿元推算测试完成")
+
+def test_state_series():
+    """测试心境寿元余额时间序列与趋势数据"""
+    print("\n========== 测试状态时间序列 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'series.db'))
+        pin_blood_clock(db)
+
+        db.update_spirit_blood(5, 2)
+        db.add_finance_record('income', 100, '工资', '月薪')
+        user = db.get_user_data()
+        balance = db.get_finance_balance()['balance']
+
+        # 各精度层的最新点都是变化后的状态
+        for days in (1, 7, 90, 3650):
+            latest = db.get_state_series(days)[-1]
+            assert latest['spirit_value'] == user.current_spirit
+            assert latest['blood_value'] == user.current_blood
+            assert latest['balance'] == balance
+        assert db.get_spirit_trend_data(7)[-1]['spirit_value'] == user.current_spirit
+
+        # 补录的历史收支回填为只有余额的天层点
+        with db.transaction() as conn:
+            conn.execute('''
+                INSERT INTO finance_records (type, amount, category, created_at)
+                VALUES ('expense', 30, '餐饮', '2020-03-01 10:00:00')
+            ''')
+        db.rebuild_daily_rollups()
+        history = db.get_state_series(3650)
+        assert history[0]['date'] == '2020-03-01' and history[0]['spirit_value'] is None
+        assert history[0]['balance'] == db.get_finance_balance()['initial'] - 30
+        assert all(point['spirit_value'] is not None for point in db.get_spirit_trend_data(3650))
+
+        finance = db.get_finance_trend_data(3650)
+        assert [point['net_amount'] for point in finance] == [-30, 100]
+        assert finance[-1]['balance'] == db.get_finance_balance()['balance']
+        print(f"   多年趋势 {len(history)} 个点，收支趋势 {len(finance)} 个点")
+
+        # 批量导入不逐行记录快照：账本只整行重建一次，每个精度层只多一个样本
+        csv_path = os.path.join(tmp, 'history.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("created_at,type,amount,category\n")
+            for i in range(1, 51):
+                f.write(f"2021-05-{i % 28 + 1:02d} 09:00,expense,{i},餐饮\n")
+        samples_sql = 'SELECT COALESCE(SUM(samples), 0) FROM state_series'
+        with db.transaction() as conn:
+            before = conn.execute(samples_sql).fetchone()[0]
+        assert db.import_finance_records(csv_path)['inserted'] == 50
+        with db.transaction() as conn:
+            after = conn.execute(samples_sql).fetchone()[0]
+        assert after - before == len(SERIES_TIERS), after - before
+
+        db.close()
+
+    print("\n[PASS] 状态时间序列测试完成")
+
+def test_analytics():
+    """测试面板统计与周期趋势"""
+    print("\n========== 测试统计查询 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'analytics.db'))
+        task = db.get_tasks()[0]
+        today = date.today()
+
+        # 前三天连续完成任务，更早一天中断
+        with db.transaction() as conn:
+            for offset in (1, 2, 3, 5):
+                day = (today - timedelta(days=offset)).isoformat()
+                conn.execute('''
+                    INSERT INTO task_records (task_id, completed_at, spirit_change, blood_change)
+                    VALUES (?, ?, 2, 1)
+                ''', (task.id, f"{day} 08:00:00"))
+        db.add_finance_record('income', 100, '工资')
+        db.add_finance_record('expense', 30, '餐饮')
+        db.add_finance_record('expense', 10, '交通')
+
+        stats = db.get_user_stats()
+        assert stats['streak_days'] == 3 and stats['tasks_completed_today'] == 0
+        assert stats['blood_value'] == db.get_user_data().current_blood
+
+        summary = db.get_finance_summary()
+        assert summary['today_expense'] == 40 and summary['balance'] == db.get_finance_balance()['balance']
+        assert [c['category'] for c in summary['expense_categories']] == ['餐饮', '交通']
+        assert summary['expense_categories'][0]['share'] == 0.75
+
+        daily = db.get_period_trend('day', 7)
+        assert [p['tasks_completed'] for p in daily] == [1, 1, 1, 1, 0]
+        assert daily[-1]['net_amount'] == 60 and daily[-1]['cumulative_net'] == 60
+        assert daily[0]['net_change'] is None
+        monthly = db.get_period_trend('month', 12)
+        assert sum(p['tasks_completed'] for p in monthly) == 4
+        assert all(p['date'].endswith('-01') for p in monthly)
+
+        tasks = db.get_today_tasks()
+        assert len(tasks) == len(db.get_tasks())
+        print(f"   连续 {stats['streak_days']} 天，今日支出 {summary['today_expense']}")
+
+        db.close()
+
+    print("\n[PASS] 统计查询测试完成")
+
+def test_profiles():
+    """测试多档案数据库与共享时钟"""
+    print("\n========== 测试多档案 ==========")
+    import threading
+    from database.profiles import ProfileRegistry, ProfileClock
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ProfileRegistry(os.path.join(tmp, 'main.db'))
+
+        # 同一档案的会话共享数据库，不同档案各自一个文件
+        first = registry.acquire()
+        second = registry.acquire('default')
+        mom = registry.acquire('妈妈')
+        assert first is second and first.db is second.db
+        assert mom.db.db_path == os.path.join(tmp, 'profiles', '妈妈.db')
+        assert registry.active_profiles() == {'default': 2, '妈妈': 1}
+        assert registry.list_profiles() == ['default', '妈妈']
+
+        mom.db.update_spirit_blood(5, 0)
+        assert mom.db.get_user_data().current_spirit != first.db.get_user_data().current_spirit
+
+        try:
+            registry.acquire('../escape')
+            assert False, "非法档案名应被拒绝"
+        except ValueError:
+            pass
+
+        # 最后一个会话释放时关闭
+        registry.release(second)
+        assert registry.active_profiles()['default'] == 1
+        registry.release(first)
+        registry.release(mom)
+        assert registry.active_profiles() == {}
+
+    # 一个时钟线程通知所有订阅者
+    clock = ProfileClock(0.01)
+    ticks = {'a': threading.Event(), 'b': threading.Event()}
+    clock.subscribe(ticks['a'].set)
+    clock.subscribe(ticks['b'].set)
+    assert ticks['a'].wait(2) and ticks['b'].wait(2)
+    clock.stop()
+    print("   档案隔离与共享时钟正常")
+
+    print("\n[PASS] 多档案测试完成")
+
+def test_changelog():
+    """测试变更日志与增量读取"""
+    print("\n========== 测试变更日志 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'cdc.db'))
+
+        # 迁移时现有数据记为插入，从 0 读取即为全量
+        seeded = db.get_changes_since(0, limit=100000)
+        assert {change.table for change in seeded.changes} >= {'user_config', 'tasks'}
+        version = db.get_change_version()
+        assert seeded.version == version and not seeded.has_more
+
+        db.add_finance_record('income', 10, '工资')
+        record_id = db.get_finance_records(1)[0].id
+        db.update_spirit_blood(1, 0)
+        db.delete_finance_record(record_id)
+        db.add_finance_record('expense', 5, '餐饮')
+
+        changes = db.get_changes_since(version)
+        assert [(c.table, c.op) for c in changes.changes] == [
+            ('finance_records', 'I'), ('user_config', 'U'), ('finance_records', 'D'), ('finance_records', 'I')
+        ]
+
+        # 合并后插入又删除的行不出现
+        net = db.get_changes_since(version, tables=('finance_records',), coalesce=True)
+        assert [(c.row_id != record_id, c.op) for c in net.changes] == [(True, 'I')]
+        assert net.version == db.get_change_version()
+
+        # 分批读取
+        first = db.get_changes_since(version, limit=3)
+        assert len(first.changes) == 3 and first.has_more
+        rest = db.get_changes_since(first.version, limit=3)
+        assert len(rest.changes) == 1 and not rest.has_more
+
+        # 清理后过旧的版本需要全量重读
+        db.prune_changelog(first.version)
+        assert db.get_changes_since(version).resync
+        assert not db.get_changes_since(first.version).resync
+        print(f"   当前版本 {db.get_change_version()}")
+
+        db.close()
+
+    print("\n[PASS] 变更日志测试完成")
+
+def test_sync():
+    """测试两台设备通过同步包交换变化"""
+    print("\n========== 测试离线同步 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        desktop = DatabaseManager(os.path.join(tmp, 'desktop.db'))
+        phone = DatabaseManager(os.path.join(tmp, 'phone.db'))
+        for db in (desktop, phone):
+            pin_blood_clock(db)
+        bundle = os.path.join(tmp, 'bundle' + SYNC_BUNDLE_SUFFIX)
+
+        def exchange(source, target):
+            exported = source.export_sync_bundle(bundle)
+            assert exported is not None
+            return exported, target.import_sync_bundle(bundle)
+
+        # 第一次同步：两端初始化时写入的默认数据按内容对应，不会重复
+        exchange(desktop, phone)
+        exchange(phone, desktop)
+        tasks = desktop.get_tasks()
+        assert len(phone.get_tasks()) == len(tasks)
+        spirit = desktop.get_user_data().current_spirit
+        assert phone.get_user_data().current_spirit == spirit
+
+        # 两端离线各自修改，其中同一个任务两端都改了名字
+        desktop.add_finance_record('income', 100, '工资')
+        desktop.complete_task(tasks[0].id, 5, 0)
+        desktop.update_task(tasks[2].id, '晨跑', 1, 0)
+        phone_tasks = phone.get_tasks()
+        phone.add_finance_record('expense', 30, '餐饮')
+        phone.complete_task(phone_tasks[1].id, 3, 0)
+        phone.update_task(phone_tasks[2].id, '夜跑', 1, 0)
+
+        _, result = exchange(desktop, phone)
+        assert result['applied'] > 0 and not result['stale']
+        exchange(phone, desktop)
+
+        # 收支流水合并，心境按两端的变化量相加，冲突两端取同一结果
+        for db in (desktop, phone):
+            balance = db.get_finance_balance()
+            assert balance['record_count'] == 2 and balance['income'] == 100 and balance['expense'] == 30
+            assert db.get_user_data().current_spirit == spirit + 8
+        assert [t.name for t in desktop.get_tasks()] == [t.name for t in phone.get_tasks()]
+        assert phone.get_user_data().current_blood == desktop.get_user_data().current_blood
+
+        # 导入写入的变化不会再发回来源设备，重复导入同一个包不生效
+        exported, result = exchange(desktop, phone)
+        assert exported['changes'] == 0 and result['applied'] == 0
+        assert phone.import_sync_bundle(bundle)['stale']
+
+        # 删除同样同步
+        desktop.delete_finance_record(desktop.get_finance_records(1)[0].id)
+        exchange(desktop, phone)
+        assert phone.get_finance_balance()['record_count'] == 1
+        print(f"   设备 {desktop.get_sync_status()['device_id']} <-> {phone.get_sync_status()['device_id']}")
+
+        desktop.close()
+        phone.close()
+
+    print("\n[PASS] 离线同步测试完成")
+
+def test_sql_profiler():
+    """测试 SQL 性能分析的开关、方法分位数与慢查询日志"""
+    print("\n========== 测试SQL性能分析 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'profile.db'))
+
+        # 关闭时不包装方法、不挂语句回调
+        assert not db.profiler.enabled and 'get_tasks' not in vars(db)
+        assert not db._pool._statement_listeners
+
+        db.profiler.enable()
+        db.profiler.slow_ms = 0  # 所有语句都记入慢查询日志
+        for _ in range(5):
+            db.get_tasks()
+        db.add_finance_record('income', 10, '工资')
+        db.get_finance_records(10)
+
+        report = db.profiler.report()
+        tasks = report['methods']['get_tasks']
+        assert tasks['count'] == 5 and tasks['rows'] == 5 * len(db.get_tasks())
+        assert tasks['p50_ms'] <= tasks['p95_ms'] <= tasks['p99_ms'] <= tasks['max_ms']
+        assert 'add_finance_record' in report['methods']
+
+        # 语句按去掉字面量后的文本归类，慢查询附带查询计划
+        assert all("'工资'" not in item['sql'] for item in report['statements'])
+        selects = [entry for entry in report['slow_queries'] if entry['sql'].lstrip().upper().startswith('SELECT')]
+        assert selects and all(entry['plan'] for entry in selects)
+        assert {entry['method'] for entry in report['slow_queries']} >= {'get_tasks', 'add_finance_record'}
+
+        path = os.path.join(tmp, 'profile.json')
+        db.profiler.dump(path)
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['methods']['get_tasks']['count'] >= 5
+
+        db.profiler.disable()
+        assert 'get_tasks' not in vars(db) and not db._pool._statement_listeners
+        db.get_tasks()
+        assert db.profiler.report(with_plans=False)['methods']['get_tasks']['count'] == 6
+        print(f"   get_tasks p95 {tasks['p95_ms']:.2f}ms，慢查询 {len(report['slow_queries'])} 条")
+
+        db.close()
+
+    print("\n[PASS] SQL性能分析测试完成")
+
+def test_query_cache():
+    """测试查询缓存按表版本号失效（含触发器维护的表）"""
+    print("\n========== 测试查询缓存 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'cache.db'))
+
+        balance = db.get_finance_balance()['balance']
+        db.get_finance_balance()
+        assert db.cache_stats()['hits'] >= 1
+
+        # finance_balance 由触发器维护，写 finance_records 后同样失效
+        db.add_finance_record("income", 12)
+        assert db.get_finance_balance()['balance'] == balance + 12
+
+        db.set_money(500)
+        assert db.get_user_data().current_money == 500
+
+        # 返回值是缓存的拷贝，修改不影响缓存
+        data = db.load_jingjie_data()
+        data["gongfa"]["realms"].clear()
+        assert db.load_jingjie_data()["gongfa"]["realms"]
+
+        print(f"   {db.cache_stats()}")
+        db.close()
+
+    print("\n[PASS] 查询缓存测试完成")
+
+def test_finance_import():
+    """测试收支记录批量导入：列映射、校验、去重与账本/汇总重建"""
+    print("\n========== 测试收支批量导入 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'bank.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("交易时间,金额,分类,备注\n")
+            for i in range(1, 301):
+                f.write(f"2024/03/{i % 28 + 1:02d} 12:{i % 60:02d},{'-' if i % 3 else ''}{i}.50,餐饮,第{i}笔\n")
+            f.write("2024/03/01 08:00,abc,餐饮,无效金额\n")
+
+        db = DatabaseManager(os.path.join(tmp, 'import.db'))
+        stages = []
+        result = db.import_finance_records(csv_path, batch_size=100,
+                                           progress_callback=lambda stage, count: stages.append(stage))
+        print(f"   首次导入: {result['inserted']} 条，无效 {result['invalid']} 行")
+        assert result['inserted'] == 300 and result['invalid'] == 1
+        assert stages[-1] == 'done'
+
+        # 再次导入全部视为重复
+        again = db.import_finance_records(csv_path)
+        assert again['inserted'] == 0 and again['duplicates'] == 300
+
+        # 账本与每日汇总与明细一致，触发器已恢复
+        assert not db.verify_finance_balance()['has_drift']
+        march = db.get_daily_rollups('2024-03-01', '2024-04-01')
+        assert sum(day['expense'] for day in march) == db.get_finance_balance()['expense']
+        db.add_finance_record("income", 1)
+        assert not db.verify_finance_balance()['has_drift']
+
+        # 全文索引在导入后一次补齐：每条导入记录一行，重复导入不重复建索引，插入触发器已恢复
+        assert [r.text for r in db.search("第123笔", sources=('finance',))] == ["第123笔"]
+        start, end = source_range('finance')
+        with db.transaction() as conn:
+            indexed = conn.execute('SELECT COUNT(*) FROM search_index WHERE rowid BETWEEN ? AND ?',
+                                   (start, end)).fetchone()[0]
+        assert indexed == 300, indexed
+        db.add_finance_record("expense", 5, "餐饮", "导入后的火锅")
+        assert db.search("火锅", sources=('finance',))
+
+        db.close()
+
+    print("\n[PASS] 收支批量导入测试完成")
+
+def test_keyset_pagination():
+    """测试键集分页：同一时间戳的记录不重复、不遗漏"""
+    print("\n========== 测试键集分页 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'paging.db'))
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO finance_records (type, amount, description, created_at) VALUES ('income', 1, ?, ?)",
+                [(f"第{i}笔", f"2024-03-0{i % 3 + 1} 12:00:00") for i in range(25)]
+            )
+
+        seen = []
+        page = db.get_finance_records_page(limit=10)
+        while True:
+            seen.extend(record.description for record in page.items)
+            if not page.has_more:
+                break
+            page = db.get_finance_records_page(limit=10, before=page.next_cursor)
+        print(f"   分页读取 {len(seen)} 条")
+        assert len(seen) == len(set(seen)) == 25
+        assert db.get_finance_records(limit=25) == db.get_finance_records_page(limit=25).items
+
+        # 按 id 删除，同内容的记录不受影响
+        target = db.get_finance_records(limit=1)[0]
+        assert db.delete_finance_record(target.id)
+        assert not db.delete_finance_record(target.id)
+        assert target.id not in [record.id for record in db.get_finance_records(limit=25)]
+        assert db.get_finance_balance()['income'] == 24
+
+        first = db.get_quotes_page(limit=3)
+        rest = db.get_quotes_page(limit=1000, before=first.next_cursor)
+        assert first.items + rest.items == db.get_all_quotes()
+        assert db.count_quotes() == len(db.get_all_quotes())
+
+        plan = db.explain_query_plan(
+            "SELECT id FROM finance_records WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT 11",
+            ('2024-03-02 12:00:00', 10)
+        )
+        assert any('idx_finance_records_created_id' in step for step in plan), plan
+
+        db.close()
+
+    print("\n[PASS] 键集分页测试完成")
+
+def test_full_text_search():
+    """测试全文搜索：中文二元组分词、触发器同步与来源筛选"""
+    print("\n========== 测试全文搜索 ==========")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'search.db'))
+
+        db.add_quote("修仙之路漫漫", "韩立")
+        db.add_finance_record("expense", 30, "餐饮", "和韩立吃火锅")
+        results = db.search("韩立")
+        print(f"   '韩立' 命中 {len(results)} 条: {[r.source for r in results]}")
+        assert {'quote', 'finance'} <= {r.source for r in results}
+
+        # 短语中间的片段与单字都能命中
+        quote = db.search("仙之路", sources=('quote',))[0]
+        assert quote.text == "修仙之路漫漫"
+        assert db.search("锅", sources=('finance',))
+
+        # 删除（软删除）后索引同步移除
+        db.delete_quote(quote.ref_id)
+        assert not db.search("仙之路")
+
+        # 诗句库由调用方同步，内容未变时不重复写入
+        library = [{"text": "天行健，君子以自强不息", "author": "周易", "category": "励志"}]
+        assert db.sync_poetry_index(library) and db.sync_poetry_index(library)
+        assert [r.ref_id for r in db.search("自强", sources=('poetry',))] == [0]
+
+        # 用户输入中的 FTS5 语法字符不会导致查询出错
+        assert db.search('"AND* (') == []
+
+        db.close()
+
+    print("\n[PASS] 全文搜索测试完成")
+
+def test_benchmarks():
+    """测试基准数据生成的确定性与基线比较"""
+    print("\n========== 测试基准测试套件 ==========")
+    from benchmarks.datagen import generate
+    from benchmarks.suite import run_suite, compare, regressions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        end = date(2024, 6, 30)
+        snapshots = []
+        for name in ('a.db', 'b.db'):
+            db = DatabaseManager(os.path.join(tmp, name))
+            counts = generate(db, 'tiny', seed=7, end=end)
+            with db.transaction() as conn:
+                snapshots.append((
+                    counts,
+                    conn.execute('SELECT type, amount, category, created_at FROM finance_records ORDER BY id').fetchall(),
+                    conn.execute('SELECT task_id, completed_at FROM task_records ORDER BY id').fetchall(),
+                ))
+            if name == 'b.db':
+                results = run_suite(db, repeat=2, include_views=False)
+            db.close()
+
+        # 相同种子与截止日期生成的数据完全相同
+        assert snapshots[0] == snapshots[1]
+        counts = snapshots[0][0]
+        assert counts['finance_records'] == len(snapshots[0][1]) == 300
+
+        stats = results['benchmarks']['get_tasks']
+        assert stats['runs'] == 2 and stats['min_ms'] <= stats['median_ms'] <= stats['p95_ms']
+        assert any(name.startswith('write.') for name in results['benchmarks'])
+
+        # 与自身比较没有退化；基线翻倍变慢时记为退化
+        assert not regressions(compare(results, results))
+        faster = {'benchmarks': {name: dict(stats, median_ms=stats['median_ms'] / 2)
+                                 for name, stats in results['benchmarks'].items()}}
+        slower = regressions(compare(results, faster, noise_floor_ms=0))
+        assert {row['name'] for row in slower} == set(results['benchmarks'])
+        print(f"   生成 {counts}，计时 {len(results['benchmarks'])} 项")
+
+    print("\n[PASS] 基准测试套件测试完成")
+
+def test_memory_database():
+    """测试内存数据库的载入、按变化写回与快照"""
+    print("\n========== 测试内存数据库 ==========")
+    from database.memory import load_initial_tasks
+
+    # 纯内存数据库不产生文件，默认任务来自 initial_tasks.json
+    db = DatabaseManager(':memory:')
+    assert db.in_memory and db.snapshot_path is None
+    assert sorted(task.name for task in db.get_tasks()) == sorted(task[0] for task in load_initial_tasks())
+    db.add_finance_record('income', 10, '工资')
+    assert db.get_finance_balance()['income'] == 10
+    db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'memory.db')
+        db = DatabaseManager(path, in_memory=True)
+        assert os.path.exists(path)  # 新建时立即写出文件
+
+        # 没有变化时不写回，有变化时写回
+        assert not db.snapshot_if_changed()
+        db.get_tasks()
+        assert not db.snapshot_if_changed()
+        db.add_finance_record('income', 20, '奖金')
+        assert db.snapshot_if_changed() and not db.snapshot_if_changed()
+
+        # 另存的快照是完整的数据库
+        copy_path = db.snapshot(os.path.join(tmp, 'copy.db'))
+        db.add_finance_record('expense', 5, '餐饮')
+        db.close()  # 关闭时写回
+
+        db = DatabaseManager(path)
+        assert db.get_finance_balance()['expense'] == 5
+        db.close()
+        db = DatabaseManager(':memory:', seed=copy_path)
+        balance = db.get_finance_balance()
+        assert balance['income'] == 20 and balance['expense'] == 0
+        db.close()
+
+    print("\n[PASS] 内存数据库测试完成")
+
+def test_lazy_startup():
+    """测试首屏只读当前境界名称，重量级模块在导入时不加载依赖、不启动线程"""
+    print("\n========== 测试延迟加载 ==========")
+    import subprocess
+
+    db = DatabaseManager(':memory:')
+    data = db.load_jingjie_data()
+    data['gongfa']['realms'].append({"name": "筑基期", "skills": {}, "completed": False})
+    data['gongfa']['current_realm_index'] = 1
+    db.save_jingjie_data(data)
+    assert db.get_current_realm_name() == "筑基期"
+    data['gongfa']['current_realm_index'] = 5
+    db.save_jingjie_data(data)
+    assert db.get_current_realm_name() == "无境界"
+    db.close()
+
+    # 在新进程中导入，检查 sys.modules 与线程数
+    code = (
+        "import sys, threading; "
+        "import ai_providers, systems.poetry_system, utils.performance, utils.export; "
+        "heavy = [m for m in ('requests', 'psutil', 'reportlab', 'pandas') if m in sys.modules]; "
+        "print(heavy, threading.active_count())"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout.strip().splitlines()[-1]
+    assert output == "[] 1", output
+    print(f"   导入后: {output}")
+
+    print("\n[PASS] 延迟加载测试完成")
+
+def test_startup_profile():
+    """测试启动阶段计时、进程内导入耗时、预算检查和启动日志"""
+    print("\n========== 测试启动剖析 ==========")
+    import tempfile
+    from utils.startup import StartupProfiler, check_budgets, load_startup_log, format_run
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 两个新模块：外层导入内层，外层的累计耗时包含内层
+        with open(os.path.join(tmp, 'startup_probe_inner.py'), 'w') as f:
+            f.write("import time\ntime.sleep(0.02)\n")
+        with open(os.path.join(tmp, 'startup_probe_outer.py'), 'w') as f:
+            f.write("import startup_probe_inner\n")
+        sys.path.insert(0, tmp)
+        profiler = StartupProfiler()
+        meta_path = list(sys.meta_path)
+        try:
+            profiler.begin(import_timing=True)
+            with profiler.phase('outer'):
+                with profiler.phase('inner'):
+                    import startup_probe_outer
+            try:
+                with profiler.phase('broken'):
+                    raise ImportError("缺少依赖")
+            except ImportError:
+                pass
+            log_path = os.path.join(tmp, 'startup_log.json')
+            run = profiler.finish(path=log_path, budgets={'inner': 10000, 'outer': 1, 'broken': 0})
+        finally:
+            sys.path.remove(tmp)
+
+        # 导入计时器已移除，模块的加载器已还原
+        assert sys.meta_path == meta_path
+        assert type(startup_probe_outer.__loader__).__name__ == 'SourceFileLoader'
+        assert startup_probe_outer.__spec__.loader is startup_probe_outer.__loader__
+
+        phases = {p['name']: p for p in run['phases']}
+        assert phases['inner']['parent'] == 'outer' and phases['outer']['parent'] is None
+        assert phases['broken']['failed'] and phases['outer']['duration_ms'] >= 20
+        imports = {item['module']: item for item in run['imports']}
+        outer, inner = imports['startup_probe_outer'], imports['startup_probe_inner']
+        assert inner['cumulative_ms'] >= 20 and outer['cumulative_ms'] >= inner['cumulative_ms']
+        assert outer['self_ms'] < inner['cumulative_ms']
+        # 失败的阶段不参与预算检查
+        assert [item['phase'] for item in run['over_budget']] == ['outer']
+        assert check_budgets({'total': 5.0}, {'total': 10, 'db_init': 1}) == []
+
+        # 结束后不再记录；日志可读回
+        with profiler.phase('late'):
+            pass
+        assert profiler.finish() is None
+        runs = load_startup_log(log_path)
+        assert len(runs) == 1 and runs[0]['total_ms'] == run['total_ms']
+        assert 'startup_probe_inner' in format_run(runs[0])
+        assert load_startup_log(os.path.join(tmp, 'missing.json')) == []
+        print(f"   outer 累计 {outer['cumulative_ms']:.1f}ms，自身 {outer['self_ms']:.1f}ms")
+
+    print("\n[PASS] 启动剖析测试完成")
+
 def main():
     """主测试函数"""
     print("=" * 50)
@@ -125,6 +889,60 @@ def main():
         # 测试数据库表
         test_database_tables()
 
+        # 测试查询计划
+        test_query_plans()
+
+        # 测试事务原子性
+        test_transaction_atomicity()
+
+        # 测试后台写入队列
+        test_write_queue()
+
+        # 测试寿元推算
+        test_derived_blood()
+
+        # 测试状态时间序列
+        test_state_series()
+
+        # 测试统计查询
+        test_analytics()
+
+        # 测试多档案
+        test_profiles()
+
+        # 测试变更日志
+        test_changelog()
+
+        # 测试离线同步
+        test_sync()
+
+        # 测试SQL性能分析
+        test_sql_profiler()
+
+        # 测试查询缓存
+        test_query_cache()
+
+        # 测试收支批量导入
+        test_finance_import()
+
+        # 测试键集分页
+        test_keyset_pagination()
+
+        # 测试全文搜索
+        test_full_text_search()
+
+        # 测试基准测试套件
+        test_benchmarks()
+
+        # 测试内存数据库
+        test_memory_database()
+
+        # 测试延迟加载
+        test_lazy_startup()
+
+        # 测试启动剖析
+        test_startup_profile()
+
         # 测试励志库
         test_lizhi_system()
 
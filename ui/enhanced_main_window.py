@@ -2,23 +2,14 @@ import flet as ft
 import threading
 import time
 from datetime import datetime, timedelta
+from functools import cached_property
 from typing import Dict, List, Any, Optional
 
 from database.db_manager import DatabaseManager
 from database.models import Task
-from systems.panel import PanelSystem
-from systems.xinjing import XinjingSystem
-from systems.jingjie import JingjieSystem
-from systems.lingshi import LingshiSystem
-from systems.tongyu import TongyuSystem
-from systems.settings import SettingsSystem
 from ui.enhanced_styles import EnhancedStyles, ThemeManager
 from ui.charts import ChartComponents, DashboardLayouts
 from ui.task_widgets import TaskWidget
-from utils.export import ReportExporter
-from utils.backup import BackupManager
-from ai_providers.ai_manager import ai_manager
-from systems.poetry_system import PoetrySystem
 from config import APP_NAME, WINDOW_WIDTH, WINDOW_HEIGHT, ThemeConfig, GameConfig
 
 
@@ -35,24 +26,33 @@ class EnhancedMainWindow:
         # 主题管理器
         self.theme_manager = ThemeManager()
         
-        # 工具管理器
-        self.report_exporter = ReportExporter(str(self.db.db_path))
-        self.backup_manager = BackupManager(str(self.db.db_path))
-        
-        # 初始化各个系统
-        self.panel_system = PanelSystem(self.db)
-        self.xinjing_system = XinjingSystem(self.db)
-        self.jingjie_system = JingjieSystem(self.db)
-        self.lingshi_system = LingshiSystem(self.db)
-        self.tongyu_system = TongyuSystem(self.db)
-        self.settings_system = SettingsSystem(self.db)
-        self.poetry_system = PoetrySystem(self.db)
-        
         # 页面容器
         self.main_content = None
         self.fab = None
         self.bottom_nav = None
     
+    # 工具和系统在首次使用时才导入并构造：报告导出依赖 reportlab/pandas，
+    # 备份管理器会启动调度线程，设置与诗句模块连带导入 AI 接口
+    @cached_property
+    def report_exporter(self):
+        from utils.export import ReportExporter
+        return ReportExporter(str(self.db.db_path))
+    
+    @cached_property
+    def backup_manager(self):
+        from utils.backup import BackupManager
+        return BackupManager(str(self.db.db_path))
+    
+    @cached_property
+    def settings_system(self):
+        from systems.settings import SettingsSystem
+        return SettingsSystem(self.db)
+    
+    @cached_property
+    def poetry_system(self):
+        from systems.poetry_system import PoetrySystem
+        return PoetrySystem(self.db)
+    
     def setup(self):
         """设置主窗口"""
         # 设置页面基本属性
@@ -238,7 +238,7 @@ class EnhancedMainWindow:
         
         # 获取财务数据
         finance_stats = self.db.get_finance_summary()
-        total_money = finance_stats.get('total_income', 0) - finance_stats.get('total_expense', 0)
+        total_money = finance_stats.get('balance', 0)
         
         # 获取今日任务
         today_tasks = self.db.get_today_tasks()
@@ -392,7 +392,7 @@ class EnhancedMainWindow:
         
         # 任务统计
         total_tasks = len(tasks)
-        completed_tasks = sum(1 for task in tasks if task.status == 1)
+        completed_tasks = sum(1 for task in tasks if task.completed_today)
         completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         
         # 头部统计
@@ -453,7 +453,7 @@ class EnhancedMainWindow:
     
     def _create_enhanced_task_widget(self, task: Task) -> ft.Container:
         """创建增强的任务卡片"""
-        is_completed = task.status == 1
+        is_completed = task.completed_today
         
         # 任务效果显示
         effects = []
@@ -680,34 +680,33 @@ class EnhancedMainWindow:
     
     # 血量定时器相关方法
     def start_blood_timer(self):
-        """启动血量自动减少定时器"""
-        def decrease_blood():
+        """启动寿元显示刷新定时器
+
+        寿元由基准值和经过的时间推算（读取时计算），定时器不写数据库，
+        只在面板页面定期刷新显示。
+        """
+        def refresh_blood():
             while self.is_running:
-                time.sleep(60)  # 每60秒执行一次
-                if self.is_running:
+                time.sleep(GameConfig.BLOOD_DISPLAY_REFRESH_SECONDS)
+                if self.is_running and self.current_page == "panel":
+                    # 使用page.run_task确保在主线程更新UI
+                    def update_ui():
+                        self.refresh_current_page()
+
                     try:
-                        # 减少1点血量
-                        success = self.db.decrease_blood_by_time(1)
-                        if success and self.current_page == "panel":
-                            # 使用page.run_task确保在主线程更新UI
-                            def update_ui():
-                                self.refresh_current_page()
-                            
-                            try:
-                                self.page.run_task(update_ui)
-                            except:
-                                pass  # 页面可能已经关闭
-                    except Exception as e:
-                        print(f"血量定时器错误: {e}")
-        
-        self.blood_timer = threading.Thread(target=decrease_blood, daemon=True)
+                        self.page.run_task(update_ui)
+                    except:
+                        pass  # 页面可能已关闭
+
+        self.blood_timer = threading.Thread(target=refresh_blood, daemon=True)
         self.blood_timer.start()
     
     def stop_blood_timer(self, e=None):
         """停止血量定时器"""
         self.is_running = False
-        if self.backup_manager:
+        if 'backup_manager' in self.__dict__:
             self.backup_manager.stop_scheduler()
+        self.db.close()
     
     def refresh_current_page(self):
         """刷新当前页面"""
@@ -716,19 +715,19 @@ class EnhancedMainWindow:
         # 其他页面的刷新逻辑...
     
     def _check_daily_poetry(self):
-        """检查是否需要显示每日诗句弹窗"""
-        if self.poetry_system.should_show_daily_poetry():
-            # 延迟1秒显示弹窗，确保界面已完全加载
-            import threading
-            def delayed_show():
-                import time
-                time.sleep(1)
-                try:
+        """检查是否需要显示每日诗句弹窗（诗句库在后台线程中加载，不拖慢首屏）"""
+        # 延迟1秒显示弹窗，确保界面已完全加载
+        import threading
+        def delayed_show():
+            import time
+            time.sleep(1)
+            try:
+                if self.poetry_system.should_show_daily_poetry():
                     self.page.run_task(self._show_daily_poetry_dialog)
-                except:
-                    pass  # 页面可能已关闭
+            except:
+                pass  # 页面可能已关闭
             
-            threading.Thread(target=delayed_show, daemon=True).start()
+        threading.Thread(target=delayed_show, daemon=True).start()
     
     def _show_daily_poetry_dialog(self):
         """显示每日诗句弹窗"""
@@ -0,0 +1,117 @@
+# ui/global_search.py - 全局搜索框
+import asyncio
+import flet as ft
+from database.async_db import AsyncDatabaseManager
+from database.models import SearchResult
+from config import ThemeConfig
+from typing import List
+
+
+class GlobalSearch:
+    """全局搜索框 - 在全文索引中搜索语录、诗句、道友、互动记录和收支备注
+
+    输入停顿后在数据库线程池中查询，较早发出的查询结果到达时直接丢弃；
+    点击结果跳转到对应页面。
+    """
+
+    DEBOUNCE_SECONDS = 0.25
+    RESULT_LIMIT = 20
+
+    # 来源 -> (标签, 图标, 跳转页面)
+    SOURCE_INFO = {
+        'quote': ("语录", ft.icons.FORMAT_QUOTE, "settings"),
+        'poetry': ("诗句", ft.icons.AUTO_STORIES, None),
+        'friend': ("道友", ft.icons.PERSON, "tongyu"),
+        'interaction': ("互动", ft.icons.CHAT, "tongyu"),
+        'finance': ("收支", ft.icons.DIAMOND, "lingshi"),
+    }
+
+    def __init__(self, adb: AsyncDatabaseManager, on_navigate=None):
+        self.adb = adb
+        self.on_navigate = on_navigate
+        self._query_token = 0  # 每次输入递增，用于丢弃过期的查询结果
+
+        self.search_field = ft.TextField(
+            hint_text="搜索语录、诗句、道友、互动、收支备注",
+            prefix_icon=ft.icons.SEARCH,
+            dense=True,
+            border_radius=20,
+            text_size=14,
+            on_change=self._on_change,
+            on_submit=self._on_change,
+        )
+        self.results_column = ft.Column(spacing=2, scroll=ft.ScrollMode.AUTO)
+        self.results_container = ft.Container(
+            content=self.results_column,
+            bgcolor=ThemeConfig.CARD_COLOR,
+            border_radius=12,
+            padding=8,
+            visible=False,
+        )
+
+    def build(self) -> ft.Container:
+        """创建搜索框及其结果列表"""
+        return ft.Container(
+            content=ft.Column(
+                controls=[self.search_field, self.results_container],
+                spacing=6,
+            ),
+            padding=ft.padding.only(left=16, right=16, top=10),
+        )
+
+    def clear(self):
+        """清空搜索框并收起结果"""
+        self._query_token += 1
+        self.search_field.value = ""
+        self.results_column.controls.clear()
+        self.results_container.visible = False
+
+    def _on_change(self, e):
+        self._query_token += 1
+        e.page.run_task(self._search, e.page, self._query_token, self.search_field.value or "")
+
+    async def _search(self, page: ft.Page, token: int, query: str):
+        # 连续输入时只查询最后一次
+        await asyncio.sleep(self.DEBOUNCE_SECONDS)
+        if token != self._query_token:
+            return
+
+        results = await self.adb.search(query, limit=self.RESULT_LIMIT) if query.strip() else []
+        if token != self._query_token:
+            return
+
+        self._show_results(query, results)
+        page.update()
+
+    def _show_results(self, query: str, results: List[SearchResult]):
+        self.results_column.controls.clear()
+        if not query.strip():
+            self.results_container.visible = False
+            return
+
+        if not results:
+            self.results_column.controls.append(
+                ft.Text("没有找到相关内容", size=13, color=ThemeConfig.TEXT_SECONDARY)
+            )
+        for result in results:
+            label, icon, target_page = self.SOURCE_INFO.get(result.source, ("", ft.icons.SEARCH, None))
+            text = result.text if len(result.text) <= 40 else result.text[:40] + "..."
+            self.results_column.controls.append(
+                ft.ListTile(
+                    leading=ft.Icon(icon, color=ThemeConfig.PRIMARY_COLOR, size=20),
+                    title=ft.Text(text, size=14),
+                    subtitle=ft.Text(label, size=11, color=ThemeConfig.TEXT_SECONDARY),
+                    dense=True,
+                    on_click=lambda e, p=target_page: self._open(e, p),
+                )
+            )
+        # 结果较多时限制高度，在列表内滚动
+        self.results_container.height = min(len(results), 6) * 56 + 16 if results else None
+        self.results_container.visible = True
+
+    def _open(self, e, target_page: str):
+        self.clear()
+        if target_page and self.on_navigate:
+            self.on_navigate(target_page)
+        else:
+            e.page.update()
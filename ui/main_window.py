@@ -1,42 +1,40 @@
 # ui/main_window.py - 修正版
 import flet as ft
-import threading
-import time
-from database.db_manager import DatabaseManager
+from database.profiles import profiles
 from database.models import Task
-from systems.panel import PanelSystem
-from systems.xinjing import XinjingSystem
-from systems.jingjie import JingjieSystem
-from systems.lingshi import LingshiSystem
-from systems.tongyu import TongyuSystem
-from systems.settings import SettingsSystem
-from systems.lizhi import LizhiSystem
 from ui.task_widgets import TaskWidget
+from ui.global_search import GlobalSearch
+from utils.startup import startup
 from config import APP_NAME, WINDOW_WIDTH, WINDOW_HEIGHT, ThemeConfig, GameConfig
 
 class MainWindow:
     """主窗口类 - 修正版"""
     
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, profile_name: str = None):
         self.page = page
-        self.db = DatabaseManager()
+        # 同一档案的会话共享数据库与时钟，界面状态各自独立
+        self.profile = profiles.acquire(profile_name)
+        self.db = self.profile.db
+        self.adb = self.profile.adb
+        self._page_load_token = 0  # 页面切换计数，丢弃过期的异步加载结果
         self.current_page = "panel"
-        self.blood_timer = None
         self.is_running = True
         
-        # 初始化各个系统
-        self.panel_system = PanelSystem(self.db)
-        self.xinjing_system = XinjingSystem(self.db)
-        self.jingjie_system = JingjieSystem(self.db)
-        self.lingshi_system = LingshiSystem(self.db)
-        self.tongyu_system = TongyuSystem(self.db)
-        self.lizhi_system = LizhiSystem(self.db)
-        self.settings_system = SettingsSystem(self.db)
+        # 各个系统在首次进入对应页面时才导入模块并构造，首屏只加载面板的数据
+        self.panel_system = None
+        self.xinjing_system = None
+        self.jingjie_system = None
+        self.lingshi_system = None
+        self.tongyu_system = None
+        self.settings_system = None
     
     def setup(self):
         """设置主窗口"""
         # 创建主内容容器
         self.main_content = ft.Column(expand=True)
+
+        # 全局搜索框
+        self.global_search = GlobalSearch(self.adb, on_navigate=self.navigate_to)
         
         # 创建悬浮按钮 - 优化版
         self.fab = ft.FloatingActionButton(
@@ -54,6 +52,7 @@ class MainWindow:
         self.page.add(
             ft.Column(
                 controls=[
+                    self.global_search.build(),
                     ft.Container(
                         content=self.main_content,
                         expand=True,
@@ -75,52 +74,74 @@ class MainWindow:
         # 设置底部导航栏
         self.page.bottom_appbar = self.bottom_nav
         
-        # 启动血量自动减少定时器
+        # 订阅档案时钟，定期刷新寿元显示
         self.start_blood_timer()
+
+        if self.page.web:
+            # 浏览器会话断线后可能重连：断线时只暂停刷新，会话过期关闭时才释放档案
+            self.page.on_disconnect = lambda e: self.profile.clock.unsubscribe(self._on_clock_tick)
+            self.page.on_connect = lambda e: self.start_blood_timer()
+            self.page.on_close = self.stop_blood_timer
+        else:
+            # 桌面窗口关闭时释放档案
+            self.page.on_disconnect = self.stop_blood_timer
         
-        # 页面关闭时停止定时器
-        self.page.on_disconnect = self.stop_blood_timer
-        
+        # 显示默认页面（首次 page.update：面板骨架屏）
+        with startup.phase('first_update'):
+            self.show_panel()
+
         # 显示每日励志语录
+        from systems.lizhi import LizhiSystem
         LizhiSystem.show_daily_quote(self.page, self.db)
 
-        # 显示默认页面
-        self.show_panel()
+        # 后台把诗句库同步进全文索引
+        self.page.run_task(self._index_poetry)
     
     def start_blood_timer(self):
-        """启动血量自动减少定时器 - 性能优化版"""
-        def decrease_blood():
-            update_counter = 0  # 更新计数器
-            while self.is_running:
-                time.sleep(60)  # 每60秒执行一次
-                if self.is_running:
-                    try:
-                        # 减少1点血量
-                        success = self.db.decrease_blood_by_time(1)
-
-                        # 只在面板页面且每5分钟更新一次UI（减少刷新频率）
-                        if success:
-                            update_counter += 1
-                            if self.current_page == "panel" and update_counter % 5 == 0:
-                                # 使用page.run_task确保在主线程更新UI
-                                def update_ui():
-                                    self.refresh_current_page()
-
-                                try:
-                                    self.page.run_task(update_ui)
-                                except:
-                                    pass  # 页面可能已关闭
-                    except Exception as e:
-                        print(f"血量更新异常: {e}")
-
-        self.blood_timer = threading.Thread(target=decrease_blood, daemon=True)
-        self.blood_timer.start()
-        print("血量定时器已启动（优化模式：每5分钟刷新UI）")
-    
+        """订阅档案时钟，定期刷新寿元显示
+
+        寿元由基准值和经过的时间推算（读取时计算），时钟不写数据库；
+        同一档案的所有会话共用一个时钟线程，只在面板页面刷新。
+        """
+        self.profile.clock.subscribe(self._on_clock_tick)
+        print(f"寿元显示已订阅档案时钟（每{GameConfig.BLOOD_DISPLAY_REFRESH_SECONDS}秒刷新面板）")
+
+    def _on_clock_tick(self):
+        """时钟线程回调：只原地更新面板上的寿元数字，不重新构建页面"""
+        if self.is_running and self.current_page == "panel" and self.panel_system:
+            # 使用page.run_task确保在主线程更新UI
+            async def update_ui():
+                user_data = await self.adb.get_user_data()
+                if user_data and self.current_page == "panel" and self.panel_system:
+                    self.panel_system.update_blood(user_data.current_blood)
+
+            try:
+                self.page.run_task(update_ui)
+            except Exception as e:
+                print(f"刷新寿元显示错误: {e}")  # 页面可能已关闭
+
+    async def _index_poetry(self):
+        """加载诗句库并同步全文索引，供全局搜索使用
+
+        诗句模块（连带 AI 接口）在数据库线程中导入，不占用界面事件循环。
+        """
+        def index():
+            from systems.poetry_system import PoetrySystem
+            PoetrySystem(self.db)
+
+        try:
+            await self.adb.run(index)
+        except Exception as e:
+            print(f"诗句索引同步失败: {e}")
+
     def stop_blood_timer(self, e=None):
-        """停止血量定时器"""
+        """会话结束：退订档案时钟并释放档案（最后一个会话释放时关闭数据库）"""
+        if not self.is_running:
+            return
         self.is_running = False
-        print("血量定时器已停止")
+        self.profile.clock.unsubscribe(self._on_clock_tick)
+        profiles.release(self.profile)
+        print("寿元显示已停止")
     
     def _create_bottom_nav(self) -> ft.BottomAppBar:
         """创建底部导航栏 - 优化版"""
@@ -195,16 +216,33 @@ class MainWindow:
     
     def show_panel(self):
         """显示个人面板"""
-        self.current_page = "panel"
+        self._show_page_async(
+            "panel",
+            self._build_panel_view,
+            lambda: dict(
+                user_data=self.adb.get_user_data(),
+                tasks=self.adb.get_tasks(),
+                fixed_items=self.adb.get_fixed_items(),
+                debt_summary=self.adb.get_debt_summary(),
+                asset_summary=self.adb.get_asset_summary(),
+                daily_stats=self.adb.get_daily_finance_stats(),
+                current_realm=self.adb.get_current_realm_name(),
+            ),
+        )
+
+    def _build_panel_view(self):
         # 重新创建面板系统实例以获取最新数据
-        self.panel_system = PanelSystem(self.db)
-        self.main_content.controls = [self.panel_system.create_panel_view()]
-        self.fab.visible = False
-        self._update_nav_and_page()
+        with startup.phase('panel_system'):
+            from systems.panel import PanelSystem
+            self.panel_system = PanelSystem(self.db)
+            return self.panel_system.create_panel_view()
     
     def show_xinjing(self):
         """显示心境系统"""
         self.current_page = "xinjing"
+        if self.xinjing_system is None:
+            from systems.xinjing import XinjingSystem
+            self.xinjing_system = XinjingSystem(self.db)
         self.main_content.controls = [
             self.xinjing_system.create_xinjing_view(self.toggle_task, self.delete_task)
         ]
@@ -215,6 +253,7 @@ class MainWindow:
         """显示境界系统"""
         self.current_page = "jingjie"
         # 重新创建实例以刷新数据
+        from systems.jingjie import JingjieSystem
         self.jingjie_system = JingjieSystem(self.db)
         self.main_content.controls = [
             self.jingjie_system.create_jingjie_view(self.refresh_current_page)
@@ -224,28 +263,105 @@ class MainWindow:
     
     def show_lingshi(self):
         """显示灵石系统"""
-        self.current_page = "lingshi"
+        from systems.lingshi import LingshiSystem
+        self._show_page_async(
+            "lingshi",
+            self._build_lingshi_view,
+            lambda: dict(
+                fixed_items=self.adb.get_fixed_items(),
+                user_data=self.adb.get_user_data(),
+                balance=self.adb.get_finance_balance(),
+                debt_summary=self.adb.get_debt_summary(),
+                asset_summary=self.adb.get_asset_summary(),
+                records=self.adb.get_finance_records_page(limit=LingshiSystem.RECORD_PAGE_SIZE),
+            ),
+        )
+
+    def _build_lingshi_view(self):
         # 重新创建实例以刷新数据
+        from systems.lingshi import LingshiSystem
         self.lingshi_system = LingshiSystem(self.db)
-        self.main_content.controls = [
-            self.lingshi_system.create_lingshi_view(self.refresh_current_page)
-        ]
-        self.fab.visible = False
-        self._update_nav_and_page()
+        return self.lingshi_system.create_lingshi_view(self.refresh_current_page)
     
     def show_tongyu(self):
         """显示统御系统"""
-        self.current_page = "tongyu"
+        self._show_page_async(
+            "tongyu",
+            self._build_tongyu_view,
+            lambda: dict(
+                family_members=self.adb.get_family_members(),
+                family_events=self.adb.get_family_events(),
+                friends=self.adb.get_friends(),
+            ),
+        )
+
+    def _build_tongyu_view(self):
         # 重新创建统御系统实例以获取最新数据
+        from systems.tongyu import TongyuSystem
         self.tongyu_system = TongyuSystem(self.db)
-        self.main_content.controls = [self.tongyu_system.create_tongyu_view(self.refresh_current_page)]
+        return self.tongyu_system.create_tongyu_view(self.refresh_current_page)
+
+    def _show_page_async(self, page_name: str, build_view, prefetch=None):
+        """先显示骨架屏，再在数据库线程池中并发预取数据、构建视图，完成后替换
+
+        prefetch 返回 {名称: 协程}，预取结果进入查询缓存，构建视图时直接命中；
+        加载期间切换到其他页面时丢弃本次结果。
+        """
+        self.current_page = page_name
+        self._page_load_token += 1
+        token = self._page_load_token
+
+        self.main_content.controls = [self._create_skeleton()]
         self.fab.visible = False
         self._update_nav_and_page()
 
+        async def load():
+            try:
+                if prefetch:
+                    await self.adb.gather(**prefetch())
+                view = await self.adb.run(build_view)
+            except Exception as e:
+                print(f"加载页面错误: {e}")
+                view = ft.Text(f"加载失败: {e}", color=ThemeConfig.DANGER_COLOR)
+
+            if token != self._page_load_token:
+                return
+            self.main_content.controls = [view]
+            self.page.update()
+            # 第一个完整页面显示出来即启动完成，写入启动日志
+            startup.finish()
+
+        self.page.run_task(load)
+
+    def _create_skeleton(self) -> ft.Column:
+        """页面数据加载中的骨架屏"""
+        def placeholder(height: int) -> ft.Container:
+            return ft.Container(
+                height=height,
+                bgcolor=ft.colors.with_opacity(0.06, "#000000"),
+                border_radius=16,
+            )
+
+        return ft.Column(
+            controls=[
+                placeholder(120),
+                placeholder(72),
+                placeholder(72),
+                placeholder(200),
+                ft.Row(
+                    controls=[ft.ProgressRing(width=20, height=20, stroke_width=2)],
+                    alignment=ft.MainAxisAlignment.CENTER,
+                ),
+            ],
+            spacing=16,
+            expand=True,
+        )
+
     def show_settings(self):
         """显示设置"""
         self.current_page = "settings"
-        # 重新创建设置系统实例
+        # 重新创建设置系统实例（设置模块连带导入 AI 接口，只在进入设置页时导入）
+        from systems.settings import SettingsSystem
         self.settings_system = SettingsSystem(self.db)
         self.main_content.controls = [self.settings_system.create_settings_view(self.refresh_current_page)]
         self.fab.visible = False
@@ -259,20 +375,43 @@ class MainWindow:
         self.page.update()
     
     def toggle_task(self, task: Task, completed: bool):
-        """切换任务完成状态"""
+        """切换任务完成状态
+
+        写入交给后台写入队列，不阻塞界面；同一任务排队中的多次切换只执行最后一次，
+        全部写入完成后再刷新页面。
+        """
         try:
+            write = self.db.complete_task if completed else self.db.uncomplete_task
+            future = self.db.writes.submit(
+                write, task.id, task.spirit_effect, task.blood_effect,
+                key=('task_records', task.id)
+            )
             if completed:
-                self.db.complete_task(task.id, task.spirit_effect, task.blood_effect)
                 print(f"完成任务: {task.name} (心境{task.spirit_effect:+d}, 血量{task.blood_effect:+d})")
             else:
-                self.db.uncomplete_task(task.id, task.spirit_effect, task.blood_effect)
                 print(f"取消任务: {task.name}")
-            
-            # 刷新当前页面
-            self.refresh_current_page()
+
+            self._last_task_write = future
+            future.add_done_callback(self._on_task_written)
         except Exception as e:
             print(f"切换任务状态错误: {e}")
             self.show_error_dialog(f"操作失败: {str(e)}")
+
+    def _on_task_written(self, future):
+        """后台写入完成回调（在写线程中执行）：交给 UI 事件循环报告错误，或只为最后一次切换刷新页面"""
+        async def update_ui():
+            try:
+                if future.exception() is not None:
+                    self.show_error_dialog(f"操作失败: {future.exception()}")
+                elif future is getattr(self, '_last_task_write', None):
+                    self.refresh_current_page()
+            except Exception as e:
+                print(f"刷新任务状态错误: {e}")
+
+        try:
+            self.page.run_task(update_ui)
+        except Exception:
+            pass  # 页面可能已关闭
     
     def delete_task(self, task: Task):
         """删除任务"""
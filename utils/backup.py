@@ -56,8 +56,13 @@ class BackupManager:
                 print(f"调度器错误: {e}")
     
     def _auto_backup(self):
-        """自动备份"""
+        """自动备份（数据自上次备份以来没有变化时跳过）"""
         try:
+            version = self._change_version()
+            backups = self.list_backups()
+            if version is not None and backups and backups[0].get('change_version') == version:
+                print("数据自上次备份以来没有变化，跳过自动备份")
+                return
             filename = self.create_backup(backup_type="auto")
             print(f"自动备份完成: {filename}")
             self._cleanup_old_backups()
@@ -84,6 +89,9 @@ class BackupManager:
         temp_backup_dir.mkdir(exist_ok=True)
         
         try:
+            # 先读取变更版本再复制：复制期间的新变化会被下一次备份包含
+            change_version = self._change_version()
+
             # 备份数据库文件
             if self.db_path.exists():
                 shutil.copy2(self.db_path, temp_backup_dir / self.db_path.name)
@@ -114,6 +122,7 @@ class BackupManager:
                 "description": description,
                 "created_at": datetime.now().isoformat(),
                 "database_file": self.db_path.name,
+                "change_version": change_version,
                 "files": [
                     self.db_path.name,
                     "data_export.json"
@@ -142,6 +151,23 @@ class BackupManager:
                 shutil.rmtree(temp_backup_dir)
             raise e
     
+    def _change_version(self) -> Optional[int]:
+        """数据库变更日志的当前版本，数据库不存在或没有变更日志时为 None"""
+        if not self.db_path.exists():
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                if not conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'changelog'").fetchone():
+                    return None
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changelog'").fetchone()
+                return row[0] if row else 0
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
     def _export_database_to_json(self) -> Dict[str, Any]:
         """将数据库导出为JSON格式"""
         if not self.db_path.exists():
@@ -1,30 +1,17 @@
 import os
 import json
+import importlib.util
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import sqlite3
 
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.colors import HexColor
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
+# reportlab 和 pandas 导入很慢，这里只检查是否安装，导出对应格式时才导入
+REPORTLAB_AVAILABLE = importlib.util.find_spec('reportlab') is not None
+PANDAS_AVAILABLE = importlib.util.find_spec('pandas') is not None
 
 from config import ThemeConfig, GameConfig
+from database.db_manager import derive_blood
 
 
 class ReportExporter:
@@ -34,14 +21,16 @@ class ReportExporter:
         self.db_path = db_path
         self.export_dir = Path("exports")
         self.export_dir.mkdir(exist_ok=True)
-        
-        # 注册中文字体（如果需要）
-        self._setup_fonts()
+        self._fonts_ready = False
     
     def _setup_fonts(self):
-        """设置字体支持"""
-        if REPORTLAB_AVAILABLE:
+        """设置字体支持（首次导出PDF时注册中文字体）"""
+        if REPORTLAB_AVAILABLE and not self._fonts_ready:
+            self._fonts_ready = True
             try:
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+                
                 # 尝试注册系统中文字体
                 font_paths = [
                     "C:/Windows/Fonts/msyh.ttc",  # Windows 微软雅黑
@@ -71,9 +60,10 @@ class ReportExporter:
             cursor.execute("SELECT * FROM user_config LIMIT 1")
             user_config = cursor.fetchone()
             
-            # 获取当前状态
-            cursor.execute("SELECT blood_value, spirit_value FROM user_stats ORDER BY id DESC LIMIT 1")
-            current_stats = cursor.fetchone()
+            # 获取当前状态 (寿元, 心境)，寿元由基准值按经过的时间推算
+            cursor.execute("SELECT current_blood, current_spirit, blood_updated_at FROM user_config LIMIT 1")
+            row = cursor.fetchone()
+            current_stats = (derive_blood(row[0], row[2]), row[1]) if row else None
             
             # 获取财务信息
             cursor.execute("""
@@ -93,8 +83,13 @@ class ReportExporter:
         finally:
             conn.close()
     
-    def get_period_data(self, period_type: str = "day", date_from: Optional[datetime] = None) -> Dict[str, Any]:
-        """获取指定周期的数据"""
+    def get_period_data(self, period_type: str = "day", date_from: Optional[datetime] = None,
+                        record_limit: Optional[int] = None) -> Dict[str, Any]:
+        """获取指定周期的数据
+
+        汇总指标读取每日汇总表（一年最多几百行）；明细记录只在报告需要展示时读取，
+        record_limit 限制明细条数，None 表示全部。
+        """
         if date_from is None:
             date_from = datetime.now()
         
@@ -118,10 +113,37 @@ class ReportExporter:
         else:
             raise ValueError(f"不支持的周期类型: {period_type}")
         
+        # 明细时间列以 'YYYY-MM-DD HH:MM:SS' 存储，汇总表以 'YYYY-MM-DD' 为键
+        start_str = start_date.strftime('%Y-%m-%d %H:%M:%S')
+        end_str = end_date.strftime('%Y-%m-%d %H:%M:%S')
+        start_day = start_date.date().isoformat()
+        end_day = end_date.date().isoformat()
+        limit = -1 if record_limit is None else record_limit
+        
         conn = self._get_db_connection()
         cursor = conn.cursor()
         
         try:
+            # 汇总指标：读取每日汇总表
+            cursor.execute("""
+                SELECT
+                    COALESCE(SUM(CASE WHEN type = 'income' THEN amount_total ELSE 0 END), 0),
+                    COALESCE(SUM(CASE WHEN type = 'expense' THEN amount_total ELSE 0 END), 0)
+                FROM daily_finance_rollup
+                WHERE day >= ? AND day < ?
+            """, (start_day, end_day))
+            income_total, expense_total = cursor.fetchone()
+            
+            cursor.execute("""
+                SELECT
+                    COALESCE(SUM(tasks_completed), 0),
+                    COALESCE(SUM(spirit_change), 0),
+                    COALESCE(SUM(blood_change), 0)
+                FROM daily_task_rollup
+                WHERE day >= ? AND day < ?
+            """, (start_day, end_day))
+            total_tasks, spirit_changes, blood_changes = cursor.fetchone()
+            
             # 获取任务完成记录
             cursor.execute("""
                 SELECT tr.*, t.name, t.category, tr.spirit_change, tr.blood_change
@@ -129,7 +151,8 @@ class ReportExporter:
                 JOIN tasks t ON tr.task_id = t.id
                 WHERE tr.completed_at >= ? AND tr.completed_at < ?
                 ORDER BY tr.completed_at DESC
-            """, (start_date.isoformat(), end_date.isoformat()))
+                LIMIT ?
+            """, (start_str, end_str, limit))
             task_records = cursor.fetchall()
             
             # 获取财务记录
@@ -137,17 +160,10 @@ class ReportExporter:
                 SELECT * FROM finance_records
                 WHERE created_at >= ? AND created_at < ?
                 ORDER BY created_at DESC
-            """, (start_date.isoformat(), end_date.isoformat()))
+                LIMIT ?
+            """, (start_str, end_str, limit))
             finance_records = cursor.fetchall()
             
-            # 获取心境变化统计
-            spirit_changes = sum(record[4] or 0 for record in task_records)  # spirit_change
-            blood_changes = sum(record[5] or 0 for record in task_records)   # blood_change
-            
-            # 获取财务统计
-            income_total = sum(record[2] for record in finance_records if record[1] == 'income')
-            expense_total = sum(record[2] for record in finance_records if record[1] == 'expense')
-            
             return {
                 'period_type': period_type,
                 'start_date': start_date,
@@ -155,7 +171,7 @@ class ReportExporter:
                 'task_records': task_records,
                 'finance_records': finance_records,
                 'summary': {
-                    'total_tasks': len(task_records),
+                    'total_tasks': total_tasks,
                     'spirit_changes': spirit_changes,
                     'blood_changes': blood_changes,
                     'income_total': income_total,
@@ -169,7 +185,7 @@ class ReportExporter:
     def export_markdown_report(self, period_type: str = "day", date_from: Optional[datetime] = None) -> str:
         """导出Markdown格式报告"""
         user_data = self.get_user_data()
-        period_data = self.get_period_data(period_type, date_from)
+        period_data = self.get_period_data(period_type, date_from, record_limit=20)
         
         # 生成文件名
         date_str = period_data['start_date'].strftime("%Y%m%d")
@@ -259,6 +275,7 @@ class ReportExporter:
         """导出Excel格式报告"""
         if not PANDAS_AVAILABLE:
             raise ImportError("需要安装pandas和openpyxl库来导出Excel文件")
+        import pandas as pd
         
         user_data = self.get_user_data()
         period_data = self.get_period_data(period_type, date_from)
@@ -319,9 +336,17 @@ class ReportExporter:
         """导出PDF格式报告"""
         if not REPORTLAB_AVAILABLE:
             raise ImportError("需要安装reportlab库来导出PDF文件")
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.colors import HexColor
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        
+        # 注册中文字体（如果需要）
+        self._setup_fonts()
         
         user_data = self.get_user_data()
-        period_data = self.get_period_data(period_type, date_from)
+        period_data = self.get_period_data(period_type, date_from, record_limit=10)
         
         # 生成文件名
         date_str = period_data['start_date'].strftime("%Y%m%d")
@@ -1,5 +1,4 @@
 import gc
-import psutil
 import threading
 import time
 from functools import wraps, lru_cache
@@ -18,13 +17,23 @@ class PerformanceOptimizer:
         self.performance_metrics = {}
         self.cleanup_tasks = []
         
-        # 启动内存监控线程
-        self.monitoring_active = True
-        self.monitor_thread = threading.Thread(target=self._monitor_memory, daemon=True)
-        self.monitor_thread.start()
+        # 内存监控线程在首次需要时才启动（导入本模块不启动线程、不导入 psutil）
+        self.monitoring_active = False
+        self.monitor_thread = None
+        self._monitor_lock = threading.Lock()
+    
+    def start_monitoring(self):
+        """启动内存监控线程（已启动时不重复启动）"""
+        with self._monitor_lock:
+            if self.monitoring_active:
+                return
+            self.monitoring_active = True
+            self.monitor_thread = threading.Thread(target=self._monitor_memory, daemon=True)
+            self.monitor_thread.start()
     
     def _monitor_memory(self):
         """监控内存使用情况"""
+        import psutil
         while self.monitoring_active:
             try:
                 process = psutil.Process()
@@ -77,6 +86,8 @@ class PerformanceOptimizer:
     def get_performance_stats(self) -> Dict[str, Any]:
         """获取性能统计信息"""
         try:
+            import psutil
+            self.start_monitoring()
             process = psutil.Process()
             cpu_percent = process.cpu_percent()
             
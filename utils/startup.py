@@ -0,0 +1,265 @@
+"""
+启动剖析 - 记录启动各阶段的耗时和每个模块的导入耗时，写入本地 JSON 日志
+
+各阶段用 startup.phase(名称) 包裹，只在 begin() 与 finish() 之间记录，之后（以及测试、脚本中
+从未 begin 的进程里）phase() 不做任何事。阶段可以嵌套，记录父阶段名称。
+
+导入耗时相当于进程内的 python -X importtime：在 sys.meta_path 最前面放一个查找器，
+委托其余查找器找到模块后包装加载器，计时 exec_module，得到每个模块的自身耗时和含子模块的累计耗时。
+不依赖解释器参数，在 Android 上同样可用。
+
+    startup.begin()                     # 进程最早处调用；环境变量 XIUXIAN_STARTUP_PROFILING=1 时记录导入耗时
+    with startup.phase('import_config'):
+        import config
+    startup.finish()                    # 首屏完成时调用，写入日志并检查预算
+
+本模块只依赖标准库，需在其他模块之前导入。
+"""
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+IMPORT_TIMING_ENV = "XIUXIAN_STARTUP_PROFILING"
+# 日志保留的启动次数
+STARTUP_LOG_RUNS = 20
+# 每次启动记录的导入数（按累计耗时取前若干个）
+TOP_IMPORTS = 40
+
+
+class _TimedLoader:
+    """包装模块加载器，计时 exec_module；执行完后把模块的 __loader__ 和 __spec__.loader 还原"""
+
+    def __init__(self, loader, timer: '_ImportTimer'):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec):
+        create = getattr(self._loader, 'create_module', None)
+        return create(spec) if create else None
+
+    def exec_module(self, module):
+        with self._timer.timing(module.__name__):
+            try:
+                self._loader.exec_module(module)
+            finally:
+                module.__loader__ = self._loader
+                if getattr(module, '__spec__', None) is not None:
+                    module.__spec__.loader = self._loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimer:
+    """sys.meta_path 上的计时查找器，records 为 {模块: [自身秒数, 累计秒数]}"""
+
+    def __init__(self):
+        self.records: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in list(sys.meta_path):
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @contextmanager
+    def timing(self, name: str):
+        # 每个线程一个栈：子模块的累计耗时从父模块的自身耗时中扣除
+        stack = self._local.__dict__.setdefault('stack', [])
+        frame = [0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cumulative = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += cumulative
+            with self._lock:
+                self.records[name] = [cumulative - frame[0], cumulative]
+
+    def report(self, limit: int = TOP_IMPORTS) -> List[dict]:
+        """按累计耗时从高到低的前 limit 个模块（毫秒）"""
+        with self._lock:
+            items = sorted(self.records.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {'module': name, 'self_ms': round(own * 1000, 3), 'cumulative_ms': round(total * 1000, 3)}
+            for name, (own, total) in items[:limit]
+        ]
+
+
+class StartupProfiler:
+    """记录一次启动的各阶段耗时和导入耗时"""
+
+    def __init__(self):
+        self.active = False
+        self._started = 0.0
+        self._phases: List[dict] = []
+        self._imports: Optional[_ImportTimer] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin(self, import_timing: bool = None):
+        """开始记录；import_timing 默认按环境变量 XIUXIAN_STARTUP_PROFILING"""
+        if import_timing is None:
+            import_timing = os.environ.get(IMPORT_TIMING_ENV) == "1"
+        self._started = time.perf_counter()
+        self._started_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._phases = []
+        self._imports = _ImportTimer() if import_timing else None
+        if self._imports:
+            self._imports.install()
+        self.active = True
+
+    @contextmanager
+    def phase(self, name: str):
+        """计时一个启动阶段；未在记录时不做任何事。阶段内抛出异常时记为 failed"""
+        if not self.active:
+            yield
+            return
+        stack = self._local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record = {
+                'name': name,
+                'parent': parent,
+                'start_ms': round((start - self._started) * 1000, 3),
+                'duration_ms': round((end - start) * 1000, 3),
+            }
+            if failed:
+                record['failed'] = True
+            with self._lock:
+                if self.active:
+                    self._phases.append(record)
+
+    def finish(self, write: bool = True, path: str = None, budgets: Dict[str, float] = None) -> Optional[dict]:
+        """结束记录，返回本次启动的记录；write 为真时追加到日志。未在记录时返回 None
+
+        budgets 默认为 config.STARTUP_BUDGETS_MS，超出预算的阶段记入 over_budget 并打印警告。
+        """
+        with self._lock:
+            if not self.active:
+                return None
+            self.active = False
+            total_ms = (time.perf_counter() - self._started) * 1000
+            phases = sorted(self._phases, key=lambda p: p['start_ms'])
+        if self._imports:
+            self._imports.uninstall()
+
+        run = {
+            'started_at': self._started_at,
+            'total_ms': round(total_ms, 3),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'phases': phases,
+            'imports': self._imports.report() if self._imports else [],
+        }
+        try:
+            if budgets is None:
+                from config import STARTUP_BUDGETS_MS
+                budgets = STARTUP_BUDGETS_MS
+            run['over_budget'] = check_budgets(phase_totals(run), budgets)
+            for item in run['over_budget']:
+                print(f"启动阶段 {item['phase']} 用时 {item['ms']:.0f}ms，超出预算 {item['budget_ms']:.0f}ms")
+            if write:
+                append_startup_log(run, path)
+        except Exception as e:
+            print(f"写入启动日志错误: {e}")
+        return run
+
+
+def phase_totals(run: dict) -> Dict[str, float]:
+    """每个阶段名称的总耗时（毫秒，同名阶段相加，不含失败的阶段），另含 total"""
+    totals = {}
+    for p in run.get('phases', []):
+        if not p.get('failed'):
+            totals[p['name']] = totals.get(p['name'], 0.0) + p['duration_ms']
+    totals['total'] = run.get('total_ms', 0.0)
+    return totals
+
+
+def check_budgets(totals: Dict[str, float], budgets: Dict[str, float]) -> List[dict]:
+    """按 {阶段: 毫秒} 检查预算，返回超出的 [{'phase', 'ms', 'budget_ms'}]；没有记录的阶段不检查"""
+    return [
+        {'phase': name, 'ms': round(totals[name], 3), 'budget_ms': budget}
+        for name, budget in budgets.items()
+        if name in totals and totals[name] > budget
+    ]
+
+
+def default_log_path() -> str:
+    from config import init_paths, STARTUP_LOG_NAME
+    return str(init_paths()[0] / STARTUP_LOG_NAME)
+
+
+def load_startup_log(path: str = None) -> List[dict]:
+    """日志中的启动记录，最近的在最后；日志不存在或损坏时返回空列表"""
+    path = path or default_log_path()
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('runs', [])
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def append_startup_log(run: dict, path: str = None, keep: int = STARTUP_LOG_RUNS):
+    """把一次启动记录追加到日志，只保留最近 keep 次"""
+    path = path or default_log_path()
+    runs = (load_startup_log(path) + [run])[-keep:]
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'runs': runs}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def format_run(run: dict, imports: int = 10) -> str:
+    """一次启动记录的文本摘要：总耗时、各阶段（按嵌套缩进）、超出预算的阶段和最慢的导入"""
+    lines = [f"{run.get('started_at', '')}  总计 {run.get('total_ms', 0):.0f}ms"]
+    depth = {}
+    for p in run.get('phases', []):
+        depth[p['name']] = depth.get(p['parent'], -1) + 1 if p['parent'] else 0
+        mark = '（失败）' if p.get('failed') else ''
+        lines.append(f"{'  ' * (depth[p['name']] + 1)}{p['name']}: {p['duration_ms']:.1f}ms{mark}")
+    for item in run.get('over_budget', []):
+        lines.append(f"超出预算 {item['phase']}: {item['ms']:.0f}ms > {item['budget_ms']:.0f}ms")
+    if run.get('imports') and imports:
+        lines.append("导入耗时（累计/自身 ms）:")
+        for item in run['imports'][:imports]:
+            lines.append(f"  {item['module']}: {item['cumulative_ms']:.1f} / {item['self_ms']:.1f}")
+    return '\n'.join(lines)
+
+
+# 全局启动剖析器
+startup = StartupProfiler()
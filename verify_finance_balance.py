@@ -0,0 +1,56 @@
+"""
+灵石账本校验工具 - 按全部财务记录重新汇总余额并报告偏差
+
+用法：
+    python verify_finance_balance.py            # 只校验
+    python verify_finance_balance.py --repair   # 发现偏差时以历史记录为准修正账本
+    python verify_finance_balance.py --db PATH  # 指定数据库文件
+"""
+import argparse
+import sys
+
+from database.db_manager import DatabaseManager
+
+
+def verify_finance_balance(db_path: str = None, repair: bool = False) -> bool:
+    """校验灵石账本，返回账本是否一致（修正后视为一致）"""
+    db = DatabaseManager(db_path)
+    try:
+        report = db.verify_finance_balance(repair=repair)
+        if report is None:
+            print("\n[ERROR] 账本校验失败")
+            return False
+
+        stored, actual, drift = report['stored'], report['actual'], report['drift']
+        print(f"\n{'':8}{'账本':>16}{'历史汇总':>16}{'偏差':>12}")
+        print(f"{'累计收入':8}{stored['income']:>16,.2f}{actual['income']:>16,.2f}{drift['income']:>12,.2f}")
+        print(f"{'累计支出':8}{stored['expense']:>16,.2f}{actual['expense']:>16,.2f}{drift['expense']:>12,.2f}")
+        print(f"{'记录数':8}{stored['record_count']:>16}{actual['record_count']:>16}{drift['record_count']:>12}")
+
+        if not report['has_drift']:
+            print("\n[OK] 账本与历史记录一致")
+            return True
+        if report['repaired']:
+            print("\n[OK] 已按历史记录重建账本")
+            return True
+
+        print("\n[WARN] 账本存在偏差，可使用 --repair 重建")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="校验/重建灵石余额账本")
+    parser.add_argument("--repair", action="store_true", help="发现偏差时重建账本")
+    parser.add_argument("--db", default=None, help="数据库文件路径（默认使用应用数据目录）")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("灵石账本校验工具")
+    print("=" * 50)
+
+    ok = verify_finance_balance(args.db, args.repair)
+
+    print("=" * 50)
+    sys.exit(0 if ok else 1)